@@ -0,0 +1,493 @@
+"""Define a non-blocking hive transport on asyncio streams.
+
+An AsyncHiveTransport exchange complete Thrift messages (binary protocol)
+with an Indexima server, in the same authentication modes than
+create_hive_transport:
+
+- NOSASL (buffered or framed transport)
+- NONE, CUSTOM and LDAP (sasl 'PLAIN' mechanism)
+- KERBEROS (sasl 'GSSAPI' mechanism)
+
+An AsyncTCLIServiceClient serialize TCLIService calls with generated
+Thrift client code on memory buffers, so many sessions could be driven
+by one event loop.
+
+```python
+transport = create_async_hive_transport(host='localhost', port=10000, auth='NOSASL')
+await transport.open()
+client = AsyncTCLIServiceClient(transport)
+response = await client.call('OpenSession', ttypes.TOpenSessionReq(...))
+```
+"""
+import asyncio
+import socket as _socket
+import struct
+from typing import Any, List, Optional, Tuple
+
+from TCLIService import TCLIService
+from thrift.protocol.TBinaryProtocol import TBinaryProtocol
+from thrift.protocol.TProtocol import TProtocolException
+from thrift.Thrift import TType
+from thrift.transport.TTransport import TMemoryBuffer, TTransportException
+
+from airflow_indexima.hive_transport import (
+    SaslFactory,
+    check_hive_connection_parameters,
+    create_gssapi_sasl_factory,
+    create_plain_sasl_factory,
+)
+
+
+__all__ = ['AsyncHiveTransport', 'AsyncTCLIServiceClient', 'create_async_hive_transport']
+
+
+_SASL_START = 1
+_SASL_OK = 2
+_SASL_COMPLETE = 5
+
+_I32 = struct.Struct('>i')
+
+_FIXED_SIZES = {TType.BOOL: 1, TType.BYTE: 1, TType.I16: 2, TType.I32: 4, TType.I64: 8, TType.DOUBLE: 8}
+_SCALAR_TYPES = set(_FIXED_SIZES) | {TType.STRING}
+
+# scanner frames
+_STRUCT = 0
+_SEQUENCE = 1
+_VALUE = 2
+
+
+class _MessageScanner:
+    """Find the end of a Thrift binary protocol message in a growing buffer.
+
+    Scan is resumed where it stopped on previous call, so each byte of a
+    large response is scanned once.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._position = 0
+        self._stack: List[List[int]] = []
+        self._started = False
+
+    def scan(self, buffer: bytearray) -> Optional[int]:
+        """Return message length, or None if buffer does not contain a complete message."""
+        if not self._started and not self._scan_header(buffer):
+            return None
+        while self._stack:
+            frame = self._stack[-1]
+            available = len(buffer) - self._position
+            if frame[0] == _STRUCT:
+                if available < 1:
+                    return None
+                if buffer[self._position] == TType.STOP:
+                    self._position += 1
+                    self._stack.pop()
+                    continue
+                # field type and identifier
+                if available < 3:
+                    return None
+                self._stack.append([_VALUE, buffer[self._position]])
+                self._position += 3
+            elif frame[0] == _SEQUENCE:
+                # [_SEQUENCE, remaining, element type] or [_SEQUENCE, remaining, key type, value type]
+                if len(frame) == 3 and frame[1]:
+                    # fast path of column values
+                    self._scan_elements(buffer, frame)
+                if frame[1] == 0:
+                    self._stack.pop()
+                    continue
+                if len(frame) == 3 and frame[2] in _SCALAR_TYPES:
+                    return None
+                element_type = frame[2] if len(frame) == 3 else frame[2 + frame[1] % 2]
+                frame[1] -= 1
+                self._stack.append([_VALUE, element_type])
+            elif not self._scan_value(buffer, frame[1]):
+                return None
+        return self._position
+
+    def _scan_elements(self, buffer: bytearray, frame: List[int]):
+        position, remaining, end = self._position, frame[1], len(buffer)
+        size = _FIXED_SIZES.get(frame[2])
+        if size is not None:
+            count = min(remaining, (end - position) // size)
+            position += count * size
+            remaining -= count
+        elif frame[2] == TType.STRING:
+            unpack_from = _I32.unpack_from
+            while remaining and position + 4 <= end:
+                (length,) = unpack_from(buffer, position)
+                if position + 4 + length > end:
+                    break
+                position += 4 + length
+                remaining -= 1
+        self._position, frame[1] = position, remaining
+
+    def _scan_header(self, buffer: bytearray) -> bool:
+        if len(buffer) < 4:
+            return False
+        (first,) = _I32.unpack_from(buffer, 0)
+        if first < 0:
+            # strict mode: version and type, name, sequence id
+            if len(buffer) < 8:
+                return False
+            (length,) = _I32.unpack_from(buffer, 4)
+            end = 8 + length + 4
+        else:
+            # old mode: name, type, sequence id
+            end = 4 + first + 1 + 4
+        if len(buffer) < end:
+            return False
+        self._position = end
+        self._stack = [[_STRUCT]]
+        self._started = True
+        return True
+
+    def _scan_value(self, buffer: bytearray, value_type: int) -> bool:
+        available = len(buffer) - self._position
+        size = _FIXED_SIZES.get(value_type)
+        if size is not None:
+            if available < size:
+                return False
+            self._position += size
+            self._stack.pop()
+        elif value_type == TType.STRING:
+            if available < 4:
+                return False
+            (length,) = _I32.unpack_from(buffer, self._position)
+            if available < 4 + length:
+                return False
+            self._position += 4 + length
+            self._stack.pop()
+        elif value_type == TType.STRUCT:
+            self._stack[-1] = [_STRUCT]
+        elif value_type in (TType.LIST, TType.SET):
+            if available < 5:
+                return False
+            element_type = buffer[self._position]
+            (count,) = _I32.unpack_from(buffer, self._position + 1)
+            self._position += 5
+            self._stack[-1] = [_SEQUENCE, count, element_type]
+        elif value_type == TType.MAP:
+            if available < 6:
+                return False
+            key_type, value_type = buffer[self._position], buffer[self._position + 1]
+            (count,) = _I32.unpack_from(buffer, self._position + 2)
+            self._position += 6
+            self._stack[-1] = [_SEQUENCE, 2 * count, key_type, value_type]
+        else:
+            raise TProtocolException(
+                type=TProtocolException.INVALID_DATA, message=f'unexpected type {value_type}'
+            )
+        return True
+
+
+class AsyncHiveTransport:
+    """A non-blocking transport of Thrift messages on asyncio streams.
+
+    A call which fail or is interrupted (timeout, task cancellation) close
+    the transport: stream position of the pending response is unknown.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        timeout_seconds: Optional[int] = None,
+        sasl_factory: Optional[SaslFactory] = None,
+        mechanism: Optional[str] = None,
+        framed_transport: Optional[bool] = None,
+        socket_keepalive: Optional[bool] = None,
+        tcp_nodelay: Optional[bool] = None,
+        recv_buffer_size: Optional[int] = None,
+        send_buffer_size: Optional[int] = None,
+        read_buffer_size: Optional[int] = None,
+    ):
+        """Create an AsyncHiveTransport instance.
+
+        # Parameters
+            host (str): The host to connect to.
+            port (Optional[int]): The (TCP) port to connect to (default 10000).
+            timeout_seconds (Optional[int]): optional timeout of connect and calls in second
+            sasl_factory (Optional[SaslFactory]): optional sasl client factory, if not set
+                messages are not authenticated (NOSASL)
+            mechanism (Optional[str]): sasl mechanism ('PLAIN' or 'GSSAPI')
+            framed_transport (Optional[bool]): use framed messages (NOSASL only)
+            socket_keepalive (Optional[bool]): enable TCP keepalive
+            tcp_nodelay (Optional[bool]): set TCP_NODELAY option
+            recv_buffer_size (Optional[int]): set SO_RCVBUF option (in bytes)
+            send_buffer_size (Optional[int]): set SO_SNDBUF option (in bytes)
+            read_buffer_size (Optional[int]): size of stream reads in bytes (default 65536)
+        """
+        self.host = host
+        self.port = port if port else 10000
+        self._timeout_seconds = timeout_seconds
+        self._sasl_factory = sasl_factory
+        self._mechanism = mechanism
+        self._framed = bool(framed_transport) or sasl_factory is not None
+        self._socket_keepalive = socket_keepalive
+        self._tcp_nodelay = tcp_nodelay
+        self._recv_buffer_size = recv_buffer_size
+        self._send_buffer_size = send_buffer_size
+        self._read_size = read_buffer_size or 65536
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._sasl: Optional[Any] = None
+        self._encode: Optional[bool] = None
+        self._read_buffer = bytearray()
+        self._scanner = _MessageScanner()
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self):
+        """Connect and process sasl negotiation (if any).
+
+        # Raises
+            (TTransportException): if connection or negotiation fail
+        """
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self._timeout_seconds
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise TTransportException(
+                type=TTransportException.NOT_OPEN,
+                message=f'Could not connect to {self.host}:{self.port}: {e}',
+            )
+        self._reader, self._writer = reader, writer
+        self._set_socket_options(writer.get_extra_info('socket'))
+        if self._sasl_factory is not None:
+            try:
+                await asyncio.wait_for(self._negotiate(), timeout=self._timeout_seconds)
+            except BaseException:
+                self.close()
+                raise
+
+    def _get_streams(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._reader is None or self._writer is None:
+            raise TTransportException(type=TTransportException.NOT_OPEN, message='Transport not open')
+        return self._reader, self._writer
+
+    def _set_socket_options(self, handle: Optional[_socket.socket]):
+        if handle is None:
+            return
+        if self._socket_keepalive:
+            handle.setsockopt(_socket.SOL_SOCKET, _socket.SO_KEEPALIVE, 1)
+        if self._tcp_nodelay is not None and handle.family in (_socket.AF_INET, _socket.AF_INET6):
+            handle.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, 1 if self._tcp_nodelay else 0)
+        if self._recv_buffer_size:
+            handle.setsockopt(_socket.SOL_SOCKET, _socket.SO_RCVBUF, self._recv_buffer_size)
+        if self._send_buffer_size:
+            handle.setsockopt(_socket.SOL_SOCKET, _socket.SO_SNDBUF, self._send_buffer_size)
+
+    async def _negotiate(self):
+        # same negotiation than thrift_sasl.TSaslClientTransport.open
+        self._sasl = self._sasl_factory()  # type: ignore
+        ret, chosen_mechanism, initial_response = self._sasl.start(self._mechanism)
+        if not ret:
+            raise TTransportException(
+                type=TTransportException.NOT_OPEN, message=f'Could not start SASL: {self._sasl.getError()}'
+            )
+        self._send_sasl_message(_SASL_START, chosen_mechanism)
+        self._send_sasl_message(_SASL_OK, initial_response)
+        reader, writer = self._get_streams()
+        await writer.drain()
+        while True:
+            status, length = struct.unpack('>BI', await reader.readexactly(5))
+            payload = await reader.readexactly(length) if length else b''
+            if status not in (_SASL_OK, _SASL_COMPLETE):
+                raise TTransportException(
+                    type=TTransportException.NOT_OPEN, message=f'Bad status: {status} ({payload!r})'
+                )
+            if status == _SASL_COMPLETE:
+                return
+            ret, response = self._sasl.step(payload)
+            if not ret:
+                raise TTransportException(
+                    type=TTransportException.NOT_OPEN, message=f'Bad SASL result: {self._sasl.getError()}'
+                )
+            self._send_sasl_message(_SASL_OK, response)
+            await writer.drain()
+
+    def _send_sasl_message(self, status: int, body: Any):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        _, writer = self._get_streams()
+        writer.write(struct.pack('>BI', status, len(body)) + body)
+
+    def _write(self, message: bytes):
+        _, writer = self._get_streams()
+        if self._sasl is not None:
+            # like thrift_sasl: encode if sasl layer change payload (QOP auth-int or auth-conf)
+            if self._encode is None or self._encode:
+                success, encoded = self._sasl.encode(message)
+                if not success:
+                    raise TTransportException(type=TTransportException.UNKNOWN, message=self._sasl.getError())
+                if self._encode is None:
+                    self._encode = len(encoded) != len(message)
+                if self._encode:
+                    writer.write(encoded)
+                    return
+        if self._framed:
+            writer.write(struct.pack('>I', len(message)) + message)
+        else:
+            writer.write(message)
+
+    async def _read_chunk(self) -> bytes:
+        reader, _ = self._get_streams()
+        if not self._framed:
+            data = await reader.read(self._read_size)
+            if not data:
+                raise TTransportException(type=TTransportException.END_OF_FILE, message='Connection closed')
+            return data
+        header = await reader.readexactly(4)
+        (length,) = struct.unpack('>I', header)
+        payload = await reader.readexactly(length)
+        if self._sasl is not None and self._encode:
+            success, payload = self._sasl.decode(header + payload)
+            if not success:
+                raise TTransportException(type=TTransportException.UNKNOWN, message=self._sasl.getError())
+        return payload
+
+    async def _receive(self) -> bytes:
+        while True:
+            length = self._scanner.scan(self._read_buffer)
+            if length is not None:
+                message = bytes(self._read_buffer[:length])
+                del self._read_buffer[:length]
+                self._scanner.reset()
+                return message
+            self._read_buffer += await self._read_chunk()
+
+    async def _call(self, message: bytes) -> bytes:
+        _, writer = self._get_streams()
+        self._write(message)
+        await writer.drain()
+        return await self._receive()
+
+    async def call(self, message: bytes) -> bytes:
+        """Send a request message and return its response message.
+
+        # Parameters
+            message (bytes): request message
+
+        # Returns
+            (bytes): response message
+
+        # Raises
+            (TTransportException): if transport is not open, on timeout or if connection is lost
+        """
+        if not self.is_open:
+            raise TTransportException(type=TTransportException.NOT_OPEN, message='Transport not open')
+        try:
+            return await asyncio.wait_for(self._call(message), timeout=self._timeout_seconds)
+        except asyncio.TimeoutError:
+            self.close()
+            raise TTransportException(type=TTransportException.TIMED_OUT, message='Call timed out')
+        except asyncio.IncompleteReadError:
+            self.close()
+            raise TTransportException(type=TTransportException.END_OF_FILE, message='Connection closed')
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Close connection."""
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            writer.close()
+        self._sasl = None
+        self._encode = None
+        self._read_buffer = bytearray()
+        self._scanner.reset()
+
+
+class AsyncTCLIServiceClient:
+    """A TCLIService client on an AsyncHiveTransport.
+
+    Calls are serialized: a transport carry one request at a time.
+    """
+
+    def __init__(self, transport: AsyncHiveTransport):
+        self.transport = transport
+        self._client = TCLIService.Client(TBinaryProtocol(TMemoryBuffer()))
+        self._lock = asyncio.Lock()
+
+    async def call(self, name: str, request: Any) -> Any:
+        """Call a TCLIService method.
+
+        # Parameters
+            name (str): method name (like 'ExecuteStatement')
+            request (Any): method request (like TExecuteStatementReq)
+
+        # Returns
+            (Any): method response (like TExecuteStatementResp)
+        """
+        async with self._lock:
+            output = TMemoryBuffer()
+            self._client._oprot = TBinaryProtocol(output)
+            getattr(self._client, f'send_{name}')(request)
+            response = await self.transport.call(output.getvalue())
+            self._client._iprot = TBinaryProtocol(TMemoryBuffer(response))
+            return getattr(self._client, f'recv_{name}')()
+
+
+def create_async_hive_transport(
+    host: str,
+    port: Optional[int] = None,
+    timeout_seconds: Optional[int] = None,
+    socket_keepalive: Optional[bool] = None,
+    auth: Optional[str] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    kerberos_service_name: Optional[str] = None,
+    tcp_nodelay: Optional[bool] = None,
+    recv_buffer_size: Optional[int] = None,
+    send_buffer_size: Optional[int] = None,
+    read_buffer_size: Optional[int] = None,
+    framed_transport: Optional[bool] = None,
+    kerberos_ccache: Optional[str] = None,
+) -> AsyncHiveTransport:
+    """Create an AsyncHiveTransport.
+
+    Parameters are those of create_hive_transport (except record_path).
+
+    # Returns
+        (AsyncHiveTransport): transport instance (not opened)
+
+    # Raises
+        (ValueError): if something is wrong
+    """
+    check_hive_connection_parameters(
+        auth=auth, username=username, password=password, kerberos_service_name=kerberos_service_name
+    )
+
+    sasl_factory: Optional[SaslFactory] = None
+    mechanism: Optional[str] = None
+    if auth == 'KERBEROS':
+        sasl_factory = create_gssapi_sasl_factory(
+            host=host, service_name=kerberos_service_name, ccache=kerberos_ccache  # type: ignore
+        )
+        mechanism = 'GSSAPI'
+    elif auth != 'NOSASL':
+        if not username:
+            raise ValueError(f'username should be set in {auth} mode')
+        sasl_factory = create_plain_sasl_factory(host=host, username=username, password=password)
+        mechanism = 'PLAIN'
+
+    return AsyncHiveTransport(
+        host=host,
+        port=port,
+        timeout_seconds=timeout_seconds,
+        sasl_factory=sasl_factory,
+        mechanism=mechanism,
+        framed_transport=framed_transport,
+        socket_keepalive=socket_keepalive,
+        tcp_nodelay=tcp_nodelay,
+        recv_buffer_size=recv_buffer_size,
+        send_buffer_size=send_buffer_size,
+        read_buffer_size=read_buffer_size,
+    )
@@ -0,0 +1,475 @@
+"""Define a local session broker shared by all worker processes of a host.
+
+The broker keeps warm, authenticated hive sessions (IndeximaHook) per
+connection identifier, and serve them to task processes over a Unix socket
+(see IndeximaBrokerHook). Connection count and handshake cost per host are
+bounded by the broker pool size, whatever the number of task processes.
+
+A task process lease a session for the life of its broker connection:
+
+```
+-> {'op': 'lease', 'conn_id': ..., 'configuration': ..., 'schema': ...}      <- {'lease': ...}
+-> {'op': 'run', 'sql': ..., 'progress': ...}  <- {'status': ...}, ... {'description': ...}
+-> {'op': 'fetch', 'size': ...}         <- {'rows': [...]}
+-> {'op': 'cancel', 'lease': ...}       <- {}   (on another broker connection)
+```
+
+With 'progress' set, each status poll of the running statement is forwarded
+(progress and new server logs) until the final response, so the progress
+monitor of the task (logs, stall and timeout) is updated in task process.
+
+A lease is rejected if hive configuration or schema of task hook differ from
+those of broker sessions. An idle session is checked (with a 'SELECT 1') before
+a lease, and a session whose state was changed by a SET or USE statement is
+closed at release rather than served to another task.
+
+Messages are pickled (with a 4 bytes length prefix), so socket file is
+only accessible by its owner (worker processes must run with the same user).
+
+Usage:
+
+```
+python -m airflow_indexima.broker --socket-path /var/run/indexima/broker.sock --pool-size 8
+```
+"""
+import argparse
+import logging
+import os
+import pickle
+import socketserver
+import struct
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from pyhive import hive
+
+from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.progress import OperationMonitor
+from airflow_indexima.retry import is_session_statement
+
+
+__all__ = ['IndeximaSessionBroker', 'send_message', 'receive_message']
+
+
+_logger = logging.getLogger(__name__)
+
+
+def send_message(stream: BinaryIO, message: Dict[str, Any]):
+    """Write a message on a stream.
+
+    # Parameters
+        stream (BinaryIO): output stream
+        message (Dict[str, Any]): message
+    """
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(struct.pack('>I', len(data)) + data)
+    stream.flush()
+
+
+def receive_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read a message from a stream.
+
+    # Parameters
+        stream (BinaryIO): input stream
+
+    # Returns
+        (Optional[Dict[str, Any]]): message or None if stream is closed
+    """
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (length,) = struct.unpack('>I', header)
+    return pickle.loads(stream.read(length))
+
+
+def _check_lease_settings(
+    hook: IndeximaHook,
+    message: Dict[str, Any],
+    schema: Optional[str] = None,
+    default_schema: Optional[str] = None,
+):
+    """Raise RuntimeError if hive configuration or schema of a lease differ from session ones.
+
+    # Parameters
+        hook (IndeximaHook): leased session
+        message (Dict[str, Any]): lease request
+        schema (Optional[str]): schema of broker sessions (default: schema of connection)
+        default_schema (Optional[str]): schema of connection
+    """
+    if 'configuration' in message and message['configuration'] != hook.hive_configuration:
+        raise RuntimeError(
+            f"hive configuration {message['configuration']} differ from broker sessions "
+            f'configuration {hook.hive_configuration}'
+        )
+    # a lease without schema use the connection one, like broker sessions without schema
+    requested = message.get('schema') or default_schema
+    served = schema or default_schema
+    if requested != served:
+        raise RuntimeError(f'schema {requested} differ from broker sessions schema {served}')
+
+
+class _SessionPool:
+    def __init__(
+        self,
+        conn_id: str,
+        max_sessions: int,
+        max_idle_seconds: Optional[float],
+        check_idle_seconds: float = 30.0,
+        **hook_parameters,
+    ):
+        self.conn_id = conn_id
+        self._max_sessions = max_sessions
+        self._max_idle_seconds = max_idle_seconds
+        self._check_idle_seconds = check_idle_seconds
+        self._hook_parameters = hook_parameters
+        self._idle: List[Tuple[float, IndeximaHook]] = []
+        self._leased = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._default_schema: Optional[str] = None
+
+    @property
+    def schema(self) -> Optional[str]:
+        """Return schema of sessions (None: schema of connection)."""
+        return self._hook_parameters.get('schema')
+
+    def get_default_schema(self) -> Optional[str]:
+        """Return schema of connection."""
+        if self._default_schema is None:
+            self._default_schema = IndeximaHook.get_connection(self.conn_id).schema or None
+        return self._default_schema
+
+    def _create_hook(self) -> IndeximaHook:
+        hook = IndeximaHook(indexima_conn_id=self.conn_id, **self._hook_parameters)
+        hook.get_conn()
+        return hook
+
+    def warm(self, count: int):
+        for _ in range(min(count, self._max_sessions)):
+            hook = self._create_hook()
+            with self._condition:
+                self._idle.append((time.monotonic(), hook))
+
+    def _is_available(self) -> bool:
+        return bool(self._idle) or self._leased + len(self._idle) < self._max_sessions
+
+    def lease(self, timeout: Optional[float] = None) -> IndeximaHook:
+        with self._condition:
+            self._waiting += 1
+            try:
+                if not self._condition.wait_for(self._is_available, timeout=timeout):
+                    raise RuntimeError(f'no session available on {self.conn_id} after {timeout}s')
+            finally:
+                self._waiting -= 1
+            self._leased += 1
+            # idle session is taken with its slot: another waiter could not take it
+            entry = self._idle.pop() if self._idle else None
+        try:
+            while entry is not None:
+                idle_since, candidate = entry
+                idle_seconds = time.monotonic() - idle_since
+                if self._max_idle_seconds is not None and idle_seconds > self._max_idle_seconds:
+                    # server could have closed this session
+                    self._close(candidate)
+                elif idle_seconds > self._check_idle_seconds and not self._is_alive(candidate):
+                    self._close(candidate)
+                else:
+                    return candidate
+                with self._condition:
+                    entry = self._idle.pop() if self._idle else None
+            return self._create_hook()
+        except BaseException:
+            self.release(None)
+            raise
+
+    def _is_alive(self, hook: IndeximaHook) -> bool:
+        try:
+            hook.run('SELECT 1').fetchall()
+            return True
+        except Exception as e:
+            _logger.info(f'idle session of {self.conn_id} is closed: {e}')
+            return False
+
+    def release(self, hook: Optional[IndeximaHook], discard: bool = False):
+        with self._condition:
+            self._leased -= 1
+            if hook is not None:
+                if discard:
+                    self._close(hook)
+                else:
+                    self._idle.append((time.monotonic(), hook))
+            self._condition.notify()
+
+    def _close(self, hook: IndeximaHook):
+        try:
+            hook.close()
+        except Exception as e:
+            _logger.warning(f'unable to close session: {e}')
+
+    def close(self):
+        with self._condition:
+            for _, hook in self._idle:
+                self._close(hook)
+            self._idle = []
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'idle': len(self._idle), 'leased': self._leased, 'waiting': self._waiting}
+
+
+class _StatusForwarder(OperationMonitor):
+    """Operation monitor which forward status polls to task process."""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+
+    def start(self):
+        pass
+
+    def update(self, response: Any, logs: Sequence[str] = ()):
+        update = getattr(response, 'progressUpdateResponse', None)
+        progress = update.progressedPercentage if update is not None else None
+        send_message(self._stream, {'status': {'progress': progress, 'logs': list(logs)}})
+
+
+class _Lease:
+    def __init__(self, hook: IndeximaHook):
+        self.hook = hook
+        self.cancelled = False
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+    server: 'IndeximaSessionBroker'
+
+    def handle(self):
+        message = receive_message(self.rfile)
+        if not message:
+            return
+        if message['op'] == 'cancel':
+            self.server.cancel(message['lease'])
+            send_message(self.wfile, {})
+            return
+        if message['op'] == 'stats':
+            send_message(self.wfile, {'stats': self.server.stats})
+            return
+        if message['op'] != 'lease':
+            error = f"unexpected operation {message['op']}"
+            send_message(self.wfile, {'error': error, 'error_type': 'RuntimeError'})
+            return
+
+        try:
+            pool = self.server.get_pool(message['conn_id'])
+            hook = pool.lease(timeout=self.server.lease_timeout)
+        except Exception as e:
+            send_message(self.wfile, {'error': str(e), 'error_type': 'RuntimeError'})
+            return
+        try:
+            _check_lease_settings(
+                hook, message, schema=pool.schema, default_schema=pool.get_default_schema()
+            )
+        except RuntimeError as e:
+            pool.release(hook)
+            send_message(self.wfile, {'error': str(e), 'error_type': 'RuntimeError'})
+            return
+        lease_id, lease = self.server.register_lease(hook)
+        discard = False
+        try:
+            send_message(self.wfile, {'lease': lease_id})
+            discard = self._serve(lease)
+        except Exception as e:
+            _logger.warning(f'lease {lease_id} ended with error: {e}')
+            discard = True
+        finally:
+            self.server.unregister_lease(lease_id)
+            pool.release(hook, discard=discard or lease.cancelled)
+
+    def _serve(self, lease: _Lease) -> bool:
+        """Serve run and fetch requests, return True if session must be discarded.
+
+        A session changed by a SET or USE statement is discarded: its state must not
+        leak into the next lease.
+        """
+        hook = lease.hook
+        cursor: Any = None
+        changed = False
+        while True:
+            message = receive_message(self.rfile)
+            if message is None or message['op'] == 'close':
+                return changed
+            try:
+                if message['op'] == 'run':
+                    changed = changed or is_session_statement(message['sql'])
+                    forwarder = _StatusForwarder(self.wfile) if message.get('progress') else None
+                    cursor = hook.run(message['sql'], progress_monitor=forwarder)
+                    send_message(self.wfile, {'description': cursor.description})
+                elif message['op'] == 'fetch':
+                    rows = cursor.fetchmany(message['size']) if cursor and cursor.description else []
+                    send_message(self.wfile, {'rows': rows})
+                else:
+                    raise RuntimeError(f"unexpected operation {message['op']}")
+            except Exception as e:
+                if lease.cancelled:
+                    error = 'operation cancelled'
+                    send_message(self.wfile, {'error': error, 'error_type': 'OperationalError'})
+                    return True
+                if isinstance(e, hive.Error):
+                    # statement error: session is still usable
+                    send_message(self.wfile, {'error': str(e), 'error_type': 'OperationalError'})
+                    continue
+                send_message(self.wfile, {'error': str(e), 'error_type': 'RuntimeError'})
+                return True
+
+
+class IndeximaSessionBroker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A session broker listening on a Unix socket.
+
+    ```python
+    broker = IndeximaSessionBroker(socket_path='/var/run/indexima/broker.sock', pool_size=8)
+    broker.warm('my-conn', 4)
+    broker.serve_forever()
+    ```
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        pool_size: int = 8,
+        lease_timeout: Optional[float] = None,
+        max_idle_seconds: Optional[float] = 3600,
+        check_idle_seconds: float = 30.0,
+        **hook_parameters,
+    ):
+        """Create an IndeximaSessionBroker instance.
+
+        # Parameters
+            socket_path (str): Unix socket path (replaced if exists)
+            pool_size (int): maximum of sessions per connection identifier (default 8)
+            lease_timeout (Optional[float]): maximum waiting delay of a session in seconds (default None)
+            max_idle_seconds (Optional[float]): idle sessions older than this delay are
+                closed rather than leased (default 3600)
+            check_idle_seconds (float): idle sessions older than this delay are checked with a
+                'SELECT 1' before a lease (default 30.0)
+
+        Others parameters are IndeximaHook parameters of pooled sessions (like auth or timeout_seconds).
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # socket file is created only accessible by its owner (no window before a chmod)
+        umask = os.umask(0o177)
+        try:
+            super(IndeximaSessionBroker, self).__init__(socket_path, _BrokerRequestHandler)
+        finally:
+            os.umask(umask)
+        self.socket_path = socket_path
+        self.lease_timeout = lease_timeout
+        self._pool_size = pool_size
+        self._max_idle_seconds = max_idle_seconds
+        self._check_idle_seconds = check_idle_seconds
+        self._hook_parameters = hook_parameters
+        self._pools: Dict[str, _SessionPool] = {}
+        self._leases: Dict[str, _Lease] = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, conn_id: str) -> _SessionPool:
+        """Return session pool of a connection identifier."""
+        with self._lock:
+            if conn_id not in self._pools:
+                self._pools[conn_id] = _SessionPool(
+                    conn_id=conn_id,
+                    max_sessions=self._pool_size,
+                    max_idle_seconds=self._max_idle_seconds,
+                    check_idle_seconds=self._check_idle_seconds,
+                    **self._hook_parameters,
+                )
+            return self._pools[conn_id]
+
+    def warm(self, conn_id: str, count: int):
+        """Open sessions in advance.
+
+        # Parameters
+            conn_id (str): connection identifier
+            count (int): session count (bounded by pool size)
+        """
+        self.get_pool(conn_id).warm(count)
+
+    def register_lease(self, hook: IndeximaHook) -> Tuple[str, _Lease]:
+        lease_id = uuid.uuid4().hex
+        lease = _Lease(hook)
+        with self._lock:
+            self._leases[lease_id] = lease
+        return lease_id, lease
+
+    def unregister_lease(self, lease_id: str):
+        with self._lock:
+            self._leases.pop(lease_id, None)
+
+    def cancel(self, lease_id: str):
+        """Cancel active operation of a lease (its session is discarded)."""
+        with self._lock:
+            lease = self._leases.get(lease_id)
+        if lease:
+            lease.cancelled = True
+            lease.hook.cancel()
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return idle, leased and waiting counts per connection identifier."""
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.conn_id: pool.stats for pool in pools}
+
+    def server_close(self):
+        super(IndeximaSessionBroker, self).server_close()
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Indexima session broker')
+    parser.add_argument('--socket-path', required=True)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--lease-timeout', type=float, default=None)
+    parser.add_argument('--max-idle-seconds', type=float, default=3600)
+    parser.add_argument('--check-idle-seconds', type=float, default=30.0)
+    parser.add_argument('--warm', action='append', default=[], help='conn_id:count, sessions opened at start')
+    parser.add_argument('--auth', default=None)
+    parser.add_argument('--timeout-seconds', type=int, default=None)
+    parser.add_argument('--socket-keepalive', action='store_true', default=None)
+    parser.add_argument(
+        '--multiplex-sessions', action='store_true', help='open sessions over shared transports'
+    )
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = IndeximaSessionBroker(
+        socket_path=arguments.socket_path,
+        pool_size=arguments.pool_size,
+        lease_timeout=arguments.lease_timeout,
+        max_idle_seconds=arguments.max_idle_seconds,
+        check_idle_seconds=arguments.check_idle_seconds,
+        auth=arguments.auth,
+        timeout_seconds=arguments.timeout_seconds,
+        socket_keepalive=arguments.socket_keepalive,
+        multiplex_sessions=arguments.multiplex_sessions,
+    )
+    for warm in arguments.warm:
+        conn_id, _, count = warm.rpartition(':')
+        broker.warm(conn_id, int(count))
+    try:
+        broker.serve_forever()
+    finally:
+        broker.server_close()
+
+
+if __name__ == '__main__':
+    main()
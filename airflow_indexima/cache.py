@@ -0,0 +1,433 @@
+"""Define a local result cache for select queries.
+
+Cache key is the connection identifier, the normalized sql query and the
+commit epoch of each table read by this query. Each commit, rollback,
+truncate or table/view DDL (like a rename) on a table (done through an
+IndeximaHook which use the same cache directory) bump the table epoch, so a
+result is never served across such a statement.
+
+Only commits made through a hook with this result cache invalidate results:
+commits of tasks without result cache, of other hosts or of other clients
+are not seen. Entries expire after 'ttl_seconds', which bound how long such a
+stale result could be served. Epochs are tracked per table name without its
+database ('client' and 'db.client' share an epoch), and a select which does
+not read any table (like 'select current_timestamp()') is never cached.
+A select whose tables can not all be identified (like a table function or a
+subquery in a comma separated FROM list) is never cached either.
+
+Results are stored on local disk in a file:
+
+```
+[header length (8 bytes)][json header][column 0][column 1]...
+```
+
+Each column is a json list of values (bytes, Decimal, date and naive datetime
+values are tagged, a result with another value type is not stored), so an entry is
+never executed when read. An unreadable entry (truncated, or written by another
+version) is a cache miss and is removed.
+Columns are json, not memory-mapped binary columns: values of a hive result
+set are python objects (strings, decimals, ...), which a binary column could
+not map without a codec per type, and a json column is never executed when
+read, unlike a pickled one.
+The cache directory is created accessible by its owner only, and a directory
+owned by another user or writable by others is refused.
+Least recently used entries are evicted when the cache exceed its size or
+entry count limit.
+"""
+import base64
+import contextlib
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import re
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from airflow_indexima.locking import locked_json_state, read_json_state
+
+
+__all__ = ['ResultCache', 'ResultCursor', 'normalize_sql', 'get_referenced_tables', 'is_cacheable_query']
+
+
+_QUOTED_PATTERN = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+_FROM_PATTERN = re.compile(r'\b(from|join)\b\s*')
+_FROM_LIST_END_PATTERN = re.compile(
+    r'\b(?:where|group|order|having|limit|join|inner|left|right|full|outer|cross|natural|lateral|'
+    r'union|intersect|except|minus|on|using|window|cluster|distribute|sort)\b|[();]'
+)
+_FROM_ITEM_PATTERN = re.compile(r'^([\w.`]+)(?:\s+(?:as\s+)?\w+)?$')
+_NAME_PATTERN = re.compile(r'[\w.`]+')
+_EPOCH_STATEMENT_PATTERN = re.compile(
+    r'^(?:commit|rollback|truncate(?:\s+table)?|'
+    r'(?:create(?:\s+or\s+replace)?|alter|drop)\s+(?:table|view)(?:\s+if\s+(?:not\s+)?exists)?)'
+    r'\s+([\w.`]+)'
+)
+_RENAME_PATTERN = re.compile(r'\brename\s+to\s+([\w.`]+)')
+
+_HEADER_SIZE = 8
+
+# errors of an unreadable entry (truncated, or written by another version)
+_ENTRY_ERRORS = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+# tagged values which have no json type
+_VALUE_DECODERS: Dict[str, Callable[[Any], Any]] = {
+    'bytes': base64.b64decode,
+    'decimal': decimal.Decimal,
+    'datetime': lambda parts: datetime.datetime(*parts),
+    'date': lambda parts: datetime.date(*parts),
+}
+
+
+def normalize_sql(sql: str) -> str:
+    """Normalize a sql query.
+
+    Outside quoted literals, case is lowered and whitespaces are collapsed.
+
+    # Parameters
+        sql (str): sql query
+
+    # Returns
+        (str): normalized query
+    """
+    parts = _QUOTED_PATTERN.split(sql.strip().rstrip(';').strip())
+    return ''.join(
+        part if i % 2 else re.sub(r'\s+', ' ', part.lower()) for i, part in enumerate(parts)
+    ).strip()
+
+
+def _find_tables(sql: str) -> Tuple[List[str], bool]:
+    """Return sorted table names read by a query, and False if some tables were not identified."""
+    # string literals are blanked ('from' inside a literal is not a clause)
+    parts = _QUOTED_PATTERN.split(normalize_sql(sql))
+    text = ''.join(
+        "''" if i % 2 and not part.startswith('`') else part for i, part in enumerate(parts)
+    )
+    names = set()
+    complete = True
+    for match in _FROM_PATTERN.finditer(text):
+        rest = text[match.end() :]
+        if rest.startswith('('):
+            # a subquery, its own FROM clause is parsed
+            continue
+        if match.group(1) == 'join':
+            name = _NAME_PATTERN.match(rest)
+            if name:
+                names.add(name.group(0))
+            else:
+                complete = False
+            continue
+        end = _FROM_LIST_END_PATTERN.search(rest)
+        if end and end.group(0) == '(':
+            # a table function, or a subquery inside a comma separated list
+            complete = False
+        for item in rest[: end.start() if end else len(rest)].split(','):
+            item_match = _FROM_ITEM_PATTERN.match(item.strip())
+            if item_match:
+                names.add(item_match.group(1))
+            else:
+                complete = False
+    return sorted({name.replace('`', '') for name in names}), complete
+
+
+def get_referenced_tables(sql: str) -> List[str]:
+    """Return sorted table names read by a query.
+
+    # Parameters
+        sql (str): sql query
+
+    # Returns
+        (List[str]): table names
+    """
+    return _find_tables(sql)[0]
+
+
+def is_cacheable_query(sql: str) -> bool:
+    """Return True if sql is a select query."""
+    return normalize_sql(sql).startswith(('select ', 'with '))
+
+
+def _encode_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return {'bytes': base64.b64encode(value).decode()}
+    if isinstance(value, decimal.Decimal):
+        return {'decimal': str(value)}
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return {'datetime': list(value.timetuple()[:6]) + [value.microsecond]}
+    if type(value) is datetime.date:
+        return {'date': [value.year, value.month, value.day]}
+    raise ValueError(f'unsupported value {value!r} ({type(value).__name__})')
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        ((kind, raw),) = value.items()
+        return _VALUE_DECODERS[kind](raw)
+    return value
+
+
+def _check_cache_dir(cache_dir: str):
+    # entries are read back, so nobody else should be able to write them
+    cache_stat = os.stat(cache_dir)
+    if not stat.S_ISDIR(cache_stat.st_mode):
+        raise NotADirectoryError(f'cache directory {cache_dir} is not a directory')
+    if cache_stat.st_uid != os.getuid() or cache_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(
+            f'cache directory {cache_dir} should be owned by current user and not writable by others'
+        )
+
+
+def _get_epoch_name(table: str) -> str:
+    # a commit on 'db.client' must invalidate queries on 'client' (and conversely)
+    return table.replace('`', '').lower().rsplit('.', 1)[-1]
+
+
+class ResultCursor:
+    """A read only cursor on a stored result.
+
+    This implementation follow hive.Cursor fetch api.
+    """
+
+    def __init__(self, description: Optional[List[Tuple]], rows: Sequence[Tuple], arraysize: int = 1000):
+        self.description = description
+        self.arraysize = arraysize
+        self._rows = rows
+        self._position = 0
+
+    @property
+    def rowcount(self) -> int:
+        return len(self._rows)
+
+    def fetchone(self) -> Optional[Tuple]:
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        _size = size or self.arraysize
+        rows = list(self._rows[self._position : self._position + _size])
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self) -> List[Tuple]:
+        rows = list(self._rows[self._position :])
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._rows = []
+
+
+class ResultCache:
+    """Local result cache.
+
+    ```python
+    cache = ResultCache(cache_dir='/tmp/indexima-cache', max_bytes=512 * 1024 * 1024)
+    hook = IndeximaHook(indexima_conn_id='my-conn', result_cache=cache)
+    ```
+
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = 3600.0,
+    ):
+        """Create a ResultCache instance.
+
+        # Parameters
+            cache_dir (str): local cache directory (created if needed, accessible by its owner only)
+            max_bytes (int): maximum size of stored results (default 256 Mb)
+            max_entries (int): maximum number of stored results (default 1000)
+            ttl_seconds (Optional[float]): result time to live in seconds, None to keep results
+                until a commit or an eviction (default 3600.0)
+        """
+        self._cache_dir = cache_dir
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._epoch_path = os.path.join(cache_dir, 'epochs.json')
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        _check_cache_dir(cache_dir)
+
+    def get_epochs(self, tables: List[str]) -> Dict[str, int]:
+        """Return commit epoch of tables."""
+        epochs = read_json_state(self._epoch_path)
+        return {table: epochs.get(_get_epoch_name(table), 0) for table in tables}
+
+    def bump_epoch(self, table: str):
+        """Increment commit epoch of a table.
+
+        # Parameters
+            table (str): table name
+        """
+        _table = _get_epoch_name(table)
+        with locked_json_state(self._epoch_path) as epochs:
+            epochs[_table] = epochs.get(_table, 0) + 1
+
+    def bump_epoch_of_statement(self, sql: str):
+        """Increment commit epoch of tables changed by a commit, rollback, truncate or DDL statement.
+
+        Both tables of a rename are changed.
+        """
+        normalized_sql = normalize_sql(sql)
+        match = _EPOCH_STATEMENT_PATTERN.match(normalized_sql)
+        if match:
+            for table in [match.group(1)] + _RENAME_PATTERN.findall(normalized_sql):
+                self.bump_epoch(table)
+
+    def is_cacheable(self, sql: str) -> bool:
+        """Return True if sql is a select query which read at least a table, all identified."""
+        if not is_cacheable_query(sql):
+            return False
+        tables, complete = _find_tables(sql)
+        return complete and bool(tables)
+
+    def get_key(self, sql: str, conn_id: str = '') -> str:
+        """Return cache key of a select query.
+
+        Commit epochs are read at this time, so a result stored with this key
+        can not be read after a commit on one of its tables.
+
+        # Parameters
+            sql (str): select query
+            conn_id (str): connection identifier (same query on two clusters has two keys)
+
+        # Returns
+            (str): cache key
+        """
+        normalized_sql = normalize_sql(sql)
+        epochs = self.get_epochs(get_referenced_tables(normalized_sql))
+        content = json.dumps([conn_id, normalized_sql, epochs], sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f'{key}.result')
+
+    def get(self, key: str) -> Optional[ResultCursor]:
+        """Return a cursor on stored result or None.
+
+        # Parameters
+            key (str): cache key
+
+        # Returns
+            (Optional[ResultCursor]): stored result if any
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            header_length = int.from_bytes(data[:_HEADER_SIZE], 'big')
+            base = _HEADER_SIZE + header_length
+            header = json.loads(data[_HEADER_SIZE:base].decode())
+            # an expired result is kept for caches with a longer time to live
+            miss = self._ttl_seconds is not None and time.time() - header['at'] > self._ttl_seconds
+            if not miss:
+                columns = [
+                    [_decode_value(value) for value in json.loads(data[base + start : base + end].decode())]
+                    for start, end in header['columns']
+                ]
+        except OSError:
+            miss = True
+        except _ENTRY_ERRORS:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            miss = True
+        if miss:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)  # used by LRU eviction
+        with self._lock:
+            self._hits += 1
+        description = [tuple(column) for column in header['description']] if header['description'] else None
+        return ResultCursor(description=description, rows=list(zip(*columns)) if columns else [])
+
+    def put(self, key: str, description: Optional[List[Tuple]], rows: List[Tuple]):
+        """Store a result.
+
+        A result with a value which can not be stored (see module documentation) is ignored.
+
+        # Parameters
+            key (str): cache key
+            description (Optional[List[Tuple]]): cursor description
+            rows (List[Tuple]): result rows
+        """
+        column_count = len(description) if description else (len(rows[0]) if rows else 0)
+        try:
+            blobs = [
+                json.dumps([_encode_value(row[i]) for row in rows]).encode() for i in range(column_count)
+            ]
+        except ValueError:
+            return
+
+        columns = []
+        offset = 0
+        for blob in blobs:
+            columns.append([offset, offset + len(blob)])
+            offset += len(blob)
+        # column offsets are relative to the end of header
+        header = json.dumps(
+            {'description': description, 'rows': len(rows), 'columns': columns, 'at': time.time()}
+        ).encode()
+
+        path = self._get_path(key)
+        _tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(_tmp_path, 'wb') as f:
+            f.write(len(header).to_bytes(_HEADER_SIZE, 'big'))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(_tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Evict least recently used results until cache fit its limits."""
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if name.endswith('.result'):
+                try:
+                    entry_stat = os.stat(os.path.join(self._cache_dir, name))
+                    entries.append((entry_stat.st_mtime, entry_stat.st_size, name))
+                except OSError:
+                    continue
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        while entries and (total_size > self._max_bytes or len(entries) > self._max_entries):
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self._cache_dir, name))
+            except OSError:
+                pass
+            total_size -= size
+            with self._lock:
+                self._evictions += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics (hits, misses, evictions, hit_rate)."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / total if total else 0.0,
+            }
@@ -0,0 +1,101 @@
+"""Define a local catalog of table columns (DESCRIBE results).
+
+Columns of a table are cached in a json state per connection identifier,
+shared by worker processes. An entry expires after 'ttl_seconds', and DDL
+statements (CREATE, ALTER, DROP TABLE) run through an IndeximaHook which use
+the same catalog directory remove entries of their tables.
+"""
+import os
+import re
+import time
+from typing import List, Optional
+
+from airflow_indexima.cache import normalize_sql
+from airflow_indexima.locking import locked_json_state, read_json_state
+from airflow_indexima.schema import ColumnSchema
+
+
+__all__ = ['TableCatalog', 'get_ddl_tables', 'parse_describe_rows']
+
+
+_DDL_TABLE_PATTERN = re.compile(r'^(?:create|alter|drop)\s+table\s+(?:if\s+(?:not\s+)?exists\s+)?([\w.`]+)')
+_RENAME_PATTERN = re.compile(r'\brename\s+to\s+([\w.`]+)')
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+def get_ddl_tables(sql: str) -> List[str]:
+    """Return tables whose columns could be changed by a DDL statement (empty if not a DDL)."""
+    normalized_sql = normalize_sql(sql)
+    match = _DDL_TABLE_PATTERN.match(normalized_sql)
+    if not match:
+        return []
+    tables = [match.group(1)] + _RENAME_PATTERN.findall(normalized_sql)
+    return [table.replace('`', '') for table in tables]
+
+
+def parse_describe_rows(rows: List[tuple]) -> List[ColumnSchema]:
+    """Return columns of a DESCRIBE result (partition and detail sections are ignored).
+
+    # Parameters
+        rows (List[tuple]): rows (col_name, data_type, comment)
+
+    # Returns
+        (List[ColumnSchema]): columns
+    """
+    columns = []
+    for row in rows:
+        name = (row[0] or '').strip()
+        if not name or name.startswith('#'):
+            break
+        columns.append(ColumnSchema(name=name, type=(row[1] or '').strip()))
+    return columns
+
+
+class TableCatalog:
+    """Local catalog of table columns.
+
+    ```python
+    catalog = TableCatalog(cache_dir='/var/cache/indexima/catalog', ttl_seconds=3600)
+    hook = IndeximaHook(..., table_catalog=catalog)
+    hook.describe_table('client')
+    ```
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 3600.0):
+        """Create a TableCatalog instance.
+
+        # Parameters
+            cache_dir (str): catalog directory shared by worker processes (created if needed)
+            ttl_seconds (float): entry time to live in seconds (default 3600.0)
+        """
+        self._cache_dir = cache_dir
+        self._ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_path(self, conn_id: str) -> str:
+        return os.path.join(self._cache_dir, f'{_safe_name(conn_id)}.json')
+
+    def get(self, conn_id: str, table: str) -> Optional[List[ColumnSchema]]:
+        """Return cached columns of a table (None if missing or expired)."""
+        entry = read_json_state(self._get_path(conn_id)).get(table.lower())
+        if entry is None or entry['cached_at'] + self._ttl_seconds < time.time():
+            return None
+        return [ColumnSchema(name=name, type=type_name) for name, type_name in entry['columns']]
+
+    def put(self, conn_id: str, table: str, columns: List[ColumnSchema]):
+        """Cache columns of a table."""
+        with locked_json_state(self._get_path(conn_id)) as state:
+            state[table.lower()] = {'cached_at': time.time(), 'columns': [list(column) for column in columns]}
+
+    def invalidate(self, conn_id: str, table: str):
+        """Remove cached columns of a table."""
+        with locked_json_state(self._get_path(conn_id)) as state:
+            state.pop(table.lower(), None)
+
+    def invalidate_statement(self, conn_id: str, sql: str):
+        """Remove cached columns of tables changed by a DDL statement (if sql is a DDL)."""
+        for table in get_ddl_tables(sql):
+            self.invalidate(conn_id, table)
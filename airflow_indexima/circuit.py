@@ -0,0 +1,189 @@
+"""Define a circuit breaker shared by all worker processes.
+
+When a cluster is degraded, each queued task waits its connect or socket
+timeout before failing. A CircuitBreaker counts failures per connection
+identifier in a state file shared by worker processes:
+
+- closed: calls are allowed, failures of the last 'failure_window_seconds' are counted
+- open: after 'failure_threshold' failures, calls fail fast (CircuitOpenError)
+  during 'cool_down_seconds'
+- half open: after cool down, a single call (the probe) is allowed, its success close
+  the circuit, its failure open it again for a new cool down
+
+Failures are failed connects and transient errors of statements (see
+airflow_indexima.retry). An error reported by server (like a missing table)
+shows that the cluster responds: it counts as a success.
+"""
+import contextlib
+import os
+import re
+import time
+from typing import Any, Callable, Dict, Iterator
+
+from pyhive import hive
+
+from airflow_indexima.locking import locked_json_state, read_json_state
+
+
+__all__ = ['CircuitBreaker', 'CircuitOpenError']
+
+
+_CLOSED = 'closed'
+_OPEN = 'open'
+_HALF_OPEN = 'half_open'
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+class CircuitOpenError(RuntimeError):
+    """A call rejected by an open circuit."""
+
+
+class CircuitBreaker:
+    """Circuit breaker per connection identifier.
+
+    ```python
+    breaker = CircuitBreaker(
+        state_dir='/var/lock/indexima/circuit', failure_threshold=5, cool_down_seconds=120
+    )
+    op = IndeximaLoadDataOperator(..., circuit_breaker=breaker)
+    ```
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        failure_threshold: int = 5,
+        failure_window_seconds: float = 60.0,
+        cool_down_seconds: float = 60.0,
+        probe_timeout_seconds: float = 300.0,
+    ):
+        """Create a CircuitBreaker instance.
+
+        # Parameters
+            state_dir (str): state directory shared by worker processes (created if needed)
+            failure_threshold (int): failure count which open the circuit (default 5)
+            failure_window_seconds (float): delay in seconds during which failures are counted (default 60.0)
+            cool_down_seconds (float): delay in seconds during which an open circuit reject calls
+                (default 60.0)
+            probe_timeout_seconds (float): delay after which a probe without outcome (like a killed
+                process) is replaced by a new one (default 300.0)
+        """
+        self._state_dir = state_dir
+        self._failure_threshold = failure_threshold
+        self._failure_window_seconds = failure_window_seconds
+        self._cool_down_seconds = cool_down_seconds
+        self._probe_timeout_seconds = probe_timeout_seconds
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._state_dir, f'{_safe_name(key)}.json')
+
+    def get_state(self, key: str) -> str:
+        """Return circuit state of a key ('closed', 'open' or 'half_open')."""
+        return read_json_state(self._get_path(key)).get('state', _CLOSED)
+
+    def before_call(self, key: str) -> bool:
+        """Check that a call is allowed.
+
+        # Parameters
+            key (str): circuit key (connection identifier)
+
+        # Returns
+            (bool): True if this call is the probe of a half open circuit
+
+        # Raises
+            (CircuitOpenError): if circuit is open, or if its probe is running
+        """
+        now = time.time()
+        path = self._get_path(key)
+        if read_json_state(path).get('state', _CLOSED) == _CLOSED:
+            return False
+        with locked_json_state(path) as state:
+            if state.get('state', _CLOSED) == _CLOSED:
+                return False
+            if state['state'] == _OPEN and now < state['opened_at'] + self._cool_down_seconds:
+                retry_in = state['opened_at'] + self._cool_down_seconds - now
+                raise CircuitOpenError(
+                    f'circuit of {key} is open (cluster unhealthy), retry in {retry_in:.0f}s'
+                )
+            if state['state'] == _HALF_OPEN and now < state.get('probe_until', 0):
+                raise CircuitOpenError(f'circuit of {key} is half open, waiting for probe outcome')
+            state['state'] = _HALF_OPEN
+            state['probe_until'] = now + self._probe_timeout_seconds
+            return True
+
+    def record_success(self, key: str):
+        """Record a success, a half open circuit is closed."""
+        path = self._get_path(key)
+        if read_json_state(path).get('state', _CLOSED) == _CLOSED:
+            return
+        with locked_json_state(path) as state:
+            state.clear()
+            state['state'] = _CLOSED
+
+    def record_failure(self, key: str):
+        """Record a failure, circuit is opened when threshold is reached (or on probe failure)."""
+        now = time.time()
+        with locked_json_state(self._get_path(key)) as state:
+            if state.get('state', _CLOSED) == _CLOSED:
+                failures = [
+                    failed_at
+                    for failed_at in state.get('failures', [])
+                    if failed_at > now - self._failure_window_seconds
+                ]
+                failures.append(now)
+                state['failures'] = failures
+                if len(failures) < self._failure_threshold:
+                    return
+            elif state['state'] == _OPEN:
+                return
+            state.clear()
+            state['state'] = _OPEN
+            state['opened_at'] = now
+
+    def _release_probe(self, key: str):
+        with locked_json_state(self._get_path(key)) as state:
+            if state.get('state') == _HALF_OPEN:
+                state['probe_until'] = 0
+
+    @contextlib.contextmanager
+    def guard(self, key: str, is_failure: Callable[[Exception], bool]) -> Iterator[None]:
+        """Guard a call.
+
+        # Parameters
+            key (str): circuit key (connection identifier)
+            is_failure (Callable[[Exception], bool]): return True if an error is a failure of cluster
+
+        # Raises
+            (CircuitOpenError): if call is not allowed
+        """
+        probe = self.before_call(key)
+        try:
+            yield
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure(key)
+            elif isinstance(e, hive.Error):
+                self.record_success(key)
+            elif probe:
+                self._release_probe(key)
+            raise
+        except BaseException:
+            # interrupted (like on execution timeout): outcome is unknown
+            if probe:
+                self._release_probe(key)
+            raise
+        else:
+            self.record_success(key)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Return state of each circuit key."""
+        states = {}
+        for name in sorted(os.listdir(self._state_dir)):
+            if name.endswith('.json'):
+                states[name[: -len('.json')]] = read_json_state(os.path.join(self._state_dir, name))
+        return states
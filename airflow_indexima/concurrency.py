@@ -0,0 +1,216 @@
+"""Define an adaptive concurrency controller of statements.
+
+A fixed parallelism is too timid when the cluster is idle, and too aggressive
+when it is busy. An AdaptiveConcurrencyController run functions (like
+statements on their own IndeximaHook session) with a concurrency limit
+adjusted on measures (AIMD):
+
+- each time 'limit' calls are done, throughput and mean latency of this window
+  are compared with previous window
+- while throughput rise, limit is increased by 'additive_increase'
+- an increase without throughput gain is undone
+- on error, or when mean latency exceed 'latency_tolerance' times the base latency
+  (lowest recent latency), limit is multiplied by 'multiplicative_decrease'
+
+```python
+controller = AdaptiveConcurrencyController(initial_limit=2, max_limit=16)
+results = controller.map(lambda sql: run_on_own_session(sql), queries)
+```
+
+Each decision is logged, and kept in 'history' (timestamp, limit), so the
+concurrency sustained by a cluster can be followed over time.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+
+__all__ = ['AdaptiveConcurrencyController']
+
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class AdaptiveConcurrencyController:
+    """AIMD concurrency controller (thread safe)."""
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        additive_increase: int = 1,
+        multiplicative_decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        min_throughput_gain: float = 0.05,
+        name: str = 'indexima',
+    ):
+        """Create an AdaptiveConcurrencyController instance.
+
+        # Parameters
+            initial_limit (int): initial concurrency limit (default 2)
+            min_limit (int): minimum concurrency limit (default 1)
+            max_limit (int): maximum concurrency limit (default 16)
+            additive_increase (int): limit increment while throughput rise (default 1)
+            multiplicative_decrease (float): limit factor on error or latency spike (default 0.5)
+            latency_tolerance (float): latency spike threshold, relative to base latency (default 2.0)
+            min_throughput_gain (float): minimum relative throughput gain of an increase (default 0.05)
+            name (str): controller name in logs (default 'indexima')
+
+        # Raises
+            (ValueError): if limits are inconsistent
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('limits must verify 1 <= min_limit <= initial_limit <= max_limit')
+        self.name = name
+        self._limit = initial_limit
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._additive_increase = additive_increase
+        self._multiplicative_decrease = multiplicative_decrease
+        self._latency_tolerance = latency_tolerance
+        self._min_throughput_gain = min_throughput_gain
+        self._active = 0
+        self._condition = threading.Condition()
+        self._base_latency: Optional[float] = None
+        self._last_throughput: Optional[float] = None
+        self._last_increased = False
+        self._reset_window()
+        self.history: List[Tuple[float, int]] = [(time.time(), initial_limit)]
+
+    @property
+    def limit(self) -> int:
+        """Return current concurrency limit."""
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        """Return number of running calls."""
+        return self._active
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+        self._window_errors = 0
+        self._window_latency = 0.0
+
+    def _acquire(self):
+        with self._condition:
+            while self._active >= self._limit:
+                self._condition.wait()
+            self._active += 1
+
+    def _release(self, latency: float, error: bool):
+        with self._condition:
+            self._active -= 1
+            self._window_calls += 1
+            if error:
+                self._window_errors += 1
+            else:
+                self._window_latency += latency
+            if error or self._window_calls >= self._limit:
+                self._adjust()
+            self._condition.notify_all()
+
+    def _adjust(self):
+        elapsed = time.monotonic() - self._window_start
+        succeeded = self._window_calls - self._window_errors
+        throughput = succeeded / elapsed if elapsed > 0 else 0.0
+        latency = self._window_latency / succeeded if succeeded else None
+        if latency is not None:
+            # base latency follow lowest latency, and slowly rise when statements become heavier
+            if self._base_latency is None or latency < self._base_latency:
+                self._base_latency = latency
+            else:
+                self._base_latency += (latency - self._base_latency) * 0.1
+
+        limit = self._limit
+        if self._window_errors or (
+            latency is not None and latency > self._latency_tolerance * self._base_latency  # type: ignore
+        ):
+            limit = int(limit * self._multiplicative_decrease)
+            reason = 'errors' if self._window_errors else 'latency spike'
+        elif self._last_throughput is None or throughput > self._last_throughput * (
+            1 + self._min_throughput_gain
+        ):
+            limit += self._additive_increase
+            reason = 'throughput rise'
+        elif self._last_increased:
+            limit -= self._additive_increase
+            reason = 'no throughput gain'
+        else:
+            reason = 'stable'
+        limit = max(self._min_limit, min(self._max_limit, limit))
+
+        _logger.info(
+            f'{self.name}: concurrency {self._limit} -> {limit} ({reason}, throughput {throughput:.2f}/s, '
+            f'latency {latency or 0:.2f}s, errors {self._window_errors}/{self._window_calls})'
+        )
+        self._last_increased = limit > self._limit
+        self._last_throughput = throughput
+        if limit != self._limit:
+            self._limit = limit
+            self.history.append((time.time(), limit))
+        self._reset_window()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Wait for a slot and measure the call done in this context."""
+        self._acquire()
+        start = time.monotonic()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._release(time.monotonic() - start, error)
+
+    def _call(self, function: Callable[[T], R], item: T) -> R:
+        start = time.monotonic()
+        error = False
+        try:
+            return function(item)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._release(time.monotonic() - start, error)
+
+    def map(self, function: Callable[[T], R], items: Sequence[T]) -> List[R]:
+        """Call function on each item concurrently, under concurrency limit.
+
+        All items are processed, even after an error.
+
+        # Parameters
+            function (Callable[[T], R]): function
+            items (Sequence[T]): items
+
+        # Returns
+            (List[R]): results in items order
+
+        # Raises
+            (Exception): first error (in items order) if any
+        """
+        with ThreadPoolExecutor(max_workers=self._max_limit) as executor:
+            futures: List[Future] = []
+            for item in items:
+                self._acquire()
+                futures.append(executor.submit(self._call, function, item))
+            results: List[R] = []
+            errors: List[Exception] = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
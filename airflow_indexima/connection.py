@@ -7,15 +7,36 @@ retreive credentials from other backeng like aws ssm.
 
 """
 import json
-from typing import Callable, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from airflow.models import Connection
 
+from airflow_indexima.routing import HiveNode, parse_hive_nodes
 
-__all__ = ['ConnectionDecorator', 'apply_hive_extra_setting', 'extract_hive_extra_setting']
+
+__all__ = [
+    'ConnectionDecorator',
+    'HIVE_TRANSPORT_SETTINGS',
+    'apply_hive_extra_setting',
+    'extract_hive_extra_setting',
+    'extract_hive_transport_setting',
+    'extract_hive_nodes',
+    'get_hive_transport_parameters',
+    'get_hive_nodes',
+    'extract_kerberos_credential',
+]
 
 ConnectionDecorator = Callable[[Connection], Connection]
 
+HIVE_TRANSPORT_SETTINGS = (
+    'tcp_nodelay',
+    'recv_buffer_size',
+    'send_buffer_size',
+    'read_buffer_size',
+    'framed_transport',
+    'record_path',
+)
+
 
 def apply_hive_extra_setting(
     connection: Connection,
@@ -23,6 +44,15 @@ def apply_hive_extra_setting(
     kerberos_service_name: Optional[str] = None,
     timeout_seconds: Optional[int] = None,
     socket_keepalive: Optional[bool] = None,
+    tcp_nodelay: Optional[bool] = None,
+    recv_buffer_size: Optional[int] = None,
+    send_buffer_size: Optional[int] = None,
+    read_buffer_size: Optional[int] = None,
+    framed_transport: Optional[bool] = None,
+    nodes: Optional[Union[str, List[str]]] = None,
+    record_path: Optional[str] = None,
+    kerberos_principal: Optional[str] = None,
+    kerberos_keytab: Optional[str] = None,
 ) -> Connection:
     """Apply extra settings on hive connection.
 
@@ -32,6 +62,17 @@ def apply_hive_extra_setting(
         kerberos_service_name (Optional[str]): optional kerberos service name
         timeout_seconds (Optional[int]): optional define the socket timeout in second
         socket_keepalive (Optional[bool]): optional enable TCP keepalive.
+        tcp_nodelay (Optional[bool]): optional set TCP_NODELAY socket option
+        recv_buffer_size (Optional[int]): optional set SO_RCVBUF socket option (in bytes)
+        send_buffer_size (Optional[int]): optional set SO_SNDBUF socket option (in bytes)
+        read_buffer_size (Optional[int]): optional transport read buffer size (in bytes)
+        framed_transport (Optional[bool]): optional use a framed transport (NOSASL only)
+        nodes (Optional[Union[str, List[str]]]): optional list of nodes 'host[:port]'
+            (or a comma separated string), connection host is used if not set
+        record_path (Optional[str]): optional capture file of Thrift messages
+        kerberos_principal (Optional[str]): optional principal of keytab (KERBEROS mode)
+        kerberos_keytab (Optional[str]): optional keytab path, if set tickets are acquired
+            and renewed in process (see airflow_indexima.kerberos)
 
     # Returns
         (Connection): configured airflow Connection instance
@@ -48,6 +89,24 @@ def apply_hive_extra_setting(
         _extra['timeout_seconds'] = timeout_seconds
     if socket_keepalive is not None:
         _extra['socket_keepalive'] = socket_keepalive
+    if tcp_nodelay is not None:
+        _extra['tcp_nodelay'] = tcp_nodelay
+    if recv_buffer_size:
+        _extra['recv_buffer_size'] = recv_buffer_size
+    if send_buffer_size:
+        _extra['send_buffer_size'] = send_buffer_size
+    if read_buffer_size:
+        _extra['read_buffer_size'] = read_buffer_size
+    if framed_transport is not None:
+        _extra['framed_transport'] = framed_transport
+    if nodes:
+        _extra['nodes'] = nodes
+    if record_path:
+        _extra['record_path'] = record_path
+    if kerberos_principal:
+        _extra['kerberos_principal'] = kerberos_principal
+    if kerberos_keytab:
+        _extra['kerberos_keytab'] = kerberos_keytab
 
     connection.extra = json.dumps(_extra)
 
@@ -74,3 +133,92 @@ def extract_hive_extra_setting(
         _extra['timeout_seconds'] if 'timeout_seconds' in _extra else None,
         _extra['socket_keepalive'] if 'socket_keepalive' in _extra else None,
     )
+
+
+def extract_hive_transport_setting(connection: Connection) -> Dict[str, Any]:
+    """Extract transport tuning settings.
+
+    # Parameters:
+        connection (Connection): airflow connection
+
+    # Returns
+        (Dict[str, Any]): defined settings among HIVE_TRANSPORT_SETTINGS
+    """
+    _extra = json.loads(connection.extra) if connection.extra else {}
+
+    return {name: _extra[name] for name in HIVE_TRANSPORT_SETTINGS if name in _extra}
+
+
+def extract_hive_nodes(connection: Connection) -> Optional[List[str]]:
+    """Extract node list.
+
+    # Parameters:
+        connection (Connection): airflow connection
+
+    # Returns
+        (Optional[List[str]]): node list 'host[:port]' if defined
+    """
+    _extra = json.loads(connection.extra) if connection.extra else {}
+    nodes = _extra.get('nodes')
+    if not nodes:
+        return None
+    if isinstance(nodes, str):
+        nodes = nodes.split(',')
+    return [node.strip() for node in nodes if node.strip()]
+
+
+def get_hive_transport_parameters(connection: Connection) -> Dict[str, Any]:
+    """Return create_hive_transport parameters of a connection (except host and port).
+
+    Default value meaning are kept: timeout is 60 seconds and authentication mode is 'CUSTOM'.
+
+    # Parameters:
+        connection (Connection): airflow connection
+
+    # Returns
+        (Dict[str, Any]): parameters
+    """
+    (auth, kerberos_service_name, timeout_seconds, socket_keepalive) = extract_hive_extra_setting(
+        connection=connection
+    )
+    parameters: Dict[str, Any] = {'timeout_seconds': timeout_seconds or 60}
+    if socket_keepalive is not None:
+        parameters['socket_keepalive'] = socket_keepalive
+    parameters['auth'] = auth or 'CUSTOM'
+    if connection.login:
+        parameters['username'] = connection.login
+    if connection.password:
+        parameters['password'] = connection.password
+    if kerberos_service_name:
+        parameters['kerberos_service_name'] = kerberos_service_name
+    parameters.update(extract_hive_transport_setting(connection=connection))
+    return parameters
+
+
+def get_hive_nodes(connection: Connection) -> List[HiveNode]:
+    """Return nodes of a connection (its 'nodes' extra, or its host).
+
+    # Parameters:
+        connection (Connection): airflow connection
+
+    # Returns
+        (List[HiveNode]): nodes
+    """
+    port = connection.port or 10000
+    nodes = parse_hive_nodes(extract_hive_nodes(connection=connection) or [], default_port=port)
+    return nodes or [HiveNode(host=connection.host, port=port)]
+
+
+def extract_kerberos_credential(connection: Connection) -> Optional[Tuple[str, str]]:
+    """Extract kerberos principal and keytab.
+
+    # Parameters:
+        connection (Connection): airflow connection
+
+    # Returns
+        (Optional[Tuple[str, str]]): (principal, keytab) if both are defined
+    """
+    _extra = json.loads(connection.extra) if connection.extra else {}
+    if _extra.get('kerberos_principal') and _extra.get('kerberos_keytab'):
+        return _extra['kerberos_principal'], _extra['kerberos_keytab']
+    return None
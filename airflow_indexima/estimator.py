@@ -0,0 +1,292 @@
+"""Define a load duration estimator based on history of past loads.
+
+Each load of a table records a sample (source bytes and rows, duration and
+count of concurrent loads) in a json state per connection identifier, shared
+by worker processes. Duration of a new load is predicted from the source size
+of current run and the last samples of its table:
+
+```python
+estimator = DurationEstimator(history_dir='/var/lib/indexima/loads')
+source_bytes, source_rows = get_source_size('/data/client', 'PARQUET')
+estimate = estimator.estimate('my-conn', 'client', source_bytes=source_bytes, source_rows=source_rows)
+```
+
+Durations of samples are normalized to a single load (a load is slowed down by
+'concurrency_slowdown' for each other concurrent load), then a line
+(fixed overhead + seconds per byte, or per row) is fitted on samples. Without
+source size (or with samples of a single size), the median normalized duration
+is used. The upper bound of an estimate covers the worst observed deviation of
+samples from the model (90th percentile).
+"""
+import contextlib
+import logging
+import os
+import re
+import statistics
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from airflow_indexima.locking import locked_json_state, read_json_state
+from airflow_indexima.schema import SourceOpener, read_parquet_row_count
+
+
+__all__ = ['DurationEstimate', 'DurationEstimator', 'get_source_size']
+
+
+_logger = logging.getLogger(__name__)
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+class DurationEstimate(NamedTuple):
+    """Define a predicted load duration."""
+
+    seconds: float
+    upper_seconds: float
+    samples: int
+
+    def __str__(self) -> str:
+        return f'{self.seconds:.0f}s (upper {self.upper_seconds:.0f}s, {self.samples} samples)'
+
+
+def _count_parquet_rows(paths: Sequence[str]) -> int:
+    rows = 0
+    for path in paths:
+        with open(path, 'rb') as source:
+            rows += read_parquet_row_count(source)
+    return rows
+
+
+def get_source_size(
+    uri: str, format_query: Optional[str] = None, opener: Optional[SourceOpener] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """Return size of a load source.
+
+    A local path (or 'file' uri) could be a file or a directory of files (names starting
+    with '_' or '.' are ignored). Other uris are read with 'opener' as a single file.
+    Rows are read in footers of Parquet files.
+
+    # Parameters
+        uri (str): load path uri
+        format_query (Optional[str]): format of load query (rows are counted for 'PARQUET')
+        opener (Optional[SourceOpener]): optional function which open a non local uri as a
+            seekable binary file (default None: non local uris are not supported)
+
+    # Returns
+        (Tuple[Optional[int], Optional[int]]): size in bytes and row count (None if unknown)
+
+    # Raises
+        (OSError): if source could not be read
+        (ValueError): if a Parquet source is not a Parquet file
+    """
+    parquet = (format_query or '').strip().upper() == 'PARQUET'
+    parsed = urlparse(uri)
+    if parsed.scheme in ('', 'file'):
+        path = parsed.path
+        if os.path.isdir(path):
+            paths = [
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if not name.startswith(('_', '.')) and os.path.isfile(os.path.join(path, name))
+            ]
+        elif os.path.isfile(path):
+            paths = [path]
+        else:
+            return None, None
+        return sum(os.path.getsize(name) for name in paths), _count_parquet_rows(paths) if parquet else None
+    if opener is None:
+        return None, None
+    with opener(uri) as source:
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        return size, read_parquet_row_count(source) if parquet else None
+
+
+def _fit_line(points: List[Tuple[float, float]]) -> Tuple[float, float]:
+    """Return intercept and slope of a least squares line (both positive)."""
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance > 0:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+        intercept = mean_y - slope * mean_x
+        if slope >= 0 and intercept >= 0:
+            return intercept, slope
+    # a single size, or a line without meaning: duration proportional to size
+    ratios = [y / x for x, y in points if x > 0]
+    if not ratios:
+        return statistics.median(y for _, y in points), 0.0
+    return 0.0, statistics.median(ratios)
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+class DurationEstimator:
+    """Load duration estimator.
+
+    ```python
+    estimator = DurationEstimator(history_dir='/var/lib/indexima/loads')
+    with estimator.track_load('my-conn', 'client') as concurrency:
+        ...  # load
+    estimator.record('my-conn', 'client', duration, source_bytes=size, concurrency=concurrency)
+    ```
+    """
+
+    def __init__(
+        self,
+        history_dir: str,
+        max_samples: int = 30,
+        min_samples: int = 3,
+        concurrency_slowdown: float = 0.5,
+        max_load_seconds: float = 86400.0,
+    ):
+        """Create a DurationEstimator instance.
+
+        # Parameters
+            history_dir (str): history directory shared by worker processes (created if needed)
+            max_samples (int): count of last samples kept per table (default 30)
+            min_samples (int): minimum count of samples of a table to estimate a duration (default 3)
+            concurrency_slowdown (float): duration ratio added to a load by each other concurrent
+                load (default 0.5)
+            max_load_seconds (float): a load started before this delay is no more counted as
+                running (a killed worker does not end its load) (default 86400.0)
+        """
+        self._history_dir = history_dir
+        self._max_samples = max_samples
+        self._min_samples = max(1, min_samples)
+        self._concurrency_slowdown = concurrency_slowdown
+        self._max_load_seconds = max_load_seconds
+        os.makedirs(history_dir, exist_ok=True)
+
+    def _get_path(self, conn_id: str, suffix: str = '') -> str:
+        return os.path.join(self._history_dir, f'{_safe_name(conn_id)}{suffix}.json')
+
+    def _get_slowdown(self, concurrency: int) -> float:
+        return 1.0 + self._concurrency_slowdown * max(0, concurrency - 1)
+
+    @contextlib.contextmanager
+    def track_load(self, conn_id: str, table: str) -> Iterator[int]:
+        """Register a running load during context.
+
+        # Parameters
+            conn_id (str): connection identifier
+            table (str): table name
+
+        # Returns
+            (Iterator[int]): count of running loads on connection (this one included)
+        """
+        key = f'{os.getpid()}:{table}:{uuid.uuid4().hex[:8]}'
+        with locked_json_state(self._get_path(conn_id, '.running')) as state:
+            now = time.time()
+            for name in [name for name, started in state.items() if started < now - self._max_load_seconds]:
+                del state[name]
+            state[key] = now
+            concurrency = len(state)
+        try:
+            yield concurrency
+        finally:
+            with locked_json_state(self._get_path(conn_id, '.running')) as state:
+                state.pop(key, None)
+
+    def get_running_loads(self, conn_id: str) -> int:
+        """Return count of running loads on a connection."""
+        limit = time.time() - self._max_load_seconds
+        state = read_json_state(self._get_path(conn_id, '.running'))
+        return sum(1 for started in state.values() if started >= limit)
+
+    def record(
+        self,
+        conn_id: str,
+        table: str,
+        duration_seconds: float,
+        source_bytes: Optional[int] = None,
+        source_rows: Optional[int] = None,
+        concurrency: int = 1,
+    ):
+        """Record a sample of a successful load.
+
+        # Parameters
+            conn_id (str): connection identifier
+            table (str): table name
+            duration_seconds (float): load duration in seconds
+            source_bytes (Optional[int]): source size in bytes
+            source_rows (Optional[int]): loaded rows
+            concurrency (int): count of running loads during this one (itself included, default 1)
+        """
+        sample = {
+            'at': time.time(),
+            'duration': duration_seconds,
+            'bytes': source_bytes,
+            'rows': source_rows,
+            'concurrency': max(1, concurrency),
+        }
+        with locked_json_state(self._get_path(conn_id)) as state:
+            samples = state.get(table, [])
+            samples.append(sample)
+            state[table] = samples[-self._max_samples :]
+        _logger.debug(f'load sample of {table}: {sample}')
+
+    def get_samples(self, conn_id: str, table: str) -> List[Dict[str, Any]]:
+        """Return recorded samples of a table (oldest first)."""
+        return read_json_state(self._get_path(conn_id)).get(table, [])
+
+    def estimate(
+        self,
+        conn_id: str,
+        table: str,
+        source_bytes: Optional[int] = None,
+        source_rows: Optional[int] = None,
+        concurrency: int = 1,
+    ) -> Optional[DurationEstimate]:
+        """Predict duration of a load.
+
+        Source bytes are used when known (and recorded in samples), then source rows.
+
+        # Parameters
+            conn_id (str): connection identifier
+            table (str): table name
+            source_bytes (Optional[int]): source size in bytes of this load
+            source_rows (Optional[int]): source rows of this load
+            concurrency (int): count of running loads (this one included, default 1)
+
+        # Returns
+            (Optional[DurationEstimate]): estimate, None without enough samples
+        """
+        samples = self.get_samples(conn_id, table)
+        if len(samples) < self._min_samples:
+            return None
+        points: List[Tuple[float, float]] = []
+        size = 0.0
+        for key, value in (('bytes', source_bytes), ('rows', source_rows)):
+            if value is None:
+                continue
+            points = [
+                (sample[key], sample['duration'] / self._get_slowdown(sample['concurrency']))
+                for sample in samples
+                if sample.get(key) is not None
+            ]
+            if len(points) >= self._min_samples:
+                size = value
+                break
+        else:
+            points = [
+                (0, sample['duration'] / self._get_slowdown(sample['concurrency'])) for sample in samples
+            ]
+        intercept, slope = _fit_line(points)
+
+        def model(x: float) -> float:
+            return max(intercept + slope * x, 1e-3)
+
+        deviation = _percentile([y / model(x) for x, y in points], 0.9)
+        seconds = model(size) * self._get_slowdown(concurrency)
+        return DurationEstimate(
+            seconds=seconds, upper_seconds=seconds * max(1.0, deviation), samples=len(points)
+        )
@@ -0,0 +1,276 @@
+"""Define key range extract utilities.
+
+A key range extract split a select query on a numeric or date key into
+several ranges. Each range can be fetched with its own hive session and
+written in its own file:
+
+- a range file is written under a temporary name and renamed when complete,
+  so an existing range file means a complete range (restart will skip it)
+- range files can be merged in order into a single output file
+- a manifest ('{output_path}.manifest.json') records a fingerprint of the query
+  of each range file (and of merged file): a file is skipped only when its
+  fingerprint matches, so a run with other bounds or query extracts again
+
+"""
+import csv
+import datetime
+import glob
+import hashlib
+import os
+from typing import Any, Iterable, List, NamedTuple, Union
+
+
+__all__ = [
+    'KeyBound',
+    'KeyRange',
+    'KEY_TYPES',
+    'parse_key_bound',
+    'format_key_bound',
+    'split_key_range',
+    'generate_range_query',
+    'get_range_path',
+    'get_fingerprint',
+    'get_manifest_path',
+    'remove_stale_range_files',
+    'write_cursor_to_csv',
+    'merge_range_files',
+]
+
+
+KeyBound = Union[int, datetime.date, datetime.datetime]
+
+KEY_TYPES = ('int', 'date', 'datetime')
+
+
+class KeyRange(NamedTuple):
+    """Define a key range.
+
+    A key range is [lower, upper[ or [lower, upper] when it is the last one.
+    """
+
+    part: int
+    lower: KeyBound
+    upper: KeyBound
+    last: bool
+
+
+def parse_key_bound(value: Union[str, KeyBound], key_type: str = 'int') -> KeyBound:
+    """Parse a key bound (which could came from a templated field).
+
+    # Parameters
+        value (Union[str, KeyBound]): value to parse
+        key_type (str): one of 'int', 'date', 'datetime' (default 'int')
+
+    # Returns
+        (KeyBound): parsed value
+
+    # Raises
+        (ValueError): if key_type is unknown or value could not be parsed
+    """
+    if key_type not in KEY_TYPES:
+        raise ValueError(f"Unknown key type '{key_type}' (use one of {KEY_TYPES}).")
+    if not isinstance(value, str):
+        return value
+    if key_type == 'int':
+        return int(value)
+    if key_type == 'date':
+        return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+    _value = value.replace('T', ' ')[:19]
+    if len(_value) == 10:
+        return datetime.datetime.strptime(_value, '%Y-%m-%d')
+    return datetime.datetime.strptime(_value, '%Y-%m-%d %H:%M:%S')
+
+
+def format_key_bound(value: KeyBound) -> str:
+    """Format a key bound as a sql literal.
+
+    # Parameters
+        value (KeyBound): value to format
+
+    # Returns
+        (str): sql literal
+    """
+    if isinstance(value, datetime.datetime):
+        return f"'{value.isoformat(sep=' ')}'"
+    if isinstance(value, datetime.date):
+        return f"'{value.isoformat()}'"
+    return str(value)
+
+
+def split_key_range(lower: KeyBound, upper: KeyBound, partitions: int) -> List[KeyRange]:
+    """Split [lower, upper] in at most 'partitions' ranges.
+
+    # Parameters
+        lower (KeyBound): lower bound (included)
+        upper (KeyBound): upper bound (included)
+        partitions (int): number of range
+
+    # Returns
+        (List[KeyRange]): ordered list of range
+
+    # Raises
+        (ValueError): if partitions is not positive or lower > upper
+    """
+    if partitions < 1:
+        raise ValueError(f"partitions should be positive (got {partitions})")
+    if lower > upper:  # type: ignore
+        raise ValueError(f"lower bound {lower} is greater than upper bound {upper}")
+
+    boundaries: List[Any]
+    if isinstance(lower, datetime.datetime):
+        delta: datetime.timedelta = upper - lower  # type: ignore
+        boundaries = [lower + (delta * i) // partitions for i in range(partitions)]
+    elif isinstance(lower, datetime.date):
+        first, span = lower.toordinal(), upper.toordinal() - lower.toordinal()  # type: ignore
+        boundaries = [
+            datetime.date.fromordinal(first + (span * i) // partitions) for i in range(partitions)
+        ]
+    else:
+        span = upper - lower  # type: ignore
+        boundaries = [lower + (span * i) // partitions for i in range(partitions)]
+
+    # remove empty range (when span is lower than partitions)
+    boundaries = sorted(set(boundaries))
+    boundaries.append(upper)
+
+    return [
+        KeyRange(part=i, lower=boundaries[i], upper=boundaries[i + 1], last=i == len(boundaries) - 2)
+        for i in range(len(boundaries) - 1)
+    ]
+
+
+def generate_range_query(sql_query: str, key_column: str, key_range: KeyRange) -> str:
+    """Generate a select query restricted on a key range.
+
+    # Parameters
+        sql_query (str): source select query
+        key_column (str): key column name
+        key_range (KeyRange): range to select
+
+    # Returns
+        (str): sql query
+
+    Last range of a date key ends before the next day: a timestamp column compared with
+    a date keeps the whole last day.
+    """
+    upper = key_range.upper
+    upper_operator = '<'
+    if key_range.last:
+        if isinstance(upper, datetime.date) and not isinstance(upper, datetime.datetime):
+            upper = upper + datetime.timedelta(days=1)
+        else:
+            upper_operator = '<='
+    return (
+        f"SELECT * FROM ({sql_query.strip().rstrip(';')}) indexima_range "
+        f"WHERE {key_column} >= {format_key_bound(key_range.lower)} "
+        f"AND {key_column} {upper_operator} {format_key_bound(upper)}"
+    )
+
+
+def get_range_path(output_path: str, key_range: KeyRange) -> str:
+    """Return file path of a range.
+
+    # Parameters
+        output_path (str): output file path
+        key_range (KeyRange): range
+
+    # Returns
+        (str): range file path
+    """
+    return f'{output_path}.part-{key_range.part:05d}'
+
+
+def get_fingerprint(*values: str) -> str:
+    """Return a fingerprint of values (like range queries).
+
+    # Parameters
+        values (str): values
+
+    # Returns
+        (str): fingerprint
+    """
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def get_manifest_path(output_path: str) -> str:
+    """Return path of manifest (fingerprints of extracted files) of an output path.
+
+    # Parameters
+        output_path (str): output file path
+
+    # Returns
+        (str): manifest path
+    """
+    return f'{output_path}.manifest.json'
+
+
+def remove_stale_range_files(output_path: str, key_ranges: Iterable[KeyRange]) -> List[str]:
+    """Remove range files (and temporary files) which are not one of key ranges.
+
+    # Parameters
+        output_path (str): output file path
+        key_ranges (Iterable[KeyRange]): current key ranges
+
+    # Returns
+        (List[str]): removed paths
+    """
+    paths = {get_range_path(output_path, key_range) for key_range in key_ranges}
+    stale = sorted(set(glob.glob(f'{glob.escape(output_path)}.part-*')) - paths)
+    for path in stale:
+        os.remove(path)
+    return stale
+
+
+def write_cursor_to_csv(cursor: Any, path: str, header: bool = True, fetch_size: int = 10000) -> int:
+    """Write all rows of a cursor in a csv file.
+
+    File is written under a temporary name and renamed when all rows are written.
+
+    # Parameters
+        cursor: an executed hive cursor
+        path (str): csv file path
+        header (bool): write columns name as first line (default True)
+        fetch_size (int): fetch size (default 10000)
+
+    # Returns
+        (int): number of written rows
+    """
+    _count = 0
+    _tmp_path = f'{path}.tmp'
+    with open(_tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        if header and cursor.description:
+            writer.writerow([column[0].split('.')[-1] for column in cursor.description])
+        for rows in iter(lambda: cursor.fetchmany(fetch_size), []):
+            writer.writerows(rows)
+            _count += len(rows)
+    os.replace(_tmp_path, path)
+    return _count
+
+
+def merge_range_files(paths: Iterable[str], output_path: str, header: bool = True, remove: bool = True):
+    """Merge range files in order.
+
+    # Parameters
+        paths (Iterable[str]): ordered range file path
+        output_path (str): merged file path
+        header (bool): range files have a header line (keep only the first one) (default True)
+        remove (bool): remove range files once merged (default True)
+    """
+    _paths = list(paths)
+    _tmp_path = f'{output_path}.tmp'
+    with open(_tmp_path, 'w', newline='') as output:
+        for i, path in enumerate(_paths):
+            with open(path, 'r', newline='') as f:
+                if header and i > 0:
+                    f.readline()
+                for line in f:
+                    output.write(line)
+    os.replace(_tmp_path, output_path)
+    if remove:
+        for path in _paths:
+            os.remove(path)
@@ -12,19 +12,31 @@ Extra configuration:
 
 - socket timeout_seconds
 - socket keepalive
+- socket tcp_nodelay, recv_buffer_size (SO_RCVBUF) and send_buffer_size (SO_SNDBUF)
+- transport read_buffer_size
+- framed transport (NOSASL only)
+- Thrift messages recording (record_path)
 
 """
-from typing import Optional
+import socket as _socket
+from typing import Any, Callable, Optional, Union
 
 import sasl
 from thrift.transport.TSocket import TSocket
-from thrift.transport.TTransport import TBufferedTransport
+from thrift.transport.TTransport import TBufferedTransport, TFramedTransport, TTransportBase
 from thrift_sasl import TSaslClientTransport
 
+from airflow_indexima.kerberos import use_credential_cache
+from airflow_indexima.recording import TRecordingTransport
+
 
 __all__ = [
     'HIVE_AUTH_MODES',
+    'TOptionSocket',
+    'SaslFactory',
     'create_transport_socket',
+    'create_plain_sasl_factory',
+    'create_gssapi_sasl_factory',
     'create_hive_plain_transport',
     'create_hive_gssapi_transport',
     'create_hive_nosasl_transport',
@@ -35,12 +47,56 @@ __all__ = [
 
 HIVE_AUTH_MODES = ('NONE', 'CUSTOM', 'KERBEROS', 'NOSASL', 'LDAP')
 
+SaslFactory = Callable[[], Any]
+
+
+class TOptionSocket(TSocket):
+    """A TSocket which set socket options before connecting.
+
+    Buffer sizes are set before connect, so TCP window scaling can use them.
+    """
+
+    def __init__(
+        self,
+        *args,
+        tcp_nodelay: Optional[bool] = None,
+        recv_buffer_size: Optional[int] = None,
+        send_buffer_size: Optional[int] = None,
+        **kwargs,
+    ):
+        """Create a TOptionSocket instance.
+
+        # Parameters
+            tcp_nodelay (Optional[bool]): set TCP_NODELAY option
+            recv_buffer_size (Optional[int]): set SO_RCVBUF option (in bytes)
+            send_buffer_size (Optional[int]): set SO_SNDBUF option (in bytes)
+
+        Others parameters are those of TSocket.
+        """
+        super(TOptionSocket, self).__init__(*args, **kwargs)
+        self.tcp_nodelay = tcp_nodelay
+        self.recv_buffer_size = recv_buffer_size
+        self.send_buffer_size = send_buffer_size
+
+    def _do_open(self, family, socktype):
+        handle = super(TOptionSocket, self)._do_open(family, socktype)
+        if self.tcp_nodelay is not None and family in (_socket.AF_INET, _socket.AF_INET6):
+            handle.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, 1 if self.tcp_nodelay else 0)
+        if self.recv_buffer_size:
+            handle.setsockopt(_socket.SOL_SOCKET, _socket.SO_RCVBUF, self.recv_buffer_size)
+        if self.send_buffer_size:
+            handle.setsockopt(_socket.SOL_SOCKET, _socket.SO_SNDBUF, self.send_buffer_size)
+        return handle
+
 
 def create_transport_socket(
     host: str,
     port: Optional[int],
     timeout_seconds: Optional[int] = None,
     socket_keepalive: Optional[bool] = None,
+    tcp_nodelay: Optional[bool] = None,
+    recv_buffer_size: Optional[int] = None,
+    send_buffer_size: Optional[int] = None,
 ) -> TSocket:
     """Create a transport socket.
 
@@ -51,82 +107,167 @@ def create_transport_socket(
         port (int): The (TCP) port to connect to.
         timeout_seconds (Optional[int]): define the socket timeout in second
         socket_keepalive (Optional[bool]): enable TCP keepalive, default False.
+        tcp_nodelay (Optional[bool]): set TCP_NODELAY option (system default if None)
+        recv_buffer_size (Optional[int]): set SO_RCVBUF option in bytes (system default if None)
+        send_buffer_size (Optional[int]): set SO_SNDBUF option in bytes (system default if None)
 
     # Returns
         (TSocket): transport socket instance.
 
     """
-    socket = TSocket(
+    socket = TOptionSocket(
         host=host,
         port=port if port else 10000,
         socket_keepalive=socket_keepalive if socket_keepalive is not None else False,
+        tcp_nodelay=tcp_nodelay,
+        recv_buffer_size=recv_buffer_size,
+        send_buffer_size=send_buffer_size,
     )
     if timeout_seconds:
         socket.setTimeout(timeout_seconds * 1000)  # set timeout in ms
     return socket
 
 
-def create_hive_plain_transport(
-    socket: TSocket, username: str, password: Optional[str] = None
-) -> TSaslClientTransport:
-    """Create a TSaslClientTransport in 'PLAIN' authentication mode.
+def _buffered(socket: TSocket, read_buffer_size: Optional[int]) -> Union[TSocket, TBufferedTransport]:
+    return TBufferedTransport(socket, rbuf_size=read_buffer_size) if read_buffer_size else socket
+
+
+def create_plain_sasl_factory(host: str, username: str, password: Optional[str] = None) -> SaslFactory:
+    """Create a sasl client factory in 'PLAIN' mechanism.
 
     # Parameters
-        socket (TSocket): socket to use
+        host (str): server host
         username (str): username to login
         password (Optional[str]): optional password to login
 
     # Returns
-        (TSaslClientTransport): transport instance
-
+        (SaslFactory): a function which return an initialized sasl client
     """
 
     def _sasl_factory():
         sasl_client = sasl.Client()
-        sasl_client.setAttr('host', socket.host)
+        sasl_client.setAttr('host', host)
         sasl_client.setAttr('username', username)
         if password:
             sasl_client.setAttr('password', password)
         sasl_client.init()
         return sasl_client
 
-    return TSaslClientTransport(_sasl_factory, 'PLAIN', socket)
+    return _sasl_factory
 
 
-def create_hive_gssapi_transport(socket: TSocket, service_name: str) -> TSaslClientTransport:
-    """Create a TSaslClientTransport in 'GSSAPI' authentication mode.
+class _CredentialCacheSaslClient:
+    """A sasl client which use a credential cache during its negotiation steps."""
+
+    def __init__(self, sasl_client: Any, ccache: str):
+        self._sasl_client = sasl_client
+        self._ccache = ccache
+
+    def start(self, mechanism: str):
+        with use_credential_cache(self._ccache):
+            return self._sasl_client.start(mechanism)
+
+    def step(self, challenge: bytes):
+        with use_credential_cache(self._ccache):
+            return self._sasl_client.step(challenge)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._sasl_client, name)
+
+
+def create_gssapi_sasl_factory(host: str, service_name: str, ccache: Optional[str] = None) -> SaslFactory:
+    """Create a sasl client factory in 'GSSAPI' mechanism.
 
     # Parameters
-        socket (TSocket): socket to use
+        host (str): server host
         service_name (str): kerberos service name
+        ccache (Optional[str]): optional credential cache name, used during negotiation
+            steps only (default: credential cache of the process)
 
     # Returns
-        (TSaslClientTransport): transport instance
-
+        (SaslFactory): a function which return an initialized sasl client
     """
 
     def _sasl_factory():
         sasl_client = sasl.Client()
-        sasl_client.setAttr('host', socket.host)
+        sasl_client.setAttr('host', host)
         sasl_client.setAttr('service', service_name)
         sasl_client.init()
+        if ccache is not None:
+            return _CredentialCacheSaslClient(sasl_client, ccache=ccache)
         return sasl_client
 
-    return TSaslClientTransport(_sasl_factory, 'GSSAPI', socket)
+    return _sasl_factory
+
+
+def create_hive_plain_transport(
+    socket: TSocket, username: str, password: Optional[str] = None, read_buffer_size: Optional[int] = None
+) -> TSaslClientTransport:
+    """Create a TSaslClientTransport in 'PLAIN' authentication mode.
+
+    # Parameters
+        socket (TSocket): socket to use
+        username (str): username to login
+        password (Optional[str]): optional password to login
+        read_buffer_size (Optional[int]): optional read buffer size in bytes, if set socket reads
+            are buffered (rather than one read per sasl frame header and payload)
+
+    # Returns
+        (TSaslClientTransport): transport instance
+
+    """
+
+    return TSaslClientTransport(
+        create_plain_sasl_factory(host=socket.host, username=username, password=password),
+        'PLAIN',
+        _buffered(socket, read_buffer_size),
+    )
 
 
-def create_hive_nosasl_transport(socket: TSocket) -> TBufferedTransport:
-    """Create a TBufferedTransport in 'NOSASL' authentication mode.
+def create_hive_gssapi_transport(
+    socket: TSocket, service_name: str, read_buffer_size: Optional[int] = None, ccache: Optional[str] = None
+) -> TSaslClientTransport:
+    """Create a TSaslClientTransport in 'GSSAPI' authentication mode.
+
+    # Parameters
+        socket (TSocket): socket to use
+        service_name (str): kerberos service name
+        read_buffer_size (Optional[int]): optional read buffer size in bytes, if set socket reads
+            are buffered
+        ccache (Optional[str]): optional credential cache name (default: credential cache of
+            the process)
+
+    # Returns
+        (TSaslClientTransport): transport instance
+
+    """
+
+    return TSaslClientTransport(
+        create_gssapi_sasl_factory(host=socket.host, service_name=service_name, ccache=ccache),
+        'GSSAPI',
+        _buffered(socket, read_buffer_size),
+    )
+
+
+def create_hive_nosasl_transport(
+    socket: TSocket, read_buffer_size: Optional[int] = None, framed_transport: Optional[bool] = None
+) -> TTransportBase:
+    """Create a TBufferedTransport (or a TFramedTransport) in 'NOSASL' authentication mode.
 
     NOSASL corresponds to hive.server2.authentication=NOSASL in hive-site.xml
 
     # Parameters
         socket (TSocket):  socket to use
+        read_buffer_size (Optional[int]): optional read buffer size in bytes (default 4096)
+        framed_transport (Optional[bool]): use a framed transport, server must be configured
+            with hive.server2.thrift.framed (default False)
 
     # Returns
-        (TBufferedTransport): transport instance
+        (TTransportBase): transport instance
     """
-    return TBufferedTransport(socket)
+    if framed_transport:
+        return TFramedTransport(socket)
+    return TBufferedTransport(socket, rbuf_size=read_buffer_size or TBufferedTransport.DEFAULT_BUFFER)
 
 
 def check_hive_connection_parameters(
@@ -168,6 +309,13 @@ def create_hive_transport(
     username: Optional[str] = None,
     password: Optional[str] = None,
     kerberos_service_name: Optional[str] = None,
+    tcp_nodelay: Optional[bool] = None,
+    recv_buffer_size: Optional[int] = None,
+    send_buffer_size: Optional[int] = None,
+    read_buffer_size: Optional[int] = None,
+    framed_transport: Optional[bool] = None,
+    record_path: Optional[str] = None,
+    kerberos_ccache: Optional[str] = None,
 ) -> TSaslClientTransport:
     """Create a TSaslClientTransport.
 
@@ -182,6 +330,15 @@ def create_hive_transport(
         username (Optional[str]): optional username to login
         password (Optional[str]): optional password to login
         kerberos_service_name (Optional[str]): optional kerberos service name
+        tcp_nodelay (Optional[bool]): set TCP_NODELAY option
+        recv_buffer_size (Optional[int]): set SO_RCVBUF option (in bytes)
+        send_buffer_size (Optional[int]): set SO_SNDBUF option (in bytes)
+        read_buffer_size (Optional[int]): transport read buffer size (in bytes)
+        framed_transport (Optional[bool]): use a framed transport (NOSASL only)
+        record_path (Optional[str]): optional capture file, if set Thrift messages are
+            recorded (see airflow_indexima.recording)
+        kerberos_ccache (Optional[str]): optional kerberos credential cache name (KERBEROS only,
+            default: credential cache of the process)
 
     # Returns
         (TSaslClientTransport): transport instance
@@ -195,14 +352,32 @@ def create_hive_transport(
     )
 
     socket = create_transport_socket(
-        host=host, port=port, timeout_seconds=timeout_seconds, socket_keepalive=socket_keepalive
+        host=host,
+        port=port,
+        timeout_seconds=timeout_seconds,
+        socket_keepalive=socket_keepalive,
+        tcp_nodelay=tcp_nodelay,
+        recv_buffer_size=recv_buffer_size,
+        send_buffer_size=send_buffer_size,
     )
 
+    transport: Optional[TTransportBase] = None
     if auth == 'KERBEROS' and kerberos_service_name:
-        return create_hive_gssapi_transport(socket=socket, service_name=kerberos_service_name)
-
-    if auth == 'NOSASL':
-        return create_hive_nosasl_transport(socket=socket)
+        transport = create_hive_gssapi_transport(
+            socket=socket,
+            service_name=kerberos_service_name,
+            read_buffer_size=read_buffer_size,
+            ccache=kerberos_ccache,
+        )
+    elif auth == 'NOSASL':
+        transport = create_hive_nosasl_transport(
+            socket=socket, read_buffer_size=read_buffer_size, framed_transport=framed_transport
+        )
+    elif auth in ('CUSTOM', 'LDAP', 'NONE') and username:
+        transport = create_hive_plain_transport(
+            socket=socket, username=username, password=password, read_buffer_size=read_buffer_size
+        )
 
-    if auth in ('CUSTOM', 'LDAP', 'NONE') and username:
-        return create_hive_plain_transport(socket=socket, username=username, password=password)
+    if transport is not None and record_path:
+        return TRecordingTransport(transport=transport, path=record_path)
+    return transport
@@ -0,0 +1,537 @@
+"""Indexima asyncio hook module definition."""
+import asyncio
+import datetime
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Tuple, TypeVar, Union
+
+from airflow.hooks.base_hook import BaseHook
+from pyhive import hive
+from pyhive.hive import _unwrap_column
+from TCLIService import ttypes
+from thrift.transport.TTransport import TTransportException
+
+from airflow_indexima.async_transport import AsyncTCLIServiceClient, create_async_hive_transport
+from airflow_indexima.cache import is_cacheable_query
+from airflow_indexima.connection import (
+    ConnectionDecorator,
+    apply_hive_extra_setting,
+    extract_kerberos_credential,
+    get_hive_nodes,
+    get_hive_transport_parameters,
+)
+from airflow_indexima.kerberos import get_kerberos_credential_manager
+from airflow_indexima.routing import HiveNode, get_node_selector
+
+
+__all__ = ['AsyncIndeximaHook', 'AsyncCursor', 'run_coroutine', 'gather_with_concurrency']
+
+
+T = TypeVar('T')
+
+_PROTOCOL_VERSION = ttypes.TProtocolVersion.HIVE_CLI_SERVICE_PROTOCOL_V6
+
+_RUNNING_STATES = (
+    ttypes.TOperationState.INITIALIZED_STATE,
+    ttypes.TOperationState.PENDING_STATE,
+    ttypes.TOperationState.RUNNING_STATE,
+)
+# first poll delay of a running operation (doubled on each poll up to poll_interval)
+_FIRST_POLL_INTERVAL = 0.005
+
+
+def _check_status(response: Any):
+    if response.status.statusCode != ttypes.TStatusCode.SUCCESS_STATUS:
+        raise hive.OperationalError(response)
+
+
+def _get_open_client(client: Optional[AsyncTCLIServiceClient]) -> AsyncTCLIServiceClient:
+    if client is None:
+        raise TTransportException(type=TTransportException.NOT_OPEN, message='Connection not open')
+    return client
+
+
+def run_coroutine(coroutine: Awaitable[T]) -> T:
+    """Run a coroutine until its end from synchronous code (like an operator execute method).
+
+    A new event loop is used (and closed), so this function can be called
+    from any thread, once per task execution.
+
+    ```python
+    def execute(self, context):
+        return run_coroutine(self._execute_all(context))
+    ```
+
+    # Parameters
+        coroutine (Awaitable[T]): coroutine to run
+
+    # Returns
+        (T): coroutine result
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+async def gather_with_concurrency(coroutines: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """Run coroutines with at most `limit` of them at the same time.
+
+    # Parameters
+        coroutines (Iterable[Awaitable[T]]): coroutines to run
+        limit (int): maximum of concurrent coroutines
+
+    # Returns
+        (List[T]): results in coroutines order
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(coroutine: Awaitable[T]) -> T:
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[_run(coroutine) for coroutine in coroutines])
+
+
+class AsyncCursor:
+    """A cursor on an operation of an AsyncIndeximaHook.
+
+    Fetch methods follow hive.Cursor api, as coroutines.
+    Rows could be iterated with ```async for row in cursor```.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncTCLIServiceClient] = None,
+        operation_handle: Optional[ttypes.TOperationHandle] = None,
+        description: Optional[List[Tuple]] = None,
+        arraysize: int = 1000,
+    ):
+        self.arraysize = arraysize
+        self.description = description
+        self._client = client
+        self._operation_handle = operation_handle
+        self._rows: List[Tuple] = []
+        self._finished = not description
+
+    @property
+    def rowcount(self) -> int:
+        return -1
+
+    async def _fetch_more(self, size: int):
+        response = await _get_open_client(self._client).call(
+            'FetchResults',
+            ttypes.TFetchResultsReq(
+                operationHandle=self._operation_handle,
+                orientation=ttypes.TFetchOrientation.FETCH_NEXT,
+                maxRows=size,
+            ),
+        )
+        _check_status(response)
+        columns = [
+            _unwrap_column(column, description[1])
+            for column, description in zip(response.results.columns, self.description)  # type: ignore
+        ]
+        rows = list(zip(*columns))
+        self._rows.extend(rows)
+        if not rows:
+            self._finished = True
+
+    async def fetchone(self) -> Optional[Tuple]:
+        if not self._rows and not self._finished:
+            await self._fetch_more(self.arraysize)
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        _size = size or self.arraysize
+        while len(self._rows) < _size and not self._finished:
+            await self._fetch_more(max(_size - len(self._rows), self.arraysize))
+        rows, self._rows = self._rows[:_size], self._rows[_size:]
+        return rows
+
+    async def fetchall(self) -> List[Tuple]:
+        while not self._finished:
+            await self._fetch_more(self.arraysize)
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __aiter__(self) -> 'AsyncCursor':
+        return self
+
+    async def __anext__(self) -> Tuple:
+        row = await self.fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    async def close(self):
+        """Close operation (if any)."""
+        operation_handle, self._operation_handle = self._operation_handle, None
+        self._rows = []
+        self._finished = True
+        if operation_handle is not None and self._client and self._client.transport.is_open:
+            response = await self._client.call(
+                'CloseOperation', ttypes.TCloseOperationReq(operationHandle=operation_handle)
+            )
+            _check_status(response)
+
+
+class AsyncIndeximaHook(BaseHook):
+    """Indexima hook implementation on a non-blocking transport.
+
+    An instance hold one session. Many instances (and so many sessions)
+    could be driven by one event loop:
+
+    ```python
+    async def count(table):
+        async with AsyncIndeximaHook(indexima_conn_id='my-conn') as hook:
+            return await hook.fetch(f'SELECT COUNT(*) FROM {table}')
+
+    results = run_coroutine(gather_with_concurrency([count(table) for table in tables], limit=32))
+    ```
+
+    Connection settings (extra, connection decorator, nodes) are those of IndeximaHook,
+    result cache and statement limiter are not supported.
+    """
+
+    def __init__(
+        self,
+        indexima_conn_id: str,
+        connection_decorator: Optional[ConnectionDecorator] = None,
+        dry_run: Optional[bool] = False,
+        auth: Optional[str] = None,
+        kerberos_service_name: Optional[str] = None,
+        timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
+        socket_keepalive: Optional[bool] = None,
+        poll_interval: float = 1.0,
+        *args,
+        **kwargs,
+    ):
+        """Create an AsyncIndeximaHook instance.
+
+        # Parameters
+            indexima_conn_id(str): connection identifier
+            connection_decorator (Optional[ConnectionDecorator]) : optional function handler
+                to post process connection parameter(default: None)
+            dry_run (Optional[bool]): dry run mode (default: False). If true no action will
+                be applied against datasource.
+            auth(str): pyhive authentication mode (defaults: 'CUSTOM')
+            kerberos_service_name (Optional[str]): optional kerberos service name
+            timeout_seconds (Optional[Union[int, datetime.timedelta]]): define the timeout of each call
+                in second (could be an int or a timedelta)
+            socket_keepalive (Optional[bool]): enable TCP keepalive.
+            poll_interval (float): maximum delay in second between two status check of a running
+                operation, first checks are done after a few milliseconds (default: 1.0)
+
+        Per default, hive connection is set in 'utf-8':
+        ```{ "serialization.encoding": "utf-8"}```
+
+        """
+        super(AsyncIndeximaHook, self).__init__(source='indexima', *args, **kwargs)
+        self._indexima_conn_id = indexima_conn_id
+        self._schema = kwargs.pop("schema", None)
+
+        self._client: Optional[AsyncTCLIServiceClient] = None
+        self._session_handle: Optional[ttypes.TSessionHandle] = None
+        self._cursor: Optional[AsyncCursor] = None
+        self._node: Optional[HiveNode] = None
+        self._connection_decorator = connection_decorator
+        self._dry_run = dry_run or False
+        self._poll_interval = poll_interval
+        self._operation_handle: Optional[ttypes.TOperationHandle] = None
+
+        _timeout_seconds = None
+        if timeout_seconds is not None:
+            if isinstance(timeout_seconds, datetime.timedelta):
+                _timeout_seconds = timeout_seconds.seconds
+            else:
+                _timeout_seconds = int(timeout_seconds)
+
+        self._settings_decorator = lambda connection: apply_hive_extra_setting(
+            connection=connection,
+            auth=auth,
+            kerberos_service_name=kerberos_service_name,
+            timeout_seconds=_timeout_seconds,
+            socket_keepalive=socket_keepalive,
+        )
+        # set default hive configuration
+        self._hive_configuration: Optional[Dict[str, str]] = {"serialization.encoding": "utf-8"}
+
+    async def get_conn(self, read_only: bool = False) -> AsyncTCLIServiceClient:  # type: ignore
+        """Open a session.
+
+        # Parameters
+            read_only (bool): session is used for read-only queries (default False)
+
+        # Returns
+            (AsyncTCLIServiceClient): the session client
+        """
+        self._client, self._session_handle, self._node = await self._create_session(read_only=read_only)
+        return self._client
+
+    async def _create_session(
+        self, read_only: bool = False, node: Optional[HiveNode] = None
+    ) -> Tuple[AsyncTCLIServiceClient, ttypes.TSessionHandle, HiveNode]:
+        conn = self.get_connection(self._indexima_conn_id)
+        if not conn:
+            raise RuntimeError(f'no connection identifier found with {self._indexima_conn_id}')
+
+        # load extra parameters of airflow connection
+        conn = self._settings_decorator(conn)
+
+        # apply decorator
+        if self._connection_decorator:
+            conn = self._connection_decorator(conn)
+
+        parameters = get_hive_transport_parameters(connection=conn)
+        if parameters.pop('record_path', None):
+            self.log.warning('record_path is not supported by asyncio transport')
+        nodes = [node] if node else get_hive_nodes(connection=conn)
+        credential = extract_kerberos_credential(connection=conn)
+        if credential and parameters['auth'] == 'KERBEROS':
+            manager = get_kerberos_credential_manager(principal=credential[0], keytab=credential[1])
+            # kinit could be run
+            await asyncio.get_event_loop().run_in_executor(None, manager.ensure)
+            parameters['kerberos_ccache'] = manager.ccache
+
+        node_selector = get_node_selector()
+        error: Optional[Exception] = None
+        for candidate in node_selector.order(nodes, read_only=read_only):
+            self.log.info(f'connect to {candidate.host}  {conn.login} {candidate.port}')
+            start = time.monotonic()
+            client = AsyncTCLIServiceClient(
+                create_async_hive_transport(host=candidate.host, port=candidate.port, **parameters)
+            )
+            try:
+                session_handle = await self._open_session(
+                    client, username=parameters.get('username'), database=self._schema or conn.schema
+                )
+            except Exception as e:
+                client.transport.close()
+                node_selector.record_failure(candidate)
+                self.log.warning(f'unable to connect to {candidate.host}:{candidate.port}: {e}')
+                error = e
+                continue
+            node_selector.record_success(candidate, latency=time.monotonic() - start)
+            return client, session_handle, candidate
+        raise error  # type: ignore
+
+    async def _open_session(
+        self, client: AsyncTCLIServiceClient, username: Optional[str], database: Optional[str]
+    ) -> ttypes.TSessionHandle:
+        # same session handshake than hive.Connection
+        await client.transport.open()
+        response = await client.call(
+            'OpenSession',
+            ttypes.TOpenSessionReq(
+                client_protocol=_PROTOCOL_VERSION, configuration=self._hive_configuration, username=username
+            ),
+        )
+        _check_status(response)
+        if response.serverProtocolVersion != _PROTOCOL_VERSION:
+            raise hive.OperationalError(f'Unable to handle protocol version {response.serverProtocolVersion}')
+        session_handle = response.sessionHandle
+        response = await client.call(
+            'ExecuteStatement',
+            ttypes.TExecuteStatementReq(sessionHandle=session_handle, statement=f'USE `{database}`'),
+        )
+        _check_status(response)
+        await AsyncCursor(client=client, operation_handle=response.operationHandle).close()
+        return session_handle
+
+    async def run(self, sql: str) -> AsyncCursor:
+        """Execute query and return cursor.
+
+        Operation status is polled without blocking event loop. If waiting is
+        interrupted (like a task cancellation or a timeout), operation is cancelled.
+        """
+        if not self._client:
+            await self.get_conn(read_only=is_cacheable_query(sql))
+        if self._cursor:
+            await self._cursor.close()
+            self._cursor = None
+        if self._dry_run:
+            self.log.warn(sql)
+            return AsyncCursor()
+        self._cursor = await self._execute_and_wait(sql)
+        return self._cursor
+
+    async def _execute_and_wait(self, sql: str) -> AsyncCursor:
+        client = _get_open_client(self._client)
+        response = await client.call(
+            'ExecuteStatement',
+            ttypes.TExecuteStatementReq(sessionHandle=self._session_handle, statement=sql, runAsync=True),
+        )
+        _check_status(response)
+        operation_handle = response.operationHandle
+        self._operation_handle = operation_handle
+        try:
+            status = await self._poll(operation_handle)
+            delay = min(_FIRST_POLL_INTERVAL, self._poll_interval)
+            while status.operationState in _RUNNING_STATES:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._poll_interval)
+                status = await self._poll(operation_handle)
+        except BaseException:
+            await self.cancel()
+            raise
+        finally:
+            self._operation_handle = None
+
+        if status.operationState != ttypes.TOperationState.FINISHED_STATE:
+            state = ttypes.TOperationState._VALUES_TO_NAMES.get(status.operationState)
+            raise hive.OperationalError(status.errorMessage or f'operation ended with state {state}')
+
+        cursor = AsyncCursor(client=client, operation_handle=operation_handle)
+        if operation_handle.hasResultSet:
+            cursor.description = await self._get_description(operation_handle)
+            cursor._finished = False
+        return cursor
+
+    async def _poll(self, operation_handle: ttypes.TOperationHandle) -> ttypes.TGetOperationStatusResp:
+        response = await _get_open_client(self._client).call(
+            'GetOperationStatus',
+            ttypes.TGetOperationStatusReq(operationHandle=operation_handle, getProgressUpdate=True),
+        )
+        _check_status(response)
+        return response
+
+    async def _get_description(self, operation_handle: ttypes.TOperationHandle) -> List[Tuple]:
+        response = await _get_open_client(self._client).call(
+            'GetResultSetMetadata', ttypes.TGetResultSetMetadataReq(operationHandle=operation_handle)
+        )
+        _check_status(response)
+        description: List[Tuple] = []
+        for column in response.schema.columns:
+            entry = column.typeDesc.types[0]
+            # like hive.Cursor, all fancy stuff maps to string
+            if entry.primitiveEntry is None:
+                type_id = ttypes.TTypeId.STRING_TYPE
+            else:
+                type_id = entry.primitiveEntry.type
+            type_code = ttypes.TTypeId._VALUES_TO_NAMES[type_id]
+            description.append((column.columnName, type_code, None, None, None, None, True))
+        return description
+
+    async def fetch(self, sql: str) -> List[Tuple]:
+        """Execute query and return all rows.
+
+        # Parameters
+            sql (str): query
+
+        # Returns
+            (List[Tuple]): rows
+        """
+        cursor = await self.run(sql)
+        return await cursor.fetchall()
+
+    async def iter_batches(self, sql: str, batch_size: Optional[int] = None) -> AsyncIterator[List[Tuple]]:
+        """Execute query and iterate on rows by batches.
+
+        ```python
+        async for rows in hook.iter_batches('select ...', batch_size=10000):
+            ...
+        ```
+
+        # Parameters
+            sql (str): query
+            batch_size (Optional[int]): rows per batch (default cursor arraysize)
+
+        # Returns
+            (AsyncIterator[List[Tuple]]): batches of rows
+        """
+        cursor = await self.run(sql)
+        while True:
+            rows = await cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    async def cancel(self):
+        """Cancel active operation (if any) and close current session.
+
+        If current transport is not usable (like a call interrupted while
+        waiting its response), operation is cancelled with a new session
+        on the node of the operation.
+        """
+        operation_handle = self._operation_handle
+        self._operation_handle = None
+        if operation_handle is not None:
+            self.log.info('cancel active operation')
+            try:
+                request = ttypes.TCancelOperationReq(operationHandle=operation_handle)
+                if self._client and self._client.transport.is_open:
+                    await self._client.call('CancelOperation', request)
+                else:
+                    client, session_handle, node = await self._create_session(node=self._node)
+                    try:
+                        await client.call('CancelOperation', request)
+                    finally:
+                        await self._close_session(client, session_handle)
+                        get_node_selector().release(node)
+            except Exception as e:
+                self.log.warning(f'unable to cancel operation: {e}')
+        try:
+            await self.close()
+        except Exception as e:
+            self.log.warning(f'unable to close connection: {e}')
+
+    def has_active_operation(self) -> bool:
+        """Return True if an operation is running."""
+        return self._operation_handle is not None
+
+    async def _close_session(self, client: AsyncTCLIServiceClient, session_handle: ttypes.TSessionHandle):
+        try:
+            if client.transport.is_open:
+                response = await client.call(
+                    'CloseSession', ttypes.TCloseSessionReq(sessionHandle=session_handle)
+                )
+                _check_status(response)
+        finally:
+            client.transport.close()
+
+    async def close(self):
+        """Close current session."""
+        client, self._client, self._cursor = self._client, None, None
+        node, self._node = self._node, None
+        try:
+            if client:
+                await self._close_session(client, self._session_handle)  # type: ignore
+        finally:
+            self._session_handle = None
+            if node:
+                get_node_selector().release(node)
+
+    async def __aenter__(self) -> 'AsyncIndeximaHook':
+        await self.get_conn()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    def is_dry_run(self) -> bool:
+        return self._dry_run
+
+    @property
+    def hive_configuration(self) -> Optional[Dict[str, str]]:
+        """Return hive configuration.
+
+        # Returns
+            (Dict[str, str]): A dictionary of Hive settings (functionally same as the `set` command)
+        """
+        return self._hive_configuration
+
+    @hive_configuration.setter
+    def hive_configuration(self, configuration: Optional[Dict[str, str]]):
+        """Set hive session configuration (applied on next session).
+
+        # Parameters
+            configuration: A dictionary of Hive settings (functionally same as the `set` command)
+        """
+        self._hive_configuration = configuration
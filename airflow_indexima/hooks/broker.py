@@ -0,0 +1,246 @@
+"""Indexima broker hook module definition."""
+import socket
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pyhive import hive
+
+from airflow_indexima.broker import receive_message, send_message
+from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.progress import OperationStalledError, OperationTimeoutError
+
+
+__all__ = ['IndeximaBrokerHook', 'BrokerCursor']
+
+
+def _raise_error(response: Dict[str, Any]):
+    if 'error' in response:
+        if response.get('error_type') == 'OperationalError':
+            raise hive.OperationalError(response['error'])
+        raise RuntimeError(response['error'])
+
+
+class _BrokerConnection:
+    def __init__(
+        self,
+        socket_path: str,
+        conn_id: str,
+        configuration: Optional[Dict[str, str]] = None,
+        schema: Optional[str] = None,
+    ):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._stream = self._socket.makefile('rwb')
+        message = {'op': 'lease', 'conn_id': conn_id, 'configuration': configuration, 'schema': schema}
+        try:
+            self.lease = self.request(message)['lease']
+        except BaseException:
+            self._stream.close()
+            self._socket.close()
+            raise
+
+    def request(
+        self, message: Dict[str, Any], on_status: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Send a request and return its response.
+
+        Status messages received before the response are given to 'on_status'.
+        """
+        send_message(self._stream, message)  # type: ignore
+        while True:
+            response = receive_message(self._stream)  # type: ignore
+            if response is None:
+                raise RuntimeError('broker connection closed')
+            if 'status' not in response:
+                break
+            if on_status:
+                on_status(response['status'])
+        _raise_error(response)
+        return response
+
+    def cursor(self) -> 'BrokerCursor':
+        return BrokerCursor(self)
+
+    def close(self):
+        try:
+            send_message(self._stream, {'op': 'close'})  # type: ignore
+        except OSError:
+            pass
+        finally:
+            self._stream.close()
+            self._socket.close()
+
+
+class BrokerCursor:
+    """A cursor on a brokered session.
+
+    This implementation follow hive.Cursor execute and fetch api.
+    """
+
+    def __init__(self, connection: _BrokerConnection, arraysize: int = 1000):
+        self.arraysize = arraysize
+        self.description: Optional[List[Tuple]] = None
+        self._connection = connection
+        self._rows: List[Tuple] = []
+        self._finished = True
+
+    @property
+    def rowcount(self) -> int:
+        return -1
+
+    def execute(self, sql: str, on_status: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Execute a statement.
+
+        # Parameters
+            sql (str): statement
+            on_status (Optional[Callable[[Dict[str, Any]], None]]): optional function called
+                with each forwarded status poll ('progress' and 'logs')
+        """
+        self._rows = []
+        message = {'op': 'run', 'sql': sql, 'progress': on_status is not None}
+        self.description = self._connection.request(message, on_status=on_status)['description']
+        self._finished = not self.description
+
+    def _fetch_more(self, size: int):
+        rows = self._connection.request({'op': 'fetch', 'size': size})['rows']
+        self._rows.extend(rows)
+        if not rows:
+            self._finished = True
+
+    def fetchone(self) -> Optional[Tuple]:
+        if not self._rows and not self._finished:
+            self._fetch_more(self.arraysize)
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        _size = size or self.arraysize
+        while len(self._rows) < _size and not self._finished:
+            self._fetch_more(_size - len(self._rows))
+        rows, self._rows = self._rows[:_size], self._rows[_size:]
+        return rows
+
+    def fetchall(self) -> List[Tuple]:
+        while not self._finished:
+            self._fetch_more(self.arraysize)
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._rows = []
+        self._finished = True
+
+
+class IndeximaBrokerHook(IndeximaHook):
+    """Indexima hook which use a session of a local broker (see airflow_indexima.broker).
+
+    ```python
+    hook = IndeximaBrokerHook(broker_socket_path='/var/run/indexima/broker.sock', indexima_conn_id='my-conn')
+    with hook:
+        hook.run('select ...')
+    ```
+
+    A session is leased from the broker until hook is closed. Connection settings
+    (auth, timeout, connection decorator, ...) are those of the broker sessions, a lease
+    is rejected if hive configuration or schema of this hook differ from those of broker
+    sessions.
+    Dry run, result cache and statement limiter are applied in task process, status polls
+    of a statement run with a progress monitor are forwarded by broker to this monitor.
+    """
+
+    def __init__(self, broker_socket_path: str, indexima_conn_id: str, *args, **kwargs):
+        """Create an IndeximaBrokerHook instance.
+
+        # Parameters
+            broker_socket_path (str): Unix socket path of broker
+            indexima_conn_id (str): connection identifier
+
+        Others parameters are those of IndeximaHook.
+        """
+        super(IndeximaBrokerHook, self).__init__(indexima_conn_id, *args, **kwargs)
+        self._broker_socket_path = broker_socket_path
+
+    def get_conn(self, read_only: bool = False) -> _BrokerConnection:  # type: ignore
+        """Lease a broker session.
+
+        # Parameters
+            read_only (bool): unused, session routing is done by broker
+
+        # Returns
+            (_BrokerConnection): the broker connection
+        """
+        self._conn = _BrokerConnection(
+            self._broker_socket_path,
+            self._indexima_conn_id,
+            configuration=self._hive_configuration,
+            schema=self._schema,
+        )
+        self._cursor = self._conn.cursor()
+        return self._conn
+
+    def _execute_and_wait(self, sql: str):
+        monitor = self._progress_monitor
+        on_status = None
+        if monitor:
+            monitor.start()
+
+            def on_status(status: Dict[str, Any]):
+                response = SimpleNamespace(
+                    progressUpdateResponse=SimpleNamespace(progressedPercentage=status['progress'])
+                )
+                monitor.update(response, logs=status['logs'])  # type: ignore
+
+        self._operation_handle = self._conn.lease  # type: ignore
+        try:
+            self._cursor.execute(sql, on_status=on_status)  # type: ignore
+        except (OperationStalledError, OperationTimeoutError):
+            # aborted by progress monitor
+            self._cancel_interrupted()
+            raise
+        except (hive.Error, RuntimeError):
+            raise
+        except BaseException:
+            # interrupted while waiting
+            self._cancel_interrupted()
+            raise
+        finally:
+            self._operation_handle = None
+
+    def _cancel_interrupted(self):
+        cancelled = self._cancelled
+        self.cancel()
+        # cancel of an interrupted operation is not a cancel request
+        self._cancelled = cancelled
+
+    def cancel(self):
+        """Cancel active operation (if any) and release leased session.
+
+        Cancel request is sent with a new broker connection, so this method can be
+        called while another call is waiting on current connection (like in a task on_kill).
+        A cancelled statement is never retried.
+        """
+        self._cancelled = True
+        lease = self._operation_handle
+        self._operation_handle = None
+        if lease is not None:
+            self.log.info('cancel active operation')
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as _socket:
+                    _socket.connect(self._broker_socket_path)
+                    with _socket.makefile('rwb') as stream:
+                        send_message(stream, {'op': 'cancel', 'lease': lease})  # type: ignore
+                        receive_message(stream)  # type: ignore
+            except Exception as e:
+                self.log.warning(f'unable to cancel operation: {e}')
+        try:
+            self.close()
+        except Exception as e:
+            self.log.warning(f'unable to close connection: {e}')
+
+    def close(self):
+        """Release leased session."""
+        conn, self._conn, self._cursor = self._conn, None, None
+        if conn:
+            conn.close()
@@ -1,22 +1,64 @@
 """Indexima hook module definition."""
 
+import contextlib
 import datetime
-from typing import Any, Dict, List, Optional, Union
+import re
+import time
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 from airflow.hooks.base_hook import BaseHook
 from pyhive import hive
+from TCLIService import ttypes
 
+from airflow_indexima.cache import ResultCache, ResultCursor, is_cacheable_query
+from airflow_indexima.catalog import TableCatalog, parse_describe_rows
+from airflow_indexima.circuit import CircuitBreaker
 from airflow_indexima.connection import (
     ConnectionDecorator,
     apply_hive_extra_setting,
-    extract_hive_extra_setting,
+    extract_kerberos_credential,
+    get_hive_nodes,
+    get_hive_transport_parameters,
 )
 from airflow_indexima.hive_transport import create_hive_transport
+from airflow_indexima.insert import build_insert_statements
+from airflow_indexima.kerberos import get_kerberos_credential_manager
+from airflow_indexima.limiter import StatementLimiter
+from airflow_indexima.multiplex import MultiplexedConnection, get_session_multiplexer
+from airflow_indexima.progress import OperationMonitor
+from airflow_indexima.retry import (
+    RetryPolicy,
+    StatementInterruptedError,
+    is_idempotent_statement,
+    is_session_statement,
+    is_transient_error,
+)
+from airflow_indexima.routing import HiveNode, get_node_selector
+from airflow_indexima.schema import ColumnSchema
+from airflow_indexima.staging import StagingBackend, get_frame_schema, iter_frame_rows, stage_rows
 
 
 __all__ = ['IndeximaHook']
 
 
+_RUNNING_STATES = (
+    ttypes.TOperationState.INITIALIZED_STATE,
+    ttypes.TOperationState.PENDING_STATE,
+    ttypes.TOperationState.RUNNING_STATE,
+)
+# first poll delay of a running operation (doubled on each poll up to poll_interval)
+_FIRST_POLL_INTERVAL = 0.005
+# sasl negotiation errors: credentials rejected by server, or not available in task process
+_SASL_ERROR_PATTERN = re.compile(r'^(?:Bad status|Could not start SASL|Bad SASL result)')
+
+
+def _is_connect_failure(error: Exception) -> bool:
+    """Return True if a connect error is a failure of cluster (not of configuration or credentials)."""
+    if _SASL_ERROR_PATTERN.match(str(getattr(error, 'message', None) or error)):
+        return False
+    return is_transient_error(error) or isinstance(error, OSError)
+
+
 class IndeximaHook(BaseHook):
     """Indexima hook implementation.
 
@@ -31,6 +73,17 @@ class IndeximaHook(BaseHook):
     which must have this profile: Callable[[Connection], Connection] (alias ConnectionDecorator)
 
     In this handler you could retreive credentials from other backeng like aws ssm.
+
+    When connection extra define a 'nodes' list, nodes are tried in order of
+    their recent connect latency and error rate, and read-only queries prefer
+    the node with less active sessions (see airflow_indexima.routing).
+
+    With a retry policy, a statement failed on a transient error (like a socket
+    reset) is replayed on a new connection if it is idempotent, otherwise a
+    StatementInterruptedError is raised (see airflow_indexima.retry).
+
+    With a circuit breaker, connects and statements fail fast while the circuit
+    of the connection identifier is open (see airflow_indexima.circuit).
     """
 
     def __init__(
@@ -42,6 +95,15 @@ class IndeximaHook(BaseHook):
         kerberos_service_name: Optional[str] = None,
         timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
         socket_keepalive: Optional[bool] = None,
+        result_cache: Optional[ResultCache] = None,
+        poll_interval: float = 1.0,
+        statement_limiter: Optional[StatementLimiter] = None,
+        priority_weight: int = 1,
+        multiplex_sessions: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        table_catalog: Optional[TableCatalog] = None,
+        staging_backend: Optional[StagingBackend] = None,
         *args,
         **kwargs,
     ):
@@ -58,6 +120,22 @@ class IndeximaHook(BaseHook):
                 (could be an int or a timedelta)
             socket_keepalive (Optional[bool]): enable TCP keepalive.
             kerberos_service_name (Optional[str]): optional kerberos service name
+            result_cache (Optional[ResultCache]): optional result cache of select queries (default: None)
+            poll_interval (float): maximum delay in second between two status check of a running
+                operation, first checks are done after a few milliseconds (default: 1.0)
+            statement_limiter (Optional[StatementLimiter]): optional statement limiter shared
+                by worker processes (default: None)
+            priority_weight (int): priority of statements in statement limiter (default: 1)
+            multiplex_sessions (bool): open session over a transport shared by hooks of this process
+                with same connection parameters, so sasl handshake is done once (default: False)
+            retry_policy (Optional[RetryPolicy]): optional retry policy of statements failed
+                on a transient error (default: None)
+            circuit_breaker (Optional[CircuitBreaker]): optional circuit breaker shared by worker
+                processes (default: None)
+            table_catalog (Optional[TableCatalog]): optional local catalog of table columns, used by
+                describe_table and invalidated by DDL statements (default: None)
+            staging_backend (Optional[StagingBackend]): optional staging location backend of
+                load_iterable and load_frame (default: None)
 
         Per default, hive connection is set in 'utf-8':
         ```{ "serialization.encoding": "utf-8"}```
@@ -69,8 +147,25 @@ class IndeximaHook(BaseHook):
 
         self._conn: Optional[Any] = None
         self._cursor: Optional[Any] = None
+        self._node: Optional[HiveNode] = None
         self._connection_decorator = connection_decorator
         self._dry_run = dry_run or False
+        self._result_cache = result_cache
+        self._poll_interval = poll_interval
+        self._operation_handle: Optional[Any] = None
+        self._statement_limiter = statement_limiter
+        self._priority_weight = priority_weight
+        self._multiplex_sessions = multiplex_sessions
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._table_catalog = table_catalog
+        self._staging_backend = staging_backend
+        self._progress_monitor: Optional[OperationMonitor] = None
+        self._logs_available = True
+        self._cancelled = False
+        # use/set statements of current session, replayed on a new connection after a transient error
+        self._session_statements: List[str] = []
+        self._session_lost = False
 
         _timeout_seconds = None
         if timeout_seconds is not None:
@@ -89,13 +184,23 @@ class IndeximaHook(BaseHook):
         # set default hive configuration
         self._hive_configuration: Optional[Dict[str, str]] = {"serialization.encoding": "utf-8"}
 
-    def get_conn(self) -> hive.Connection:
+    def get_conn(self, read_only: bool = False) -> hive.Connection:
         """Return a hive connection.
 
+        # Parameters
+            read_only (bool): connection is used for read-only queries (default False)
+
         # Returns
             (hive.Connection): the hive connection
         """
+        with self._circuit_guard(is_failure=_is_connect_failure):
+            self._conn, self._node = self._create_connection(read_only=read_only)
+        self._cursor = self._conn.cursor()  # type: ignore
+        return self._conn
 
+    def _create_connection(
+        self, read_only: bool = False, node: Optional[HiveNode] = None, dedicated: bool = False
+    ) -> Tuple[hive.Connection, HiveNode]:
         conn = self.get_connection(self._indexima_conn_id)
         if not conn:
             raise RuntimeError(f'no connection identifier found with {self._indexima_conn_id}')
@@ -107,31 +212,51 @@ class IndeximaHook(BaseHook):
         if self._connection_decorator:
             conn = self._connection_decorator(conn)
 
-        self.log.info(f'connect to {conn.host}  {conn.login} {conn.port}')  # noqa: E501
-        (auth, kerberos_service_name, timeout_seconds, socket_keepalive) = extract_hive_extra_setting(
-            connection=conn
-        )
-
         # build parameters for create_hive_transport and keep default value meaning
-        parameters = {'host': conn.host}
-        parameters['port'] = conn.port or 10000
-        parameters['timeout_seconds'] = timeout_seconds or 60
-        if socket_keepalive is not None:
-            parameters['socket_keepalive'] = socket_keepalive
-        parameters['auth'] = auth or 'CUSTOM'
-        if conn.login:
-            parameters['username'] = conn.login
-        if conn.password:
-            parameters['password'] = conn.password
-        if kerberos_service_name:
-            parameters['kerberos_service_name'] = kerberos_service_name
-        self._conn = hive.Connection(
+        parameters = get_hive_transport_parameters(connection=conn)
+        nodes = [node] if node else get_hive_nodes(connection=conn)
+        credential = extract_kerberos_credential(connection=conn)
+        if credential and parameters['auth'] == 'KERBEROS':
+            manager = get_kerberos_credential_manager(principal=credential[0], keytab=credential[1])
+            manager.ensure()
+            parameters['kerberos_ccache'] = manager.ccache
+
+        node_selector = get_node_selector()
+        error: Optional[Exception] = None
+        for candidate in node_selector.order(nodes, read_only=read_only):
+            self.log.info(f'connect to {candidate.host}  {conn.login} {candidate.port}')  # noqa: E501
+            start = time.monotonic()
+            try:
+                if self._multiplex_sessions and not dedicated:
+                    connection = self._create_multiplexed_connection(candidate, conn.schema, parameters)
+                else:
+                    connection = hive.Connection(
+                        configuration=self._hive_configuration,
+                        database=self._schema or conn.schema,
+                        thrift_transport=create_hive_transport(
+                            host=candidate.host, port=candidate.port, **parameters
+                        ),
+                    )
+            except Exception as e:
+                node_selector.record_failure(candidate)
+                self.log.warning(f'unable to connect to {candidate.host}:{candidate.port}: {e}')
+                error = e
+                continue
+            node_selector.record_success(candidate, latency=time.monotonic() - start)
+            return connection, candidate
+        raise error  # type: ignore
+
+    def _create_multiplexed_connection(
+        self, node: HiveNode, schema: Optional[str], parameters: Dict[str, Any]
+    ) -> MultiplexedConnection:
+        return get_session_multiplexer().connect(
+            key=(node.host, node.port, tuple(sorted(parameters.items()))),
+            transport_factory=lambda: create_hive_transport(host=node.host, port=node.port, **parameters),
             configuration=self._hive_configuration,
-            database=self._schema or conn.schema,
-            thrift_transport=create_hive_transport(**parameters),
+            database=self._schema or schema,
+            username=parameters.get('username'),
+            name=f'{node.host}:{node.port}',
         )
-        self._cursor = self._conn.cursor()  # type: ignore
-        return self._conn
 
     def get_records(self, sql: str) -> hive.Cursor:
         """Execute query and return curror.
@@ -143,37 +268,403 @@ class IndeximaHook(BaseHook):
     def get_pandas_df(self, sql: str):
         raise NotImplementedError()
 
-    def run(self, sql: str) -> hive.Cursor:
-        """Execute query and return curror."""
-        if not self._cursor:
-            self.get_conn()
+    def run(self, sql: str, progress_monitor: Optional[OperationMonitor] = None) -> hive.Cursor:
+        """Execute query and return curror.
+
+        When a result cache is set, select queries are served from this cache
+        and commit/rollback/truncate/DDL statements invalidate results of their tables.
+
+        # Parameters
+            sql (str): query
+            progress_monitor (Optional[OperationMonitor]): optional monitor (like a ProgressMonitor) updated
+                on each status poll of the running operation
+        """
+        read_only = is_cacheable_query(sql)
+        if self._result_cache and not self._dry_run and self._result_cache.is_cacheable(sql):
+            return self._run_cached(sql)
         if not self._dry_run:
-            self._cursor.execute(sql)  # type: ignore
+            self._progress_monitor = progress_monitor
+            try:
+                self._execute_with_retry(sql, read_only=read_only)
+            finally:
+                self._progress_monitor = None
+                if self._result_cache:
+                    self._result_cache.bump_epoch_of_statement(sql)
+                if self._table_catalog:
+                    self._table_catalog.invalidate_statement(self._indexima_conn_id, sql)
         else:
+            if not self._cursor:
+                self.get_conn(read_only=read_only)
             self.log.warn(sql)
         return self._cursor
 
-    def check_error_of_load_query(self, cursor: hive.Cursor):
+    def _run_cached(self, sql: str) -> ResultCursor:
+        # key is computed before execution: a commit during execution will not be served
+        key = self._result_cache.get_key(sql, conn_id=self._indexima_conn_id)  # type: ignore
+        cursor = self._result_cache.get(key)  # type: ignore
+        if cursor is None:
+            self._execute_with_retry(sql, read_only=True)
+            description, rows = self._cursor.description, self._cursor.fetchall()  # type: ignore
+            self._result_cache.put(key, description=description, rows=rows)  # type: ignore
+            cursor = ResultCursor(description=description, rows=rows)
+        self.log.debug(f'result cache stats: {self._result_cache.stats}')  # type: ignore
+        return cursor
+
+    def _execute_with_retry(self, sql: str, read_only: bool):
+        """Execute query, and replay it on a new connection after a transient error.
+
+        A failed connect is always retried. A statement is replayed only if it is idempotent,
+        otherwise a StatementInterruptedError is raised. Nothing is retried after a cancel.
+        Use and set statements of the lost session are replayed on the new connection first.
+        """
+        self._cancelled = False
+        attempt = 1
+        while True:
+            sent = False
+            try:
+                if not self._cursor:
+                    self.get_conn(read_only=read_only)
+                with self._circuit_guard(is_failure=is_transient_error):
+                    if self._session_lost:
+                        self._restore_session()
+                    sent = True
+                    self._execute(sql)
+                if is_session_statement(sql):
+                    self._session_statements.append(sql)
+                return
+            except Exception as e:
+                if self._cancelled or not is_transient_error(e):
+                    raise
+                self._discard_connection()
+                if self._retry_policy is None:
+                    raise
+                if sent and not is_idempotent_statement(sql):
+                    raise StatementInterruptedError(sql=sql, error=e) from e
+                if attempt >= self._retry_policy.max_attempts:
+                    raise
+                delay = self._retry_policy.get_delay(attempt)
+                self.log.warning(f'transient error ({e}), attempt {attempt + 1} in {delay:.1f}s')
+                time.sleep(delay)
+                attempt += 1
+
+    def _circuit_guard(self, is_failure: Callable[[Exception], bool]) -> ContextManager:
+        if self._circuit_breaker is None:
+            return contextlib.ExitStack()
+        return self._circuit_breaker.guard(self._indexima_conn_id, is_failure=is_failure)
+
+    def _discard_connection(self):
+        """Close a broken connection, and record a failure of its node.
+
+        Session statements are kept, to be replayed by next statement on a new connection.
+        """
+        if self._node:
+            get_node_selector().record_failure(self._node)
+        session_statements = self._session_statements
+        with contextlib.suppress(Exception):
+            self.close()
+        self._session_statements = session_statements
+        self._session_lost = bool(session_statements)
+
+    def _restore_session(self):
+        """Replay use and set statements of a lost session on current connection."""
+        self.log.info(f'replay {len(self._session_statements)} session statement(s) on new connection')
+        for statement in self._session_statements:
+            self._execute(statement)
+        self._session_lost = False
+
+    def _execute(self, sql: str):
+        """Execute query asynchronously and wait for its end.
+
+        Active operation handle is tracked, so the operation can be cancelled
+        (see cancel) on task kill. If waiting is interrupted (like on execution
+        timeout), operation is cancelled, except on a transient error (operation is lost
+        with its connection).
+
+        If a statement limiter is set, the statement wait for its slots before execution.
+        """
+        if self._statement_limiter:
+            with self._statement_limiter.acquire(
+                conn_id=self._indexima_conn_id, sql=sql, priority_weight=self._priority_weight
+            ):
+                self._execute_and_wait(sql)
+        else:
+            self._execute_and_wait(sql)
+
+    def _execute_and_wait(self, sql: str):
+        monitor = self._progress_monitor
+        if monitor:
+            monitor.start()
+        self._cursor.execute(sql, async_=True)  # type: ignore
+        self._operation_handle = self._cursor._operationHandle  # type: ignore
+        try:
+            response = self._cursor.poll()  # type: ignore
+            # short statements end after a few milliseconds, long loads are polled every poll_interval
+            delay = min(_FIRST_POLL_INTERVAL, self._poll_interval)
+            while response.operationState in _RUNNING_STATES:
+                if monitor:
+                    monitor.update(response, logs=self._fetch_logs())
+                time.sleep(delay)
+                delay = min(delay * 2, self._poll_interval)
+                response = self._cursor.poll()  # type: ignore
+        except BaseException as e:
+            if is_transient_error(e):
+                # operation is lost with its broken connection, which is discarded by caller (a cancel
+                # would connect to the failed node and wait its timeout)
+                raise
+            cancelled = self._cancelled
+            self.cancel()
+            # cancel of an interrupted operation is not a cancel request
+            self._cancelled = cancelled
+            raise
+        finally:
+            self._operation_handle = None
+
+        if response.operationState != ttypes.TOperationState.FINISHED_STATE:
+            state = ttypes.TOperationState._VALUES_TO_NAMES.get(response.operationState)
+            raise hive.OperationalError(response.errorMessage or f'operation ended with state {state}')
+
+    def _fetch_logs(self) -> List[str]:
+        """Return new server logs of running operation (if server support it)."""
+        if not self._logs_available:
+            return []
+        try:
+            return self._cursor.fetch_logs()  # type: ignore
+        except Exception as e:
+            self.log.info(f'operation logs are not available: {e}')
+            self._logs_available = False
+            return []
+
+    def cancel(self):
+        """Cancel active operation (if any) and close current connection.
+
+        Operation is cancelled with a new connection (on the node of the operation,
+        never multiplexed), so this method can be called while another call is waiting
+        on current connection (like in a task on_kill). A cancelled statement is never retried.
+        """
+        self._cancelled = True
+        operation_handle = self._operation_handle
+        self._operation_handle = None
+        if operation_handle is not None:
+            self.log.info('cancel active operation')
+            try:
+                conn, node = self._create_connection(node=self._node, dedicated=True)
+                try:
+                    conn.client.CancelOperation(ttypes.TCancelOperationReq(operationHandle=operation_handle))
+                finally:
+                    conn.close()
+                    get_node_selector().release(node)
+            except Exception as e:
+                self.log.warning(f'unable to cancel operation: {e}')
+        try:
+            self.close()
+        except Exception as e:
+            self.log.warning(f'unable to close connection: {e}')
+        self._conn = None
+        self._cursor = None
+
+    def has_active_operation(self) -> bool:
+        """Return True if an operation is running."""
+        return self._operation_handle is not None
+
+    def check_error_of_load_query(self, cursor: hive.Cursor) -> int:
         """Raise error if a load query fail.
 
         # Parameters
             cursor: cursor returned by load path query.
 
+        # Returns
+            (int): count of inserted rows
+
         # Raises
             (RuntimeError): if an error is found
 
         """
         _messages: List[str] = []
+        _inserted = 0
         for path, inserts, errors, message in iter(cursor.fetchone, None):  # type: ignore
+            _inserted += inserts or 0  # type: ignore
             if errors > 0:  # type: ignore
                 _messages.append(f"({path}, {inserts}, {errors}: {message}")  # type: ignore
 
         if len(_messages):
             raise RuntimeError('\n'.join(_messages))
+        return _inserted
+
+    def describe_table(self, tablename: str) -> List[ColumnSchema]:
+        """Return columns of a table.
+
+        Columns are read from table catalog if any (and cached on miss).
+
+        # Parameters
+            tablename (str): table name
+
+        # Returns
+            (List[ColumnSchema]): columns
+        """
+        if self._table_catalog:
+            columns = self._table_catalog.get(self._indexima_conn_id, tablename)
+            if columns is not None:
+                return columns
+        columns = parse_describe_rows(self.run(f'DESCRIBE {tablename}').fetchall())
+        if self._table_catalog:
+            self._table_catalog.put(self._indexima_conn_id, tablename, columns)
+        return columns
+
+    def insert_rows(
+        self,
+        table: str,
+        rows: Iterable[Sequence[Any]],
+        target_fields: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+        max_statement_length: int = 1000000,
+        commit: bool = True,
+        log_interval_seconds: float = 30.0,
+    ) -> int:
+        """Insert rows with multi-row INSERT statements (see airflow_indexima.insert).
+
+        Rows are streamed from iterable (constant memory), table is committed once at end.
+        Inserted rows and rate are logged every 'log_interval_seconds' and at end.
+
+        # Parameters
+            table (str): table name
+            rows (Iterable[Sequence[Any]]): rows
+            target_fields (Optional[Sequence[str]]): optional column names of row values
+            batch_size (int): maximum row count per statement (default 1000)
+            max_statement_length (int): maximum statement length in characters (default 1000000)
+            commit (bool): commit table at end (default True)
+            log_interval_seconds (float): delay in seconds between two progress logs (default 30.0)
+
+        # Returns
+            (int): inserted row count
+
+        # Raises
+            (ValueError): on an unsupported value
+        """
+        start = time.monotonic()
+        last_log = start
+        count = 0
+        for sql, row_count in build_insert_statements(
+            table,
+            rows,
+            target_fields=target_fields,
+            batch_size=batch_size,
+            max_statement_length=max_statement_length,
+        ):
+            self.run(sql)
+            count += row_count
+            now = time.monotonic()
+            if now - last_log >= log_interval_seconds:
+                last_log = now
+                self.log.info(f'{count} rows inserted into {table} ({count / (now - start):.0f} rows/s)')
+        if commit and count:
+            self.commit(table)
+        elapsed = time.monotonic() - start
+        rate = count / elapsed if elapsed else 0
+        self.log.info(f'{count} rows inserted into {table} in {elapsed:.1f}s ({rate:.0f} rows/s)')
+        return count
+
+    def load_iterable(
+        self,
+        rows: Iterable[Sequence[Any]],
+        schema: Sequence[ColumnSchema],
+        table: str,
+        chunk_rows: int = 100000,
+        compression: str = 'gzip',
+        commit: bool = True,
+    ) -> int:
+        """Load rows through Parquet chunks staged with staging backend (see airflow_indexima.staging).
+
+        Rows are streamed from iterable (memory is bounded by chunk size), chunks are loaded with
+        a single LOAD DATA statement, then staging location is deleted.
+
+        # Parameters
+            rows (Iterable[Sequence[Any]]): rows, values in schema order
+            schema (Sequence[ColumnSchema]): columns (name and hive type) of rows
+            table (str): table name
+            chunk_rows (int): maximum row count per chunk (default 100000)
+            compression (str): parquet compression, 'gzip' or 'none' (default 'gzip')
+            commit (bool): commit table at end (default True)
+
+        # Returns
+            (int): loaded row count
+
+        # Raises
+            (ValueError): without staging backend, or on an unsupported type or value
+            (RuntimeError): if load query fail
+        """
+        if self._staging_backend is None:
+            raise ValueError('a staging_backend is required to load python rows')
+        start = time.monotonic()
+        location = self._staging_backend.create_location(prefix=table)
+        try:
+            count, chunks = stage_rows(
+                self._staging_backend,
+                location,
+                schema,
+                rows,
+                chunk_rows=chunk_rows,
+                compression=compression,
+            )
+            if count:
+                uri = self._staging_backend.get_uri(location)
+                self.check_error_of_load_query(
+                    self.run(f"LOAD DATA INPATH '{uri}' INTO TABLE {table} FORMAT PARQUET;")
+                )
+                if commit:
+                    self.commit(table)
+        finally:
+            self._staging_backend.delete_location(location)
+        elapsed = time.monotonic() - start
+        rate = count / elapsed if elapsed else 0
+        self.log.info(
+            f'{count} rows loaded into {table} from {chunks} chunks in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        )
+        return count
+
+    def load_frame(
+        self,
+        frame: Any,
+        table: str,
+        schema: Optional[Sequence[ColumnSchema]] = None,
+        chunk_rows: int = 100000,
+        compression: str = 'gzip',
+        commit: bool = True,
+    ) -> int:
+        """Load a pandas DataFrame through Parquet chunks (see load_iterable).
+
+        Missing values (NaN, NaT) are loaded as null.
+
+        # Parameters
+            frame (Any): a pandas DataFrame
+            table (str): table name
+            schema (Optional[Sequence[ColumnSchema]]): optional columns of frame (default: inferred
+                from dtypes, an object column is typed from its first value)
+            chunk_rows (int): maximum row count per chunk (default 100000)
+            compression (str): parquet compression, 'gzip' or 'none' (default 'gzip')
+            commit (bool): commit table at end (default True)
+
+        # Returns
+            (int): loaded row count
+
+        # Raises
+            (ValueError): without staging backend, if a column type could not be inferred,
+                or on an unsupported value
+            (RuntimeError): if load query fail
+        """
+        return self.load_iterable(
+            iter_frame_rows(frame),
+            schema=schema or get_frame_schema(frame),
+            table=table,
+            chunk_rows=chunk_rows,
+            compression=compression,
+            commit=commit,
+        )
 
     def commit(self, tablename: str):
         """Execute a simple commit on table.
 
+        Commit epoch of table is incremented in result cache if any.
+
         # Parameters
             tablename (str): table name to commit
         """
@@ -182,6 +673,8 @@ class IndeximaHook(BaseHook):
     def rollback(self, tablename: str):
         """Execute a simple rollback on table.
 
+        Commit epoch of table is incremented in result cache if any.
+
         # Parameters
             tablename (str): table name to rollback
         """
@@ -198,13 +691,19 @@ class IndeximaHook(BaseHook):
 
     def close(self):
         """Close current connection."""
-        if self._conn:
-            self._conn.close()
-        self._conn = None
-        self._cursor = None
+        node, self._node = self._node, None
+        conn, self._conn, self._cursor = self._conn, None, None
+        self._session_statements, self._session_lost = [], False
+        try:
+            if conn:
+                conn.close()
+        finally:
+            if node:
+                get_node_selector().release(node)
 
     def __enter__(self):
-        self.get_conn()
+        # connection is opened by first statement, so a read-only statement could prefer the least
+        # loaded node
         return self
 
     def __exit__(self, *exc):
@@ -214,6 +713,11 @@ class IndeximaHook(BaseHook):
     def is_dry_run(self) -> bool:
         return self._dry_run
 
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        """Return retry policy of statements failed on a transient error (if any)."""
+        return self._retry_policy
+
     @property
     def hive_configuration(self) -> Optional[Dict[str, str]]:
         """Return hive configuration.
@@ -5,6 +5,11 @@ This will create a hook, and an operator accessible at:
 - airflow.hooks.indexima.IndeximaHook
 - airflow.operators.indexima.IndeximaQueryRunnerOperator
 - airflow.operators.indexima.IndeximaLoadDataOperator
+- airflow.operators.indexima.IndeximaCommitOperator
+- airflow.operators.indexima.IndeximaRangeExtractOperator
+- airflow.operators.indexima.IndeximaFanOutOperator
+- airflow.operators.indexima.IndeximaBatchLoadDataOperator
+- airflow.operators.indexima.IndeximaTableSensor
 
 
 see https://airflow.apache.org/docs/stable/plugins.html
@@ -12,10 +17,26 @@ see https://airflow.apache.org/docs/stable/plugins.html
 from airflow.plugins_manager import AirflowPlugin
 
 from airflow_indexima.hooks.indexima import IndeximaHook
-from airflow_indexima.operators.indexima import IndeximaLoadDataOperator, IndeximaQueryRunnerOperator
+from airflow_indexima.operators.indexima import (
+    IndeximaBatchLoadDataOperator,
+    IndeximaCommitOperator,
+    IndeximaFanOutOperator,
+    IndeximaLoadDataOperator,
+    IndeximaQueryRunnerOperator,
+    IndeximaRangeExtractOperator,
+)
+from airflow_indexima.sensors.indexima import IndeximaTableSensor
 
 
 class IndeximaAirflowPlugin(AirflowPlugin):
     name = 'indexima'
-    operators = [IndeximaQueryRunnerOperator, IndeximaLoadDataOperator]
+    operators = [
+        IndeximaQueryRunnerOperator,
+        IndeximaLoadDataOperator,
+        IndeximaCommitOperator,
+        IndeximaRangeExtractOperator,
+        IndeximaFanOutOperator,
+        IndeximaBatchLoadDataOperator,
+        IndeximaTableSensor,
+    ]
     hooks = [IndeximaHook]
@@ -0,0 +1,98 @@
+"""Define multi-row INSERT statement builder.
+
+Rows written one INSERT per row pay a full statement round trip (and a
+server side plan) for each row. Rows are grouped in multi-row statements:
+
+```sql
+INSERT INTO client (id, name) VALUES (1, 'john'), (2, 'o\\'hara'), ...
+```
+
+A statement hold at most 'batch_size' rows, and stay under
+'max_statement_length' characters (a single row longer than this limit is
+sent alone). Rows are read from any iterable, one statement at a time, so
+memory stay constant whatever the row count.
+"""
+import datetime
+import decimal
+import math
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pyhive import hive
+
+
+__all__ = ['escape_value', 'build_insert_statements']
+
+
+_escaper = hive.HiveParamEscaper()
+
+
+def escape_value(value: Any) -> str:
+    """Return a sql literal of a value.
+
+    # Parameters
+        value (Any): None, bool, int, float, Decimal, str, bytes, date or datetime
+
+    # Returns
+        (str): sql literal
+
+    # Raises
+        (ValueError): if value is not supported (like a float NaN)
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f'unsupported float value {value}')
+        return repr(value)
+    if isinstance(value, (int, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (str, bytes)):
+        return _escaper.escape_string(value)
+    if isinstance(value, datetime.datetime):
+        return _escaper.escape_string(value.isoformat(sep=' '))
+    if isinstance(value, datetime.date):
+        return _escaper.escape_string(value.isoformat())
+    raise ValueError(f'unsupported value {value!r} ({type(value).__name__})')
+
+
+def build_insert_statements(
+    table: str,
+    rows: Iterable[Sequence[Any]],
+    target_fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+    max_statement_length: int = 1000000,
+) -> Iterator[Tuple[str, int]]:
+    """Build multi-row INSERT statements.
+
+    # Parameters
+        table (str): table name
+        rows (Iterable[Sequence[Any]]): rows (read lazily)
+        target_fields (Optional[Sequence[str]]): optional column names of row values
+        batch_size (int): maximum row count per statement (default 1000)
+        max_statement_length (int): maximum statement length in characters (default 1000000)
+
+    # Returns
+        (Iterator[Tuple[str, int]]): statements and their row count
+
+    # Raises
+        (ValueError): if batch_size is not positive, or on an unsupported value
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    columns = f" ({', '.join(target_fields)})" if target_fields else ''
+    prefix = f'INSERT INTO {table}{columns} VALUES '
+    values: List[str] = []
+    length = len(prefix)
+    for row in rows:
+        row_values = f"({', '.join(escape_value(value) for value in row)})"
+        # separator ', ' before each row but first
+        if values and (len(values) >= batch_size or length + 2 + len(row_values) > max_statement_length):
+            yield prefix + ', '.join(values), len(values)
+            values = []
+            length = len(prefix)
+        length += len(row_values) + (2 if values else 0)
+        values.append(row_values)
+    if values:
+        yield prefix + ', '.join(values), len(values)
@@ -0,0 +1,279 @@
+"""Define a Kerberos credential manager.
+
+In KERBEROS mode, GSSAPI use the default credential cache (KRB5CCNAME).
+A KerberosCredentialManager acquire a ticket from a keytab (kinit) in a
+credential cache shared by all hooks, and renew it ahead of its expiry
+in a background thread:
+
+```python
+manager = get_kerberos_credential_manager(principal='airflow@EXAMPLE.COM', keytab='/etc/airflow.keytab')
+manager.ensure()
+with use_credential_cache(manager.ccache):
+    ...  # GSSAPI negotiation step
+```
+
+The credential cache of the process is not changed: KRB5CCNAME is set only
+during GSSAPI negotiation steps of hooks (see use_credential_cache), so other
+Kerberos clients of a worker (like HDFS or Hive hooks with their own principal)
+keep their cache.
+
+Service tickets obtained on connect are stored in this cache too, so
+next GSSAPI connects (of this process, or of other processes using the
+same cache) do not request them again to the KDC.
+
+The cache file is replaced atomically under a file lock, and its expiry
+is stored in a state file ('{ccache_path}.state'), so a cache could be
+shared by worker processes of a host: a ticket is acquired by the first
+process which need it.
+"""
+import contextlib
+import datetime
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from airflow_indexima.locking import locked_json_state
+
+
+__all__ = [
+    'KerberosCredentialManager',
+    'get_kerberos_credential_manager',
+    'parse_tgt_expiry',
+    'use_credential_cache',
+]
+
+
+_logger = logging.getLogger(__name__)
+
+_KLIST_DATE_FORMATS = ('%m/%d/%Y %H:%M:%S', '%m/%d/%y %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%b %d %H:%M:%S %Y')
+
+_environ_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def use_credential_cache(ccache: Optional[str]) -> Iterator[None]:
+    """Use a credential cache during context.
+
+    GSSAPI read its credential cache name in KRB5CCNAME environment variable: it is set
+    under a process lock (contexts of two threads do not overlap), and restored at exit.
+    Keep the context short (a negotiation step): a Kerberos client of another thread which
+    does not use this function could read KRB5CCNAME meanwhile.
+
+    # Parameters
+        ccache (Optional[str]): credential cache name (None: nothing is changed)
+    """
+    if ccache is None:
+        yield
+        return
+    with _environ_lock:
+        previous = os.environ.get('KRB5CCNAME')
+        os.environ['KRB5CCNAME'] = ccache
+        try:
+            yield
+        finally:
+            if previous is None:
+                os.environ.pop('KRB5CCNAME', None)
+            else:
+                os.environ['KRB5CCNAME'] = previous
+
+
+def parse_tgt_expiry(klist_output: str) -> Optional[float]:
+    """Return expiry timestamp of ticket granting ticket from a klist output.
+
+    # Parameters
+        klist_output (str): output of 'klist -c ...'
+
+    # Returns
+        (Optional[float]): expiry timestamp (local time) or None if not found
+    """
+    for line in klist_output.splitlines():
+        columns = [column.strip() for column in line.split('  ') if column.strip()]
+        if len(columns) < 3 or not columns[2].startswith('krbtgt/'):
+            continue
+        for date_format in _KLIST_DATE_FORMATS:
+            try:
+                return time.mktime(datetime.datetime.strptime(columns[1], date_format).timetuple())
+            except ValueError:
+                continue
+    return None
+
+
+class KerberosCredentialManager:
+    """Acquire and renew a ticket from a keytab in a shared credential cache."""
+
+    def __init__(
+        self,
+        principal: str,
+        keytab: str,
+        ccache_path: Optional[str] = None,
+        ticket_lifetime_seconds: int = 36000,
+        renew_ahead_seconds: int = 900,
+        retry_seconds: int = 60,
+        kinit_path: str = 'kinit',
+        klist_path: str = 'klist',
+    ):
+        """Create a KerberosCredentialManager instance.
+
+        # Parameters
+            principal (str): kerberos principal
+            keytab (str): keytab path of principal
+            ccache_path (Optional[str]): credential cache file path (default a file per principal and user
+                in temporary directory)
+            ticket_lifetime_seconds (int): requested ticket lifetime (default 36000)
+            renew_ahead_seconds (int): a ticket is renewed when it expire in less than this delay
+                (default 900)
+            retry_seconds (int): delay before a new attempt when renewal fail (default 60)
+            kinit_path (str): kinit command (default 'kinit')
+            klist_path (str): klist command (default 'klist')
+        """
+        self.principal = principal
+        self.keytab = keytab
+        if ccache_path is None:
+            digest = hashlib.sha1(f'{principal}:{keytab}'.encode('utf-8')).hexdigest()[:16]
+            ccache_path = os.path.join(tempfile.gettempdir(), f'krb5cc_indexima_{os.getuid()}_{digest}')
+        self.ccache_path = ccache_path
+        self._ticket_lifetime_seconds = ticket_lifetime_seconds
+        self._renew_ahead_seconds = renew_ahead_seconds
+        self._retry_seconds = retry_seconds
+        self._kinit_path = kinit_path
+        self._klist_path = klist_path
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ccache(self) -> str:
+        """Return credential cache name (KRB5CCNAME value)."""
+        return f'FILE:{self.ccache_path}'
+
+    @property
+    def expires_at(self) -> float:
+        """Return expiry timestamp of current ticket (0 if none)."""
+        return self._expires_at
+
+    def _is_valid(self, expires_at: float) -> bool:
+        return expires_at - time.time() > self._renew_ahead_seconds
+
+    def ensure(self) -> float:
+        """Acquire a ticket if current one is missing or expire soon.
+
+        Credential cache of the process is not changed (see use_credential_cache).
+
+        # Returns
+            (float): expiry timestamp of ticket
+
+        # Raises
+            (RuntimeError): if kinit fail
+        """
+        with self._lock:
+            if not self._is_valid(self._expires_at) or not os.path.exists(self.ccache_path):
+                self._expires_at = self._refresh()
+            return self._expires_at
+
+    def _refresh(self) -> float:
+        with locked_json_state(f'{self.ccache_path}.state') as state:
+            expires_at = state.get('expires_at', 0.0)
+            if self._is_valid(expires_at) and os.path.exists(self.ccache_path):
+                # renewed by another process
+                return expires_at
+            expires_at = self._kinit()
+            state['expires_at'] = expires_at
+            return expires_at
+
+    def _kinit(self) -> float:
+        _tmp_path = f'{self.ccache_path}.{os.getpid()}.tmp'
+        start = time.time()
+        command = [
+            self._kinit_path,
+            '-kt',
+            self.keytab,
+            '-l',
+            f'{self._ticket_lifetime_seconds}s',
+            '-c',
+            f'FILE:{_tmp_path}',
+            self.principal,
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            if os.path.exists(_tmp_path):
+                os.remove(_tmp_path)
+            error = result.stderr.decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f'kinit of {self.principal} failed ({result.returncode}): {error}')
+        os.chmod(_tmp_path, 0o600)
+        os.replace(_tmp_path, self.ccache_path)
+        expires_at = start + self._ticket_lifetime_seconds
+        # the KDC could grant a shorter lifetime
+        tgt_expiry = self._read_expiry()
+        if tgt_expiry is not None:
+            expires_at = min(expires_at, tgt_expiry)
+        _logger.info(f'kerberos ticket of {self.principal} acquired (expire at {time.ctime(expires_at)})')
+        return expires_at
+
+    def _read_expiry(self) -> Optional[float]:
+        try:
+            result = subprocess.run(
+                [self._klist_path, '-c', self.ccache], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError:
+            return None
+        return parse_tgt_expiry(result.stdout.decode('utf-8', errors='replace'))
+
+    def start(self) -> 'KerberosCredentialManager':
+        """Start background renewal (if not started)."""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._renew_loop, name='kerberos-renew', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop background renewal."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _renew_loop(self):
+        while not self._stop.is_set():
+            delay = self._expires_at - self._renew_ahead_seconds - time.time()
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            try:
+                self.ensure()
+            except Exception as e:
+                _logger.warning(f'unable to renew kerberos ticket of {self.principal}: {e}')
+            if not self._is_valid(self._expires_at):
+                # renewal failed, or ticket lifetime is shorter than renew ahead delay
+                self._stop.wait(self._retry_seconds)
+
+
+_managers: Dict[Tuple[str, str], KerberosCredentialManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_kerberos_credential_manager(principal: str, keytab: str, **kwargs) -> KerberosCredentialManager:
+    """Return the (started) credential manager of a principal and keytab in current process.
+
+    # Parameters
+        principal (str): kerberos principal
+        keytab (str): keytab path of principal
+
+    Others parameters are KerberosCredentialManager parameters (used on first call only).
+
+    # Returns
+        (KerberosCredentialManager): credential manager
+    """
+    with _managers_lock:
+        manager = _managers.get((principal, keytab))
+        if manager is None:
+            manager = KerberosCredentialManager(principal=principal, keytab=keytab, **kwargs)
+            _managers[(principal, keytab)] = manager
+    return manager.start()
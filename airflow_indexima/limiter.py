@@ -0,0 +1,244 @@
+"""Define a statement limiter shared by all worker processes.
+
+Airflow pools count tasks, this limiter count statements running against
+an Indexima cluster. Each statement takes a slot in each of its scopes:
+
+- the connection: all statements on a connection identifier
+- the statement class: heavy (LOAD, COMMIT) or light statement on a connection
+- the target table: LOAD/COMMIT/ROLLBACK/TRUNCATE statement on a table
+
+A slot is an exclusive file lock (released by the system if a worker die),
+coordination works across processes which share the lock directory (on a
+same host, or on a shared file system).
+
+Waiting statements are granted in 'priority_weight' order (and in arrival
+order for a same priority): a waiting statement is never overtaken by a
+lower priority statement which share one of its scopes.
+"""
+import fcntl
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from airflow_indexima.cache import normalize_sql
+
+
+__all__ = ['StatementLimiter', 'is_heavy_statement', 'get_statement_table']
+
+
+_HEAVY_STATEMENT_PATTERN = re.compile(r'^(?:load|commit)\b')
+_TABLE_PATTERNS = (
+    re.compile(r'^load data .* into table ([\w.`]+)'),
+    re.compile(r'^(?:commit|rollback) ([\w.`]+)'),
+    re.compile(r'^truncate table ([\w.`]+)'),
+)
+_MAX_PRIORITY = 10 ** 9
+
+
+def is_heavy_statement(sql: str) -> bool:
+    """Return True if sql is an heavy statement (LOAD, COMMIT)."""
+    return bool(_HEAVY_STATEMENT_PATTERN.match(normalize_sql(sql)))
+
+
+def get_statement_table(sql: str) -> Optional[str]:
+    """Return table written by a LOAD/COMMIT/ROLLBACK/TRUNCATE statement or None."""
+    normalized_sql = normalize_sql(sql)
+    for pattern in _TABLE_PATTERNS:
+        match = pattern.match(normalized_sql)
+        if match:
+            return match.group(1).replace('`', '')
+    return None
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+class StatementLimiter:
+    """Statement limiter.
+
+    ```python
+    limiter = StatementLimiter(
+        lock_dir='/var/lock/indexima', connection_slots=20, heavy_slots=4, table_slots=1
+    )
+    op = IndeximaLoadDataOperator(..., statement_limiter=limiter, priority_weight=10)
+    ```
+
+    A None slot count disable limitation on this scope.
+    """
+
+    def __init__(
+        self,
+        lock_dir: str,
+        connection_slots: Optional[int] = None,
+        heavy_slots: Optional[int] = None,
+        light_slots: Optional[int] = None,
+        table_slots: Optional[int] = None,
+        poll_interval: float = 1.0,
+        acquire_timeout: Optional[float] = None,
+        stale_ticket_seconds: float = 120.0,
+    ):
+        """Create a StatementLimiter instance.
+
+        # Parameters
+            lock_dir (str): lock directory shared by worker processes (created if needed)
+            connection_slots (Optional[int]): maximum of concurrent statements per connection
+            heavy_slots (Optional[int]): maximum of concurrent heavy statements (LOAD, COMMIT)
+                per connection
+            light_slots (Optional[int]): maximum of concurrent light statements per connection
+            table_slots (Optional[int]): maximum of concurrent LOAD/COMMIT/ROLLBACK/TRUNCATE
+                statements per table
+            poll_interval (float): delay in seconds between two acquire attempts (default 1.0)
+            acquire_timeout (Optional[float]): maximum waiting delay in seconds (default None)
+            stale_ticket_seconds (float): delay after which a waiting ticket without update
+                is considered as stale (default 120.0)
+        """
+        self._lock_dir = lock_dir
+        self._connection_slots = connection_slots
+        self._heavy_slots = heavy_slots
+        self._light_slots = light_slots
+        self._table_slots = table_slots
+        self._poll_interval = poll_interval
+        self._acquire_timeout = acquire_timeout
+        self._stale_ticket_seconds = stale_ticket_seconds
+        self._queue_dir = os.path.join(lock_dir, 'queue')
+        self._slot_dir = os.path.join(lock_dir, 'slots')
+        os.makedirs(self._queue_dir, exist_ok=True)
+        os.makedirs(self._slot_dir, exist_ok=True)
+
+    def get_scopes(self, conn_id: str, sql: str) -> Dict[str, int]:
+        """Return scopes (name: slot count) of a statement.
+
+        # Parameters
+            conn_id (str): connection identifier
+            sql (str): statement
+
+        # Returns
+            (Dict[str, int]): scopes
+        """
+        scopes = {}
+        if self._connection_slots is not None:
+            scopes[f'conn-{conn_id}'] = self._connection_slots
+        if is_heavy_statement(sql):
+            if self._heavy_slots is not None:
+                scopes[f'conn-{conn_id}-heavy'] = self._heavy_slots
+        elif self._light_slots is not None:
+            scopes[f'conn-{conn_id}-light'] = self._light_slots
+        table = get_statement_table(sql)
+        if table and self._table_slots is not None:
+            scopes[f'table-{conn_id}-{table}'] = self._table_slots
+        return {_safe_name(name): slots for name, slots in scopes.items()}
+
+    def _try_acquire_slots(self, scopes: Dict[str, int]) -> Optional[List[int]]:
+        fds: List[int] = []
+        for scope, slots in sorted(scopes.items()):
+            acquired = False
+            for index in range(slots):
+                path = os.path.join(self._slot_dir, f'{scope}.{index}.lock')
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fds.append(fd)
+                    acquired = True
+                    break
+                except OSError:
+                    os.close(fd)
+            if not acquired:
+                self._release_slots(fds)
+                return None
+        return fds
+
+    def _release_slots(self, fds: List[int]):
+        for fd in fds:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _create_ticket(self, scopes: Dict[str, int], priority_weight: int) -> str:
+        name = '{:012d}-{:020d}-{}-{}-{}'.format(
+            _MAX_PRIORITY - min(max(priority_weight, 0), _MAX_PRIORITY),
+            time.time_ns() if hasattr(time, 'time_ns') else int(time.time() * 10 ** 9),
+            _safe_name(socket.gethostname()),
+            os.getpid(),
+            threading.get_ident(),
+        )
+        path = os.path.join(self._queue_dir, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(scopes))
+        return path
+
+    def _touch_ticket(self, ticket: str, scopes: Dict[str, int]):
+        try:
+            os.utime(ticket)
+        except FileNotFoundError:
+            # removed as stale by another process
+            with open(ticket, 'w') as f:
+                f.write('\n'.join(scopes))
+
+    def _read_tickets(self) -> List[Tuple[str, List[str]]]:
+        tickets = []
+        now = time.time()
+        for name in sorted(os.listdir(self._queue_dir)):
+            path = os.path.join(self._queue_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self._stale_ticket_seconds:
+                    os.remove(path)
+                    continue
+                with open(path, 'r') as f:
+                    tickets.append((path, f.read().split('\n')))
+            except OSError:
+                continue
+        return tickets
+
+    def _is_first_in_queue(self, ticket: str, scopes: Dict[str, int]) -> bool:
+        for path, ticket_scopes in self._read_tickets():
+            if path == ticket:
+                return True
+            if set(ticket_scopes) & set(scopes):
+                return False
+        return True
+
+    @contextmanager
+    def acquire(self, conn_id: str, sql: str, priority_weight: int = 1) -> Iterator[None]:
+        """Wait for a slot in each scope of a statement.
+
+        # Parameters
+            conn_id (str): connection identifier
+            sql (str): statement
+            priority_weight (int): priority of statement (default 1)
+
+        # Raises
+            (RuntimeError): if acquire_timeout is reached
+        """
+        scopes = self.get_scopes(conn_id=conn_id, sql=sql)
+        if not scopes:
+            yield
+            return
+
+        ticket = self._create_ticket(scopes, priority_weight=priority_weight)
+        start = time.monotonic()
+        fds: Optional[List[int]] = None
+        try:
+            while fds is None:
+                if self._is_first_in_queue(ticket, scopes):
+                    fds = self._try_acquire_slots(scopes)
+                if fds is None:
+                    if self._acquire_timeout is not None and time.monotonic() - start > self._acquire_timeout:
+                        raise RuntimeError(
+                            f'no slot available on {list(scopes)} after {self._acquire_timeout}s'
+                        )
+                    time.sleep(self._poll_interval)
+                    self._touch_ticket(ticket, scopes)
+        finally:
+            try:
+                os.remove(ticket)
+            except FileNotFoundError:
+                pass
+
+        try:
+            yield
+        finally:
+            self._release_slots(fds)
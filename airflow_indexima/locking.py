@@ -0,0 +1,75 @@
+"""Define file lock utilities.
+
+Those utilities are used to share a state between worker processes
+on a same host (or on a shared file system).
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+__all__ = ['file_lock', 'read_json_state', 'locked_json_state']
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[int]:
+    """Acquire a lock on a file (created if needed).
+
+    # Parameters
+        path (str): lock file path
+        shared (bool): acquire a shared lock rather than an exclusive one (default False)
+
+    # Returns
+        (Iterator[int]): file descriptor of locked file
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield fd
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        content = f.read()
+    return json.loads(content) if content else {}
+
+
+def read_json_state(path: str) -> Dict[str, Any]:
+    """Read a json state under a shared lock.
+
+    # Parameters
+        path (str): json file path (lock file is '{path}.lock')
+
+    # Returns
+        (Dict[str, Any]): state
+    """
+    with file_lock(f'{path}.lock', shared=True):
+        return _read_json(path)
+
+
+@contextmanager
+def locked_json_state(path: str) -> Iterator[Dict[str, Any]]:
+    """Read and update a json state under an exclusive lock.
+
+    The yielded dictionary is written back when leaving the context without error.
+
+    # Parameters
+        path (str): json file path (lock file is '{path}.lock')
+
+    # Returns
+        (Iterator[Dict[str, Any]]): state
+    """
+    with file_lock(f'{path}.lock'):
+        state = _read_json(path)
+        yield state
+        _tmp_path = f'{path}.tmp'
+        with open(_tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(_tmp_path, path)
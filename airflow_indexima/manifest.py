@@ -0,0 +1,166 @@
+"""Define a factory of load tasks from a manifest of tables.
+
+A manifest (a yaml or json file, or a dictionary) list tables to load, and
+default options of their loads:
+
+```yaml
+defaults:
+  format_query: PARQUET
+  truncate: true
+tables:
+  - target_table: client
+    load_path_uri: s3://bucket/client/{{ ds }}
+  - target_table: country
+    load_path_uri: s3://bucket/country
+    small: true
+```
+
+Each table option is an IndeximaLoadDataOperator parameter (table options
+override defaults). Tasks are named '{group_id}.{target_table}' (airflow 1.10
+has no TaskGroup, the prefix group them in UI and in task selection):
+
+```python
+tasks = create_load_tasks(dag, '/path/of/manifest.yaml', indexima_conn_id='my-conn', group_id='load')
+tasks['client'] >> downstream_task
+```
+
+DAG file parsing stay fast with thousands of tables:
+
+- manifest file is parsed once per process (cached on its modification time)
+- parameters shared by all tasks (like a retry policy) are merged once
+- operators create their hook on first use (at execution), not at parse time
+- with 'batch_small_tables', tables flagged 'small' are loaded by
+  IndeximaBatchLoadDataOperator tasks of 'batch_size' tables, instead of a
+  task per table
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Tuple, Union
+
+from airflow.models import DAG, BaseOperator
+
+from airflow_indexima.operators.indexima import IndeximaBatchLoadDataOperator, IndeximaLoadDataOperator
+
+
+__all__ = ['read_manifest', 'create_load_tasks']
+
+
+_manifests: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_TASK_ID_PATTERN = re.compile(r'[^\w.-]')
+
+
+def _load_yaml(stream) -> Any:
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError('PyYAML is required to read a yaml manifest (or use a json manifest)')
+    # C loader is much faster on large manifests
+    return yaml.load(stream, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def _validate_manifest(manifest: Any, source: str) -> Dict[str, Any]:
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('tables'), list):
+        raise ValueError(f'manifest {source} must define a list of tables')
+    if not isinstance(manifest.get('defaults', {}), dict):
+        raise ValueError(f'defaults of manifest {source} must be a dictionary')
+    for table in manifest['tables']:
+        if not isinstance(table, dict) or 'target_table' not in table or 'load_path_uri' not in table:
+            raise ValueError(f'a table of {source} needs a target_table and a load_path_uri: {table}')
+    return manifest
+
+
+def read_manifest(source: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Read a manifest of tables.
+
+    A manifest file is parsed once per process, until its modification.
+
+    # Parameters
+        source (Union[str, Dict[str, Any]]): path of a yaml (.yaml, .yml) or json file, or a dictionary
+
+    # Returns
+        (Dict[str, Any]): manifest (with 'tables' and optional 'defaults')
+
+    # Raises
+        (ValueError): if manifest is not valid
+        (RuntimeError): if PyYAML is not installed for a yaml manifest
+    """
+    if isinstance(source, dict):
+        return _validate_manifest(source, 'dictionary')
+    modified_at = os.path.getmtime(source)
+    cached = _manifests.get(source)
+    if cached and cached[0] == modified_at:
+        return cached[1]
+    with open(source, 'r', encoding='utf-8') as stream:
+        if source.endswith(('.yaml', '.yml')):
+            manifest = _load_yaml(stream)
+        else:
+            manifest = json.load(stream)
+    manifest = _validate_manifest(manifest, source)
+    _manifests[source] = (modified_at, manifest)
+    return manifest
+
+
+def _get_task_id(group_id: str, name: str) -> str:
+    return f'{group_id}.{_TASK_ID_PATTERN.sub("_", name)}'
+
+
+def create_load_tasks(
+    dag: DAG,
+    manifest: Union[str, Dict[str, Any]],
+    indexima_conn_id: str,
+    group_id: str = 'load',
+    batch_small_tables: bool = False,
+    batch_size: int = 50,
+    **operator_kwargs,
+) -> Dict[str, BaseOperator]:
+    """Create load tasks of a manifest.
+
+    # Parameters
+        dag (DAG): dag of tasks
+        manifest (Union[str, Dict[str, Any]]): manifest path or dictionary (see read_manifest)
+        indexima_conn_id (str): indexima connection identifier
+        group_id (str): task identifier prefix (default 'load')
+        batch_small_tables (bool): load tables flagged 'small' with IndeximaBatchLoadDataOperator
+            tasks (default False). A small table with an option which is not a load option
+            (see IndeximaBatchLoadDataOperator.load_keys) keeps its own task.
+        batch_size (int): maximum table count of a batch task (default 50)
+        operator_kwargs: parameters shared by all tasks (IndeximaHookBasedOperator and
+            BaseOperator parameters, like 'retry_policy' or 'pool')
+
+    # Returns
+        (Dict[str, BaseOperator]): task of each target table (a batch task for batched tables)
+
+    # Raises
+        (ValueError): if manifest is not valid
+    """
+    content = read_manifest(manifest)
+    shared = dict(operator_kwargs, dag=dag, indexima_conn_id=indexima_conn_id)
+    defaults = content.get('defaults', {})
+    tasks: Dict[str, BaseOperator] = {}
+    batch: List[Dict[str, Any]] = []
+    batch_tasks: List[BaseOperator] = []
+
+    def _flush_batch():
+        task = IndeximaBatchLoadDataOperator(
+            task_id=_get_task_id(group_id, f'batch_{len(batch_tasks):04d}'), loads=list(batch), **shared
+        )
+        batch_tasks.append(task)
+        for load in batch:
+            tasks[load['target_table']] = task
+        batch.clear()
+
+    for table in content['tables']:
+        options = dict(defaults, **table)
+        small = options.pop('small', False)
+        if batch_small_tables and small and set(options) <= set(IndeximaBatchLoadDataOperator.load_keys):
+            batch.append(options)
+            if len(batch) >= batch_size:
+                _flush_batch()
+            continue
+        parameters = dict(shared, task_id=_get_task_id(group_id, options['target_table']))
+        parameters.update(options)
+        tasks[options['target_table']] = IndeximaLoadDataOperator(**parameters)
+    if batch:
+        _flush_batch()
+    return tasks
@@ -0,0 +1,254 @@
+"""Define hive sessions multiplexed over shared authenticated transports.
+
+HiveServer2 accept many OpenSession calls on a single transport. A
+SharedTransport is opened (and authenticated) once per connection parameters
+in a process, and each MultiplexedConnection open its own session (with its
+own hive configuration and database) over it. So sasl handshake cost is paid
+once, whatever the number of sessions.
+
+Calls of all sessions are serialized on their transport with a lock: sessions
+could be used from many threads, but a long call (like a large fetch) delay
+calls of other sessions. A transport error (or an interrupted call) fails all
+sessions of a transport, next session opens a new one.
+"""
+import contextlib
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from pyhive import hive
+from TCLIService import TCLIService, ttypes
+from thrift.protocol.TBinaryProtocol import TBinaryProtocol
+from thrift.transport.TTransport import TTransportBase, TTransportException
+
+
+__all__ = ['SharedTransport', 'MultiplexedConnection', 'SessionMultiplexer', 'get_session_multiplexer']
+
+
+TransportFactory = Callable[[], TTransportBase]
+
+_PROTOCOL_VERSION = ttypes.TProtocolVersion.HIVE_CLI_SERVICE_PROTOCOL_V6
+
+_TRANSPORT_ERRORS = (TTransportException, EOFError, OSError)
+
+
+def _check_status(response: Any):
+    if response.status.statusCode != ttypes.TStatusCode.SUCCESS_STATUS:
+        raise hive.OperationalError(response)
+
+
+class _LockedClient:
+    """A TCLIService client proxy which serialize calls on a shared transport."""
+
+    def __init__(self, client: TCLIService.Client, shared: 'SharedTransport'):
+        self._client = client
+        self._shared = shared
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(self._client, name)
+
+        def _call(*args, **kwargs):
+            with self._shared.acquire():
+                try:
+                    return method(*args, **kwargs)
+                except BaseException:
+                    # an interrupted call (like on execution timeout) could leave its response
+                    # unread on transport: next call would read it
+                    self._shared.broken = True
+                    raise
+
+        return _call
+
+
+class SharedTransport:
+    """An opened hive transport shared by many sessions."""
+
+    def __init__(self, transport_factory: TransportFactory, name: str = ''):
+        """Create and open a SharedTransport instance.
+
+        # Parameters
+            transport_factory (TransportFactory): function which return a transport (not opened)
+            name (str): transport name in statistics (like 'host:port')
+
+        # Raises
+            (ValueError): if factory does not return a transport
+        """
+        transport = transport_factory()
+        if transport is None:
+            raise ValueError('session multiplexing require a transport (check auth mode and username)')
+        self.name = name
+        self.broken = False
+        self.sessions = 0
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._owner: Optional[int] = None
+        self._transport.open()
+        self.client = _LockedClient(TCLIService.Client(TBinaryProtocol(self._transport)), self)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Acquire transport for a call.
+
+        # Raises
+            (RuntimeError): if current thread is already in a call on this transport
+                (like a signal handler interrupting a call)
+        """
+        if self._owner == threading.get_ident():
+            raise RuntimeError('shared transport is busy in this thread')
+        with self._lock:
+            self._owner = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._owner = None
+
+    @property
+    def is_usable(self) -> bool:
+        return not self.broken and self._transport.isOpen()
+
+    def close(self):
+        self.broken = True
+        self._transport.close()
+
+
+class MultiplexedConnection(hive.Connection):
+    """A hive connection which own a session over a SharedTransport.
+
+    Cursors are those of hive.Connection, closing this connection close its session only.
+    """
+
+    def __init__(
+        self,
+        shared: SharedTransport,
+        configuration: Optional[Dict[str, str]] = None,
+        database: Optional[str] = None,
+        username: Optional[str] = None,
+    ):
+        """Open a session (hive.Connection.__init__ is not called: transport is already opened).
+
+        # Parameters
+            shared (SharedTransport): shared transport
+            configuration (Optional[Dict[str, str]]): hive settings of this session
+            database (Optional[str]): database of this session (default 'default')
+            username (Optional[str]): session username
+        """
+        self._shared = shared
+        self._transport = None
+        self._client = shared.client
+        response = self._client.OpenSession(
+            ttypes.TOpenSessionReq(
+                client_protocol=_PROTOCOL_VERSION, configuration=configuration, username=username
+            )
+        )
+        _check_status(response)
+        self._sessionHandle = response.sessionHandle
+        shared.sessions += 1
+        try:
+            if response.serverProtocolVersion != _PROTOCOL_VERSION:
+                raise hive.OperationalError(
+                    f'Unable to handle protocol version {response.serverProtocolVersion}'
+                )
+            with contextlib.closing(self.cursor()) as cursor:
+                cursor.execute(f'USE `{database or "default"}`')
+        except BaseException:
+            with contextlib.suppress(Exception):
+                self.close()
+            raise
+
+    def close(self):
+        """Close session (shared transport stay open)."""
+        if self._sessionHandle is None:
+            return
+        session_handle, self._sessionHandle = self._sessionHandle, None
+        self._shared.sessions -= 1
+        response = self._client.CloseSession(ttypes.TCloseSessionReq(sessionHandle=session_handle))
+        _check_status(response)
+
+
+class SessionMultiplexer:
+    """A registry of shared transports of a process, per connection parameters."""
+
+    def __init__(self):
+        self._transports: Dict[Hashable, SharedTransport] = {}
+        self._lock = threading.Lock()
+
+    def _get_transport(
+        self, key: Hashable, transport_factory: TransportFactory, name: str
+    ) -> SharedTransport:
+        with self._lock:
+            shared = self._transports.get(key)
+            if shared is None or not shared.is_usable:
+                if shared is not None:
+                    shared.close()
+                shared = SharedTransport(transport_factory, name=name)
+                self._transports[key] = shared
+            return shared
+
+    def _discard(self, key: Hashable, shared: SharedTransport):
+        with self._lock:
+            if self._transports.get(key) is shared:
+                del self._transports[key]
+        shared.close()
+
+    def connect(
+        self,
+        key: Hashable,
+        transport_factory: TransportFactory,
+        configuration: Optional[Dict[str, str]] = None,
+        database: Optional[str] = None,
+        username: Optional[str] = None,
+        name: str = '',
+    ) -> MultiplexedConnection:
+        """Open a session over shared transport of a key.
+
+        A transport closed by server (like after an idle timeout) is replaced once.
+
+        # Parameters
+            key (Hashable): connection parameters (sessions with same key share a transport)
+            transport_factory (TransportFactory): function which return a new transport (not opened)
+            configuration (Optional[Dict[str, str]]): hive settings of this session
+            database (Optional[str]): database of this session
+            username (Optional[str]): session username
+            name (str): transport name in statistics (like 'host:port')
+
+        # Returns
+            (MultiplexedConnection): connection of the new session
+        """
+        with self._lock:
+            reused = key in self._transports
+        shared = self._get_transport(key, transport_factory, name)
+        try:
+            return MultiplexedConnection(
+                shared, configuration=configuration, database=database, username=username
+            )
+        except _TRANSPORT_ERRORS:
+            self._discard(key, shared)
+            if not reused:
+                raise
+        return MultiplexedConnection(
+            self._get_transport(key, transport_factory, name),
+            configuration=configuration,
+            database=database,
+            username=username,
+        )
+
+    def close(self):
+        """Close all shared transports."""
+        with self._lock:
+            transports, self._transports = list(self._transports.values()), {}
+        for shared in transports:
+            shared.close()
+
+    @property
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return name and session count of each shared transport."""
+        with self._lock:
+            transports = list(self._transports.values())
+        return [{'name': shared.name, 'sessions': shared.sessions} for shared in transports]
+
+
+_session_multiplexer = SessionMultiplexer()
+
+
+def get_session_multiplexer() -> SessionMultiplexer:
+    """Return session multiplexer of current process."""
+    return _session_multiplexer
@@ -1,15 +1,100 @@
 """Indexima operators module definition."""
+import contextlib
 import datetime
-from typing import Optional, Union
+import math
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+from airflow.exceptions import AirflowException
 from airflow.models import BaseOperator
+from airflow.settings import Stats
+from airflow.utils import timezone
 from airflow.utils.decorators import apply_defaults
+from airflow.utils.state import State
+from airflow.utils.trigger_rule import TriggerRule
 
+from airflow_indexima.cache import ResultCache, normalize_sql
+from airflow_indexima.catalog import TableCatalog
+from airflow_indexima.circuit import CircuitBreaker
+from airflow_indexima.concurrency import AdaptiveConcurrencyController
 from airflow_indexima.connection import ConnectionDecorator
+from airflow_indexima.estimator import DurationEstimate, DurationEstimator, get_source_size
+from airflow_indexima.extract import (
+    KeyRange,
+    generate_range_query,
+    get_fingerprint,
+    get_manifest_path,
+    get_range_path,
+    merge_range_files,
+    parse_key_bound,
+    remove_stale_range_files,
+    split_key_range,
+    write_cursor_to_csv,
+)
+from airflow_indexima.hooks.broker import IndeximaBrokerHook
 from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.limiter import StatementLimiter
+from airflow_indexima.locking import locked_json_state, read_json_state
+from airflow_indexima.progress import OperationProgress, ProgressMonitor
+from airflow_indexima.retry import RetryPolicy, StatementInterruptedError, is_transient_error
+from airflow_indexima.schema import (
+    SchemaMismatchError,
+    SourceOpener,
+    compare_schemas,
+    is_local_uri,
+    read_source_schema,
+)
+from airflow_indexima.warmup import get_default_warm_up_queries, run_warm_up_queries
 
 
-__all__ = ['IndeximaHookBasedOperator', 'IndeximaQueryRunnerOperator', 'IndeximaLoadDataOperator']
+__all__ = [
+    'IndeximaHookBasedOperator',
+    'IndeximaQueryRunnerOperator',
+    'IndeximaLoadDataOperator',
+    'IndeximaCommitOperator',
+    'IndeximaRangeExtractOperator',
+    'IndeximaFanOutOperator',
+    'IndeximaBatchLoadDataOperator',
+]
+
+# xcom key of the rendered target table of a commit group member
+_COMMIT_GROUP_TABLE_KEY = 'commit_group_table'
+
+
+def _generate_load_data_query(
+    table: str,
+    load_path_uri: str,
+    format_query: Optional[str] = None,
+    prefix_query: Optional[str] = None,
+    source_select_query: Optional[str] = None,
+    skip_lines: Optional[int] = None,
+    no_check: Optional[bool] = False,
+    limit: Optional[int] = None,
+    locale: Optional[str] = None,
+) -> str:
+    def escape_quote(txt: str) -> str:
+        return txt.replace("'", "\\'")
+
+    sql_query = [f"LOAD DATA INPATH '{load_path_uri}'", f"INTO TABLE {table}"]
+    if format_query:
+        sql_query.append(f"FORMAT {format_query}")
+    if prefix_query:
+        sql_query.append(f"PREFIX '{escape_quote(prefix_query)}'")
+    if source_select_query:
+        sql_query.append(f"QUERY '{escape_quote(source_select_query)}'")
+    if skip_lines:
+        sql_query.append(f"SKIP {skip_lines}")
+    if no_check:
+        sql_query.append(f"NOCHECK")
+    if limit:
+        sql_query.append(f"LIMIT {limit}")
+    if locale:
+        sql_query.append(f"LOCALE '{locale}'")
+
+    return " ".join(sql_query) + ";"
 
 
 class IndeximaHookBasedOperator(BaseOperator):
@@ -31,6 +116,13 @@ class IndeximaHookBasedOperator(BaseOperator):
         kerberos_service_name: Optional[str] = None,
         timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
         socket_keepalive: Optional[bool] = None,
+        result_cache: Optional[ResultCache] = None,
+        statement_limiter: Optional[StatementLimiter] = None,
+        broker_socket_path: Optional[str] = None,
+        multiplex_sessions: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        table_catalog: Optional[TableCatalog] = None,
         *args,
         **kwargs,
     ):
@@ -47,6 +139,19 @@ class IndeximaHookBasedOperator(BaseOperator):
             timeout_seconds (Optional[Union[int, datetime.timedelta]]): define the socket timeout in second
                 (could be an int or a timedelta)
             socket_keepalive (Optional[bool]): enable TCP keepalive.
+            result_cache (Optional[ResultCache]): optional result cache of select queries (default: None)
+            statement_limiter (Optional[StatementLimiter]): optional statement limiter shared
+                by worker processes, slots are granted in task 'priority_weight' order (default: None)
+            broker_socket_path (Optional[str]): optional Unix socket path of a local session broker,
+                if set hive sessions are leased from this broker (default: None)
+            multiplex_sessions (bool): open hive sessions over a transport shared by hooks of task
+                process, so sasl handshake is done once (default: False)
+            retry_policy (Optional[RetryPolicy]): optional retry policy of statements failed on a
+                transient error, idempotent statements are replayed on a new connection (default: None)
+            circuit_breaker (Optional[CircuitBreaker]): optional circuit breaker shared by worker
+                processes, task fails fast while cluster is unhealthy (default: None)
+            table_catalog (Optional[TableCatalog]): optional local catalog of table columns shared
+                by worker processes (default: None)
 
         """
         super(IndeximaHookBasedOperator, self).__init__(task_id=task_id, *args, **kwargs)
@@ -55,7 +160,7 @@ class IndeximaHookBasedOperator(BaseOperator):
         if kwargs and 'execution_timeout' in kwargs and timeout_seconds is None:
             timeout_seconds = kwargs['execution_timeout']
 
-        self._hook = IndeximaHook(
+        self._hook_parameters: Dict[str, Any] = dict(
             indexima_conn_id=indexima_conn_id,
             connection_decorator=connection_decorator,
             dry_run=dry_run,
@@ -63,12 +168,48 @@ class IndeximaHookBasedOperator(BaseOperator):
             kerberos_service_name=kerberos_service_name,
             timeout_seconds=timeout_seconds,
             socket_keepalive=socket_keepalive,
+            result_cache=result_cache,
+            statement_limiter=statement_limiter,
+            priority_weight=self.priority_weight,
+            multiplex_sessions=multiplex_sessions,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            table_catalog=table_catalog,
         )
+        self._broker_socket_path = broker_socket_path
+        self._created_hooks: List[IndeximaHook] = []
+        self._hook: Optional[IndeximaHook] = None
 
     def get_hook(self) -> IndeximaHook:
-        """Return a configured IndeximaHook instance."""
+        """Return a configured IndeximaHook instance.
+
+        Hook is created on first call: a DAG file which define many tasks does not pay
+        hook creation at parse time.
+        """
+        if self._hook is None:
+            self._hook = self.create_hook()
         return self._hook
 
+    def create_hook(self) -> IndeximaHook:
+        """Return a new configured IndeximaHook instance.
+
+        Each instance owns its own hive session (or broker session), this is useful to run
+        statements concurrently.
+        """
+        if self._broker_socket_path:
+            hook: IndeximaHook = IndeximaBrokerHook(
+                broker_socket_path=self._broker_socket_path, **self._hook_parameters
+            )
+        else:
+            hook = IndeximaHook(**self._hook_parameters)
+        self._created_hooks.append(hook)
+        return hook
+
+    def on_kill(self):
+        """Cancel active operations and close sessions of all hooks."""
+        for hook in self._created_hooks:
+            hook.cancel()
+
 
 class IndeximaQueryRunnerOperator(IndeximaHookBasedOperator):
     """A simple query executor."""
@@ -138,6 +279,23 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         2. load source_select_query into target_table using redshift_user_name credential
         4. commit/rollback target_table
 
+    With a 'commit_group', commit (or rollback) is delegated to an IndeximaCommitOperator.
+
+    With a 'staging_table', data are loaded and committed into the staging table (truncated first),
+    which is then swapped with target table by 'swap_sql' (like a view repointed in one statement):
+    readers never see an empty or partial target table.
+
+    With a 'retry_policy', a truncate and load sequence interrupted by a transient error is replayed
+    on a new connection (a load without truncate is not replayed: it could insert rows twice).
+
+    With 'warm_up_queries' (or 'warm_up_default_queries'), queries are run concurrently on target
+    table after a successful commit (or swap), so first users never hit a cold table.
+
+    With a 'duration_estimator', load duration is predicted from source size and history of past
+    loads of target table: load is cancelled after the upper estimate multiplied by
+    'timeout_headroom', socket timeout is aligned on it (if not set), and a likely SLA miss is
+    reported before load. Each successful load is recorded in history.
+
     All fields ('target_table', 'load_path_uri', 'source_select_query', 'truncate_sql',
     'format_query', 'prefix_query', 'skip_lines', 'no_check', 'limit', 'locale',
     'pause_delay_in_seconds_between_query' ) support airflow macro.
@@ -169,6 +327,9 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         '_limit',
         '_locale',
         '_pause_delay_in_seconds_between_query',
+        '_staging_table',
+        '_swap_sql',
+        '_warm_up_queries',
     )
 
     def __init__(
@@ -193,6 +354,21 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
         socket_keepalive: Optional[bool] = None,
         pause_delay_in_seconds_between_query: Optional[int] = None,
+        commit_group: Optional[str] = None,
+        staging_table: Optional[str] = None,
+        swap_sql: Optional[List[str]] = None,
+        progress_log_interval_seconds: Optional[int] = None,
+        stall_timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
+        progress_scale: float = 1.0,
+        check_source_schema: bool = False,
+        source_opener: Optional[SourceOpener] = None,
+        warm_up_queries: Optional[List[str]] = None,
+        warm_up_default_queries: bool = False,
+        warm_up_concurrency: int = 4,
+        duration_estimator: Optional[DurationEstimator] = None,
+        timeout_headroom: float = 2.0,
+        min_timeout_seconds: int = 600,
+        on_sla_risk: Optional[Callable[[Dict[str, Any], DurationEstimate], None]] = None,
         *args,
         **kwargs,
     ):
@@ -204,7 +380,8 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
             target_table (str): target table to load into
             load_path_uri (str): source uri
             truncate (bool): if true execute truncate query before load (default: False)
-            truncate_sql (Optional[str]): truncate query (truncate table per default)
+            truncate_sql (Optional[str]): truncate query (truncate table per default, of staging table
+                with a staging table)
             connection_decorator Optional[ConnectionDecorator]: optional connection decorator
             source_select_query (Optional[str]): optional sql query to select data from load_path_uri
             format_query (Optional[str]): optional format to identify a character separator or a file format
@@ -224,6 +401,35 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
             kerberos_service_name (Optional[str]): optional kerberos service name
             pause_delay_in_seconds_between_query (Optional[int]): optional pause delay between queries
                 truncate, load and commit. A None, zero or negative value disable the 'pause'.
+            commit_group (Optional[str]): optional commit group name. If set, target table is not
+                committed (nor rolled back) by this task, but by a downstream IndeximaCommitOperator
+                of the same group (which rolls back the group if this task failed).
+            staging_table (Optional[str]): optional staging table name. If set, data are loaded and
+                committed into this table, which is then swapped with target table.
+            swap_sql (Optional[List[str]]): swap queries, required with a staging table (like
+                a view repointed on staging table in a single atomic statement)
+            progress_log_interval_seconds (Optional[int]): delay in seconds between two progress logs
+                of load (and metrics), None disable progress logs and metrics (default: None)
+            stall_timeout_seconds (Optional[Union[int, datetime.timedelta]]): optional delay without
+                progress (nor server log) after which load is cancelled (default: None)
+            progress_scale (float): value of a completed load in progress reported by server
+                (default: 1.0, a ratio, 100.0 for a percentage)
+            check_source_schema (bool): compare source schema (Parquet or ORC footer, CSV first line)
+                with load table columns before truncate and load (default: False)
+            source_opener (Optional[SourceOpener]): optional function which open load path uri as a
+                seekable binary file, for source schema check (default: local files only)
+            warm_up_queries (Optional[List[str]]): optional queries run after a successful commit
+                (default: None)
+            warm_up_default_queries (bool): run default warm-up queries derived from target table
+                columns (see airflow_indexima.warmup) (default: False)
+            warm_up_concurrency (int): maximum count of concurrent warm-up queries (default: 4)
+            duration_estimator (Optional[DurationEstimator]): optional load duration estimator shared
+                by worker processes (default: None)
+            timeout_headroom (float): load timeout is the upper estimated duration multiplied by this
+                ratio (default: 2.0)
+            min_timeout_seconds (int): minimum load timeout in seconds (default: 600)
+            on_sla_risk (Optional[Callable[[Dict[str, Any], DurationEstimate], None]]): optional
+                function called with task context and estimate when task will likely miss its SLA
         """
 
         super(IndeximaLoadDataOperator, self).__init__(
@@ -242,6 +448,7 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         self._load_path_uri = load_path_uri
         self._truncate = truncate
         self._truncate_sql = truncate_sql if truncate_sql else f'truncate table {self._target_table};'
+        self._default_truncate_sql = not truncate_sql
         self._source_select_query = source_select_query
         self._format_query = format_query
         self._prefix_query = prefix_query
@@ -250,6 +457,65 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         self._limit = limit
         self._locale = locale
         self._pause_delay_in_seconds_between_query = pause_delay_in_seconds_between_query
+        self._commit_started = False
+        self._rolled_back = False
+        self._commit_group = commit_group
+        self._staging_table = staging_table
+        self._swap_sql = swap_sql
+        self._progress_log_interval_seconds = progress_log_interval_seconds
+        if isinstance(stall_timeout_seconds, datetime.timedelta):
+            stall_timeout_seconds = int(stall_timeout_seconds.total_seconds())
+        self._stall_timeout_seconds = stall_timeout_seconds
+        self._progress_scale = progress_scale
+        self._check_source_schema = check_source_schema
+        self._source_opener = source_opener
+        self._warm_up_queries = warm_up_queries
+        self._warm_up_default_queries = warm_up_default_queries
+        self._warm_up_concurrency = warm_up_concurrency
+        self._duration_estimator = duration_estimator
+        self._timeout_headroom = timeout_headroom
+        self._min_timeout_seconds = min_timeout_seconds
+        self._on_sla_risk = on_sla_risk
+        self._load_timeout_seconds: Optional[float] = None
+        self._source_size: Tuple[Optional[int], Optional[int]] = (None, None)
+        if staging_table and commit_group:
+            raise ValueError('staging_table and commit_group could not be used together')
+        if staging_table and not swap_sql:
+            # renames are not atomic: target table would not exist between two of them
+            raise ValueError('staging_table requires swap_sql (like a view repointed on staging table)')
+        if staging_table and not truncate:
+            raise ValueError('staging_table requires truncate (staging table is truncated before load)')
+
+    def get_load_table(self) -> str:
+        """Return table to load into (staging table in swap mode, target table otherwise)."""
+        return self._staging_table or self._target_table
+
+    def generate_swap_queries(self) -> List[str]:
+        """Generate queries which swap staging table and target table.
+
+        # Returns
+            (List[str]): swap queries
+        """
+        return list(self._swap_sql or [])
+
+    def _bump_swapped_tables(self):
+        """Increment commit epoch of target and staging tables in result cache if any.
+
+        A swap (like a view repointed) is not seen as a change of those tables.
+        """
+        result_cache = self._hook_parameters['result_cache']
+        if result_cache:
+            for table in (self._target_table, self._staging_table):
+                result_cache.bump_epoch(table)
+
+    def _execute_swap_queries(self):
+        try:
+            with self.get_hook() as hook:
+                for query in self.generate_swap_queries():
+                    hook.run(query)
+        finally:
+            # after a swap, or a failed one
+            self._bump_swapped_tables()
 
     def generate_load_data_query(self) -> str:
         """Generate 'load data' sql query.
@@ -257,51 +523,736 @@ class IndeximaLoadDataOperator(IndeximaHookBasedOperator):
         # Returns
             (str): load data sql query
         """
+        return _generate_load_data_query(
+            table=self.get_load_table(),
+            load_path_uri=self._load_path_uri,
+            format_query=self._format_query,
+            prefix_query=self._prefix_query,
+            source_select_query=self._source_select_query,
+            skip_lines=self._skip_lines,
+            no_check=self._no_check,
+            limit=self._limit,
+            locale=self._locale,
+        )
+
+    def create_progress_monitor(self) -> Optional[ProgressMonitor]:
+        """Return a progress monitor of load query (None if progress, stall and load timeouts are disabled).
+
+        Progress is sent as gauges 'indexima.load.{dag_id}.{task_id}.{progress,rows,eta_seconds}'
+        (only with a 'progress_log_interval_seconds').
+        """
+        if (
+            self._progress_log_interval_seconds is None
+            and self._stall_timeout_seconds is None
+            and self._load_timeout_seconds is None
+        ):
+            return None
+        prefix = f'indexima.load.{self.dag_id}.{self.task_id}'
+
+        def _send_metrics(progress: OperationProgress):
+            for name in ('progress', 'rows', 'eta_seconds'):
+                value = getattr(progress, name)
+                if value is not None:
+                    Stats.gauge(f'{prefix}.{name}', value)
+
+        return ProgressMonitor(
+            name=f'load {self.get_load_table()}',
+            log_interval_seconds=self._progress_log_interval_seconds or float('inf'),
+            stall_timeout_seconds=self._stall_timeout_seconds,
+            on_progress=_send_metrics if self._progress_log_interval_seconds is not None else None,
+            timeout_seconds=self._load_timeout_seconds,
+            progress_scale=self._progress_scale,
+            logger=self.log,
+        )
 
-        def escape_quote(txt: str) -> str:
-            return txt.replace("'", "\\'")
-
-        sql_query = [f"LOAD DATA INPATH '{self._load_path_uri}'", f"INTO TABLE {self._target_table}"]
-        if self._format_query:
-            sql_query.append(f"FORMAT {self._format_query}")
-        if self._prefix_query:
-            sql_query.append(f"PREFIX '{escape_quote(self._prefix_query)}'")
-        if self._source_select_query:
-            sql_query.append(f"QUERY '{escape_quote(self._source_select_query)}'")
-        if self._skip_lines:
-            sql_query.append(f"SKIP {self._skip_lines}")
-        if self._no_check:
-            sql_query.append(f"NOCHECK")
-        if self._limit:
-            sql_query.append(f"LIMIT {self._limit}")
-        if self._locale:
-            sql_query.append(f"LOCALE '{self._locale}'")
-
-        return " ".join(sql_query) + ";"
+    def check_sla(self, context: Dict[str, Any], estimate: DurationEstimate) -> bool:
+        """Report a likely SLA miss of task (a warning, a metric and 'on_sla_risk' callback).
+
+        Like airflow, SLA deadline is the end of schedule interval plus task 'sla'.
+
+        # Parameters
+            context (Dict[str, Any]): task context
+            estimate (DurationEstimate): estimated load duration
+
+        # Returns
+            (bool): True if task will likely miss its SLA
+        """
+        if not self.sla or not context.get('dag') or not context.get('execution_date'):
+            return False
+        following_schedule = context['dag'].following_schedule(context['execution_date'])
+        if following_schedule is None:
+            return False
+        deadline = following_schedule + self.sla
+        expected_end = timezone.utcnow() + datetime.timedelta(seconds=estimate.seconds)
+        if expected_end <= deadline:
+            return False
+        self.log.warning(
+            f'{self.task_id} will likely miss its SLA: load end expected at {expected_end}, '
+            f'SLA deadline is {deadline}'
+        )
+        Stats.incr(f'indexima.load.{self.dag_id}.{self.task_id}.sla_risk')
+        if self._on_sla_risk:
+            self._on_sla_risk(context, estimate)
+        return True
+
+    def estimate_load_duration(self, context: Dict[str, Any]) -> Optional[DurationEstimate]:
+        """Estimate load duration, and derive load timeout (and socket timeout if not set).
+
+        # Parameters
+            context (Dict[str, Any]): task context
+
+        # Returns
+            (Optional[DurationEstimate]): estimate (None without estimator or enough history)
+        """
+        if self._duration_estimator is None or self._hook_parameters['dry_run']:
+            return None
+        try:
+            self._source_size = get_source_size(
+                self._load_path_uri, self._format_query, opener=self._source_opener
+            )
+        except (OSError, ValueError) as e:
+            self.log.warning(f'size of {self._load_path_uri} is unknown: {e}')
+        conn_id = self._hook_parameters['indexima_conn_id']
+        source_bytes, source_rows = self._source_size
+        estimate = self._duration_estimator.estimate(
+            conn_id,
+            self._target_table,
+            source_bytes=source_bytes,
+            source_rows=source_rows,
+            concurrency=self._duration_estimator.get_running_loads(conn_id) + 1,
+        )
+        if estimate is None:
+            self.log.info(f'load duration of {self._target_table} not estimated (not enough history)')
+            return None
+        self._load_timeout_seconds = max(
+            self._min_timeout_seconds, estimate.upper_seconds * self._timeout_headroom
+        )
+        self.log.info(
+            f'estimated load duration of {self._target_table}: {estimate}, '
+            f'load timeout {self._load_timeout_seconds:.0f}s'
+        )
+        if self._hook is None and self._hook_parameters['timeout_seconds'] is None:
+            self._hook_parameters['timeout_seconds'] = math.ceil(self._load_timeout_seconds)
+        self.check_sla(context, estimate)
+        return estimate
+
+    @contextlib.contextmanager
+    def _track_load(self) -> Iterator[int]:
+        if self._duration_estimator is None:
+            yield 1
+            return
+        conn_id = self._hook_parameters['indexima_conn_id']
+        with self._duration_estimator.track_load(conn_id, self._target_table) as concurrency:
+            yield concurrency
+
+    def _record_load(self, duration_seconds: float, inserted: int, concurrency: int):
+        if self._duration_estimator is None or self._hook_parameters['dry_run']:
+            return
+        source_bytes, source_rows = self._source_size
+        self._duration_estimator.record(
+            self._hook_parameters['indexima_conn_id'],
+            self._target_table,
+            duration_seconds,
+            source_bytes=source_bytes,
+            source_rows=source_rows if source_rows is not None else inserted,
+            concurrency=concurrency,
+        )
 
     def _execute_pause(self, hook: IndeximaHook):
         if self._pause_delay_in_seconds_between_query and self._pause_delay_in_seconds_between_query > 0:
             hook.pause(self._pause_delay_in_seconds_between_query)
 
+    def _execute_load(self, hook: IndeximaHook, truncate_sql: Optional[str]):
+        """Execute truncate (if any) and load queries.
+
+        With a truncate and a retry policy, the sequence is replayed when interrupted
+        by a transient error.
+        """
+        attempt = 1
+        while True:
+            try:
+                if truncate_sql:
+                    hook.run(truncate_sql)
+                    self._execute_pause(hook=hook)
+
+                with self._track_load() as concurrency:
+                    start = time.monotonic()
+                    cursor = hook.run(
+                        self.generate_load_data_query(), progress_monitor=self.create_progress_monitor()
+                    )
+                    inserted = hook.check_error_of_load_query(cursor=cursor)
+                self._record_load(time.monotonic() - start, inserted, concurrency)
+                return
+            except Exception as e:
+                policy = hook.retry_policy
+                interrupted = isinstance(e, StatementInterruptedError) or is_transient_error(e)
+                if not interrupted or not truncate_sql or policy is None or attempt >= policy.max_attempts:
+                    raise
+                delay = policy.get_delay(attempt)
+                self.log.warning(f'load of {self.get_load_table()} interrupted ({e}), replay in {delay:.1f}s')
+                with contextlib.suppress(Exception):
+                    hook.close()
+                time.sleep(delay)
+                attempt += 1
+
+    def validate_source_schema(self, hook: IndeximaHook):
+        """Compare source schema with columns of load table.
+
+        Check is skipped (with a warning) when source schema is not readable (a non local
+        uri without 'source_opener', or an unsupported format), or when a QUERY or PREFIX
+        clause change source columns.
+
+        # Parameters
+            hook (IndeximaHook): hook used to describe load table
+
+        # Raises
+            (SchemaMismatchError): if source schema does not match load table
+        """
+        if self._source_select_query or self._prefix_query:
+            self.log.info('source schema check skipped (QUERY or PREFIX clause)')
+            return
+        if self._source_opener is None and not is_local_uri(self._load_path_uri):
+            self.log.warning(
+                f'source schema check skipped, {self._load_path_uri} is not a local path '
+                '(set a source_opener to read it)'
+            )
+            return
+        try:
+            source = read_source_schema(self._load_path_uri, self._format_query, opener=self._source_opener)
+        except (OSError, ValueError) as e:
+            self.log.warning(f'source schema check skipped, unable to read {self._load_path_uri}: {e}')
+            return
+        if source is None:
+            self.log.warning('source schema check skipped (unsupported source or format)')
+            return
+        table = self.get_load_table()
+        by_name = (self._format_query or '').strip().upper() in ('PARQUET', 'ORC')
+        problems = compare_schemas(source, hook.describe_table(table), by_name=by_name)
+        if problems:
+            message = '\n'.join(problems)
+            raise SchemaMismatchError(f'{self._load_path_uri} does not match {table}:\n{message}')
+        self.log.info(f'source schema of {self._load_path_uri} match {table}')
+
+    def get_warm_up_queries(self, hook: IndeximaHook) -> List[str]:
+        """Return warm-up queries of target table (given ones, then default ones if enabled)."""
+        queries = list(self._warm_up_queries or [])
+        if self._warm_up_default_queries:
+            columns = hook.describe_table(self._target_table)
+            queries.extend(get_default_warm_up_queries(self._target_table, columns))
+        return queries
+
+    def execute_warm_up(self):
+        """Run warm-up queries of target table (failures are logged only: table is committed)."""
+        if not self._warm_up_queries and not self._warm_up_default_queries:
+            return
+        try:
+            with self.get_hook() as hook:
+                queries = self.get_warm_up_queries(hook=hook)
+        except Exception as e:
+            self.log.warning(f'warm-up of {self._target_table} skipped: {e}')
+            return
+        if self.get_hook().is_dry_run():
+            for sql in queries:
+                self.log.warn(sql)
+            return
+        self.log.info(f'warm-up of {self._target_table} ({len(queries)} queries)')
+        run_warm_up_queries(self.create_hook, queries, concurrency=self._warm_up_concurrency)
+
     def execute(self, context):
         """Process executor."""
+        if self._commit_group:
+            # rendered target table, for the commit operator of the group
+            context['task_instance'].xcom_push(key=_COMMIT_GROUP_TABLE_KEY, value=self._target_table)
+        self.estimate_load_duration(context)
+        if self._check_source_schema and not self.get_hook().is_dry_run():
+            with self.get_hook() as hook:
+                self.validate_source_schema(hook=hook)
+        if self._staging_table:
+            return self._execute_swap()
         try:
             with self.get_hook() as hook:
-                if self._truncate and self._truncate_sql:
-                    hook.run(self._truncate_sql)
-                    self._execute_pause(hook=hook)
-
-                cursor = hook.run(self.generate_load_data_query())
-                hook.check_error_of_load_query(cursor=cursor)
+                truncate_sql = self._truncate_sql if self._truncate and self._truncate_sql else None
+                self._execute_load(hook=hook, truncate_sql=truncate_sql)
 
                 self._execute_pause(hook=hook)
 
+                if self._commit_group:
+                    self.log.info(f'{self._target_table} will be committed by group {self._commit_group}')
+                    return
+
+                self._commit_started = True
                 hook.commit(tablename=self._target_table)
         except Exception as e:
             self.log.error(e)
+            if self._commit_group:
+                # the whole group will be rolled back by its commit operator
+                raise e
+
+            if not self._rolled_back:
+                with self.get_hook() as hook:
+                    self._execute_pause(hook=hook)
+                    hook.rollback(tablename=self._target_table)
+
+            raise e
+
+        self.execute_warm_up()
+
+    def _execute_swap(self):
+        """Load into staging table and swap it with target table.
 
+        Target table is never truncated, readers query it until the swap.
+        """
+        try:
             with self.get_hook() as hook:
+                truncate_sql = self._truncate_sql
+                if self._default_truncate_sql:
+                    truncate_sql = f'truncate table {self._staging_table};'
+                self._execute_load(hook=hook, truncate_sql=truncate_sql)
+
                 self._execute_pause(hook=hook)
-                hook.rollback(tablename=self._target_table)
+
+                self._commit_started = True
+                hook.commit(tablename=self._staging_table)
+        except Exception as e:
+            self.log.error(e)
+
+            if not self._rolled_back:
+                with self.get_hook() as hook:
+                    self._execute_pause(hook=hook)
+                    hook.rollback(tablename=self._staging_table)
 
             raise e
+
+        self._execute_swap_queries()
+        self.log.info(f'{self._staging_table} swapped with {self._target_table}')
+        self.execute_warm_up()
+
+    def on_kill(self):
+        """Cancel active operation and rollback loaded table if commit is not started."""
+        super(IndeximaLoadDataOperator, self).on_kill()
+        if not self._commit_started and not self._commit_group:
+            self.log.info(f'rollback {self.get_load_table()}')
+            with self.create_hook() as hook:
+                hook.rollback(tablename=self.get_load_table())
+            # execute is interrupted by this kill: its rollback is not needed
+            self._rolled_back = True
+
+
+class IndeximaCommitOperator(IndeximaHookBasedOperator):
+    """Indexima group commit operator.
+
+    Upstream IndeximaLoadDataOperator tasks of the same 'commit_group' do not commit their
+    target table. This operator (run when all upstream tasks are done):
+
+        1. commit once each target table, if all members succeed
+        2. rollback each target table, if any member failed (and then fail)
+
+    Target tables are those rendered by members (pushed as xcom 'commit_group_table').
+    A member is never rolled back alone (its table is shared with other members), so a
+    member retry loads on top of rows already loaded by its failed try, if any.
+
+    ```python
+    loads = [
+        IndeximaLoadDataOperator(task_id=f'load_{i}', ..., target_table='Client', commit_group='client')
+        for i in range(4)
+    ]
+    loads >> IndeximaCommitOperator(task_id='commit_client', ..., commit_group='client')
+    ```
+
+    """
+
+    template_fields = ('_commit_group',)
+
+    @apply_defaults
+    def __init__(self, task_id: str, indexima_conn_id: str, commit_group: str, *args, **kwargs):
+        """Create IndeximaCommitOperator instance.
+
+        # Parameters
+            task_id (str): task identifier
+            indexima_conn_id (str): indexima connection identifier
+            commit_group (str): commit group name
+
+        Trigger rule is 'all_done' per default. Others parameters are those of IndeximaHookBasedOperator.
+        """
+        kwargs.setdefault('trigger_rule', TriggerRule.ALL_DONE)
+        super(IndeximaCommitOperator, self).__init__(
+            task_id=task_id, indexima_conn_id=indexima_conn_id, *args, **kwargs
+        )
+        self._commit_group = commit_group
+
+    def get_members(self) -> List[IndeximaLoadDataOperator]:
+        """Return upstream load tasks of this commit group."""
+        return [
+            task
+            for task in self.upstream_list
+            if isinstance(task, IndeximaLoadDataOperator) and task._commit_group == self._commit_group
+        ]
+
+    def execute(self, context):
+        """Process executor."""
+        members = self.get_members()
+        if not members:
+            raise AirflowException(f'no upstream load task found in commit group {self._commit_group}')
+
+        dag_run = context['dag_run']
+        failed_members = []
+        for member in members:
+            task_instance = dag_run.get_task_instance(member.task_id)
+            if task_instance.state in (State.FAILED, State.UPSTREAM_FAILED):
+                failed_members.append(member.task_id)
+        # target table of members could be templated, a member not executed loaded nothing
+        tables = sorted(
+            {
+                table
+                for table in context['task_instance'].xcom_pull(
+                    task_ids=[member.task_id for member in members], key=_COMMIT_GROUP_TABLE_KEY
+                )
+                if table
+            }
+        )
+
+        with self.get_hook() as hook:
+            for table in tables:
+                if failed_members:
+                    self.log.info(f'rollback {table}')
+                    hook.rollback(tablename=table)
+                else:
+                    self.log.info(f'commit {table}')
+                    hook.commit(tablename=table)
+
+        if failed_members:
+            raise AirflowException(f'commit group {self._commit_group} rolled back, failed: {failed_members}')
+
+
+class IndeximaRangeExtractOperator(IndeximaHookBasedOperator):
+    """Indexima key range parallel extract operator.
+
+    The select query is splitted on a numeric or date key into 'partitions' ranges.
+    Each range is fetched concurrently with its own hive session and written in its own
+    csv file ('{output_path}.part-00000', ...), or merged in order into 'output_path'.
+
+    A range file is renamed only when complete, so on retry, already extracted ranges
+    are skipped. Fingerprints of range queries are recorded in '{output_path}.manifest.json':
+    a range file (or merged file) of another query or bounds (like a templated bound of a
+    previous run) is extracted again, and range files out of current ranges are removed.
+
+    Fields ('sql_query', 'key_column', 'lower_bound', 'upper_bound', 'output_path')
+    support airflow macro.
+    """
+
+    template_fields = ('_sql_query', '_key_column', '_lower_bound', '_upper_bound', '_output_path')
+
+    @apply_defaults
+    def __init__(
+        self,
+        task_id: str,
+        indexima_conn_id: str,
+        sql_query: str,
+        key_column: str,
+        lower_bound: Any,
+        upper_bound: Any,
+        output_path: str,
+        partitions: int = 4,
+        key_type: str = 'int',
+        merge: bool = False,
+        header: bool = True,
+        fetch_size: int = 10000,
+        max_workers: Optional[int] = None,
+        *args,
+        **kwargs,
+    ):
+        """Create IndeximaRangeExtractOperator instance.
+
+        # Parameters
+            task_id (str): task identifier
+            indexima_conn_id (str): indexima connection identifier
+            sql_query (str): select query to extract
+            key_column (str): key column name used to split query
+            lower_bound (Any): lower bound of key (included)
+            upper_bound (Any): upper bound of key (included)
+            output_path (str): output file path
+            partitions (int): number of range (default 4)
+            key_type (str): key type, one of 'int', 'date', 'datetime' (default 'int')
+            merge (bool): merge all range in order into output_path (default False)
+            header (bool): write columns name as first line (default True)
+            fetch_size (int): fetch size (default 10000)
+            max_workers (Optional[int]): maximum of concurrent session (default partitions)
+
+        Others parameters are those of IndeximaHookBasedOperator.
+        """
+        super(IndeximaRangeExtractOperator, self).__init__(
+            task_id=task_id, indexima_conn_id=indexima_conn_id, *args, **kwargs
+        )
+        self._sql_query = sql_query
+        self._key_column = key_column
+        self._lower_bound = lower_bound
+        self._upper_bound = upper_bound
+        self._output_path = output_path
+        self._partitions = partitions
+        self._key_type = key_type
+        self._merge = merge
+        self._header = header
+        self._fetch_size = fetch_size
+        self._max_workers = max_workers
+
+    def get_key_ranges(self) -> List[KeyRange]:
+        """Return key ranges to extract."""
+        return split_key_range(
+            lower=parse_key_bound(self._lower_bound, key_type=self._key_type),
+            upper=parse_key_bound(self._upper_bound, key_type=self._key_type),
+            partitions=int(self._partitions),
+        )
+
+    def get_range_fingerprint(self, key_range: KeyRange) -> str:
+        """Return fingerprint of an extracted range file (its query and header)."""
+        return get_fingerprint(
+            generate_range_query(self._sql_query, self._key_column, key_range), str(bool(self._header))
+        )
+
+    def _extract_range(self, key_range: KeyRange) -> int:
+        path = get_range_path(self._output_path, key_range)
+        fingerprint = self.get_range_fingerprint(key_range)
+        manifest_path = get_manifest_path(self._output_path)
+        if os.path.exists(path) and read_json_state(manifest_path).get(path) == fingerprint:
+            self.log.info(f'range {key_range.part} already extracted in {path}')
+            return 0
+        with self.create_hook() as hook:
+            cursor = hook.run(generate_range_query(self._sql_query, self._key_column, key_range))
+            count = write_cursor_to_csv(cursor, path, header=self._header, fetch_size=self._fetch_size)
+        with locked_json_state(manifest_path) as manifest:
+            manifest[path] = fingerprint
+        self.log.info(f'range {key_range.part} [{key_range.lower}, {key_range.upper}]: {count} rows')
+        return count
+
+    def execute(self, context):
+        """Process executor."""
+        key_ranges = self.get_key_ranges()
+        manifest_path = get_manifest_path(self._output_path)
+        fingerprint = get_fingerprint(*[self.get_range_fingerprint(key_range) for key_range in key_ranges])
+
+        if (
+            self._merge
+            and os.path.exists(self._output_path)
+            and read_json_state(manifest_path).get(self._output_path) == fingerprint
+        ):
+            self.log.info(f'{self._output_path} already extracted')
+            return
+
+        if self.get_hook().is_dry_run():
+            for key_range in key_ranges:
+                self.log.warn(generate_range_query(self._sql_query, self._key_column, key_range))
+            return
+
+        for path in remove_stale_range_files(self._output_path, key_ranges):
+            self.log.info(f'stale range file {path} removed')
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=self._max_workers or len(key_ranges)) as executor:
+            futures = [executor.submit(self._extract_range, key_range) for key_range in key_ranges]
+            for key_range, future in zip(key_ranges, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.log.error(f'range {key_range.part} failed: {e}')
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+
+        if self._merge:
+            paths = [get_range_path(self._output_path, key_range) for key_range in key_ranges]
+            merge_range_files(paths, output_path=self._output_path, header=self._header)
+            with locked_json_state(manifest_path) as manifest:
+                for path in paths:
+                    manifest.pop(path, None)
+                manifest[self._output_path] = fingerprint
+
+
+class IndeximaFanOutOperator(IndeximaHookBasedOperator):
+    """Indexima fan-out operator: run many statements concurrently.
+
+    Statements (like loads of many paths, or independent queries) run on their own
+    hive sessions, with a concurrency adjusted on measured throughput and latency
+    (see airflow_indexima.concurrency). Concurrency limit changes are logged.
+
+    Results of 'LOAD DATA' statements are checked. All statements are executed, even
+    after an error (first error is raised at the end).
+
+    ```python
+    IndeximaFanOutOperator(
+        task_id='load_clients',
+        indexima_conn_id='my-conn',
+        sql_queries=[f"LOAD DATA INPATH 's3://bucket/client/{i}' INTO TABLE client;" for i in range(64)],
+        max_concurrency=8,
+    )
+    ```
+
+    Field 'sql_queries' support airflow macro.
+    """
+
+    template_fields = ('_sql_queries',)
+
+    @apply_defaults
+    def __init__(
+        self,
+        task_id: str,
+        indexima_conn_id: str,
+        sql_queries: List[str],
+        initial_concurrency: int = 2,
+        max_concurrency: int = 16,
+        *args,
+        **kwargs,
+    ):
+        """Create IndeximaFanOutOperator instance.
+
+        # Parameters
+            task_id (str): task identifier
+            indexima_conn_id (str): indexima connection identifier
+            sql_queries (List[str]): statements to run
+            initial_concurrency (int): initial concurrency limit (default 2)
+            max_concurrency (int): maximum concurrency limit (default 16)
+
+        Others parameters are those of IndeximaHookBasedOperator.
+        """
+        super(IndeximaFanOutOperator, self).__init__(
+            task_id=task_id, indexima_conn_id=indexima_conn_id, *args, **kwargs
+        )
+        self._sql_queries = sql_queries
+        self._initial_concurrency = initial_concurrency
+        self._max_concurrency = max_concurrency
+
+    def execute(self, context):
+        """Process executor."""
+        if self.get_hook().is_dry_run():
+            for sql in self._sql_queries:
+                self.log.warn(sql)
+            return
+
+        controller = AdaptiveConcurrencyController(
+            initial_limit=min(self._initial_concurrency, self._max_concurrency),
+            max_limit=self._max_concurrency,
+            name=self.task_id,
+        )
+        idle_hooks: queue.Queue = queue.Queue()
+
+        def _run(sql: str):
+            try:
+                hook = idle_hooks.get_nowait()
+            except queue.Empty:
+                hook = self.create_hook()
+            try:
+                cursor = hook.run(sql)
+                if normalize_sql(sql).startswith('load data'):
+                    hook.check_error_of_load_query(cursor=cursor)
+            except Exception as e:
+                self.log.error(f'{e}\n{sql}')
+                with contextlib.suppress(Exception):
+                    hook.close()
+                raise
+            finally:
+                idle_hooks.put(hook)
+
+        try:
+            controller.map(_run, list(self._sql_queries))
+        finally:
+            while not idle_hooks.empty():
+                with contextlib.suppress(Exception):
+                    idle_hooks.get_nowait().close()
+            self.log.info(f'concurrency limits: {[limit for _, limit in controller.history]}')
+
+
+class IndeximaBatchLoadDataOperator(IndeximaHookBasedOperator):
+    """Indexima batch load operator: load many (small) tables in a single task.
+
+    A task per small table cost more in scheduling than its load. Each load of
+    'loads' (a dictionary of 'target_table', 'load_path_uri' and optional 'truncate',
+    'truncate_sql', 'source_select_query', 'format_query', 'prefix_query', 'skip_lines',
+    'no_check', 'limit', 'locale' like IndeximaLoadDataOperator) is done in turn on a
+    single session, then its table is committed (or rolled back on error).
+
+    All loads are executed, even after an error (failed tables are raised at the end).
+    Keys of a load with a None value are ignored (defaults apply).
+
+    ```python
+    IndeximaBatchLoadDataOperator(
+        task_id='load_references',
+        indexima_conn_id='my-conn',
+        loads=[
+            {'target_table': 'country', 'load_path_uri': 's3://bucket/country', 'truncate': True},
+            {'target_table': 'currency', 'load_path_uri': 's3://bucket/currency', 'truncate': True},
+        ],
+    )
+    ```
+
+    Field 'loads' support airflow macro.
+    """
+
+    template_fields = ('_loads',)
+
+    load_keys = (
+        'target_table',
+        'load_path_uri',
+        'truncate',
+        'truncate_sql',
+        'source_select_query',
+        'format_query',
+        'prefix_query',
+        'skip_lines',
+        'no_check',
+        'limit',
+        'locale',
+    )
+
+    @apply_defaults
+    def __init__(self, task_id: str, indexima_conn_id: str, loads: List[Dict[str, Any]], *args, **kwargs):
+        """Create IndeximaBatchLoadDataOperator instance.
+
+        # Parameters
+            task_id (str): task identifier
+            indexima_conn_id (str): indexima connection identifier
+            loads (List[Dict[str, Any]]): loads
+
+        # Raises
+            (ValueError): if a load miss 'target_table' or 'load_path_uri', or has an unknown key
+
+        Others parameters are those of IndeximaHookBasedOperator.
+        """
+        super(IndeximaBatchLoadDataOperator, self).__init__(
+            task_id=task_id, indexima_conn_id=indexima_conn_id, *args, **kwargs
+        )
+        # airflow (1.10) fails to render a None nested in a template field
+        loads = [{key: value for key, value in load.items() if value is not None} for load in loads]
+        for load in loads:
+            if 'target_table' not in load or 'load_path_uri' not in load:
+                raise ValueError(f'a load needs a target_table and a load_path_uri: {load}')
+            unknown_keys = set(load) - set(self.load_keys)
+            if unknown_keys:
+                raise ValueError(f'unknown load keys {sorted(unknown_keys)} of {load["target_table"]}')
+        self._loads = loads
+
+    def _execute_one(self, hook: IndeximaHook, load: Dict[str, Any]):
+        table = load['target_table']
+        if load.get('truncate'):
+            hook.run(load.get('truncate_sql') or f'truncate table {table};')
+        options = {key: value for key, value in load.items() if key not in ('truncate', 'truncate_sql')}
+        options['table'] = options.pop('target_table')
+        hook.check_error_of_load_query(cursor=hook.run(_generate_load_data_query(**options)))
+        hook.commit(tablename=table)
+
+    def execute(self, context):
+        """Process executor."""
+        failed_tables = []
+        with self.get_hook() as hook:
+            for load in self._loads:
+                table = load['target_table']
+                start = time.monotonic()
+                try:
+                    self._execute_one(hook=hook, load=load)
+                except Exception as e:
+                    self.log.error(f'load of {table} failed: {e}')
+                    failed_tables.append(table)
+                    with contextlib.suppress(Exception):
+                        hook.rollback(tablename=table)
+                    continue
+                self.log.info(f'{table} loaded in {time.monotonic() - start:.1f}s')
+        if failed_tables:
+            raise AirflowException(f'{len(failed_tables)} loads failed: {", ".join(failed_tables)}')
@@ -0,0 +1,276 @@
+"""Define a minimal Parquet writer.
+
+Rows computed in python are written as Parquet files without a new
+dependency: the footer is encoded with the Thrift compact protocol (already
+shipped with PyHive), each file holds a single row group with one PLAIN
+encoded data page per column, compressed with GZIP (or not compressed).
+
+All columns are optional (None is written as a null). Supported column types:
+
+- boolean
+- tinyint, smallint, int (INT32), bigint (INT64)
+- float, double
+- string, varchar, char (UTF8 BYTE_ARRAY), binary
+- date (INT32 DATE)
+- timestamp (INT96, like Hive and Impala writers)
+- decimal(precision, scale) with precision up to 18 (INT64 DECIMAL)
+"""
+import datetime
+import decimal
+import gzip
+import re
+import struct
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from thrift.protocol.TCompactProtocol import TCompactProtocol
+from thrift.Thrift import TType
+from thrift.transport.TTransport import TMemoryBuffer
+
+from airflow_indexima.schema import ColumnSchema
+
+
+__all__ = ['write_parquet']
+
+
+_MAGIC = b'PAR1'
+_CODECS = {'none': 0, 'gzip': 2}
+
+# physical types
+_BOOLEAN, _INT32, _INT64, _INT96, _FLOAT, _DOUBLE, _BYTE_ARRAY = range(7)
+# converted types
+_UTF8, _DECIMAL, _DATE, _INT_8, _INT_16 = 0, 5, 6, 15, 16
+# encodings
+_PLAIN, _RLE = 0, 3
+
+_DECIMAL_PATTERN = re.compile(r'^decimal\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?$')
+_EPOCH = datetime.date(1970, 1, 1)
+_JULIAN_EPOCH_DAY = 2440588
+
+
+def _to_date(value: Any) -> int:
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def _to_int96(value: Any) -> bytes:
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    day = value.date()
+    nanos = ((value.hour * 3600 + value.minute * 60 + value.second) * 1000000 + value.microsecond) * 1000
+    return struct.pack('<qi', nanos, (day - _EPOCH).days + _JULIAN_EPOCH_DAY)
+
+
+def _to_utf8(value: Any) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+
+def _plain_booleans(values: List[Any]) -> bytes:
+    return _pack_bits([bool(value) for value in values])
+
+
+def _plain(format_character: str, convert: Callable[[Any], Any]) -> Callable[[List[Any]], bytes]:
+    return lambda values: struct.pack(f'<{len(values)}{format_character}', *(convert(v) for v in values))
+
+
+def _plain_byte_arrays(values: List[bytes]) -> bytes:
+    return b''.join(struct.pack('<i', len(value)) + value for value in values)
+
+
+_ColumnType = Tuple[Dict[int, Optional[int]], Callable[[Any], Any], Callable[[List[Any]], bytes]]
+
+
+def _get_column_type(column: ColumnSchema) -> _ColumnType:
+    """Return schema element fields, value converter and plain encoder of a column."""
+    type_name = column.type.strip().lower()
+    base_type = type_name.split('(')[0].strip()
+    if base_type == 'boolean':
+        return {1: _BOOLEAN}, bool, _plain_booleans
+    if base_type in ('tinyint', 'smallint', 'int', 'integer'):
+        converted = {'tinyint': _INT_8, 'smallint': _INT_16}.get(base_type)
+        return {1: _INT32, 6: converted}, int, _plain('i', int)
+    if base_type == 'bigint':
+        return {1: _INT64}, int, _plain('q', int)
+    if base_type == 'float':
+        return {1: _FLOAT}, float, _plain('f', float)
+    if base_type in ('double', 'real'):
+        return {1: _DOUBLE}, float, _plain('d', float)
+    if base_type in ('string', 'varchar', 'char'):
+        return {1: _BYTE_ARRAY, 6: _UTF8}, _to_utf8, _plain_byte_arrays
+    if base_type == 'binary':
+        return {1: _BYTE_ARRAY}, bytes, _plain_byte_arrays
+    if base_type == 'date':
+        return {1: _INT32, 6: _DATE}, _to_date, _plain('i', int)
+    if base_type == 'timestamp':
+        return {1: _INT96}, _to_int96, b''.join
+    match = _DECIMAL_PATTERN.match(type_name)
+    if match:
+        # hive default decimal is decimal(10, 0)
+        precision, scale = int(match.group(1) or 10), int(match.group(2) or 0)
+        if precision > 18:
+            raise ValueError(f'unsupported decimal precision {precision} of {column.name} (maximum 18)')
+        quantum = decimal.Decimal(1).scaleb(-scale)
+
+        def to_unscaled(value: Any) -> int:
+            return int(decimal.Decimal(str(value)).quantize(quantum).scaleb(scale))
+
+        return {1: _INT64, 6: _DECIMAL, 7: scale, 8: precision}, to_unscaled, _plain('q', int)
+    raise ValueError(f'unsupported parquet type {column.type} of {column.name}')
+
+
+def _pack_bits(bits: List[bool]) -> bytes:
+    result = bytearray((len(bits) + 7) // 8)
+    for index, bit in enumerate(bits):
+        if bit:
+            result[index >> 3] |= 1 << (index & 7)
+    return bytes(result)
+
+
+def _varint(value: int) -> bytes:
+    result = bytearray()
+    while value > 0x7F:
+        result.append(value & 0x7F | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def _definition_levels(defined: List[bool]) -> bytes:
+    """Encode definition levels (bit width 1) as a single bit packed run of RLE hybrid encoding."""
+    data = _varint(((len(defined) + 7) // 8) << 1 | 1) + _pack_bits(defined)
+    return struct.pack('<i', len(data)) + data
+
+
+def _write_thrift_value(protocol: TCompactProtocol, ttype: int, value: Any):
+    if ttype == TType.STRUCT:
+        _write_thrift_struct(protocol, value)
+    elif ttype == TType.LIST:
+        element_type, items = value
+        protocol.writeListBegin(element_type, len(items))
+        for item in items:
+            _write_thrift_value(protocol, element_type, item)
+        protocol.writeListEnd()
+    else:
+        writers = {
+            TType.I32: protocol.writeI32,
+            TType.I64: protocol.writeI64,
+            TType.STRING: protocol.writeString,
+        }
+        writers[ttype](value)
+
+
+def _write_thrift_struct(protocol: TCompactProtocol, fields: Sequence[Tuple[int, int, Any]]):
+    """Write a struct from (field id, type, value) without its generated class (None are skipped)."""
+    protocol.writeStructBegin('')
+    for field_id, ttype, value in fields:
+        if value is None:
+            continue
+        protocol.writeFieldBegin('', ttype, field_id)
+        _write_thrift_value(protocol, ttype, value)
+        protocol.writeFieldEnd()
+    protocol.writeFieldStop()
+    protocol.writeStructEnd()
+
+
+def _serialize(fields: Sequence[Tuple[int, int, Any]]) -> bytes:
+    buffer = TMemoryBuffer()
+    _write_thrift_struct(TCompactProtocol(buffer), fields)
+    return buffer.getvalue()
+
+
+def write_parquet(
+    target: IO[bytes],
+    columns: Sequence[ColumnSchema],
+    rows: Sequence[Sequence[Any]],
+    compression: str = 'gzip',
+) -> int:
+    """Write rows as a Parquet file of a single row group.
+
+    # Parameters
+        target (IO[bytes]): binary file open for writing (need not be seekable)
+        columns (Sequence[ColumnSchema]): columns (name and hive type)
+        rows (Sequence[Sequence[Any]]): rows, values in columns order
+        compression (str): 'gzip' or 'none' (default 'gzip')
+
+    # Returns
+        (int): written byte count
+
+    # Raises
+        (ValueError): on an unsupported type, compression or value
+    """
+    codec = _CODECS.get(compression.lower())
+    if codec is None:
+        raise ValueError(f'unsupported parquet compression {compression} (gzip or none)')
+    column_types = [_get_column_type(column) for column in columns]
+    target.write(_MAGIC)
+    offset = len(_MAGIC)
+    chunks = []
+    total_byte_size = 0
+    for index, (column, (element, convert, encode)) in enumerate(zip(columns, column_types)):
+        values = [row[index] for row in rows]
+        defined = [value is not None for value in values]
+        try:
+            encoded = encode([convert(value) for value in values if value is not None])
+        except (TypeError, ValueError, AttributeError, ArithmeticError, struct.error) as e:
+            raise ValueError(f'invalid value of column {column.name} ({column.type}): {e}') from e
+        page = _definition_levels(defined) + encoded
+        compressed = gzip.compress(page) if codec else page
+        data_page_header = [
+            (1, TType.I32, len(values)),
+            (2, TType.I32, _PLAIN),
+            (3, TType.I32, _RLE),
+            (4, TType.I32, _RLE),
+        ]
+        header = _serialize(
+            [
+                (1, TType.I32, 0),
+                (2, TType.I32, len(page)),
+                (3, TType.I32, len(compressed)),
+                (5, TType.STRUCT, data_page_header),
+            ]
+        )
+        target.write(header)
+        target.write(compressed)
+        metadata = [
+            (1, TType.I32, element[1]),
+            (2, TType.LIST, (TType.I32, [_PLAIN, _RLE])),
+            (3, TType.LIST, (TType.STRING, [column.name])),
+            (4, TType.I32, codec),
+            (5, TType.I64, len(values)),
+            (6, TType.I64, len(header) + len(page)),
+            (7, TType.I64, len(header) + len(compressed)),
+            (9, TType.I64, offset),
+        ]
+        chunks.append([(2, TType.I64, offset), (3, TType.STRUCT, metadata)])
+        offset += len(header) + len(compressed)
+        total_byte_size += len(header) + len(page)
+
+    schema = [[(4, TType.STRING, 'schema'), (5, TType.I32, len(columns))]]
+    for column, (element, _, _) in zip(columns, column_types):
+        schema.append(
+            [
+                (1, TType.I32, element[1]),
+                (3, TType.I32, 1),
+                (4, TType.STRING, column.name),
+                (6, TType.I32, element.get(6)),
+                (7, TType.I32, element.get(7)),
+                (8, TType.I32, element.get(8)),
+            ]
+        )
+    row_group = [
+        (1, TType.LIST, (TType.STRUCT, chunks)),
+        (2, TType.I64, total_byte_size),
+        (3, TType.I64, len(rows)),
+    ]
+    footer = _serialize(
+        [
+            (1, TType.I32, 1),
+            (2, TType.LIST, (TType.STRUCT, schema)),
+            (3, TType.I64, len(rows)),
+            (4, TType.LIST, (TType.STRUCT, [row_group])),
+            (6, TType.STRING, 'airflow-indexima'),
+        ]
+    )
+    target.write(footer)
+    target.write(struct.pack('<i', len(footer)) + _MAGIC)
+    return offset + len(footer) + 8
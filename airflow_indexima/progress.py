@@ -0,0 +1,199 @@
+"""Define a progress monitor of long running operations.
+
+IndeximaHook poll status of a running operation (see poll_interval). With a
+ProgressMonitor, each poll also read progress of operation (progress update of
+operation status) and new server logs of operation (where available):
+
+```python
+monitor = ProgressMonitor(name='load client', log_interval_seconds=60, stall_timeout_seconds=1800)
+hook.run("LOAD DATA INPATH ...", progress_monitor=monitor)
+```
+
+Every 'log_interval_seconds', progress, loaded rows (read in server logs with
+'rows_pattern'), rate and estimated remaining time are logged and given to an
+optional 'on_progress' callback (like a metrics sender). Progress of operation
+status is read as a ratio (hive), set 'progress_scale' to 100 for a server which
+report a percentage. An operation without
+progress (nor new log) during 'stall_timeout_seconds' is aborted with an
+OperationStalledError, an operation still running after 'timeout_seconds' is
+aborted with an OperationTimeoutError (hook cancel it).
+"""
+import logging
+import re
+import time
+from typing import Any, Callable, NamedTuple, Optional, Pattern, Sequence
+
+
+__all__ = [
+    'OperationProgress',
+    'OperationStalledError',
+    'OperationTimeoutError',
+    'OperationMonitor',
+    'ProgressMonitor',
+]
+
+
+_logger = logging.getLogger(__name__)
+
+_ROWS_PATTERN = re.compile(r'(\d[\d,]*)\s+(?:rows|lines|records)\b', re.IGNORECASE)
+
+
+class OperationProgress(NamedTuple):
+    """Define progress of a running operation."""
+
+    elapsed_seconds: float
+    progress: Optional[float]
+    rows: Optional[int]
+    rows_per_second: Optional[float]
+    eta_seconds: Optional[float]
+
+    def __str__(self) -> str:
+        parts = [f'elapsed {self.elapsed_seconds:.0f}s']
+        if self.progress is not None:
+            parts.append(f'progress {self.progress:.1%}')
+        if self.rows is not None:
+            parts.append(f'{self.rows} rows ({self.rows_per_second or 0:.0f} rows/s)')
+        if self.eta_seconds is not None:
+            parts.append(f'eta {self.eta_seconds:.0f}s')
+        return ', '.join(parts)
+
+
+class OperationStalledError(RuntimeError):
+    """An operation without progress during stall timeout."""
+
+
+class OperationTimeoutError(RuntimeError):
+    """An operation still running after its timeout."""
+
+
+class OperationMonitor:
+    """Monitor of status polls of a running operation (interface)."""
+
+    def start(self):
+        """Start monitoring of a new operation."""
+        raise NotImplementedError()
+
+    def update(self, response: Any, logs: Sequence[str] = ()) -> Any:
+        """Update monitor with an operation status (TGetOperationStatusResp) and new server logs."""
+        raise NotImplementedError()
+
+
+class ProgressMonitor(OperationMonitor):
+    """Progress monitor of an operation."""
+
+    def __init__(
+        self,
+        name: str = 'operation',
+        log_interval_seconds: float = 60.0,
+        stall_timeout_seconds: Optional[float] = None,
+        rows_pattern: Pattern = _ROWS_PATTERN,
+        on_progress: Optional[Callable[[OperationProgress], None]] = None,
+        timeout_seconds: Optional[float] = None,
+        progress_scale: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """Create a ProgressMonitor instance.
+
+        # Parameters
+            name (str): operation name in logs (default 'operation')
+            log_interval_seconds (float): delay in seconds between two progress logs (default 60.0)
+            stall_timeout_seconds (Optional[float]): abort operation without progress during this
+                delay in seconds (default None: never)
+            rows_pattern (Pattern): regular expression of a row count in server logs (first group)
+            on_progress (Optional[Callable[[OperationProgress], None]]): optional function called
+                with progress every log interval
+            timeout_seconds (Optional[float]): abort operation still running after this delay
+                in seconds (default None: never)
+            progress_scale (float): value of a completed operation in progress updates (default 1.0:
+                a ratio, like hive, 100.0 for a percentage)
+            logger (Optional[logging.Logger]): logger of progress and server logs, like the task
+                logger (default: logger of this module)
+
+        # Raises
+            (ValueError): if progress_scale is not positive
+        """
+        if progress_scale <= 0:
+            raise ValueError(f'progress_scale must be positive: {progress_scale}')
+        self.name = name
+        self._log_interval_seconds = log_interval_seconds
+        self._stall_timeout_seconds = stall_timeout_seconds
+        self._rows_pattern = rows_pattern
+        self._on_progress = on_progress
+        self._timeout_seconds = timeout_seconds
+        self._progress_scale = progress_scale
+        self._logger = logger or _logger
+        self.start()
+
+    def start(self):
+        """Start monitoring of a new operation."""
+        now = time.monotonic()
+        self._start = now
+        self._last_change = now
+        self._last_log = now
+        self._progress: Optional[float] = None
+        self._rows: Optional[int] = None
+        self.last_progress: Optional[OperationProgress] = None
+
+    def _read_rows(self, logs: Sequence[str]) -> Optional[int]:
+        rows = None
+        for line in logs:
+            for match in self._rows_pattern.finditer(line):
+                rows = int(match.group(1).replace(',', ''))
+        return rows
+
+    def update(self, response: Any, logs: Sequence[str] = ()) -> OperationProgress:
+        """Update progress with an operation status and new server logs.
+
+        # Parameters
+            response (Any): operation status (TGetOperationStatusResp)
+            logs (Sequence[str]): server logs since last update
+
+        # Returns
+            (OperationProgress): current progress
+
+        # Raises
+            (OperationStalledError): if operation has no progress during stall timeout
+            (OperationTimeoutError): if operation is still running after timeout
+        """
+        now = time.monotonic()
+        for line in logs:
+            self._logger.info(f'{self.name}: {line}')
+        changed = bool(logs)
+
+        update = getattr(response, 'progressUpdateResponse', None)
+        if update is not None and update.progressedPercentage is not None:
+            progress = update.progressedPercentage / self._progress_scale
+            changed = changed or progress != self._progress
+            self._progress = progress
+        rows = self._read_rows(logs)
+        if rows is not None:
+            changed = changed or rows != self._rows
+            self._rows = rows
+
+        if changed:
+            self._last_change = now
+        elapsed = now - self._start
+        eta = None
+        if self._progress:
+            eta = elapsed * (1 - self._progress) / self._progress
+        self.last_progress = OperationProgress(
+            elapsed_seconds=elapsed,
+            progress=self._progress,
+            rows=self._rows,
+            rows_per_second=self._rows / elapsed if self._rows is not None and elapsed > 0 else None,
+            eta_seconds=eta,
+        )
+
+        if now - self._last_log >= self._log_interval_seconds:
+            self._last_log = now
+            self._logger.info(f'{self.name}: {self.last_progress}')
+            if self._on_progress:
+                self._on_progress(self.last_progress)
+
+        if self._stall_timeout_seconds is not None and now - self._last_change > self._stall_timeout_seconds:
+            raise OperationStalledError(
+                f'{self.name}: no progress since {now - self._last_change:.0f}s (elapsed {elapsed:.0f}s)'
+            )
+        if self._timeout_seconds is not None and elapsed > self._timeout_seconds:
+            raise OperationTimeoutError(f'{self.name}: still running after {elapsed:.0f}s')
+        return self.last_progress
@@ -0,0 +1,350 @@
+"""Define a record and replay harness of Thrift traffic.
+
+A TRecordingTransport wrap a hive transport (see create_hive_transport
+'record_path' parameter) and append each Thrift message exchanged to a
+capture file (json lines):
+
+```
+{"connection": "1f2e...", "event": "open", "t": 1571234567.12}
+{"connection": "1f2e...", "event": "request", "t": ..., "rpc": "ExecuteStatement", "size": 154,
+ "payload": "..."}
+{"connection": "1f2e...", "event": "response", "t": ..., "rpc": "ExecuteStatement", "size": 98,
+ "elapsed": 0.0123, "payload": "..."}
+{"connection": "1f2e...", "event": "close", "t": ...}
+```
+
+'elapsed' is the delay between the request and the first byte of its response
+(server timing plus network round trip), payloads are base64 encoded messages
+(without sasl framing).
+
+Payloads hold credentials (username and password of OpenSession request), sql
+statements and result rows: a capture file is created readable by its owner only
+(mode 0600), and should be handled like a credential file.
+
+A ReplayServer serve a capture on a local port: each accepted connection
+replay the next recorded connection, each request is answered with the
+next recorded response of the same rpc after its recorded 'elapsed' delay.
+"""
+import base64
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from thrift.protocol.TBinaryProtocol import TBinaryProtocol
+from thrift.Thrift import TType
+from thrift.transport.TSocket import TServerSocket, TSocket
+from thrift.transport.TTransport import TBufferedTransport, TTransportBase, TTransportException
+
+
+__all__ = [
+    'TRecordingTransport',
+    'TSaslPlainServerTransport',
+    'ReplayServer',
+    'get_rpc_name',
+    'load_capture',
+    'summarize_capture',
+]
+
+
+_SASL_START = 1
+_SASL_OK = 2
+_SASL_COMPLETE = 5
+
+
+def get_rpc_name(message: bytes) -> Optional[str]:
+    """Return rpc name of a Thrift binary protocol message (or None if not parsable)."""
+    try:
+        (first,) = struct.unpack('>i', message[:4])
+        if first < 0:
+            # strict mode: version and type, then name
+            (length,) = struct.unpack('>i', message[4:8])
+            return message[8 : 8 + length].decode('utf-8')
+        # old mode: name, then type and sequence id
+        return message[4 : 4 + first].decode('utf-8')
+    except (struct.error, UnicodeDecodeError):
+        return None
+
+
+class TRecordingTransport(TTransportBase):
+    """A transport which record Thrift messages of a wrapped transport in a capture file."""
+
+    def __init__(self, transport: TTransportBase, path: str, payloads: bool = True):
+        """Create a TRecordingTransport instance.
+
+        # Parameters
+            transport (TTransportBase): wrapped transport
+            path (str): capture file path (events are appended, created with mode 0600)
+            payloads (bool): record message payloads, required by replay (default True)
+        """
+        self._trans = transport
+        self._path = path
+        self._payloads = payloads
+        self._connection = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._write_buffer: List[bytes] = []
+        self._read_buffer: List[bytes] = []
+        self._request_time: Optional[float] = None
+        self._first_read_time: Optional[float] = None
+
+    def _record(self, event: str, payload: Optional[bytes] = None, **fields: Any):
+        record: Dict[str, Any] = {'connection': self._connection, 'event': event, 't': time.time()}
+        if payload is not None:
+            record['rpc'] = get_rpc_name(payload)
+            record['size'] = len(payload)
+        record.update(fields)
+        if payload is not None and self._payloads:
+            record['payload'] = base64.b64encode(payload).decode('ascii')
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            # payloads hold credentials and data
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'a') as f:
+                f.write(line)
+
+    def _record_response(self):
+        if self._read_buffer:
+            elapsed = (self._first_read_time or 0.0) - (self._request_time or 0.0)
+            self._record('response', b''.join(self._read_buffer), elapsed=round(max(elapsed, 0.0), 6))
+            self._read_buffer = []
+
+    def isOpen(self) -> bool:
+        return self._trans.isOpen()
+
+    def open(self):
+        self._trans.open()
+        self._record('open')
+
+    def close(self):
+        self._record_response()
+        self._trans.close()
+        self._record('close')
+
+    def read(self, sz: int) -> bytes:
+        data = self._trans.read(sz)
+        if not self._read_buffer:
+            self._first_read_time = time.monotonic()
+        self._read_buffer.append(data)
+        return data
+
+    def write(self, buf: bytes):
+        self._record_response()
+        self._write_buffer.append(buf)
+        self._trans.write(buf)
+
+    def flush(self):
+        self._trans.flush()
+        self._request_time = time.monotonic()
+        if self._write_buffer:
+            self._record('request', b''.join(self._write_buffer))
+            self._write_buffer = []
+
+
+class TSaslPlainServerTransport(TTransportBase):
+    """Server side of a sasl transport in PLAIN mode (credentials are not checked)."""
+
+    def __init__(self, transport: TTransportBase):
+        self._trans = transport
+        self._read_buffer = b''
+        self._write_buffer: List[bytes] = []
+
+    def isOpen(self) -> bool:
+        return self._trans.isOpen()
+
+    def open(self):
+        """Process sasl negotiation (start and initial response, then complete)."""
+        status, mechanism = self._read_message()
+        if status != _SASL_START or mechanism != b'PLAIN':
+            raise TTransportException(message=f'unexpected sasl start ({status}, {mechanism!r})')
+        status, _ = self._read_message()
+        if status != _SASL_OK:
+            raise TTransportException(message=f'unexpected sasl status {status}')
+        self._trans.write(struct.pack('>BI', _SASL_COMPLETE, 0))
+        self._trans.flush()
+
+    def _read_message(self) -> Tuple[int, bytes]:
+        status, length = struct.unpack('>BI', self._trans.readAll(5))
+        return status, self._trans.readAll(length) if length else b''
+
+    def read(self, sz: int) -> bytes:
+        if not self._read_buffer:
+            (length,) = struct.unpack('>I', self._trans.readAll(4))
+            self._read_buffer = self._trans.readAll(length)
+        data, self._read_buffer = self._read_buffer[:sz], self._read_buffer[sz:]
+        return data
+
+    def write(self, buf: bytes):
+        self._write_buffer.append(buf)
+
+    def flush(self):
+        data = b''.join(self._write_buffer)
+        self._write_buffer = []
+        self._trans.write(struct.pack('>I', len(data)) + data)
+        self._trans.flush()
+
+    def close(self):
+        self._trans.close()
+
+
+class _RawBinaryProtocol(TBinaryProtocol):
+    # strings are not decoded: skipped structs contain binary identifiers
+    def readString(self):
+        return self.readBinary()
+
+
+def load_capture(path: str) -> List[List[Dict[str, Any]]]:
+    """Load a capture file.
+
+    # Parameters
+        path (str): capture file path
+
+    # Returns
+        (List[List[Dict[str, Any]]]): events of each connection, in opening order
+    """
+    connections: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                connections.setdefault(event['connection'], []).append(event)
+    return sorted(connections.values(), key=lambda events: events[0]['t'])
+
+
+def summarize_capture(path: str) -> Dict[str, Dict[str, Any]]:
+    """Return count, request and response bytes and server seconds per rpc of a capture.
+
+    # Parameters
+        path (str): capture file path
+
+    # Returns
+        (Dict[str, Dict[str, Any]]): statistics per rpc name
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for events in load_capture(path):
+        for event in events:
+            if event['event'] not in ('request', 'response'):
+                continue
+            rpc = summary.setdefault(
+                event.get('rpc') or 'unknown',
+                {'count': 0, 'request_bytes': 0, 'response_bytes': 0, 'server_seconds': 0.0},
+            )
+            if event['event'] == 'request':
+                rpc['count'] += 1
+                rpc['request_bytes'] += event['size']
+            else:
+                rpc['response_bytes'] += event['size']
+                rpc['server_seconds'] = round(rpc['server_seconds'] + event.get('elapsed', 0.0), 6)
+    return summary
+
+
+class ReplayServer:
+    """Serve a capture on a local port.
+
+    ```python
+    with ReplayServer(path='capture.jsonl', auth='PLAIN') as server:
+        hook = IndeximaHook(...)  # connection on 127.0.0.1:{server.port}
+    ```
+
+    Could be used as a context manager (started on enter, stopped on exit).
+    """
+
+    def __init__(
+        self, path: str, auth: str = 'NOSASL', speed: float = 1.0, host: str = '127.0.0.1', port: int = 0
+    ):
+        """Create a ReplayServer instance.
+
+        # Parameters
+            path (str): capture file path
+            auth (str): authentication mode expected from clients: 'NOSASL' or 'PLAIN' (default 'NOSASL')
+            speed (float): timing factor, 2.0 replay twice faster, 0 disable delays (default 1.0)
+            host (str): listening address (default '127.0.0.1')
+            port (int): listening port (default 0: a free port)
+
+        # Raises
+            (ValueError): if auth is not supported
+        """
+        if auth not in ('NOSASL', 'PLAIN'):
+            raise ValueError(f"Unsupported auth '{auth}' (use NOSASL or PLAIN)")
+        self.auth = auth
+        self.host = host
+        self._speed = speed
+        self._requested_port = port
+        self._connections = load_capture(path)
+        self._next_connection = 0
+        self._lock = threading.Lock()
+        self._server: Optional[TServerSocket] = None
+
+    @property
+    def port(self) -> int:
+        """Return listening port."""
+        return self._server.handle.getsockname()[1]  # type: ignore
+
+    def start(self) -> 'ReplayServer':
+        self._server = TServerSocket(host=self.host, port=self._requested_port)
+        self._server.listen()
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+
+    def _serve(self):
+        server = self._server
+        while True:
+            try:
+                client = server.accept()  # type: ignore
+            except Exception:
+                return
+            if client is None:
+                return
+            with self._lock:
+                index = self._next_connection
+                self._next_connection += 1
+            if index >= len(self._connections):
+                client.close()
+                continue
+            events = self._connections[index]
+            threading.Thread(target=self._handle, args=(client, events), daemon=True).start()
+
+    def _handle(self, client: TSocket, events: List[Dict[str, Any]]):
+        responses = [event for event in events if event['event'] == 'response' and 'payload' in event]
+        transport: Any = client
+        try:
+            if self.auth == 'PLAIN':
+                transport = TSaslPlainServerTransport(client)
+                transport.open()
+            else:
+                transport = TBufferedTransport(client)
+            protocol = _RawBinaryProtocol(transport)
+            position = 0
+            while True:
+                name, _, _ = protocol.readMessageBegin()
+                protocol.skip(TType.STRUCT)
+                protocol.readMessageEnd()
+                name = name.decode('utf-8')
+                while position < len(responses) and responses[position].get('rpc') != name:
+                    position += 1
+                if position >= len(responses):
+                    return
+                response = responses[position]
+                position += 1
+                if self._speed:
+                    time.sleep(response.get('elapsed', 0.0) / self._speed)
+                transport.write(base64.b64decode(response['payload']))
+                transport.flush()
+        except (TTransportException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
+
+    def __enter__(self) -> 'ReplayServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,143 @@
+"""Define transient error classification and retry policy of statements.
+
+A transport failure (socket reset, node restart, ...) fails a statement with
+an unknown outcome. IndeximaHook with a RetryPolicy reconnects after a jittered
+backoff delay and replays idempotent statements (select, show, describe,
+pause, use, set):
+
+```python
+hook = IndeximaHook(indexima_conn_id='my-conn', retry_policy=RetryPolicy(max_attempts=3))
+```
+
+A commit is not replayed: its outcome is unknown, and a replay could report
+as committed rows lost with the failed session.
+Session statements (use, set) are replayed too: a new connection opens a new
+session, so the hook replays every use and set statement of the lost session
+(in their order) before the interrupted statement.
+Others statements (like a load or a truncate) are not replayed, a
+StatementInterruptedError is raised instead, so caller could replay a whole
+sequence when it is idempotent (like IndeximaLoadDataOperator does for a
+truncate and load).
+
+Errors reported by server (hive.OperationalError) are fatal, except an invalid
+session or operation handle (server restarted).
+"""
+import random
+import re
+import socket
+
+from pyhive import hive
+from thrift.transport.TTransport import TTransportException
+
+from airflow_indexima.cache import normalize_sql
+
+
+__all__ = [
+    'RetryPolicy',
+    'StatementInterruptedError',
+    'is_transient_error',
+    'is_idempotent_statement',
+    'is_session_statement',
+]
+
+
+_TRANSIENT_ERRORS = (TTransportException, EOFError, ConnectionError, socket.timeout)
+_TRANSIENT_MESSAGE_PATTERN = re.compile(r'invalid (?:session|operation)handle', re.IGNORECASE)
+_IDEMPOTENT_STATEMENT_PATTERN = re.compile(r'^(?:select|show|describe|desc|explain|pause|use|set)\b')
+_SESSION_STATEMENT_PATTERN = re.compile(r'^(?:use|set)\b')
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Return True if error is a transport failure (a new connection could succeed).
+
+    # Parameters
+        error (BaseException): error
+
+    # Returns
+        (bool): True if error is transient
+    """
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return True
+    if isinstance(error, hive.OperationalError):
+        return bool(_TRANSIENT_MESSAGE_PATTERN.search(str(error)))
+    return False
+
+
+def is_idempotent_statement(sql: str) -> bool:
+    """Return True if a statement could be replayed without side effect.
+
+    # Parameters
+        sql (str): sql statement
+
+    # Returns
+        (bool): True if statement is idempotent
+    """
+    return bool(_IDEMPOTENT_STATEMENT_PATTERN.match(normalize_sql(sql)))
+
+
+def is_session_statement(sql: str) -> bool:
+    """Return True if a statement changes state of its session (use, set).
+
+    # Parameters
+        sql (str): sql statement
+
+    # Returns
+        (bool): True if statement must be replayed on a new session
+    """
+    return bool(_SESSION_STATEMENT_PATTERN.match(normalize_sql(sql)))
+
+
+class StatementInterruptedError(RuntimeError):
+    """A non idempotent statement interrupted by a transient error (its outcome is unknown)."""
+
+    def __init__(self, sql: str, error: BaseException):
+        """Create a StatementInterruptedError instance.
+
+        # Parameters
+            sql (str): interrupted statement
+            error (BaseException): transient error
+        """
+        super(StatementInterruptedError, self).__init__(
+            f'statement interrupted by a transient error, not replayed (outcome unknown): {error}\n{sql}'
+        )
+        self.sql = sql
+        self.error = error
+
+
+class RetryPolicy:
+    """Define attempts and backoff delays of a retry.
+
+    Delay before attempt n + 1 is a random value between 0 and
+    min(max_delay_seconds, base_delay_seconds * 2 ** (n - 1)) ("full jitter"),
+    so hooks which failed together do not reconnect together.
+    """
+
+    def __init__(
+        self, max_attempts: int = 3, base_delay_seconds: float = 1.0, max_delay_seconds: float = 30.0
+    ):
+        """Create a RetryPolicy instance.
+
+        # Parameters
+            max_attempts (int): maximum number of attempts, first one included (default 3)
+            base_delay_seconds (float): backoff delay base (default 1.0)
+            max_delay_seconds (float): maximum backoff delay (default 30.0)
+
+        # Raises
+            (ValueError): if max_attempts is lower than 1
+        """
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be greater than 0')
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+    def get_delay(self, attempt: int) -> float:
+        """Return delay in second before next attempt.
+
+        # Parameters
+            attempt (int): number of the failed attempt (starting at 1)
+
+        # Returns
+            (float): delay in second
+        """
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
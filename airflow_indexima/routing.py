@@ -0,0 +1,135 @@
+"""Define multi-node routing utilities.
+
+A connection could define a list of Indexima nodes in its extra:
+
+```
+'{"nodes": ["node-1:10000", "node-2:10000", "node-3"]}'
+```
+
+Nodes are ordered by a score computed from their recent connect latency
+and error rate (tracked in-process), and read-only queries prefer the node
+with the less active sessions of this process. On connect failure, the next
+node is tried.
+"""
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+
+__all__ = ['HiveNode', 'NodeSelector', 'parse_hive_nodes', 'get_node_selector']
+
+
+class HiveNode(NamedTuple):
+    """Define an Indexima node."""
+
+    host: str
+    port: int
+
+
+def parse_hive_nodes(nodes: Sequence[str], default_port: int = 10000) -> List[HiveNode]:
+    """Parse a list of node 'host[:port]'.
+
+    # Parameters
+        nodes (Sequence[str]): node definitions
+        default_port (int): port used when not specified (default 10000)
+
+    # Returns
+        (List[HiveNode]): nodes
+    """
+    result = []
+    for node in nodes:
+        host, _, port = node.strip().partition(':')
+        result.append(HiveNode(host=host, port=int(port) if port else default_port))
+    return result
+
+
+class _NodeStatistics:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.active_sessions = 0
+
+
+class NodeSelector:
+    """Order nodes by recent connect latency and error rate.
+
+    Latency and error rate are exponentially weighted moving averages.
+    A node without statistics is tried first (in its definition order).
+    """
+
+    def __init__(self, smoothing: float = 0.3, error_penalty: float = 10.0):
+        """Create a NodeSelector instance.
+
+        # Parameters
+            smoothing (float): weight of the last measure in moving averages (default 0.3)
+            error_penalty (float): score multiplier applied on error rate (default 10.0)
+        """
+        self._smoothing = smoothing
+        self._error_penalty = error_penalty
+        self._statistics: Dict[HiveNode, _NodeStatistics] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, node: HiveNode) -> _NodeStatistics:
+        if node not in self._statistics:
+            self._statistics[node] = _NodeStatistics()
+        return self._statistics[node]
+
+    def score(self, node: HiveNode) -> float:
+        """Return score of a node (lower is better)."""
+        with self._lock:
+            statistics = self._get(node)
+            latency = statistics.latency or 0.0
+            return latency * (1 + self._error_penalty * statistics.error_rate) + statistics.error_rate
+
+    def order(self, nodes: Sequence[HiveNode], read_only: bool = False) -> List[HiveNode]:
+        """Return nodes in preference order.
+
+        # Parameters
+            nodes (Sequence[HiveNode]): nodes
+            read_only (bool): prefer node with less active sessions (default False)
+
+        # Returns
+            (List[HiveNode]): ordered nodes
+        """
+        scores = {node: self.score(node) for node in nodes}
+        if read_only:
+            with self._lock:
+                sessions = {node: self._get(node).active_sessions for node in nodes}
+            return sorted(nodes, key=lambda node: (sessions[node], scores[node]))
+        return sorted(nodes, key=lambda node: scores[node])
+
+    def record_success(self, node: HiveNode, latency: float):
+        """Record a successful connection and open a session on node.
+
+        # Parameters
+            node (HiveNode): node
+            latency (float): connect latency in seconds
+        """
+        with self._lock:
+            statistics = self._get(node)
+            statistics.latency = (
+                latency
+                if statistics.latency is None
+                else self._smoothing * latency + (1 - self._smoothing) * statistics.latency
+            )
+            statistics.error_rate = (1 - self._smoothing) * statistics.error_rate
+            statistics.active_sessions += 1
+
+    def record_failure(self, node: HiveNode):
+        """Record a connection failure on node."""
+        with self._lock:
+            statistics = self._get(node)
+            statistics.error_rate = self._smoothing + (1 - self._smoothing) * statistics.error_rate
+
+    def release(self, node: HiveNode):
+        """Record a session close on node."""
+        with self._lock:
+            statistics = self._get(node)
+            statistics.active_sessions = max(0, statistics.active_sessions - 1)
+
+
+_node_selector = NodeSelector()
+
+
+def get_node_selector() -> NodeSelector:
+    """Return the node selector shared by all hooks of this process."""
+    return _node_selector
@@ -0,0 +1,503 @@
+"""Define source schema readers and schema comparison utilities.
+
+Source schema of a load is read without loading data:
+
+- Parquet: file footer (FileMetaData, Thrift compact protocol), top level columns
+- ORC: file footer (protobuf), root struct fields (NONE, ZLIB or SNAPPY compression)
+- CSV: field count of first line (with an explicit FORMAT separator)
+
+Types are compared by category (integer, floating, decimal, string, boolean,
+date, timestamp, binary, complex): only obvious mismatches are reported, like a
+string column loaded into a numeric column, or a source column unknown in table.
+"""
+import os
+import struct
+import zlib
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from thrift.protocol.TCompactProtocol import TCompactProtocol
+from thrift.Thrift import TType
+from thrift.transport.TTransport import TMemoryBuffer
+
+
+__all__ = [
+    'ColumnSchema',
+    'SchemaMismatchError',
+    'SourceOpener',
+    'read_parquet_schema',
+    'read_parquet_row_count',
+    'read_orc_schema',
+    'read_csv_schema',
+    'read_source_schema',
+    'is_local_uri',
+    'get_type_category',
+    'compare_schemas',
+]
+
+
+SourceOpener = Callable[[str], IO[bytes]]
+
+
+class ColumnSchema(NamedTuple):
+    """Define a column name and type."""
+
+    name: str
+    type: str
+
+
+class SchemaMismatchError(RuntimeError):
+    """Source schema does not match target table."""
+
+
+# parquet physical types and converted types
+_PARQUET_PHYSICAL_TYPES = {
+    0: 'boolean',
+    1: 'int',
+    2: 'bigint',
+    3: 'timestamp',
+    4: 'float',
+    5: 'double',
+    6: 'binary',
+    7: 'fixed_len_byte_array',
+}
+_PARQUET_CONVERTED_TYPES = {
+    0: 'string',
+    1: 'map',
+    2: 'map',
+    3: 'list',
+    4: 'string',
+    5: 'decimal',
+    6: 'date',
+    7: 'int',
+    8: 'bigint',
+    9: 'timestamp',
+    10: 'timestamp',
+    11: 'tinyint',
+    12: 'smallint',
+    13: 'int',
+    14: 'bigint',
+    15: 'tinyint',
+    16: 'smallint',
+    17: 'int',
+    18: 'bigint',
+    19: 'string',
+    20: 'binary',
+    21: 'binary',
+}
+
+# orc type kinds
+_ORC_KINDS = {
+    0: 'boolean',
+    1: 'tinyint',
+    2: 'smallint',
+    3: 'int',
+    4: 'bigint',
+    5: 'float',
+    6: 'double',
+    7: 'string',
+    8: 'binary',
+    9: 'timestamp',
+    10: 'array',
+    11: 'map',
+    12: 'struct',
+    13: 'uniontype',
+    14: 'decimal',
+    15: 'date',
+    16: 'varchar',
+    17: 'char',
+    18: 'timestamp',
+}
+
+_TYPE_CATEGORIES = {
+    'boolean': 'boolean',
+    'tinyint': 'integer',
+    'smallint': 'integer',
+    'int': 'integer',
+    'integer': 'integer',
+    'bigint': 'integer',
+    'float': 'floating',
+    'double': 'floating',
+    'real': 'floating',
+    'decimal': 'decimal',
+    'numeric': 'decimal',
+    'string': 'string',
+    'varchar': 'string',
+    'char': 'string',
+    'date': 'date',
+    'timestamp': 'timestamp',
+    'binary': 'binary',
+    'fixed_len_byte_array': 'binary',
+    'array': 'complex',
+    'list': 'complex',
+    'map': 'complex',
+    'struct': 'complex',
+    'uniontype': 'complex',
+}
+
+# source categories accepted by a target category
+_COMPATIBLE_CATEGORIES = {
+    'integer': {'integer'},
+    'floating': {'integer', 'floating', 'decimal'},
+    'decimal': {'integer', 'floating', 'decimal'},
+    'string': {'boolean', 'integer', 'floating', 'decimal', 'string', 'date', 'timestamp', 'binary'},
+    'boolean': {'boolean'},
+    'date': {'date', 'timestamp', 'string'},
+    'timestamp': {'date', 'timestamp', 'string'},
+    'binary': {'binary', 'string'},
+    'complex': {'complex'},
+}
+
+
+def get_type_category(type_name: str) -> Optional[str]:
+    """Return category of a type name (like 'decimal(10,2)' or 'varchar(20)'), None if unknown."""
+    base_type = type_name.strip().lower().split('(')[0].split('<')[0].strip()
+    return _TYPE_CATEGORIES.get(base_type)
+
+
+def _read_thrift_value(protocol: TCompactProtocol, ttype: int) -> Any:
+    if ttype == TType.STRUCT:
+        return _read_thrift_struct(protocol)
+    if ttype in (TType.LIST, TType.SET):
+        element_type, size = protocol.readListBegin()
+        values = [_read_thrift_value(protocol, element_type) for _ in range(size)]
+        protocol.readListEnd()
+        return values
+    if ttype == TType.MAP:
+        key_type, value_type, size = protocol.readMapBegin()
+        entries = {
+            _read_thrift_value(protocol, key_type): _read_thrift_value(protocol, value_type)
+            for _ in range(size)
+        }
+        protocol.readMapEnd()
+        return entries
+    readers = {
+        TType.BOOL: protocol.readBool,
+        TType.BYTE: protocol.readByte,
+        TType.I16: protocol.readI16,
+        TType.I32: protocol.readI32,
+        TType.I64: protocol.readI64,
+        TType.DOUBLE: protocol.readDouble,
+        TType.STRING: protocol.readBinary,
+    }
+    return readers[ttype]()
+
+
+def _read_thrift_struct(protocol: TCompactProtocol, until_field: Optional[int] = None) -> Dict[int, Any]:
+    """Read a struct as a dictionary (field id: value) without its generated class."""
+    fields: Dict[int, Any] = {}
+    protocol.readStructBegin()
+    while True:
+        _, ttype, field_id = protocol.readFieldBegin()
+        if ttype == TType.STOP:
+            break
+        fields[field_id] = _read_thrift_value(protocol, ttype)
+        protocol.readFieldEnd()
+        if field_id == until_field:
+            # next fields (like row groups) are not needed
+            return fields
+    protocol.readStructEnd()
+    return fields
+
+
+def _get_parquet_type(element: Dict[int, Any]) -> str:
+    if element.get(5):
+        # group (nested) column
+        return _PARQUET_CONVERTED_TYPES.get(element.get(6), 'struct')  # type: ignore
+    if 6 in element and element[6] in _PARQUET_CONVERTED_TYPES:
+        return _PARQUET_CONVERTED_TYPES[element[6]]
+    logical_type = element.get(10) or {}
+    if 1 in logical_type:
+        return 'string'
+    if 6 in logical_type:
+        return 'date'
+    if 8 in logical_type:
+        return 'timestamp'
+    if 5 in logical_type:
+        return 'decimal'
+    return _PARQUET_PHYSICAL_TYPES.get(element.get(1), 'binary')  # type: ignore
+
+
+def _read_parquet_footer(source: IO[bytes], until_field: int) -> Dict[int, Any]:
+    source.seek(-8, os.SEEK_END)
+    footer_length, magic = struct.unpack('<i4s', source.read(8))
+    if magic != b'PAR1':
+        raise ValueError('not a parquet file')
+    source.seek(-8 - footer_length, os.SEEK_END)
+    protocol = TCompactProtocol(TMemoryBuffer(source.read(footer_length)))
+    return _read_thrift_struct(protocol, until_field=until_field)
+
+
+def read_parquet_row_count(source: IO[bytes]) -> int:
+    """Read row count of a Parquet file (from its footer).
+
+    # Parameters
+        source (IO[bytes]): a seekable binary file
+
+    # Returns
+        (int): row count
+
+    # Raises
+        (ValueError): if source is not a Parquet file
+    """
+    return _read_parquet_footer(source, until_field=3).get(3, 0)
+
+
+def read_parquet_schema(source: IO[bytes]) -> List[ColumnSchema]:
+    """Read top level columns of a Parquet file.
+
+    # Parameters
+        source (IO[bytes]): a seekable binary file
+
+    # Returns
+        (List[ColumnSchema]): columns
+
+    # Raises
+        (ValueError): if source is not a Parquet file
+    """
+    elements = _read_parquet_footer(source, until_field=2).get(2, [])
+    columns = []
+    position = 1
+    for _ in range(elements[0].get(5, 0) if elements else 0):
+        element = elements[position]
+        columns.append(ColumnSchema(name=element[4].decode('utf-8'), type=_get_parquet_type(element)))
+        # skip nested elements of a group
+        remaining = element.get(5, 0)
+        position += 1
+        while remaining:
+            remaining += elements[position].get(5, 0) - 1
+            position += 1
+    return columns
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def _read_protobuf(data: bytes) -> Dict[int, List[Union[int, bytes]]]:
+    """Read a protobuf message as a dictionary (field number: values) without its schema."""
+    fields: Dict[int, List[Union[int, bytes]]] = {}
+    position = 0
+    while position < len(data):
+        key, position = _read_varint(data, position)
+        field_number, wire_type = key >> 3, key & 0x7
+        value: Union[int, bytes]
+        if wire_type == 0:
+            value, position = _read_varint(data, position)
+        elif wire_type == 1:
+            value, position = data[position : position + 8], position + 8
+        elif wire_type == 2:
+            length, position = _read_varint(data, position)
+            value, position = data[position : position + length], position + length
+        elif wire_type == 5:
+            value, position = data[position : position + 4], position + 4
+        else:
+            raise ValueError(f'unsupported protobuf wire type {wire_type}')
+        fields.setdefault(field_number, []).append(value)
+    return fields
+
+
+def _read_packed_varints(values: List[Union[int, bytes]]) -> List[int]:
+    result: List[int] = []
+    for value in values:
+        if isinstance(value, int):
+            result.append(value)
+            continue
+        position = 0
+        while position < len(value):
+            number, position = _read_varint(value, position)
+            result.append(number)
+    return result
+
+
+def _decompress_snappy(data: bytes) -> bytes:
+    """Decompress a raw snappy block (footers are small, a pure python decoder is enough)."""
+    length, position = _read_varint(data, 0)
+    result = bytearray()
+    while position < len(data):
+        tag = data[position]
+        position += 1
+        element_type = tag & 0x3
+        if element_type == 0:
+            size = tag >> 2
+            if size >= 60:
+                extra = size - 59
+                size = int.from_bytes(data[position : position + extra], 'little')
+                position += extra
+            size += 1
+            result += data[position : position + size]
+            position += size
+            continue
+        if element_type == 1:
+            size = ((tag >> 2) & 0x7) + 4
+            offset = (tag >> 5) << 8 | data[position]
+            position += 1
+        else:
+            extra = 2 if element_type == 2 else 4
+            size = (tag >> 2) + 1
+            offset = int.from_bytes(data[position : position + extra], 'little')
+            position += extra
+        # copy could overlap its output
+        for _ in range(size):
+            result.append(result[-offset])
+    if len(result) != length:
+        raise ValueError('invalid snappy block')
+    return bytes(result)
+
+
+def _decompress_orc(data: bytes, compression: int) -> bytes:
+    if compression == 0:
+        return data
+    decompress = {1: lambda chunk: zlib.decompress(chunk, -15), 2: _decompress_snappy}.get(compression)
+    if decompress is None:
+        raise ValueError(f'unsupported orc compression {compression} (only NONE, ZLIB and SNAPPY)')
+    result = bytearray()
+    position = 0
+    while position < len(data):
+        header = data[position] | data[position + 1] << 8 | data[position + 2] << 16
+        length, original = header >> 1, header & 1
+        chunk = data[position + 3 : position + 3 + length]
+        result += chunk if original else decompress(chunk)
+        position += 3 + length
+    return bytes(result)
+
+
+def read_orc_schema(source: IO[bytes]) -> List[ColumnSchema]:
+    """Read root struct fields of an ORC file.
+
+    # Parameters
+        source (IO[bytes]): a seekable binary file
+
+    # Returns
+        (List[ColumnSchema]): columns
+
+    # Raises
+        (ValueError): if source is not an ORC file, or its footer compression is not supported
+    """
+    source.seek(-1, os.SEEK_END)
+    postscript_length = source.read(1)[0]
+    source.seek(-1 - postscript_length, os.SEEK_END)
+    postscript = _read_protobuf(source.read(postscript_length))
+    if postscript.get(8000, [b''])[0] != b'ORC':
+        raise ValueError('not an orc file')
+    footer_length = postscript[1][0]
+    compression = postscript.get(2, [0])[0]
+    source.seek(-1 - postscript_length - footer_length, os.SEEK_END)  # type: ignore
+    footer = _read_protobuf(_decompress_orc(source.read(footer_length), compression))  # type: ignore
+    types = [_read_protobuf(value) for value in footer.get(4, [])]  # type: ignore
+    if not types:
+        return []
+    root = types[0]
+    names = [name.decode('utf-8') for name in root.get(3, [])]  # type: ignore
+    subtypes = _read_packed_varints(root.get(2, []))
+    return [
+        ColumnSchema(name=name, type=_ORC_KINDS.get(types[subtype].get(1, [7])[0], 'binary'))  # type: ignore
+        for name, subtype in zip(names, subtypes)
+    ]
+
+
+def read_csv_schema(source: IO[bytes], separator: str) -> List[ColumnSchema]:
+    """Read fields of first line of a CSV file (named and typed as string).
+
+    # Parameters
+        source (IO[bytes]): a binary file
+        separator (str): field separator
+
+    # Returns
+        (List[ColumnSchema]): columns
+    """
+    line = source.readline().decode('utf-8', errors='replace').rstrip('\r\n')
+    return [ColumnSchema(name=field.strip(), type='string') for field in line.split(separator)]
+
+
+def is_local_uri(uri: str) -> bool:
+    """Return True if uri is a local path (or a 'file' uri), readable without a source opener."""
+    return urlparse(uri).scheme in ('', 'file')
+
+
+def _open_local(uri: str) -> Optional[IO[bytes]]:
+    if not is_local_uri(uri):
+        return None
+    path = urlparse(uri).path
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if not name.startswith(('_', '.')))
+        if not names:
+            return None
+        path = os.path.join(path, names[0])
+    return open(path, 'rb')
+
+
+def read_source_schema(
+    uri: str, format_query: Optional[str], opener: Optional[SourceOpener] = None
+) -> Optional[List[ColumnSchema]]:
+    """Read schema of a load source.
+
+    # Parameters
+        uri (str): load path uri (a directory is read from its first data file)
+        format_query (Optional[str]): FORMAT clause of load ('PARQUET', 'ORC' or a quoted separator)
+        opener (Optional[SourceOpener]): function which open an uri as a seekable binary file
+            (default: local files only)
+
+    # Returns
+        (Optional[List[ColumnSchema]]): source columns, None if source or format is not supported
+    """
+    source_format = (format_query or '').strip()
+    if source_format.upper() == 'PARQUET':
+        reader: Callable[[IO[bytes]], List[ColumnSchema]] = read_parquet_schema
+    elif source_format.upper() == 'ORC':
+        reader = read_orc_schema
+    elif len(source_format) >= 3 and source_format[0] == source_format[-1] == "'":
+        separator = source_format[1:-1].replace('\\t', '\t')
+        reader = lambda source: read_csv_schema(source, separator=separator)  # noqa: E731
+    else:
+        return None
+    source = opener(uri) if opener else _open_local(uri)
+    if source is None:
+        return None
+    with source:
+        return reader(source)
+
+
+def compare_schemas(
+    source: List[ColumnSchema], target: List[ColumnSchema], by_name: bool = True
+) -> List[str]:
+    """Return obvious mismatches between a source schema and a target table.
+
+    # Parameters
+        source (List[ColumnSchema]): source columns
+        target (List[ColumnSchema]): table columns
+        by_name (bool): columns are matched by name (Parquet, ORC), otherwise only column
+            count is compared (CSV)
+
+    # Returns
+        (List[str]): mismatches (empty if none)
+    """
+    if not by_name:
+        if len(source) != len(target):
+            return [f'source has {len(source)} fields, table has {len(target)} columns']
+        return []
+    columns = {column.name.lower(): column for column in target}
+    problems = []
+    for column in source:
+        target_column = columns.get(column.name.lower())
+        if target_column is None:
+            problems.append(f'source column {column.name} ({column.type}) not found in table')
+            continue
+        source_category = get_type_category(column.type)
+        target_category = get_type_category(target_column.type)
+        if source_category is None or target_category is None:
+            continue
+        if source_category not in _COMPATIBLE_CATEGORIES[target_category]:
+            problems.append(
+                f'source column {column.name} ({column.type}) could not be loaded in '
+                f'{target_column.name} ({target_column.type})'
+            )
+    return problems
@@ -0,0 +1,169 @@
+"""Indexima sensors module definition."""
+import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from airflow.sensors.base_sensor_operator import BaseSensorOperator
+from airflow.utils.decorators import apply_defaults
+
+from airflow_indexima.connection import ConnectionDecorator
+from airflow_indexima.hooks.indexima import IndeximaHook
+
+
+__all__ = ['IndeximaTableSensor', 'TableSpecification', 'generate_readiness_query']
+
+
+TableSpecification = Union[str, Sequence[str]]
+"""A table name, or a sequence (table name, where clause) to check a partition."""
+
+
+def _get_table_and_condition(table: TableSpecification) -> Tuple[str, Optional[str]]:
+    if isinstance(table, str):
+        return (table, None)
+    return (table[0], table[1] if len(table) > 1 else None)
+
+
+def generate_readiness_query(tables: Sequence[TableSpecification]) -> str:
+    """Generate a single query which count rows of each table (or partition).
+
+    # Parameters
+        tables (Sequence[TableSpecification]): tables to check
+
+    # Returns
+        (str): sql query which return rows (table index, row count)
+    """
+    queries = []
+    for index, table in enumerate(tables):
+        name, condition = _get_table_and_condition(table)
+        query = f"SELECT {index} AS table_index, COUNT(*) AS row_count FROM {name}"
+        if condition:
+            query += f" WHERE {condition}"
+        queries.append(query)
+    return " UNION ALL ".join(queries)
+
+
+class IndeximaTableSensor(BaseSensorOperator):
+    """Wait for many tables (or partitions) to be loaded.
+
+    All tables are checked with a single query per poke, and the hive session
+    is kept open between pokes (in 'poke' mode).
+
+    Poke interval is multiplied by 'backoff_factor' after each unsuccessful poke
+    (up to 'max_poke_interval'). In 'reschedule' mode, the number of previous pokes
+    is read from task reschedule history, so no worker slot is used between pokes.
+
+    ```python
+    IndeximaTableSensor(
+        task_id='wait_for_clients',
+        indexima_conn_id='my-indexima-connection',
+        tables=['client', ('sales', "day = '{{ ds }}'")],
+        mode='reschedule',
+        poke_interval=60,
+    )
+    ```
+
+    Field 'tables' support airflow macro.
+    """
+
+    template_fields = ('_tables',)
+    ui_color = '#ededed'
+
+    @apply_defaults
+    def __init__(
+        self,
+        task_id: str,
+        indexima_conn_id: str,
+        tables: List[TableSpecification],
+        min_rows: int = 1,
+        backoff_factor: float = 2.0,
+        max_poke_interval: float = 60 * 60,
+        connection_decorator: Optional[ConnectionDecorator] = None,
+        auth: Optional[str] = None,
+        kerberos_service_name: Optional[str] = None,
+        timeout_seconds: Optional[Union[int, datetime.timedelta]] = None,
+        socket_keepalive: Optional[bool] = None,
+        *args,
+        **kwargs,
+    ):
+        """Create IndeximaTableSensor instance.
+
+        # Parameters
+            task_id (str): task identifier
+            indexima_conn_id (str): indexima connection identifier
+            tables (List[TableSpecification]): table name or (table name, where clause)
+            min_rows (int): minimum row count of a ready table (default: 1)
+            backoff_factor (float): poke interval multiplier (default: 2.0), 1 disable backoff
+            max_poke_interval (float): maximum poke interval in seconds (default: 3600)
+            connection_decorator Optional[ConnectionDecorator]: optional connection decorator
+            auth (Optional[str]): authentication mode (default: {'CUSTOM'})
+            kerberos_service_name (Optional[str]): optional kerberos service name
+            timeout_seconds (Optional[Union[int, datetime.timedelta]]): define the socket timeout in second
+                (could be an int or a timedelta)
+            socket_keepalive (Optional[bool]): enable TCP keepalive.
+
+        """
+        super(IndeximaTableSensor, self).__init__(task_id=task_id, *args, **kwargs)
+        self._tables = tables
+        self._min_rows = min_rows
+        self._backoff_factor = backoff_factor
+        self._max_poke_interval = max_poke_interval
+        self._initial_poke_interval = self.poke_interval
+        self._poke_count = 0
+        self._hook_parameters: Dict[str, Any] = dict(
+            indexima_conn_id=indexima_conn_id,
+            connection_decorator=connection_decorator,
+            auth=auth,
+            kerberos_service_name=kerberos_service_name,
+            timeout_seconds=timeout_seconds,
+            socket_keepalive=socket_keepalive,
+        )
+        self._hook: Optional[IndeximaHook] = None
+
+    def get_hook(self) -> IndeximaHook:
+        """Return a configured IndeximaHook instance.
+
+        Hook is created on first call: a DAG file which define many sensors does not pay
+        hook creation at parse time.
+        """
+        if self._hook is None:
+            self._hook = IndeximaHook(**self._hook_parameters)
+        return self._hook
+
+    def get_pending_tables(self) -> List[TableSpecification]:
+        """Return tables which are not ready."""
+        cursor = self.get_hook().run(generate_readiness_query(self._tables))
+        row_counts = {int(index): int(count) for index, count in cursor.fetchall()}
+        return [
+            table for index, table in enumerate(self._tables) if row_counts.get(index, 0) < self._min_rows
+        ]
+
+    def _get_previous_poke_count(self, context) -> int:
+        if self.mode != 'reschedule':
+            return self._poke_count
+        try:
+            from airflow.models import TaskReschedule
+
+            return len(TaskReschedule.find_for_task_instance(context['ti']))
+        except (ImportError, AttributeError, KeyError):
+            return self._poke_count
+
+    def poke(self, context) -> bool:
+        """Check all tables with a single query."""
+        pending_tables = self.get_pending_tables()
+        if not pending_tables:
+            return True
+
+        poke_count = self._get_previous_poke_count(context)
+        self._poke_count += 1
+        self.poke_interval: float = min(
+            self._initial_poke_interval * (self._backoff_factor ** poke_count), self._max_poke_interval
+        )
+        self.log.info(f'waiting for {pending_tables}, next poke in {self.poke_interval}s')
+        return False
+
+    def execute(self, context):
+        """Process executor (session is closed at end)."""
+        try:
+            super(IndeximaTableSensor, self).execute(context)
+        finally:
+            if self._hook is not None:
+                self._hook.close()
@@ -0,0 +1,195 @@
+"""Define staging of python rows as Parquet files for a LOAD DATA statement.
+
+Rows (or a pandas DataFrame) are written in Parquet chunks of 'chunk_rows'
+rows into a staging location, loaded with a single
+`LOAD DATA INPATH '<location>' INTO TABLE ... FORMAT PARQUET` statement, then
+the staging location is deleted (see IndeximaHook.load_iterable and
+IndeximaHook.load_frame). Only one chunk is held in memory at a time.
+
+Staging location must be readable by Indexima servers. A StagingBackend
+create, write and delete locations, LocalStagingBackend use a local (or
+mounted shared) directory.
+"""
+import datetime
+import decimal
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+from typing import IO, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from airflow_indexima.parquet import write_parquet
+from airflow_indexima.schema import ColumnSchema
+
+
+__all__ = ['StagingBackend', 'LocalStagingBackend', 'stage_rows', 'get_frame_schema', 'iter_frame_rows']
+
+
+_logger = logging.getLogger(__name__)
+
+
+class StagingBackend:
+    """Staging location backend (interface)."""
+
+    def create_location(self, prefix: str) -> str:
+        """Create a new empty location and return its identifier."""
+        raise NotImplementedError()
+
+    def open_chunk(self, location: str, name: str) -> IO[bytes]:
+        """Open a new file of location for writing."""
+        raise NotImplementedError()
+
+    def get_uri(self, location: str) -> str:
+        """Return uri of location, as seen by Indexima servers (LOAD DATA INPATH)."""
+        raise NotImplementedError()
+
+    def delete_location(self, location: str):
+        """Delete a location and its files."""
+        raise NotImplementedError()
+
+
+class LocalStagingBackend(StagingBackend):
+    """Staging in a local directory.
+
+    Directory must be visible by Indexima servers (like a shared mount), 'base_uri'
+    gives its uri on servers when it differs from local path:
+
+    ```python
+    backend = LocalStagingBackend(base_dir='/mnt/shared/staging', base_uri='hdfs://namenode/staging')
+    ```
+    """
+
+    def __init__(self, base_dir: str, base_uri: Optional[str] = None, mode: int = 0o755):
+        """Create a LocalStagingBackend instance.
+
+        # Parameters
+            base_dir (str): staging directory (created if needed)
+            base_uri (Optional[str]): optional uri of staging directory on Indexima servers
+                (default: local path)
+            mode (int): permissions of staging locations, whatever the umask (default 0o755:
+                readable by Indexima servers running as another user), chunk files get
+                the same permissions without execute bits
+        """
+        self._base_dir = base_dir
+        self._base_uri = base_uri.rstrip('/') if base_uri else None
+        self._mode = mode
+        os.makedirs(base_dir, exist_ok=True)
+
+    def create_location(self, prefix: str) -> str:
+        safe_prefix = ''.join(character if character.isalnum() else '_' for character in prefix)
+        # mkdtemp create a directory accessible by its owner only
+        location = tempfile.mkdtemp(prefix=f'{safe_prefix}-', dir=self._base_dir)
+        os.chmod(location, self._mode)
+        return location
+
+    def open_chunk(self, location: str, name: str) -> IO[bytes]:
+        file_mode = self._mode & 0o666
+        fd = os.open(os.path.join(location, name), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, file_mode)
+        os.fchmod(fd, file_mode)
+        return os.fdopen(fd, 'wb')
+
+    def get_uri(self, location: str) -> str:
+        if self._base_uri is None:
+            return location
+        return f'{self._base_uri}/{os.path.relpath(location, self._base_dir)}'
+
+    def delete_location(self, location: str):
+        shutil.rmtree(location, ignore_errors=True)
+
+
+def stage_rows(
+    backend: StagingBackend,
+    location: str,
+    columns: Sequence[ColumnSchema],
+    rows: Iterable[Sequence[Any]],
+    chunk_rows: int = 100000,
+    compression: str = 'gzip',
+) -> Tuple[int, int]:
+    """Write rows as Parquet chunks into a staging location.
+
+    # Parameters
+        backend (StagingBackend): staging backend
+        location (str): staging location
+        columns (Sequence[ColumnSchema]): columns (name and hive type)
+        rows (Iterable[Sequence[Any]]): rows (read lazily)
+        chunk_rows (int): maximum row count per chunk (default 100000)
+        compression (str): parquet compression, 'gzip' or 'none' (default 'gzip')
+
+    # Returns
+        (Tuple[int, int]): row count and chunk count
+
+    # Raises
+        (ValueError): on an unsupported type or value
+    """
+    if chunk_rows < 1:
+        raise ValueError('chunk_rows must be positive')
+    iterator = iter(rows)
+    count = 0
+    chunks = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_rows))
+        if not chunk:
+            break
+        with backend.open_chunk(location, f'part-{chunks:05d}.parquet') as target:
+            size = write_parquet(target, columns, chunk, compression=compression)
+        _logger.debug(f'chunk {chunks} staged ({len(chunk)} rows, {size} bytes)')
+        count += len(chunk)
+        chunks += 1
+    return count, chunks
+
+
+def _get_object_type(name: str, values: Iterable[Any]) -> str:
+    for value in values:
+        if value is None or value != value:
+            continue
+        for value_type, type_name in (
+            (bool, 'boolean'),
+            (int, 'bigint'),
+            (float, 'double'),
+            (str, 'string'),
+            (bytes, 'binary'),
+            (datetime.datetime, 'timestamp'),
+            (datetime.date, 'date'),
+        ):
+            if isinstance(value, value_type):
+                return type_name
+        if isinstance(value, decimal.Decimal):
+            raise ValueError(f'decimal precision of column {name} is unknown, give a schema')
+        break
+    raise ValueError(f'unable to infer type of column {name}, give a schema')
+
+
+def get_frame_schema(frame: Any) -> List[ColumnSchema]:
+    """Return hive columns of a pandas DataFrame (from dtypes, or values of object columns).
+
+    # Parameters
+        frame (Any): a pandas DataFrame
+
+    # Returns
+        (List[ColumnSchema]): columns
+
+    # Raises
+        (ValueError): if a column type could not be inferred
+    """
+    columns = []
+    for name, dtype in frame.dtypes.items():
+        if dtype.kind == 'b':
+            type_name = 'boolean'
+        elif dtype.kind in 'iu':
+            type_name = 'int' if dtype.kind == 'i' and dtype.itemsize <= 4 else 'bigint'
+        elif dtype.kind == 'f':
+            type_name = 'float' if dtype.itemsize <= 4 else 'double'
+        elif dtype.kind == 'M':
+            type_name = 'timestamp'
+        else:
+            type_name = _get_object_type(str(name), frame[name])
+        columns.append(ColumnSchema(name=str(name), type=type_name))
+    return columns
+
+
+def iter_frame_rows(frame: Any) -> Iterator[Tuple[Any, ...]]:
+    """Iterate rows of a pandas DataFrame, missing values (NaN, NaT) as None."""
+    for row in frame.itertuples(index=False, name=None):
+        # NaN and NaT are not equal to themselves
+        yield tuple(None if value is None or value != value else value for value in row)
@@ -0,0 +1,105 @@
+"""Define warm-up queries of a freshly committed table.
+
+First queries on a freshly loaded table are slow while Indexima builds its
+in-memory structures. Warm-up queries are run right after commit, so users
+never hit a cold table:
+
+```python
+queries = get_default_warm_up_queries('client', hook.describe_table('client'))
+run_warm_up_queries(create_hook, queries, concurrency=4)
+```
+
+Default queries count rows, group rows by each dimension column (string,
+integer, date, boolean) and sum each measure column (floating, decimal), like
+dashboard queries. Queries run concurrently (each worker thread on its own hive
+session), their latency is logged. Warm-up is best effort: a failed query is
+logged and does not fail the caller.
+"""
+import contextlib
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from airflow_indexima.schema import ColumnSchema, get_type_category
+
+
+__all__ = ['get_default_warm_up_queries', 'run_warm_up_queries']
+
+
+_logger = logging.getLogger(__name__)
+
+_DIMENSION_CATEGORIES = ('string', 'integer', 'date', 'timestamp', 'boolean')
+_MEASURE_CATEGORIES = ('floating', 'decimal')
+
+
+def get_default_warm_up_queries(
+    table: str, columns: Sequence[ColumnSchema], max_columns: int = 8
+) -> List[str]:
+    """Return default warm-up queries of a table.
+
+    # Parameters
+        table (str): table name
+        columns (Sequence[ColumnSchema]): table columns
+        max_columns (int): maximum count of warmed columns (default 8, first columns of table)
+
+    # Returns
+        (List[str]): queries
+    """
+    queries = [f'SELECT COUNT(*) FROM {table}']
+    for column in columns[:max_columns]:
+        category = get_type_category(column.type)
+        if category in _DIMENSION_CATEGORIES:
+            queries.append(f'SELECT {column.name}, COUNT(*) FROM {table} GROUP BY {column.name} LIMIT 100')
+        elif category in _MEASURE_CATEGORIES:
+            queries.append(f'SELECT SUM({column.name}) FROM {table}')
+    return queries
+
+
+def run_warm_up_queries(
+    create_hook: Callable[[], Any], queries: Sequence[str], concurrency: int = 4
+) -> List[Tuple[str, Optional[float]]]:
+    """Run warm-up queries concurrently, and log their latency.
+
+    # Parameters
+        create_hook (Callable[[], Any]): function which create a new IndeximaHook
+        queries (Sequence[str]): queries
+        concurrency (int): maximum count of concurrent queries (default 4)
+
+    # Returns
+        (List[Tuple[str, Optional[float]]]): query and its latency in seconds (None on error),
+            in queries order
+    """
+    idle_hooks: queue.Queue = queue.Queue()
+
+    def _run(sql: str) -> Tuple[str, Optional[float]]:
+        try:
+            hook = idle_hooks.get_nowait()
+        except queue.Empty:
+            hook = create_hook()
+        start = time.monotonic()
+        try:
+            hook.run(sql).fetchall()
+        except Exception as e:
+            _logger.warning(f'warm-up query failed: {sql}: {e}')
+            with contextlib.suppress(Exception):
+                hook.close()
+            return sql, None
+        finally:
+            idle_hooks.put(hook)
+        latency = time.monotonic() - start
+        _logger.info(f'warm-up query done in {latency:.2f}s: {sql}')
+        return sql, latency
+
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            results = list(executor.map(_run, queries))
+    finally:
+        while not idle_hooks.empty():
+            with contextlib.suppress(Exception):
+                idle_hooks.get_nowait().close()
+    failed = sum(1 for _, latency in results if latency is None)
+    _logger.info(f'{len(results)} warm-up queries done in {time.monotonic() - start:.2f}s ({failed} failed)')
+    return results
@@ -0,0 +1 @@
+"""Benchmarks of the package (not a part of the distribution)."""
@@ -0,0 +1,106 @@
+"""Parse time benchmark of manifest driven load tasks.
+
+A manifest of N tables (json and, when PyYAML is installed, yaml) is
+written in a temporary directory, then load tasks are created in a new DAG
+(like a DAG file parse) with a task per table, and with small tables batched.
+
+Usage:
+
+```
+python -m benchmarks.dag_parse --tables 1000 10000 --small-ratio 0.8 --batch-size 50
+```
+
+Results (duration, task count and memory peak) are printed as json.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from airflow import DAG
+
+from airflow_indexima import manifest as manifest_module
+from airflow_indexima.manifest import create_load_tasks, read_manifest
+
+
+__all__ = ['run_benchmark']
+
+
+def _write_manifests(directory: str, table_count: int, small_ratio: float) -> List[str]:
+    small_count = int(table_count * small_ratio)
+    content = {
+        'defaults': {'format_query': 'PARQUET', 'truncate': True},
+        'tables': [
+            {
+                'target_table': f'db.table_{index:05d}',
+                'load_path_uri': f's3://bucket/table_{index:05d}/{{{{ ds }}}}',
+                'small': index < small_count,
+            }
+            for index in range(table_count)
+        ],
+    }
+    paths = [os.path.join(directory, f'manifest_{table_count}.json')]
+    with open(paths[0], 'w') as stream:
+        json.dump(content, stream)
+    try:
+        import yaml
+    except ImportError:
+        return paths
+    paths.append(os.path.join(directory, f'manifest_{table_count}.yaml'))
+    with open(paths[1], 'w') as stream:
+        yaml.safe_dump(content, stream)
+    return paths
+
+
+def _measure(path: str, batch_small_tables: bool, batch_size: int) -> Dict[str, Any]:
+    # a parse in a new process: manifest cache is empty
+    manifest_module._manifests.clear()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    read_manifest(path)
+    read_duration = time.perf_counter() - start
+    dag = DAG(dag_id='benchmark', start_date=datetime.datetime(2020, 1, 1))
+    create_load_tasks(
+        dag, path, indexima_conn_id='benchmark', batch_small_tables=batch_small_tables, batch_size=batch_size
+    )
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'manifest': os.path.basename(path),
+        'batch_small_tables': batch_small_tables,
+        'tasks': len(dag.task_dict),
+        'read_manifest_seconds': round(read_duration, 4),
+        'total_seconds': round(duration, 4),
+        'memory_peak_mb': round(peak / 1024 / 1024, 1),
+    }
+
+
+def run_benchmark(table_counts: List[int], small_ratio: float, batch_size: int) -> List[Dict[str, Any]]:
+    """Run benchmark and return its results."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for table_count in table_counts:
+            for path in _write_manifests(directory, table_count, small_ratio):
+                for batch_small_tables in (False, True):
+                    results.append(dict(_measure(path, batch_small_tables, batch_size), tables=table_count))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tables', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--small-ratio', type=float, default=0.8)
+    parser.add_argument('--batch-size', type=int, default=50)
+    arguments = parser.parse_args()
+    print(json.dumps(run_benchmark(arguments.tables, arguments.small_ratio, arguments.batch_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
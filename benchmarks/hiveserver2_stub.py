@@ -0,0 +1,326 @@
+"""A local HiveServer2 compatible Thrift server.
+
+This stub serve the TCLIService calls used by pyhive and IndeximaHook
+(session, statement, status, metadata, fetch, cancel and close), in NOSASL
+(buffered or framed) or PLAIN (SASL) authentication mode, without checking
+credentials.
+
+Statement results:
+
+- 'LOAD DATA ...': `load_rows` rows (path, inserts, errors, message), `load_errors` of them with an error
+- 'SELECT ...' or 'WITH ...': `rows` rows of `columns` string columns of `value_size` characters
+- others: no result set
+
+Each call is delayed by `latency` seconds, and a statement stay in running
+state during `execution_seconds` (with a progress update on status poll).
+
+```python
+with HiveServer2Stub(auth='NOSASL', settings=StubSettings(rows=100000)) as stub:
+    hive.Connection(thrift_transport=create_hive_transport(host='127.0.0.1', port=stub.port, auth='NOSASL'))
+```
+"""
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from TCLIService import TCLIService, ttypes
+from thrift.protocol.TBinaryProtocol import TBinaryProtocol
+from thrift.transport.TSocket import TServerSocket, TSocket
+from thrift.transport.TTransport import TBufferedTransport, TFramedTransport, TTransportException
+
+from airflow_indexima.recording import TSaslPlainServerTransport
+
+
+__all__ = ['StubSettings', 'HiveServer2Handler', 'HiveServer2Stub']
+
+
+class StubSettings(NamedTuple):
+    """Define stub behaviour."""
+
+    latency: float = 0.0
+    execution_seconds: float = 0.0
+    rows: int = 1
+    columns: int = 1
+    value_size: int = 16
+    load_rows: int = 1
+    load_errors: int = 0
+
+
+def _success() -> ttypes.TStatus:
+    return ttypes.TStatus(statusCode=ttypes.TStatusCode.SUCCESS_STATUS)
+
+
+def _column_desc(name: str, position: int, type_id: int) -> ttypes.TColumnDesc:
+    return ttypes.TColumnDesc(
+        columnName=name,
+        position=position,
+        typeDesc=ttypes.TTypeDesc(
+            types=[ttypes.TTypeEntry(primitiveEntry=ttypes.TPrimitiveTypeEntry(type=type_id))]
+        ),
+    )
+
+
+class _Operation:
+    def __init__(self, kind: str, row_count: int):
+        self.kind = kind
+        self.row_count = row_count
+        self.position = 0
+        self.start = time.monotonic()
+        self.cancelled = False
+
+
+class HiveServer2Handler:
+    """TCLIService handler."""
+
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.calls: Dict[str, int] = {}
+        self._operations: Dict[bytes, _Operation] = {}
+        self._lock = threading.Lock()
+        self._value = 'x' * settings.value_size
+
+    def _call(self, name: str):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.settings.latency:
+            time.sleep(self.settings.latency)
+
+    def _get_operation(self, handle: ttypes.TOperationHandle) -> _Operation:
+        with self._lock:
+            return self._operations[handle.operationId.guid]
+
+    def OpenSession(self, req):
+        self._call('OpenSession')
+        return ttypes.TOpenSessionResp(
+            status=_success(),
+            serverProtocolVersion=req.client_protocol,
+            sessionHandle=ttypes.TSessionHandle(
+                sessionId=ttypes.THandleIdentifier(guid=uuid.uuid4().bytes, secret=uuid.uuid4().bytes)
+            ),
+            configuration={},
+        )
+
+    def CloseSession(self, req):
+        self._call('CloseSession')
+        return ttypes.TCloseSessionResp(status=_success())
+
+    def ExecuteStatement(self, req):
+        self._call('ExecuteStatement')
+        statement = req.statement.strip().lower()
+        if statement.startswith('load data'):
+            operation = _Operation(kind='load', row_count=self.settings.load_rows)
+        elif statement.startswith(('select', 'with')):
+            operation = _Operation(kind='select', row_count=self.settings.rows)
+        else:
+            operation = _Operation(kind='command', row_count=0)
+        guid = uuid.uuid4().bytes
+        with self._lock:
+            self._operations[guid] = operation
+        return ttypes.TExecuteStatementResp(
+            status=_success(),
+            operationHandle=ttypes.TOperationHandle(
+                operationId=ttypes.THandleIdentifier(guid=guid, secret=uuid.uuid4().bytes),
+                operationType=ttypes.TOperationType.EXECUTE_STATEMENT,
+                hasResultSet=operation.kind != 'command',
+            ),
+        )
+
+    def GetOperationStatus(self, req):
+        self._call('GetOperationStatus')
+        operation = self._get_operation(req.operationHandle)
+        elapsed = time.monotonic() - operation.start
+        progress = None
+        if operation.cancelled:
+            state = ttypes.TOperationState.CANCELED_STATE
+        elif elapsed < self.settings.execution_seconds:
+            state = ttypes.TOperationState.RUNNING_STATE
+            if req.getProgressUpdate:
+                progress = ttypes.TProgressUpdateResp(
+                    headerNames=[],
+                    rows=[],
+                    progressedPercentage=elapsed / self.settings.execution_seconds,
+                    status=ttypes.TJobExecutionStatus.IN_PROGRESS,
+                    footerSummary='',
+                    startTime=0,
+                )
+        else:
+            state = ttypes.TOperationState.FINISHED_STATE
+        return ttypes.TGetOperationStatusResp(
+            status=_success(), operationState=state, progressUpdateResponse=progress
+        )
+
+    def CancelOperation(self, req):
+        self._call('CancelOperation')
+        self._get_operation(req.operationHandle).cancelled = True
+        return ttypes.TCancelOperationResp(status=_success())
+
+    def CloseOperation(self, req):
+        self._call('CloseOperation')
+        with self._lock:
+            self._operations.pop(req.operationHandle.operationId.guid, None)
+        return ttypes.TCloseOperationResp(status=_success())
+
+    def GetResultSetMetadata(self, req):
+        self._call('GetResultSetMetadata')
+        operation = self._get_operation(req.operationHandle)
+        if operation.kind == 'load':
+            columns = [
+                _column_desc('path', 1, ttypes.TTypeId.STRING_TYPE),
+                _column_desc('inserts', 2, ttypes.TTypeId.BIGINT_TYPE),
+                _column_desc('errors', 3, ttypes.TTypeId.BIGINT_TYPE),
+                _column_desc('message', 4, ttypes.TTypeId.STRING_TYPE),
+            ]
+        else:
+            columns = [
+                _column_desc(f'c{i}', i + 1, ttypes.TTypeId.STRING_TYPE)
+                for i in range(self.settings.columns)
+            ]
+        return ttypes.TGetResultSetMetadataResp(
+            status=_success(), schema=ttypes.TTableSchema(columns=columns)
+        )
+
+    def _get_columns(self, operation: _Operation, start: int, count: int) -> List[ttypes.TColumn]:
+        if operation.kind == 'load':
+            errors = [1 if start + i < self.settings.load_errors else 0 for i in range(count)]
+            return [
+                ttypes.TColumn(
+                    stringVal=ttypes.TStringColumn(
+                        values=[f'/data/part-{start + i:05d}' for i in range(count)], nulls=b''
+                    )
+                ),
+                ttypes.TColumn(i64Val=ttypes.TI64Column(values=[1000] * count, nulls=b'')),
+                ttypes.TColumn(i64Val=ttypes.TI64Column(values=errors, nulls=b'')),
+                ttypes.TColumn(
+                    stringVal=ttypes.TStringColumn(
+                        values=['error' if error else '' for error in errors], nulls=b''
+                    )
+                ),
+            ]
+        return [
+            ttypes.TColumn(stringVal=ttypes.TStringColumn(values=[self._value] * count, nulls=b''))
+            for _ in range(self.settings.columns)
+        ]
+
+    def FetchResults(self, req):
+        self._call('FetchResults')
+        if req.fetchType == 1:
+            # operation logs
+            return ttypes.TFetchResultsResp(
+                status=_success(),
+                hasMoreRows=False,
+                results=ttypes.TRowSet(
+                    startRowOffset=0,
+                    rows=[],
+                    columns=[ttypes.TColumn(stringVal=ttypes.TStringColumn(values=[], nulls=b''))],
+                ),
+            )
+        operation = self._get_operation(req.operationHandle)
+        start = operation.position
+        count = max(0, min(req.maxRows, operation.row_count - start))
+        operation.position += count
+        return ttypes.TFetchResultsResp(
+            status=_success(),
+            hasMoreRows=operation.position < operation.row_count,
+            results=ttypes.TRowSet(
+                startRowOffset=start, rows=[], columns=self._get_columns(operation, start, count)
+            ),
+        )
+
+    def GetLog(self, req):
+        self._call('GetLog')
+        return ttypes.TGetLogResp(status=_success(), log='')
+
+
+class HiveServer2Stub:
+    """A threaded HiveServer2 stub listening on a local port.
+
+    Could be used as a context manager (started on enter, stopped on exit).
+    """
+
+    def __init__(
+        self,
+        auth: str = 'NOSASL',
+        settings: Optional[StubSettings] = None,
+        host: str = '127.0.0.1',
+        framed_transport: bool = False,
+    ):
+        """Create a HiveServer2Stub instance.
+
+        # Parameters
+            auth (str): authentication mode 'NOSASL' or 'PLAIN' (default 'NOSASL')
+            settings (Optional[StubSettings]): stub behaviour (default StubSettings())
+            host (str): listening address (default '127.0.0.1')
+            framed_transport (bool): use a framed transport (NOSASL only, default False)
+
+        # Raises
+            (ValueError): if auth is not supported
+        """
+        if auth not in ('NOSASL', 'PLAIN'):
+            raise ValueError(f"Unsupported auth '{auth}' (use NOSASL or PLAIN)")
+        if framed_transport and auth != 'NOSASL':
+            raise ValueError('framed transport is only supported in NOSASL mode')
+        self.auth = auth
+        self.framed_transport = framed_transport
+        self.host = host
+        self.handler = HiveServer2Handler(settings or StubSettings())
+        self._processor = TCLIService.Processor(self.handler)
+        self._server: Optional[TServerSocket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        """Return listening port."""
+        return self._server.handle.getsockname()[1]  # type: ignore
+
+    @property
+    def settings(self) -> StubSettings:
+        return self.handler.settings
+
+    def start(self) -> 'HiveServer2Stub':
+        self._server = TServerSocket(host=self.host, port=0)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+
+    def _serve(self):
+        server = self._server
+        while True:
+            try:
+                client = server.accept()  # type: ignore
+            except Exception:
+                return
+            if client is None:
+                return
+            threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _handle(self, client: TSocket):
+        transport: Any = client
+        try:
+            if self.auth == 'PLAIN':
+                transport = TSaslPlainServerTransport(client)
+                transport.open()
+            elif self.framed_transport:
+                transport = TFramedTransport(client)
+            else:
+                transport = TBufferedTransport(client)
+            protocol = TBinaryProtocol(transport)
+            while True:
+                self._processor.process(protocol, protocol)
+        except (TTransportException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
+
+    def __enter__(self) -> 'HiveServer2Stub':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,40 @@
+"""Serve a Thrift capture on a local port.
+
+A capture is recorded with 'record_path' connection extra (see airflow_indexima.recording),
+then a task could be run against this server (connection host 127.0.0.1 and the given port).
+
+Usage:
+
+```
+python -m benchmarks.replay capture.jsonl --port 10000 --auth PLAIN --speed 1.0
+```
+
+Capture summary (per rpc count, sizes and server seconds) is printed as json.
+"""
+import argparse
+import json
+import time
+
+from airflow_indexima.recording import ReplayServer, summarize_capture
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path', help='capture file')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--auth', choices=('NOSASL', 'PLAIN'), default='PLAIN')
+    parser.add_argument('--speed', type=float, default=1.0)
+    arguments = parser.parse_args()
+
+    print(json.dumps(summarize_capture(arguments.path), indent=2))
+    with ReplayServer(path=arguments.path, auth=arguments.auth, speed=arguments.speed, port=arguments.port):
+        print(f'replay {arguments.path} on 127.0.0.1:{arguments.port} (ctrl-c to stop)')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Fetch throughput benchmark of hive transport settings.
+
+A local HiveServer2 stub (see benchmarks.hiveserver2_stub) serve a select
+result set, and a hive connection fetch it through a transport built with
+'create_hive_transport' and each combination of settings:
+
+- auth: NOSASL (buffered or framed transport) and PLAIN (sasl frames)
+- read_buffer_size: transport read buffer (not used by a framed transport)
+- tcp_nodelay and recv_buffer_size: socket options
+
+Usage:
+
+```
+python -m benchmarks.transport_throughput --rows 200000 --columns 4 --value-size 64
+```
+
+Results are printed as json.
+"""
+import argparse
+import itertools
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pyhive import hive
+
+from airflow_indexima.hive_transport import create_hive_transport
+from benchmarks.hiveserver2_stub import HiveServer2Stub, StubSettings
+
+
+__all__ = ['run_benchmark']
+
+
+# (auth of stub, framed transport)
+TRANSPORTS = (('NOSASL', False), ('NOSASL', True), ('PLAIN', False))
+READ_BUFFER_SIZES = (None, 4096, 65536, 1024 * 1024)
+TCP_NODELAYS = (None, True)
+RECV_BUFFER_SIZES = (None, 4 * 1024 * 1024)
+FETCH_SIZE = 10000
+
+
+Combination = Tuple[Optional[int], Optional[bool], Optional[int]]
+
+
+def _get_combinations(framed_transport: bool) -> Iterator[Combination]:
+    # a framed transport read whole frames, without read buffer
+    read_buffer_sizes = (None,) if framed_transport else READ_BUFFER_SIZES
+    return itertools.product(read_buffer_sizes, TCP_NODELAYS, RECV_BUFFER_SIZES)
+
+
+def _measure(
+    stub: HiveServer2Stub,
+    read_buffer_size: Optional[int],
+    tcp_nodelay: Optional[bool],
+    recv_buffer_size: Optional[int],
+) -> Dict[str, Any]:
+    transport = create_hive_transport(
+        host='127.0.0.1',
+        port=stub.port,
+        # PLAIN sasl mechanism is used by CUSTOM authentication mode
+        auth='NOSASL' if stub.auth == 'NOSASL' else 'CUSTOM',
+        username='benchmark',
+        password='benchmark',
+        tcp_nodelay=tcp_nodelay,
+        recv_buffer_size=recv_buffer_size,
+        read_buffer_size=read_buffer_size,
+        framed_transport=stub.framed_transport or None,
+    )
+    connection = hive.Connection(thrift_transport=transport)
+    try:
+        cursor = connection.cursor(arraysize=FETCH_SIZE)
+        cursor.execute('SELECT * FROM benchmark')
+        start = time.perf_counter()
+        rows = 0
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        cursor.close()
+    finally:
+        connection.close()
+    settings = stub.settings
+    received = rows * settings.columns * settings.value_size
+    return {
+        'auth': stub.auth,
+        'framed_transport': stub.framed_transport,
+        'read_buffer_size': read_buffer_size,
+        'tcp_nodelay': tcp_nodelay,
+        'recv_buffer_size': recv_buffer_size,
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'mb_per_second': round(received / elapsed / (1024 * 1024), 2),
+    }
+
+
+def run_benchmark(rows: int = 100000, columns: int = 4, value_size: int = 64) -> List[Dict[str, Any]]:
+    """Run benchmark on each combination of settings.
+
+    # Parameters
+        rows (int): fetched rows per combination (default 100000)
+        columns (int): string columns per row (default 4)
+        value_size (int): characters per value (default 64)
+
+    # Returns
+        (List[Dict[str, Any]]): one result per combination
+    """
+    settings = StubSettings(rows=rows, columns=columns, value_size=value_size)
+    results = []
+    for auth, framed_transport in TRANSPORTS:
+        with HiveServer2Stub(auth=auth, settings=settings, framed_transport=framed_transport) as stub:
+            for combination in _get_combinations(framed_transport):
+                results.append(_measure(stub, *combination))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=4)
+    parser.add_argument('--value-size', type=int, default=64)
+    arguments = parser.parse_args()
+    results = run_benchmark(rows=arguments.rows, columns=arguments.columns, value_size=arguments.value_size)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from TCLIService import TCLIService, ttypes
+from thrift.protocol.TBinaryProtocol import TBinaryProtocol
+from thrift.Thrift import TMessageType
+from thrift.transport.TTransport import TMemoryBuffer
+
+from airflow_indexima.async_transport import (
+    AsyncHiveTransport,
+    AsyncTCLIServiceClient,
+    _MessageScanner,
+    create_async_hive_transport,
+)
+from airflow_indexima.hooks.async_indexima import gather_with_concurrency, run_coroutine
+
+
+def _serialize(name: str, message_type: int, struct, seqid: int = 0) -> bytes:
+    buffer = TMemoryBuffer()
+    protocol = TBinaryProtocol(buffer)
+    protocol.writeMessageBegin(name, message_type, seqid)
+    struct.write(protocol)
+    protocol.writeMessageEnd()
+    return buffer.getvalue()
+
+
+def _fetch_results(rows: int) -> bytes:
+    result = TCLIService.FetchResults_result(
+        success=ttypes.TFetchResultsResp(
+            status=ttypes.TStatus(statusCode=ttypes.TStatusCode.SUCCESS_STATUS),
+            hasMoreRows=False,
+            results=ttypes.TRowSet(
+                startRowOffset=0,
+                rows=[],
+                columns=[
+                    ttypes.TColumn(stringVal=ttypes.TStringColumn(values=['value'] * rows, nulls=b'')),
+                    ttypes.TColumn(i64Val=ttypes.TI64Column(values=list(range(rows)), nulls=b'')),
+                ],
+            ),
+        )
+    )
+    return _serialize('FetchResults', TMessageType.REPLY, result)
+
+
+def test_message_scanner_on_chunks():
+    message = _fetch_results(rows=1000)
+    for chunk_size in (1, 7, 4096, len(message)):
+        scanner = _MessageScanner()
+        buffer = bytearray()
+        lengths = []
+        for position in range(0, len(message), chunk_size):
+            buffer += message[position : position + chunk_size]
+            lengths.append(scanner.scan(buffer))
+        assert lengths[-1] == len(message)
+        assert all(length is None for length in lengths[:-1])
+
+
+def test_message_scanner_with_map_and_following_message():
+    request = TCLIService.OpenSession_args(
+        req=ttypes.TOpenSessionReq(configuration={'serialization.encoding': 'utf-8', 'a': 'b'})
+    )
+    message = _serialize('OpenSession', TMessageType.CALL, request)
+    assert _MessageScanner().scan(bytearray(message + b'\x80\x01')) == len(message)
+
+
+def test_create_async_hive_transport():
+    with pytest.raises(ValueError):
+        create_async_hive_transport(host='localhost', auth='ahah')
+    with pytest.raises(ValueError):
+        create_async_hive_transport(host='localhost', auth='NONE')
+    transport = create_async_hive_transport(host='localhost', auth='NOSASL')
+    assert transport.port == 10000
+    assert not transport.is_open
+
+
+class _Transport(AsyncHiveTransport):
+    def __init__(self, response: bytes):
+        super(_Transport, self).__init__(host='localhost')
+        self.requests = []
+        self.response = response
+
+    async def call(self, message: bytes) -> bytes:
+        self.requests.append(message)
+        return self.response
+
+
+def test_async_tcliservice_client():
+    transport = _Transport(_fetch_results(rows=3))
+    client = AsyncTCLIServiceClient(transport)
+    response = run_coroutine(client.call('FetchResults', ttypes.TFetchResultsReq(maxRows=3)))
+    assert response.results.columns[1].i64Val.values == [0, 1, 2]
+    assert b'FetchResults' in transport.requests[0]
+
+
+def test_gather_with_concurrency():
+    active = []
+
+    async def _task(value):
+        active.append(value)
+        assert len(active) <= 2
+        await asyncio.sleep(0.01)
+        active.remove(value)
+        return value
+
+    assert run_coroutine(gather_with_concurrency([_task(i) for i in range(5)], limit=2)) == [0, 1, 2, 3, 4]
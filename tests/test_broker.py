@@ -0,0 +1,195 @@
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from airflow_indexima.broker import (
+    _BrokerRequestHandler,
+    _check_lease_settings,
+    _Lease,
+    _SessionPool,
+    receive_message,
+    send_message,
+)
+from airflow_indexima.hooks.broker import BrokerCursor, IndeximaBrokerHook
+
+
+def test_message_round_trip():
+    stream = io.BytesIO()
+    send_message(stream, {'op': 'run', 'sql': 'select 1'})
+    send_message(stream, {'rows': [(1, 'a')]})
+    stream.seek(0)
+    assert receive_message(stream) == {'op': 'run', 'sql': 'select 1'}
+    assert receive_message(stream) == {'rows': [(1, 'a')]}
+    assert receive_message(stream) is None
+
+
+class _Connection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def request(self, message, on_status=None):
+        if message['op'] == 'run':
+            if on_status:
+                on_status({'progress': 0.5, 'logs': ['10 rows loaded']})
+            return {'description': [('c0', 'INT_TYPE', None, None, None, None, True)]}
+        rows, self.rows = self.rows[: message['size']], self.rows[message['size'] :]
+        return {'rows': rows}
+
+
+def test_broker_cursor_fetch():
+    cursor = BrokerCursor(_Connection([(i,) for i in range(10)]), arraysize=3)
+    cursor.execute('select 1')
+    assert cursor.fetchone() == (0,)
+    assert cursor.fetchmany(4) == [(1,), (2,), (3,), (4,)]
+    assert cursor.fetchall() == [(i,) for i in range(5, 10)]
+    assert cursor.fetchone() is None
+
+
+def test_broker_cursor_status():
+    statuses = []
+    cursor = BrokerCursor(_Connection([]))
+    cursor.execute('LOAD DATA ...', on_status=statuses.append)
+    assert statuses == [{'progress': 0.5, 'logs': ['10 rows loaded']}]
+
+
+def test_broker_hook_cancel_is_never_retried(tmpdir):
+    hook = IndeximaBrokerHook(broker_socket_path=str(tmpdir.join('broker.sock')), indexima_conn_id='my-conn')
+    hook._operation_handle = 'lease-id'
+    # broker is not reachable: cancel fails, statement must not be replayed
+    hook.cancel()
+    assert hook._cancelled
+    assert not hook.has_active_operation()
+
+
+class _Hook:
+    def close(self):
+        pass
+
+
+def test_session_pool_is_bounded(monkeypatch):
+    pool = _SessionPool(conn_id='my-conn', max_sessions=2, max_idle_seconds=None)
+    monkeypatch.setattr(pool, '_create_hook', _Hook)
+    first = pool.lease()
+    pool.lease()
+    with pytest.raises(RuntimeError):
+        pool.lease(timeout=0.01)
+    pool.release(first)
+    assert pool.lease(timeout=0.01) is first
+    assert pool.stats == {'idle': 0, 'leased': 2, 'waiting': 0}
+
+
+class _ClosedHook:
+    hive_configuration = {'serialization.encoding': 'utf-8'}
+    _schema = None
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.statements = []
+
+    def run(self, sql, progress_monitor=None):
+        if not self.alive:
+            raise RuntimeError('Invalid SessionHandle')
+        self.statements.append(sql)
+        return self
+
+    def fetchall(self):
+        return []
+
+    @property
+    def description(self):
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+def test_session_pool_is_bounded_under_concurrency(monkeypatch):
+    pool = _SessionPool(conn_id='my-conn', max_sessions=2, max_idle_seconds=None)
+    created = []
+
+    def _create_hook():
+        created.append(_Hook())
+        return created[-1]
+
+    monkeypatch.setattr(pool, '_create_hook', _create_hook)
+    pool.release(pool.lease())
+
+    def _use():
+        for _ in range(200):
+            pool.release(pool.lease(timeout=5))
+
+    threads = [threading.Thread(target=_use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) <= 2
+    assert pool.stats['leased'] == 0
+
+
+def test_session_pool_check_idle_session(monkeypatch):
+    pool = _SessionPool(conn_id='my-conn', max_sessions=2, max_idle_seconds=None, check_idle_seconds=0)
+    fresh = _ClosedHook()
+    monkeypatch.setattr(pool, '_create_hook', lambda: fresh)
+    closed = _ClosedHook(alive=False)
+    pool.release(closed)
+    # a session closed by server is replaced
+    assert pool.lease() is fresh
+    assert closed.closed
+
+
+def test_lease_settings():
+    hook = _ClosedHook()
+    _check_lease_settings(hook, {'conn_id': 'my-conn'})
+    _check_lease_settings(hook, {'configuration': {'serialization.encoding': 'utf-8'}, 'schema': None})
+    with pytest.raises(RuntimeError):
+        _check_lease_settings(hook, {'configuration': {'hive.exec.parallel': 'true'}, 'schema': None})
+    with pytest.raises(RuntimeError):
+        _check_lease_settings(hook, {'configuration': hook.hive_configuration, 'schema': 'sales'})
+    # schemas are compared with schema of connection as default
+    _check_lease_settings(hook, {'schema': 'default'}, default_schema='default')
+    _check_lease_settings(hook, {'schema': None}, schema='default', default_schema='default')
+    _check_lease_settings(hook, {'schema': 'sales'}, schema='sales', default_schema='default')
+    with pytest.raises(RuntimeError):
+        _check_lease_settings(hook, {'schema': 'sales'}, default_schema='default')
+
+
+def _serve(*messages):
+    handler = _BrokerRequestHandler.__new__(_BrokerRequestHandler)
+    handler.rfile = io.BytesIO()
+    for message in messages:
+        send_message(handler.rfile, message)
+    handler.rfile.seek(0)
+    handler.wfile = io.BytesIO()
+    return handler._serve(_Lease(_ClosedHook()))
+
+
+def test_session_state_is_not_leaked():
+    assert not _serve({'op': 'run', 'sql': 'select 1'}, {'op': 'close'})
+    # a session changed by SET or USE is discarded at release
+    assert _serve({'op': 'run', 'sql': ' USE sales'}, {'op': 'close'})
+    assert _serve({'op': 'run', 'sql': 'set hive.exec.parallel=true'})
+
+
+def test_status_polls_are_forwarded():
+    class _LoadHook(_ClosedHook):
+        def run(self, sql, progress_monitor=None):
+            progress_monitor.start()
+            progress_monitor.update(SimpleNamespace(progressUpdateResponse=None), logs=[])
+            progress = SimpleNamespace(progressedPercentage=0.25)
+            progress_monitor.update(SimpleNamespace(progressUpdateResponse=progress), logs=['10 rows'])
+            return self
+
+    handler = _BrokerRequestHandler.__new__(_BrokerRequestHandler)
+    handler.rfile = io.BytesIO()
+    send_message(handler.rfile, {'op': 'run', 'sql': 'LOAD DATA ...', 'progress': True})
+    handler.rfile.seek(0)
+    handler.wfile = io.BytesIO()
+    handler._serve(_Lease(_LoadHook()))
+    handler.wfile.seek(0)
+    assert receive_message(handler.wfile) == {'status': {'progress': None, 'logs': []}}
+    assert receive_message(handler.wfile) == {'status': {'progress': 0.25, 'logs': ['10 rows']}}
+    assert receive_message(handler.wfile) == {'description': None}
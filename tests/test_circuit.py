@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from pyhive import hive
+
+from airflow_indexima.circuit import CircuitBreaker, CircuitOpenError
+
+
+def _fail(breaker, key='conn'):
+    with pytest.raises(ConnectionError):
+        with breaker.guard(key, is_failure=lambda error: isinstance(error, ConnectionError)):
+            raise ConnectionError()
+
+
+def test_circuit_open_after_threshold(tmp_path):
+    breaker = CircuitBreaker(state_dir=str(tmp_path), failure_threshold=2, cool_down_seconds=60)
+    _fail(breaker)
+    assert breaker.get_state('conn') == 'closed'
+    # an error reported by server is not a failure of the cluster
+    with pytest.raises(hive.OperationalError):
+        with breaker.guard('conn', is_failure=lambda error: isinstance(error, ConnectionError)):
+            raise hive.OperationalError('Table not found')
+    _fail(breaker)
+    assert breaker.get_state('conn') == 'open'
+
+    # state is shared by instances on same directory
+    other = CircuitBreaker(state_dir=str(tmp_path))
+    with pytest.raises(CircuitOpenError):
+        other.before_call('conn')
+    assert not other.before_call('other-conn')
+
+
+def test_circuit_half_open_probe(tmp_path):
+    breaker = CircuitBreaker(state_dir=str(tmp_path), failure_threshold=1, cool_down_seconds=0.05)
+    _fail(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call('conn')
+    time.sleep(0.1)
+
+    # a single probe, its failure open circuit again
+    assert breaker.before_call('conn')
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call('conn')
+    breaker.record_failure('conn')
+    assert breaker.get_state('conn') == 'open'
+    time.sleep(0.1)
+
+    with breaker.guard('conn', is_failure=lambda error: True):
+        pass
+    assert breaker.get_state('conn') == 'closed'
+    assert not breaker.before_call('conn')
+    assert breaker.stats == {'conn': {'state': 'closed'}}
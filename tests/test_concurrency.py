@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from airflow_indexima.concurrency import AdaptiveConcurrencyController
+
+
+def test_controller_limits():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyController(initial_limit=4, max_limit=2)
+
+
+def test_controller_grow_until_saturation():
+    capacity = 4
+    running = []
+    lock = threading.Lock()
+
+    def _statement(item):
+        # latency grows when more than 'capacity' statements run together
+        with lock:
+            running.append(item)
+            load = len(running)
+        time.sleep(0.01 * max(1, load / capacity))
+        with lock:
+            running.remove(item)
+        return item
+
+    controller = AdaptiveConcurrencyController(initial_limit=1, max_limit=16)
+    assert controller.map(_statement, list(range(200))) == list(range(200))
+    limits = [limit for _, limit in controller.history]
+    assert max(limits) > 1
+    assert max(limits) < 16
+
+
+def test_controller_backoff_on_error():
+    controller = AdaptiveConcurrencyController(initial_limit=8, max_limit=8)
+
+    def _statement(item):
+        if item == 3:
+            raise RuntimeError('TSocket read 0 bytes')
+        return item
+
+    with pytest.raises(RuntimeError):
+        controller.map(_statement, list(range(6)))
+    assert 4 in [limit for _, limit in controller.history]
+
+    with pytest.raises(RuntimeError):
+        with controller.slot():
+            raise RuntimeError()
+    assert controller.active == 0
@@ -1,4 +1,13 @@
-from airflow_indexima.connection import apply_hive_extra_setting, extract_hive_extra_setting
+from airflow_indexima.connection import (
+    apply_hive_extra_setting,
+    extract_hive_extra_setting,
+    extract_hive_nodes,
+    extract_hive_transport_setting,
+    extract_kerberos_credential,
+    get_hive_nodes,
+    get_hive_transport_parameters,
+)
+from airflow_indexima.routing import HiveNode
 
 
 def test_apply_hive_extra_setting_with_nothing(indexima_connection):
@@ -63,3 +72,60 @@ def test_extract_hive_extra_setting_without_data_1(indexima_connection):
 def test_extract_hive_extra_setting_without_data_2(indexima_connection):
     conn = apply_hive_extra_setting(connection=indexima_connection)
     assert extract_hive_extra_setting(connection=conn) == (None, None, None, None)
+
+
+def test_extract_hive_transport_setting(indexima_connection):
+    conn = apply_hive_extra_setting(
+        connection=indexima_connection,
+        timeout_seconds=90,
+        tcp_nodelay=True,
+        recv_buffer_size=1048576,
+        read_buffer_size=65536,
+    )
+    assert extract_hive_transport_setting(connection=conn) == {
+        'tcp_nodelay': True,
+        'recv_buffer_size': 1048576,
+        'read_buffer_size': 65536,
+    }
+
+
+def test_extract_hive_transport_setting_without_data(indexima_connection):
+    conn = apply_hive_extra_setting(connection=indexima_connection)
+    assert extract_hive_transport_setting(connection=conn) == {}
+
+
+def test_extract_hive_nodes(indexima_connection):
+    conn = apply_hive_extra_setting(connection=indexima_connection, nodes='node-1:10000, node-2')
+    assert extract_hive_nodes(connection=conn) == ['node-1:10000', 'node-2']
+
+
+def test_extract_hive_nodes_without_data(indexima_connection):
+    conn = apply_hive_extra_setting(connection=indexima_connection)
+    assert extract_hive_nodes(connection=conn) is None
+
+
+def test_get_hive_transport_parameters(indexima_connection):
+    conn = apply_hive_extra_setting(connection=indexima_connection, tcp_nodelay=True)
+    assert get_hive_transport_parameters(connection=conn) == {
+        'timeout_seconds': 60,
+        'auth': 'CUSTOM',
+        'username': 'airflow-user',
+        'password': 'XXXXXXXX',
+        'tcp_nodelay': True,
+    }
+
+
+def test_get_hive_nodes(indexima_connection):
+    assert get_hive_nodes(connection=indexima_connection) == [HiveNode(host='indexima.com', port=10000)]
+    conn = apply_hive_extra_setting(connection=indexima_connection, nodes='node-1:10001, node-2')
+    assert get_hive_nodes(connection=conn) == [HiveNode('node-1', 10001), HiveNode('node-2', 10000)]
+
+
+def test_extract_kerberos_credential(indexima_connection):
+    assert extract_kerberos_credential(connection=indexima_connection) is None
+    conn = apply_hive_extra_setting(
+        connection=indexima_connection,
+        kerberos_principal='airflow@EXAMPLE.COM',
+        kerberos_keytab='/etc/airflow.keytab',
+    )
+    assert extract_kerberos_credential(connection=conn) == ('airflow@EXAMPLE.COM', '/etc/airflow.keytab')
@@ -0,0 +1,111 @@
+import datetime
+
+import pytest
+
+from airflow_indexima.estimator import DurationEstimator, get_source_size
+from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+from airflow_indexima.parquet import write_parquet
+from airflow_indexima.schema import ColumnSchema
+
+
+def test_get_source_size(tmp_path):
+    for index in range(2):
+        with open(str(tmp_path / f'part-{index}.parquet'), 'wb') as target:
+            write_parquet(target, [ColumnSchema('id', 'bigint')], [(value,) for value in range(10 + index)])
+    (tmp_path / '_SUCCESS').write_text('')
+    size = sum(path.stat().st_size for path in tmp_path.glob('part-*'))
+    assert get_source_size(str(tmp_path), 'PARQUET') == (size, 21)
+    assert get_source_size(f'file://{tmp_path}', ';') == (size, None)
+    assert get_source_size(str(tmp_path / 'missing')) == (None, None)
+    assert get_source_size('s3://bucket/client') == (None, None)
+
+
+def test_estimate(tmp_path):
+    estimator = DurationEstimator(history_dir=str(tmp_path), min_samples=3)
+    assert estimator.estimate('my-conn', 'client', source_bytes=1000) is None
+
+    # 10s of overhead, 0.1s per byte
+    for size in (100, 200, 400):
+        estimator.record('my-conn', 'client', 10 + 0.1 * size, source_bytes=size, source_rows=size // 10)
+    # twice slower with another concurrent load
+    estimator.record('my-conn', 'client', 2 * (10 + 0.1 * 300), source_bytes=300, concurrency=3)
+
+    estimate = estimator.estimate('my-conn', 'client', source_bytes=1000)
+    assert estimate.seconds == pytest.approx(110)
+    assert estimate.upper_seconds >= estimate.seconds
+    assert estimate.samples == 4
+    estimate = estimator.estimate('my-conn', 'client', source_bytes=1000, concurrency=3)
+    assert estimate.seconds == pytest.approx(220)
+    # rows of three samples, then median duration
+    assert estimator.estimate('my-conn', 'client', source_rows=100).seconds == pytest.approx(110)
+    assert estimator.estimate('my-conn', 'client').seconds == pytest.approx(35)
+    assert estimator.estimate('my-conn', 'country') is None
+
+
+def test_track_load(tmp_path):
+    estimator = DurationEstimator(history_dir=str(tmp_path))
+    with estimator.track_load('my-conn', 'client') as first:
+        with estimator.track_load('my-conn', 'country') as second:
+            assert (first, second) == (1, 2)
+            assert estimator.get_running_loads('my-conn') == 2
+    assert estimator.get_running_loads('my-conn') == 0
+
+
+class _Cursor:
+    def fetchone(self):
+        return None
+
+
+class _Hook:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, sql, progress_monitor=None):
+        if progress_monitor:
+            self.load_timeout_seconds = progress_monitor._timeout_seconds
+        return _Cursor()
+
+    def check_error_of_load_query(self, cursor):
+        return 42
+
+    def commit(self, tablename):
+        pass
+
+
+class _Dag:
+    def following_schedule(self, execution_date):
+        return execution_date + datetime.timedelta(days=1)
+
+
+def test_load_data_operator_estimate(tmp_path):
+    estimator = DurationEstimator(history_dir=str(tmp_path))
+    for duration in (100, 120, 110):
+        estimator.record('my-conn', 'client', duration)
+    risks = []
+    op = IndeximaLoadDataOperator(
+        task_id='load',
+        indexima_conn_id='my-conn',
+        target_table='client',
+        load_path_uri='s3://bucket/client',
+        duration_estimator=estimator,
+        timeout_headroom=3.0,
+        min_timeout_seconds=60,
+        on_sla_risk=lambda context, estimate: risks.append(estimate),
+        sla=datetime.timedelta(hours=1),
+    )
+    assert op.estimate_load_duration({}).seconds == pytest.approx(110)
+    assert op._load_timeout_seconds == pytest.approx(360)
+    assert op._hook_parameters['timeout_seconds'] == 360
+
+    op._hook = _Hook()
+    # schedule interval ended yesterday, SLA is missed
+    execution_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=2)
+    op.execute(context={'dag': _Dag(), 'execution_date': execution_date})
+    assert op._hook.load_timeout_seconds == pytest.approx(360)
+    assert len(risks) == 1
+    sample = estimator.get_samples('my-conn', 'client')[-1]
+    assert sample['rows'] == 42
+    assert sample['concurrency'] == 1
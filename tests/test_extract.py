@@ -0,0 +1,175 @@
+import datetime
+
+import pytest
+
+from airflow_indexima.extract import (
+    KeyRange,
+    generate_range_query,
+    get_range_path,
+    merge_range_files,
+    parse_key_bound,
+    split_key_range,
+)
+
+
+def test_parse_key_bound():
+    assert parse_key_bound('12', key_type='int') == 12
+    assert parse_key_bound(12, key_type='int') == 12
+    assert parse_key_bound('2019-12-01', key_type='date') == datetime.date(2019, 12, 1)
+    assert parse_key_bound('2019-12-01T10:11:12', key_type='datetime') == datetime.datetime(
+        2019, 12, 1, 10, 11, 12
+    )
+    with pytest.raises(ValueError):
+        parse_key_bound('12', key_type='float')
+
+
+def test_split_key_range_int():
+    assert split_key_range(0, 100, 4) == [
+        KeyRange(part=0, lower=0, upper=25, last=False),
+        KeyRange(part=1, lower=25, upper=50, last=False),
+        KeyRange(part=2, lower=50, upper=75, last=False),
+        KeyRange(part=3, lower=75, upper=100, last=True),
+    ]
+
+
+def test_split_key_range_with_small_span():
+    assert split_key_range(0, 1, 4) == [
+        KeyRange(part=0, lower=0, upper=1, last=True),
+    ]
+    assert split_key_range(5, 5, 4) == [KeyRange(part=0, lower=5, upper=5, last=True)]
+
+
+def test_split_key_range_date():
+    ranges = split_key_range(datetime.date(2019, 12, 1), datetime.date(2019, 12, 31), 3)
+    assert [r.lower for r in ranges] == [
+        datetime.date(2019, 12, 1),
+        datetime.date(2019, 12, 11),
+        datetime.date(2019, 12, 21),
+    ]
+    assert ranges[-1].upper == datetime.date(2019, 12, 31)
+
+
+def test_split_key_range_errors():
+    with pytest.raises(ValueError):
+        split_key_range(0, 100, 0)
+    with pytest.raises(ValueError):
+        split_key_range(100, 0, 4)
+
+
+def test_generate_range_query():
+    assert generate_range_query(
+        'select * from client;', 'id', KeyRange(part=0, lower=0, upper=25, last=False)
+    ) == ("SELECT * FROM (select * from client) indexima_range WHERE id >= 0 AND id < 25")
+    assert generate_range_query(
+        'select * from client',
+        'day',
+        KeyRange(part=1, lower=datetime.date(2019, 12, 1), upper=datetime.date(2019, 12, 31), last=True),
+    ) == (
+        "SELECT * FROM (select * from client) indexima_range "
+        "WHERE day >= '2019-12-01' AND day < '2020-01-01'"
+    )
+    assert generate_range_query(
+        'select * from client',
+        'id',
+        KeyRange(part=3, lower=75, upper=100, last=True),
+    ) == ("SELECT * FROM (select * from client) indexima_range WHERE id >= 75 AND id <= 100")
+
+
+def test_merge_range_files(tmpdir):
+    output_path = str(tmpdir.join('extract.csv'))
+    ranges = split_key_range(0, 10, 2)
+    for key_range in ranges:
+        with open(get_range_path(output_path, key_range), 'w') as f:
+            f.write(f'id\n{key_range.lower}\n')
+
+    merge_range_files([get_range_path(output_path, r) for r in ranges], output_path=output_path)
+
+    with open(output_path) as f:
+        assert f.read() == 'id\n0\n5\n'
+    assert not tmpdir.join('extract.csv.part-00000').exists()
+
+
+class _Cursor:
+    description = [('client.id', 'INT_TYPE')]
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class _Hook:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def is_dry_run(self):
+        return False
+
+    def run(self, sql):
+        self.statements.append(sql)
+        # a row per range: its lower bound
+        return _Cursor([(int(sql.split('>= ')[1].split(' ')[0]),)])
+
+
+def test_range_extract_operator_rerun(tmpdir):
+    from airflow_indexima.operators.indexima import IndeximaRangeExtractOperator
+
+    output_path = str(tmpdir.join('extract.csv'))
+    statements = []
+
+    def _extract(upper_bound, partitions=2, merge=False):
+        statements.clear()
+        op = IndeximaRangeExtractOperator(
+            task_id='extract',
+            indexima_conn_id='my-conn',
+            sql_query='select * from client',
+            key_column='id',
+            lower_bound=0,
+            upper_bound=upper_bound,
+            partitions=partitions,
+            output_path=output_path,
+            merge=merge,
+        )
+        op._hook = _Hook(statements)
+        op.create_hook = lambda: _Hook(statements)
+        op.execute(context={})
+
+    def _read(path):
+        with open(path) as f:
+            return f.read()
+
+    _extract(upper_bound=100)
+    assert len(statements) == 2
+    assert _read(f'{output_path}.part-00001') == 'id\n50\n'
+
+    # same query and bounds: ranges are skipped
+    _extract(upper_bound=100)
+    assert statements == []
+
+    # another bound (like a templated bound of the next run): ranges are extracted again
+    _extract(upper_bound=200)
+    assert len(statements) == 2
+    assert _read(f'{output_path}.part-00001') == 'id\n100\n'
+
+    # a range file out of current ranges is removed
+    _extract(upper_bound=200, partitions=1)
+    assert len(statements) == 1
+    assert not tmpdir.join('extract.csv.part-00001').exists()
+
+    # merged file is skipped only for the same query and bounds
+    _extract(upper_bound=100, merge=True)
+    assert _read(output_path) == 'id\n0\n50\n'
+    _extract(upper_bound=100, merge=True)
+    assert statements == []
+    _extract(upper_bound=200, merge=True)
+    assert len(statements) == 2
+    assert _read(output_path) == 'id\n0\n100\n'
+    assert not tmpdir.join('extract.csv.part-00000').exists()
@@ -1,6 +1,16 @@
+import os
+
 import pytest
+from thrift.transport.TTransport import TBufferedTransport, TFramedTransport
 
-from airflow_indexima.hive_transport import check_hive_connection_parameters, create_transport_socket
+from airflow_indexima.hive_transport import (
+    check_hive_connection_parameters,
+    create_gssapi_sasl_factory,
+    create_hive_nosasl_transport,
+    create_hive_transport,
+    create_transport_socket,
+)
+from airflow_indexima.recording import TRecordingTransport
 
 
 def test_create_transport_socket():
@@ -38,3 +48,59 @@ def test_check_hive_connection_parameters():
         check_hive_connection_parameters(auth='KERBEROS', kerberos_service_name=None)
 
     check_hive_connection_parameters(auth='KERBEROS', kerberos_service_name="my-service")
+
+
+def test_create_transport_socket_with_options():
+    socket = create_transport_socket(
+        host='localhost', port=10000, tcp_nodelay=True, recv_buffer_size=1048576, send_buffer_size=65536
+    )
+    assert socket.tcp_nodelay
+    assert socket.recv_buffer_size == 1048576
+    assert socket.send_buffer_size == 65536
+
+
+def test_create_hive_nosasl_transport():
+    socket = create_transport_socket(host='localhost', port=10000)
+    assert isinstance(create_hive_nosasl_transport(socket=socket, read_buffer_size=65536), TBufferedTransport)
+    assert isinstance(create_hive_nosasl_transport(socket=socket, framed_transport=True), TFramedTransport)
+
+
+def test_create_hive_transport_with_record_path(tmp_path):
+    transport = create_hive_transport(
+        host='localhost', auth='NOSASL', record_path=str(tmp_path / 'capture.jsonl')
+    )
+    assert isinstance(transport, TRecordingTransport)
+    assert isinstance(create_hive_transport(host='localhost', auth='NOSASL'), TBufferedTransport)
+
+
+def test_gssapi_sasl_factory_credential_cache(monkeypatch):
+    class _Client:
+        def __init__(self):
+            self.caches = []
+
+        def setAttr(self, name, value):
+            pass
+
+        def init(self):
+            pass
+
+        def start(self, mechanism):
+            self.caches.append(os.environ.get('KRB5CCNAME'))
+            return True, mechanism, b''
+
+        def step(self, challenge):
+            self.caches.append(os.environ.get('KRB5CCNAME'))
+            return True, b''
+
+        def getError(self):
+            return 'error'
+
+    monkeypatch.setattr('airflow_indexima.hive_transport.sasl.Client', _Client)
+    monkeypatch.setenv('KRB5CCNAME', 'FILE:/tmp/krb5cc_hdfs')
+    client = create_gssapi_sasl_factory(host='localhost', service_name='hive', ccache='FILE:/tmp/krb5cc')()
+    client.start('GSSAPI')
+    client.step(b'')
+    # cache is used during negotiation steps only
+    assert client.caches == ['FILE:/tmp/krb5cc', 'FILE:/tmp/krb5cc']
+    assert os.environ['KRB5CCNAME'] == 'FILE:/tmp/krb5cc_hdfs'
+    assert client.getError() == 'error'
@@ -1,5 +1,12 @@
 import datetime
+import socket
 
+import pytest
+from pyhive import hive
+from TCLIService import ttypes
+from thrift.transport.TTransport import TTransportException
+
+from airflow_indexima.circuit import CircuitBreaker
 from airflow_indexima.hooks.indexima import IndeximaHook
 
 
@@ -18,3 +25,77 @@ def test_indexima_timeout_settings_from_timedelta(indexima_connection):
     hook = IndeximaHook(indexima_conn_id=indexima_connection.id, timeout_seconds=datetime.timedelta(hours=10))
     conn = hook._settings_decorator(indexima_connection)
     assert conn.extra == '{"timeout_seconds": 36000}'
+
+
+def test_indexima_hook_cancel_without_active_operation(indexima_connection):
+    hook = IndeximaHook(indexima_conn_id=indexima_connection.id)
+    assert not hook.has_active_operation()
+    hook.cancel()
+    assert not hook.has_active_operation()
+
+
+class _PollCursor:
+    def __init__(self, running_polls):
+        self._running_polls = running_polls
+        self._operationHandle = object()
+
+    def execute(self, sql, async_=False):
+        pass
+
+    def poll(self):
+        self._running_polls -= 1
+        if self._running_polls >= 0:
+            return ttypes.TGetOperationStatusResp(operationState=ttypes.TOperationState.RUNNING_STATE)
+        return ttypes.TGetOperationStatusResp(operationState=ttypes.TOperationState.FINISHED_STATE)
+
+
+def test_indexima_hook_poll_backoff(indexima_connection, monkeypatch):
+    delays = []
+    monkeypatch.setattr('airflow_indexima.hooks.indexima.time.sleep', delays.append)
+    hook = IndeximaHook(indexima_conn_id=indexima_connection.id, poll_interval=0.05)
+    hook._cursor = _PollCursor(running_polls=6)
+    hook._execute_and_wait('commit client')
+    # short statements are polled after a few milliseconds, then up to poll_interval
+    assert delays == [0.005, 0.01, 0.02, 0.04, 0.05, 0.05]
+
+
+def test_indexima_hook_connect_on_first_statement(indexima_connection, monkeypatch):
+    hook = IndeximaHook(indexima_conn_id=indexima_connection.id)
+    intents = []
+
+    def _get_conn(read_only=False):
+        intents.append(read_only)
+        hook._cursor = object()
+
+    monkeypatch.setattr(hook, 'get_conn', _get_conn)
+    monkeypatch.setattr(hook, '_execute', lambda sql: None)
+    with hook:
+        assert intents == []
+        hook.run('SELECT * FROM client')
+        hook.run('COMMIT client')
+    # node is chosen for the read-only intent of first statement
+    assert intents == [True]
+
+
+def test_indexima_hook_connect_errors_of_circuit(indexima_connection, monkeypatch, tmp_path):
+    conn_id = indexima_connection.conn_id
+    breaker = CircuitBreaker(state_dir=str(tmp_path), failure_threshold=1)
+    hook = IndeximaHook(indexima_conn_id=conn_id, circuit_breaker=breaker)
+
+    def _raise(error):
+        def _create_connection(read_only=False):
+            raise error
+
+        monkeypatch.setattr(hook, '_create_connection', _create_connection)
+        with pytest.raises(type(error)):
+            hook.get_conn()
+
+    # configuration, credential and server reported errors do not open circuit
+    _raise(RuntimeError(f'no connection identifier found with {conn_id}'))
+    _raise(RuntimeError('kinit of indexima@REALM failed (1): keytab not found'))
+    _raise(TTransportException(type=TTransportException.NOT_OPEN, message='Bad status: 3 (bad password)'))
+    _raise(hive.OperationalError('Database does not exist: sales'))
+    assert breaker.get_state(conn_id) == 'closed'
+
+    _raise(socket.timeout('timed out'))
+    assert breaker.get_state(conn_id) == 'open'
@@ -0,0 +1,84 @@
+from airflow_indexima.sensors.indexima import generate_readiness_query
+
+
+def test_indexima_table_sensor_exists():
+    from airflow_indexima.sensors.indexima import IndeximaTableSensor
+
+    assert IndeximaTableSensor
+    assert '_tables' in IndeximaTableSensor.template_fields
+
+
+def test_generate_readiness_query():
+    assert generate_readiness_query(['client', ('sales', "day = '2019-12-01'")]) == (
+        "SELECT 0 AS table_index, COUNT(*) AS row_count FROM client "
+        "UNION ALL "
+        "SELECT 1 AS table_index, COUNT(*) AS row_count FROM sales WHERE day = '2019-12-01'"
+    )
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Hook:
+    def __init__(self, row_counts):
+        self.row_counts = row_counts
+        self.statements = []
+
+    def run(self, sql):
+        self.statements.append(sql)
+        return _Cursor(list(enumerate(self.row_counts)))
+
+
+def test_indexima_table_sensor_poke():
+    from airflow_indexima.sensors.indexima import IndeximaTableSensor
+
+    sensor = IndeximaTableSensor(
+        task_id='wait',
+        indexima_conn_id='my-conn',
+        tables=['client', ('sales', "day = '2019-12-01'")],
+        min_rows=10,
+        poke_interval=10,
+        backoff_factor=2.0,
+        max_poke_interval=30,
+    )
+    # hook is created on first poke, not at dag parse time
+    assert sensor._hook is None
+    sensor._hook = _Hook(row_counts=[20, 5])
+
+    intervals = []
+    for _ in range(3):
+        assert not sensor.poke(context={})
+        intervals.append(sensor.poke_interval)
+    # a single query per poke, poke interval grows up to max_poke_interval
+    assert sensor._hook.statements == [generate_readiness_query(sensor._tables)] * 3
+    assert intervals == [10, 20, 30]
+    assert sensor.get_pending_tables() == [('sales', "day = '2019-12-01'")]
+
+    sensor._hook.row_counts = [20, 10]
+    assert sensor.poke(context={})
+
+
+def test_indexima_table_sensor_reschedule(monkeypatch):
+    from airflow_indexima.sensors.indexima import IndeximaTableSensor
+
+    class _TaskReschedule:
+        @staticmethod
+        def find_for_task_instance(task_instance):
+            return task_instance.reschedules
+
+    class _TaskInstance:
+        reschedules = [object(), object()]
+
+    monkeypatch.setattr('airflow.models.TaskReschedule', _TaskReschedule, raising=False)
+    sensor = IndeximaTableSensor(
+        task_id='wait', indexima_conn_id='my-conn', tables=['client'], mode='reschedule', poke_interval=10
+    )
+    sensor._hook = _Hook(row_counts=[0])
+    # a rescheduled sensor is a new instance: poke count is read from reschedule history
+    assert not sensor.poke(context={'ti': _TaskInstance()})
+    assert sensor.poke_interval == 40
@@ -0,0 +1,53 @@
+import datetime
+import decimal
+
+import pytest
+
+from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.insert import build_insert_statements, escape_value
+
+
+def test_escape_value():
+    assert escape_value(None) == 'NULL'
+    assert escape_value(True) == 'true'
+    assert escape_value(12) == '12'
+    assert escape_value(1.5) == '1.5'
+    assert escape_value(decimal.Decimal('10.20')) == '10.20'
+    assert escape_value("o'hara\\\n") == "'o\\'hara\\\\\\n'"
+    assert escape_value(datetime.date(2020, 1, 2)) == "'2020-01-02'"
+    assert escape_value(datetime.datetime(2020, 1, 2, 3, 4, 5)) == "'2020-01-02 03:04:05'"
+    with pytest.raises(ValueError):
+        escape_value(float('nan'))
+    with pytest.raises(ValueError):
+        escape_value(object())
+
+
+def test_build_insert_statements():
+    rows = ((index, f'name-{index}') for index in range(5))
+    statements = list(build_insert_statements('client', rows, target_fields=['id', 'name'], batch_size=2))
+    assert [count for _, count in statements] == [2, 2, 1]
+    assert statements[0][0] == "INSERT INTO client (id, name) VALUES (0, 'name-0'), (1, 'name-1')"
+
+    # statement length limit, a long row is sent alone
+    rows = [(1,), ('x' * 100,), (2,), (3,)]
+    statements = list(build_insert_statements('t', rows, max_statement_length=40))
+    assert [count for _, count in statements] == [1, 1, 2]
+    assert all(len(sql) <= 40 for sql, count in statements if count > 1)
+    assert list(build_insert_statements('t', [])) == []
+
+
+class _RecordingHook(IndeximaHook):
+    def __init__(self, **kwargs):
+        super(_RecordingHook, self).__init__(**kwargs)
+        self.statements = []
+
+    def run(self, sql, progress_monitor=None):
+        self.statements.append(sql)
+
+
+def test_hook_insert_rows(indexima_connection):
+    hook = _RecordingHook(indexima_conn_id=indexima_connection.id)
+    count = hook.insert_rows('client', iter([(index,) for index in range(2500)]), batch_size=1000)
+    assert count == 2500
+    assert len(hook.statements) == 4
+    assert hook.statements[-1] == 'COMMIT client'
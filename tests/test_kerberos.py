@@ -0,0 +1,132 @@
+import os
+import stat
+import time
+
+import pytest
+
+from airflow_indexima.kerberos import KerberosCredentialManager, parse_tgt_expiry, use_credential_cache
+
+
+_KINIT = '''#!/bin/sh
+echo "$@" >> {calls}
+while [ $# -gt 0 ]; do
+    if [ "$1" = "-c" ]; then
+        shift
+        touch "${{1#FILE:}}"
+    fi
+    shift
+done
+'''
+
+
+@pytest.fixture
+def kinit(tmp_path):
+    path = tmp_path / 'kinit'
+    path.write_text(_KINIT.format(calls=tmp_path / 'calls'))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def _calls(tmp_path):
+    path = tmp_path / 'calls'
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_parse_tgt_expiry():
+    output = (
+        'Ticket cache: FILE:/tmp/krb5cc_1000\n'
+        'Default principal: airflow@EXAMPLE.COM\n\n'
+        'Valid starting       Expires              Service principal\n'
+        '10/19/2026 12:00:00  10/19/2026 22:00:00  krbtgt/EXAMPLE.COM@EXAMPLE.COM\n'
+        '\trenew until 10/26/2026 12:00:00\n'
+    )
+    assert parse_tgt_expiry(output) == time.mktime((2026, 10, 19, 22, 0, 0, 0, 0, -1))
+    assert parse_tgt_expiry('klist: No credentials cache found') is None
+
+
+def test_ensure_acquire_ticket_once(tmp_path, kinit, monkeypatch):
+    monkeypatch.delenv('KRB5CCNAME', raising=False)
+    ccache_path = str(tmp_path / 'krb5cc')
+    manager = KerberosCredentialManager(
+        principal='airflow@EXAMPLE.COM',
+        keytab='/etc/airflow.keytab',
+        ccache_path=ccache_path,
+        kinit_path=kinit,
+        klist_path=str(tmp_path / 'missing-klist'),
+    )
+    expires_at = manager.ensure()
+    assert expires_at > time.time() + 3600
+    assert os.path.exists(ccache_path)
+    # credential cache of the process is not changed
+    assert 'KRB5CCNAME' not in os.environ
+    assert manager.ensure() == expires_at
+    assert len(_calls(tmp_path)) == 1
+    assert '-kt /etc/airflow.keytab -l 36000s' in _calls(tmp_path)[0]
+
+    # another process (same cache) reuse ticket
+    other = KerberosCredentialManager(
+        principal='airflow@EXAMPLE.COM',
+        keytab='/etc/airflow.keytab',
+        ccache_path=ccache_path,
+        kinit_path=kinit,
+    )
+    assert other.ensure() == expires_at
+    assert len(_calls(tmp_path)) == 1
+
+
+def test_ensure_renew_ticket_ahead_of_expiry(tmp_path, kinit):
+    manager = KerberosCredentialManager(
+        principal='airflow@EXAMPLE.COM',
+        keytab='/etc/airflow.keytab',
+        ccache_path=str(tmp_path / 'krb5cc'),
+        ticket_lifetime_seconds=600,
+        renew_ahead_seconds=900,
+        kinit_path=kinit,
+    )
+    manager.ensure()
+    manager.ensure()
+    assert len(_calls(tmp_path)) == 2
+
+
+def test_ensure_raise_on_kinit_failure(tmp_path):
+    manager = KerberosCredentialManager(
+        principal='airflow@EXAMPLE.COM',
+        keytab='/etc/airflow.keytab',
+        ccache_path=str(tmp_path / 'krb5cc'),
+        kinit_path='false',
+    )
+    with pytest.raises(RuntimeError):
+        manager.ensure()
+
+
+def test_background_renewal(tmp_path, kinit):
+    manager = KerberosCredentialManager(
+        principal='airflow@EXAMPLE.COM',
+        keytab='/etc/airflow.keytab',
+        ccache_path=str(tmp_path / 'krb5cc'),
+        kinit_path=kinit,
+    ).start()
+    try:
+        for _ in range(100):
+            if manager.expires_at:
+                break
+            time.sleep(0.01)
+        assert manager.expires_at > time.time()
+    finally:
+        manager.stop()
+    assert len(_calls(tmp_path)) == 1
+
+
+def test_use_credential_cache(monkeypatch):
+    monkeypatch.setenv('KRB5CCNAME', 'FILE:/tmp/krb5cc_hdfs')
+    with use_credential_cache('FILE:/tmp/krb5cc_indexima'):
+        assert os.environ['KRB5CCNAME'] == 'FILE:/tmp/krb5cc_indexima'
+    assert os.environ['KRB5CCNAME'] == 'FILE:/tmp/krb5cc_hdfs'
+
+    monkeypatch.delenv('KRB5CCNAME')
+    with pytest.raises(RuntimeError):
+        with use_credential_cache('FILE:/tmp/krb5cc_indexima'):
+            raise RuntimeError()
+    assert 'KRB5CCNAME' not in os.environ
+    with use_credential_cache(None):
+        assert 'KRB5CCNAME' not in os.environ
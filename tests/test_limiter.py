@@ -0,0 +1,49 @@
+import pytest
+
+from airflow_indexima.limiter import StatementLimiter, get_statement_table, is_heavy_statement
+
+
+def test_is_heavy_statement():
+    assert is_heavy_statement("LOAD DATA INPATH 'a' INTO TABLE b")
+    assert is_heavy_statement('commit client')
+    assert not is_heavy_statement('select * from client')
+    assert not is_heavy_statement('ROLLBACK client')
+
+
+def test_get_statement_table():
+    assert get_statement_table("LOAD DATA INPATH 'a' INTO TABLE Client FORMAT PARQUET;") == 'client'
+    assert get_statement_table('COMMIT client') == 'client'
+    assert get_statement_table('truncate table `db`.client;') == 'db.client'
+    assert get_statement_table('select * from client') is None
+
+
+def test_statement_limiter_scopes(tmpdir):
+    limiter = StatementLimiter(lock_dir=str(tmpdir), connection_slots=10, heavy_slots=2, table_slots=1)
+    assert limiter.get_scopes('my_conn', 'COMMIT client') == {
+        'conn-my_conn': 10,
+        'conn-my_conn-heavy': 2,
+        'table-my_conn-client': 1,
+    }
+    assert limiter.get_scopes('my_conn', 'select 1') == {'conn-my_conn': 10}
+
+
+def test_statement_limiter_acquire(tmpdir):
+    limiter = StatementLimiter(lock_dir=str(tmpdir), table_slots=1, poll_interval=0.01, acquire_timeout=0.05)
+    with limiter.acquire('my_conn', 'COMMIT client'):
+        with pytest.raises(RuntimeError):
+            with limiter.acquire('my_conn', 'COMMIT client'):
+                pass
+        with limiter.acquire('my_conn', 'COMMIT other'):
+            pass
+    with limiter.acquire('my_conn', 'COMMIT client'):
+        pass
+    assert tmpdir.join('queue').listdir() == []
+
+
+def test_statement_limiter_priority(tmpdir):
+    limiter = StatementLimiter(lock_dir=str(tmpdir), table_slots=1)
+    scopes = limiter.get_scopes('my_conn', 'COMMIT client')
+    low = limiter._create_ticket(scopes, priority_weight=1)
+    high = limiter._create_ticket(scopes, priority_weight=10)
+    assert limiter._is_first_in_queue(high, scopes)
+    assert not limiter._is_first_in_queue(low, scopes)
@@ -14,6 +14,8 @@ def test_data_operator_operator_fields_has_macro_support():
     assert '_no_check' in IndeximaLoadDataOperator.template_fields
     assert '_limit' in IndeximaLoadDataOperator.template_fields
     assert '_locale' in IndeximaLoadDataOperator.template_fields
+    assert '_staging_table' in IndeximaLoadDataOperator.template_fields
+    assert '_swap_sql' in IndeximaLoadDataOperator.template_fields
 
 
 def test_load_data_operator_target_table_mandatory():
@@ -211,3 +213,160 @@ def test_load_data_operator_generate_query_with_format_and_prefix_and_query_and_
         "LIMIT 1000 "
         "LOCALE 'fr';"
     )
+
+
+def test_load_data_operator_generate_query_with_staging_table():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    operator = IndeximaLoadDataOperator(
+        task_id="my_task",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        staging_table="fake_table_staging",
+        truncate=True,
+        swap_sql=['CREATE OR REPLACE VIEW fake_view AS SELECT * FROM fake_table_staging;'],
+    )
+    assert operator.generate_load_data_query() == (
+        "LOAD DATA INPATH 'fake:uri//dummy' INTO TABLE fake_table_staging;"
+    )
+    assert operator.generate_swap_queries() == [
+        'CREATE OR REPLACE VIEW fake_view AS SELECT * FROM fake_table_staging;'
+    ]
+
+
+def test_load_data_operator_staging_table_requires_swap_sql_and_truncate():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    parameters = dict(
+        task_id="my_task",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        staging_table="fake_table_staging",
+    )
+    # renames are not atomic: no default swap
+    with pytest.raises(ValueError):
+        IndeximaLoadDataOperator(truncate=True, **parameters)
+    with pytest.raises(ValueError):
+        IndeximaLoadDataOperator(swap_sql=['CREATE OR REPLACE VIEW ...'], **parameters)
+
+
+def test_load_data_operator_staging_table_and_commit_group():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    with pytest.raises(ValueError):
+        IndeximaLoadDataOperator(
+            task_id="my_task",
+            indexima_conn_id='fake_connection_id',
+            target_table="fake_table",
+            load_path_uri="fake:uri//dummy",
+            staging_table="fake_table_staging",
+            commit_group="my_group",
+        )
+
+
+def test_load_data_operator_swap_failure():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    statements = []
+
+    class _Hook:
+        retry_policy = None
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, sql, progress_monitor=None):
+            if sql.startswith('CREATE OR REPLACE VIEW'):
+                raise RuntimeError('Table not found')
+            statements.append(sql)
+            return self
+
+        def fetchone(self):
+            return None
+
+        def check_error_of_load_query(self, cursor):
+            return 0
+
+        def commit(self, tablename):
+            statements.append(f'COMMIT {tablename}')
+
+    operator = IndeximaLoadDataOperator(
+        task_id="my_task",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        staging_table="fake_table_staging",
+        truncate=True,
+        truncate_sql="delete from fake_table_staging;",
+        swap_sql=['CREATE OR REPLACE VIEW fake_view AS SELECT * FROM fake_table_staging;'],
+    )
+    operator._hook = _Hook()
+    operator.create_hook = _Hook
+    with pytest.raises(RuntimeError):
+        operator.execute(context={})
+    assert statements == [
+        'delete from fake_table_staging;',
+        "LOAD DATA INPATH 'fake:uri//dummy' INTO TABLE fake_table_staging;",
+        'COMMIT fake_table_staging',
+    ]
+
+
+def test_load_data_operator_swap_invalidates_result_cache(tmpdir):
+    from airflow_indexima.cache import ResultCache
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    cache = ResultCache(cache_dir=str(tmpdir))
+    key = cache.get_key('select * from fake_table')
+
+    class _Hook:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, sql, progress_monitor=None):
+            # a custom swap: statements are not seen by result cache
+            return self
+
+    operator = IndeximaLoadDataOperator(
+        task_id="my_task",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        staging_table="fake_table_staging",
+        truncate=True,
+        swap_sql=['CREATE OR REPLACE VIEW fake_view AS SELECT * FROM fake_table_staging;'],
+        result_cache=cache,
+    )
+    operator._hook = _Hook()
+    operator._execute_swap_queries()
+    assert cache.get_key('select * from fake_table') != key
+    assert cache.get_epochs(['fake_table', 'fake_table_staging']) == {
+        'fake_table': 1,
+        'fake_table_staging': 1,
+    }
+
+
+def test_load_data_operator_progress_monitor_opt_in():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+    from airflow_indexima.progress import ProgressMonitor
+
+    op = IndeximaLoadDataOperator(
+        task_id='load', indexima_conn_id='my-conn', target_table='client', load_path_uri='s3://bucket/client'
+    )
+    assert op.create_progress_monitor() is None
+
+    op = IndeximaLoadDataOperator(
+        task_id='load',
+        indexima_conn_id='my-conn',
+        target_table='client',
+        load_path_uri='s3://bucket/client',
+        progress_log_interval_seconds=60,
+    )
+    assert isinstance(op.create_progress_monitor(), ProgressMonitor)
@@ -0,0 +1,160 @@
+import datetime
+import json
+
+import pytest
+from airflow import DAG
+from airflow.exceptions import AirflowException
+
+from airflow_indexima.manifest import create_load_tasks, read_manifest
+from airflow_indexima.operators.indexima import IndeximaBatchLoadDataOperator, IndeximaLoadDataOperator
+
+
+def _manifest(count):
+    return {
+        'defaults': {'format_query': 'PARQUET', 'truncate': True},
+        'tables': [
+            {
+                'target_table': f'db.table_{index}',
+                'load_path_uri': f's3://bucket/{index}',
+                'small': index % 2 == 0,
+            }
+            for index in range(count)
+        ],
+    }
+
+
+def test_read_manifest(tmp_path):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(_manifest(3)))
+    manifest = read_manifest(str(path))
+    assert len(manifest['tables']) == 3
+    # parsed once
+    assert read_manifest(str(path)) is manifest
+
+    with pytest.raises(ValueError):
+        read_manifest({'tables': [{'target_table': 'client'}]})
+
+
+def test_create_load_tasks():
+    dag = DAG(dag_id='my_dag', start_date=datetime.datetime(2019, 12, 1))
+    tasks = create_load_tasks(dag, _manifest(5), indexima_conn_id='my-conn', group_id='load', retries=2)
+    assert len(dag.task_dict) == 5
+    task = tasks['db.table_1']
+    assert isinstance(task, IndeximaLoadDataOperator)
+    assert task.task_id == 'load.db.table_1'
+    query = task.generate_load_data_query()
+    assert query == "LOAD DATA INPATH 's3://bucket/1' INTO TABLE db.table_1 FORMAT PARQUET;"
+    # hooks are created on first use
+    assert task._hook is None
+
+
+def test_create_batched_load_tasks():
+    dag = DAG(dag_id='my_dag', start_date=datetime.datetime(2019, 12, 1))
+    manifest = _manifest(7)
+    manifest['tables'][2].update(
+        staging_table='db.table_2_staging',
+        truncate=True,
+        swap_sql=['CREATE OR REPLACE VIEW db.table_2_view AS SELECT * FROM db.table_2_staging'],
+    )
+    tasks = create_load_tasks(
+        dag, manifest, indexima_conn_id='my-conn', batch_small_tables=True, batch_size=2
+    )
+    # small tables 0, 4 and 6 are batched, table 2 has a non load option
+    assert sorted(dag.task_dict) == [
+        'load.batch_0000',
+        'load.batch_0001',
+        'load.db.table_1',
+        'load.db.table_2',
+        'load.db.table_3',
+        'load.db.table_5',
+    ]
+    assert tasks['db.table_0'] is tasks['db.table_4']
+    assert isinstance(tasks['db.table_6'], IndeximaBatchLoadDataOperator)
+
+
+class _Cursor:
+    def fetchone(self):
+        return None
+
+
+class _Hook:
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, sql):
+        if 'broken' in sql:
+            raise RuntimeError('Table not found')
+        self.statements.append(sql)
+        return _Cursor()
+
+    def check_error_of_load_query(self, cursor):
+        pass
+
+    def commit(self, tablename):
+        self.statements.append(f'COMMIT {tablename}')
+
+    def rollback(self, tablename):
+        self.statements.append(f'ROLLBACK {tablename}')
+
+
+def test_batch_load_data_operator():
+    op = IndeximaBatchLoadDataOperator(
+        task_id='batch',
+        indexima_conn_id='my-conn',
+        loads=[
+            {'target_table': 'broken', 'load_path_uri': 's3://bucket/broken'},
+            {'target_table': 'country', 'load_path_uri': 's3://bucket/country', 'truncate': True},
+        ],
+    )
+    op._hook = _Hook()
+    with pytest.raises(AirflowException):
+        op.execute(context={})
+    assert op._hook.statements == [
+        'ROLLBACK broken',
+        'truncate table country;',
+        "LOAD DATA INPATH 's3://bucket/country' INTO TABLE country;",
+        'COMMIT country',
+    ]
+
+    with pytest.raises(ValueError):
+        IndeximaBatchLoadDataOperator(
+            task_id='batch', indexima_conn_id='my-conn', loads=[{'target_table': 'country'}]
+        )
+    with pytest.raises(ValueError):
+        IndeximaBatchLoadDataOperator(
+            task_id='batch',
+            indexima_conn_id='my-conn',
+            loads=[{'target_table': 'country', 'load_path_uri': None}],
+        )
+
+
+def test_batch_load_data_operator_ignore_none():
+    op = IndeximaBatchLoadDataOperator(
+        task_id='batch',
+        indexima_conn_id='my-conn',
+        loads=[
+            {
+                'target_table': 'country',
+                'load_path_uri': 's3://bucket/country',
+                'truncate_sql': None,
+                'format_query': None,
+                'skip_lines': None,
+            }
+        ],
+    )
+    assert op._loads == [{'target_table': 'country', 'load_path_uri': 's3://bucket/country'}]
+    # loads are a template field: a None value would be rendered as 'None'
+    assert '_loads' in op.template_fields
+    assert all(isinstance(value, str) for load in op._loads for value in load.values())
+    op._hook = _Hook()
+    op.execute(context={})
+    assert op._hook.statements == [
+        "LOAD DATA INPATH 's3://bucket/country' INTO TABLE country;",
+        'COMMIT country',
+    ]
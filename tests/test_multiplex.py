@@ -0,0 +1,130 @@
+import pytest
+from TCLIService import ttypes
+from thrift.transport.TTransport import TTransportException
+
+from airflow_indexima import multiplex
+from airflow_indexima.multiplex import SessionMultiplexer
+
+
+def _status():
+    return ttypes.TStatus(statusCode=ttypes.TStatusCode.SUCCESS_STATUS)
+
+
+class _Client:
+    def __init__(self, protocol):
+        self.requests = []
+        self.failing = False
+
+    def OpenSession(self, req):
+        if self.failing:
+            raise TTransportException(message='closed')
+        self.requests.append(req)
+        return ttypes.TOpenSessionResp(
+            status=_status(),
+            serverProtocolVersion=req.client_protocol,
+            sessionHandle=ttypes.TSessionHandle(
+                sessionId=ttypes.THandleIdentifier(guid=bytes([len(self.requests)]), secret=b'')
+            ),
+        )
+
+    def ExecuteStatement(self, req):
+        self.requests.append(req)
+        return ttypes.TExecuteStatementResp(
+            status=_status(),
+            operationHandle=ttypes.TOperationHandle(
+                operationId=ttypes.THandleIdentifier(guid=b'op', secret=b''),
+                operationType=ttypes.TOperationType.EXECUTE_STATEMENT,
+                hasResultSet=False,
+            ),
+        )
+
+    def CloseOperation(self, req):
+        return ttypes.TCloseOperationResp(status=_status())
+
+    def CloseSession(self, req):
+        self.requests.append(req)
+        return ttypes.TCloseSessionResp(status=_status())
+
+
+class _Transport:
+    opened = 0
+
+    def __init__(self):
+        self.is_open = False
+
+    def open(self):
+        _Transport.opened += 1
+        self.is_open = True
+
+    def isOpen(self):
+        return self.is_open
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    monkeypatch.setattr(multiplex.TCLIService, 'Client', _Client)
+    _Transport.opened = 0
+
+
+def test_sessions_share_transport(fake_client):
+    multiplexer = SessionMultiplexer()
+    first = multiplexer.connect(
+        key='a', transport_factory=_Transport, configuration={'k': '1'}, database='db1'
+    )
+    second = multiplexer.connect(key='a', transport_factory=_Transport, configuration={'k': '2'})
+    assert _Transport.opened == 1
+    assert first.sessionHandle != second.sessionHandle
+    assert first.client is second.client
+    requests = first.client._client.requests
+    assert [request.configuration for request in requests if hasattr(request, 'client_protocol')] == [
+        {'k': '1'},
+        {'k': '2'},
+    ]
+    assert [request.statement for request in requests if hasattr(request, 'statement')] == [
+        'USE `db1`',
+        'USE `default`',
+    ]
+    assert multiplexer.stats[0]['sessions'] == 2
+    first.close()
+    second.close()
+    assert multiplexer.stats[0]['sessions'] == 0
+
+    multiplexer.connect(key='b', transport_factory=_Transport)
+    assert _Transport.opened == 2
+
+
+def test_broken_transport_is_replaced(fake_client):
+    multiplexer = SessionMultiplexer()
+    connection = multiplexer.connect(key='a', transport_factory=_Transport)
+    connection.close()
+    connection.client._client.failing = True
+    other = multiplexer.connect(key='a', transport_factory=_Transport)
+    assert _Transport.opened == 2
+    assert other.client is not connection.client
+
+
+def test_interrupted_call_breaks_transport(fake_client):
+    multiplexer = SessionMultiplexer()
+    connection = multiplexer.connect(key='a', transport_factory=_Transport)
+
+    def _interrupted(req):
+        raise KeyboardInterrupt()
+
+    connection.client._client.ExecuteStatement = _interrupted
+    with pytest.raises(KeyboardInterrupt):
+        connection.client.ExecuteStatement(None)
+    # response of interrupted call could be unread: transport is not reused
+    other = multiplexer.connect(key='a', transport_factory=_Transport)
+    assert _Transport.opened == 2
+    assert other.client is not connection.client
+
+
+def test_shared_transport_is_not_reentrant(fake_client):
+    shared = multiplex.SharedTransport(_Transport)
+    with shared.acquire():
+        with pytest.raises(RuntimeError):
+            with shared.acquire():
+                pass
@@ -8,3 +8,275 @@ def test_indexima_query_runner_operator_exists():
     from airflow_indexima.operators.indexima import IndeximaQueryRunnerOperator
 
     assert IndeximaQueryRunnerOperator
+
+
+def test_indexima_range_extract_operator_exists():
+    from airflow_indexima.operators.indexima import IndeximaRangeExtractOperator
+
+    assert IndeximaRangeExtractOperator
+
+
+def test_indexima_commit_operator_members():
+    import datetime
+
+    from airflow import DAG
+    from airflow_indexima.operators.indexima import IndeximaCommitOperator, IndeximaLoadDataOperator
+
+    dag = DAG(dag_id='my_dag', start_date=datetime.datetime(2019, 12, 1))
+    load = IndeximaLoadDataOperator(
+        task_id="load",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        commit_group='my_group',
+        dag=dag,
+    )
+    other = IndeximaLoadDataOperator(
+        task_id="other",
+        indexima_conn_id='fake_connection_id',
+        target_table="fake_table",
+        load_path_uri="fake:uri//dummy",
+        dag=dag,
+    )
+    commit = IndeximaCommitOperator(
+        task_id="commit", indexima_conn_id='fake_connection_id', commit_group='my_group', dag=dag
+    )
+    commit.set_upstream([load, other])
+
+    assert commit.trigger_rule == 'all_done'
+    assert commit.get_members() == [load]
+
+
+def test_indexima_commit_operator_rollback_failed_member():
+    import datetime
+
+    import pytest
+    from airflow import DAG
+    from airflow.exceptions import AirflowException
+    from airflow_indexima.operators.indexima import IndeximaCommitOperator, IndeximaLoadDataOperator
+
+    class _TaskInstance:
+        def __init__(self, state, table=None):
+            self.state = state
+            self.table = table
+            self.pulled = []
+
+        def xcom_pull(self, task_ids, key):
+            self.pulled.append(key)
+            return tuple(dag_run.get_task_instance(task_id).table for task_id in task_ids)
+
+    class _DagRun:
+        def __init__(self, task_instances):
+            self.task_instances = task_instances
+
+        def get_task_instance(self, task_id):
+            return self.task_instances[task_id]
+
+    class _Hook:
+        def __init__(self):
+            self.statements = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def commit(self, tablename):
+            self.statements.append(f'COMMIT {tablename}')
+
+        def rollback(self, tablename):
+            self.statements.append(f'ROLLBACK {tablename}')
+
+    dag = DAG(dag_id='my_dag', start_date=datetime.datetime(2019, 12, 1))
+    loads = [
+        IndeximaLoadDataOperator(
+            task_id=f'load_{region}',
+            indexima_conn_id='my-conn',
+            target_table='client_{{ ds_nodash }}',
+            load_path_uri=f's3://bucket/client/{region}',
+            commit_group='client',
+            retries=2,
+            dag=dag,
+        )
+        for region in ('eu', 'us')
+    ]
+    commit = IndeximaCommitOperator(
+        task_id='commit', indexima_conn_id='my-conn', commit_group='client', dag=dag
+    )
+    commit.set_upstream(loads)
+
+    # a member which succeeded after a retry does not fail the group
+    commit._hook = _Hook()
+    dag_run = _DagRun(
+        {
+            'load_eu': _TaskInstance('success', 'client_20191201'),
+            'load_us': _TaskInstance('success', 'client_20191201'),
+        }
+    )
+    commit.execute(context={'dag_run': dag_run, 'task_instance': _TaskInstance('running')})
+    assert commit._hook.statements == ['COMMIT client_20191201']
+
+    # a member not executed (upstream failed) did not push its table
+    commit._hook = _Hook()
+    dag_run = _DagRun(
+        {'load_eu': _TaskInstance('success', 'client_20191201'), 'load_us': _TaskInstance('upstream_failed')}
+    )
+    with pytest.raises(AirflowException, match='load_us'):
+        commit.execute(context={'dag_run': dag_run, 'task_instance': _TaskInstance('running')})
+    assert commit._hook.statements == ['ROLLBACK client_20191201']
+
+
+def test_indexima_load_data_operator_push_commit_group_table():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    class _TaskInstance:
+        def __init__(self):
+            self.xcoms = {}
+
+        def xcom_push(self, key, value):
+            self.xcoms[key] = value
+
+    class _Hook:
+        statements = []
+        retry_policy = None
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, sql, progress_monitor=None):
+            self.statements.append(sql)
+
+        def check_error_of_load_query(self, cursor):
+            return 0
+
+        def is_dry_run(self):
+            return False
+
+    op = IndeximaLoadDataOperator(
+        task_id='load',
+        indexima_conn_id='my-conn',
+        target_table='client',
+        load_path_uri='s3://bucket/client',
+        commit_group='client',
+    )
+    op._hook = _Hook()
+    op.create_hook = _Hook
+    task_instance = _TaskInstance()
+    op.execute(context={'task_instance': task_instance})
+    assert task_instance.xcoms == {'commit_group_table': 'client'}
+    # committed by the group
+    assert not [sql for sql in _Hook.statements if sql.startswith('COMMIT')]
+
+
+def test_indexima_operator_with_broker():
+    from airflow_indexima.hooks.broker import IndeximaBrokerHook
+    from airflow_indexima.operators.indexima import IndeximaQueryRunnerOperator
+
+    op = IndeximaQueryRunnerOperator(
+        task_id='query',
+        indexima_conn_id='my-conn',
+        sql_query='select 1',
+        broker_socket_path='/tmp/broker.sock',
+    )
+    assert isinstance(op.get_hook(), IndeximaBrokerHook)
+
+
+def test_indexima_fan_out_operator():
+    import pytest
+    from airflow_indexima.operators.indexima import IndeximaFanOutOperator
+
+    class _Cursor:
+        def __init__(self, sql):
+            self.sql = sql
+
+    class _Hook:
+        def __init__(self):
+            self.statements = []
+            self.checked = []
+            self.closed = 0
+
+        def is_dry_run(self):
+            return False
+
+        def run(self, sql):
+            self.statements.append(sql)
+            if 'broken' in sql:
+                raise RuntimeError('Table not found')
+            return _Cursor(sql)
+
+        def check_error_of_load_query(self, cursor):
+            self.checked.append(cursor.sql)
+            if 'bad' in cursor.sql:
+                raise RuntimeError('bad load')
+
+        def close(self):
+            self.closed += 1
+
+    sql_queries = [
+        'select 1',
+        "LOAD DATA INPATH 's3://bucket/bad' INTO TABLE client;",
+        'select broken',
+        "LOAD DATA INPATH 's3://bucket/client' INTO TABLE client;",
+    ]
+    op = IndeximaFanOutOperator(
+        task_id='fan_out',
+        indexima_conn_id='my-conn',
+        sql_queries=sql_queries,
+        initial_concurrency=1,
+        max_concurrency=1,
+    )
+    hooks = []
+
+    def create_hook():
+        hooks.append(_Hook())
+        return hooks[-1]
+
+    op._hook = _Hook()
+    op.create_hook = create_hook
+    # all statements are executed, first error is raised at the end
+    with pytest.raises(RuntimeError, match='bad load'):
+        op.execute(context={})
+    # a single session is reused through idle hooks (and reopened after an error)
+    assert len(hooks) == 1
+    assert hooks[0].statements == sql_queries
+    # only results of loads are checked
+    assert hooks[0].checked == [sql_queries[1], sql_queries[3]]
+    # closed after each error, then at the end
+    assert hooks[0].closed == 3
+
+
+def test_indexima_load_data_operator_kill_rollback_once():
+    import pytest
+    from airflow.exceptions import AirflowException
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    class _Hook:
+        statements = []
+        retry_policy = None
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, sql, progress_monitor=None):
+            # like airflow signal handler: on_kill, then an exception in execute
+            op.on_kill()
+            raise AirflowException('Task received SIGTERM signal')
+
+        def rollback(self, tablename):
+            self.statements.append(f'ROLLBACK {tablename}')
+
+    op = IndeximaLoadDataOperator(
+        task_id='load', indexima_conn_id='my-conn', target_table='client', load_path_uri='s3://bucket/client'
+    )
+    op._hook = _Hook()
+    op.create_hook = _Hook
+    with pytest.raises(AirflowException):
+        op.execute(context={})
+    assert _Hook.statements == ['ROLLBACK client']
@@ -0,0 +1,81 @@
+import logging
+import time
+
+import pytest
+from TCLIService import ttypes
+
+from airflow_indexima.progress import OperationStalledError, OperationTimeoutError, ProgressMonitor
+
+
+def _status(progress=None):
+    return ttypes.TGetOperationStatusResp(
+        operationState=ttypes.TOperationState.RUNNING_STATE,
+        progressUpdateResponse=ttypes.TProgressUpdateResp(progressedPercentage=progress)
+        if progress is not None
+        else None,
+    )
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self):
+        super(_RecordHandler, self).__init__(level=logging.INFO)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_progress_monitor_eta_and_rows():
+    reports = []
+    # task logger does not propagate its records
+    logger = logging.getLogger('airflow.task')
+    handler = _RecordHandler()
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        monitor = ProgressMonitor(log_interval_seconds=0, on_progress=reports.append, logger=logger)
+        time.sleep(0.01)
+        progress = monitor.update(_status(0.25), logs=['INFO : 1,200 rows loaded from part-0'])
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    assert progress.progress == 0.25
+    assert progress.rows == 1200
+    assert progress.eta_seconds == pytest.approx(progress.elapsed_seconds * 3)
+    assert progress.rows_per_second > 0
+    assert reports == [progress]
+    # server logs and progress are logged in task logger
+    assert [record.getMessage() for record in handler.records] == [
+        'operation: INFO : 1,200 rows loaded from part-0',
+        f'operation: {progress}',
+    ]
+    assert monitor.update(_status(0.005)).progress == 0.005
+
+
+def test_progress_monitor_scale():
+    monitor = ProgressMonitor(progress_scale=100.0)
+    assert monitor.update(_status(50.0)).progress == 0.5
+    assert monitor.update(_status(0.5)).progress == 0.005
+    with pytest.raises(ValueError):
+        ProgressMonitor(progress_scale=0)
+
+
+def test_progress_monitor_stall():
+    monitor = ProgressMonitor(stall_timeout_seconds=0.05)
+    monitor.update(_status(0.1))
+    time.sleep(0.03)
+    monitor.update(_status(0.2))
+    time.sleep(0.03)
+    monitor.update(_status(0.2), logs=['still loading'])
+    time.sleep(0.06)
+    with pytest.raises(OperationStalledError):
+        monitor.update(_status(0.2))
+
+
+def test_progress_monitor_timeout():
+    monitor = ProgressMonitor(timeout_seconds=0.05)
+    monitor.update(_status(0.5))
+    time.sleep(0.06)
+    with pytest.raises(OperationTimeoutError):
+        monitor.update(_status(0.9))
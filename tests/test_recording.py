@@ -0,0 +1,69 @@
+import json
+import os
+
+from thrift.transport.TTransport import TMemoryBuffer, TTransportBase
+
+from airflow_indexima.recording import TRecordingTransport, get_rpc_name, load_capture, summarize_capture
+
+
+def _message(name: str) -> bytes:
+    encoded = name.encode()
+    return b'\x80\x01\x00\x01' + len(encoded).to_bytes(4, 'big') + encoded + b'\x00\x00\x00\x01'
+
+
+class _Transport(TTransportBase):
+    def __init__(self, response: bytes):
+        self.input = TMemoryBuffer(response)
+        self.output = TMemoryBuffer()
+
+    def isOpen(self):
+        return True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self, sz):
+        return self.input.read(sz)
+
+    def write(self, buf):
+        self.output.write(buf)
+
+    def flush(self):
+        pass
+
+
+def test_get_rpc_name():
+    assert get_rpc_name(_message('OpenSession')) == 'OpenSession'
+    assert get_rpc_name(b'\x00') is None
+
+
+def test_recording_transport(tmp_path):
+    path = str(tmp_path / 'capture.jsonl')
+    inner = _Transport(_message('OpenSession') + b'response')
+    transport = TRecordingTransport(transport=inner, path=path)
+    transport.open()
+    transport.write(_message('OpenSession'))
+    transport.write(b'request')
+    transport.flush()
+    transport.read(len(_message('OpenSession')))
+    transport.read(8)
+    transport.close()
+    assert inner.output.getvalue() == _message('OpenSession') + b'request'
+    # capture holds credentials and data
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    with open(path, 'r') as f:
+        events = [json.loads(line) for line in f]
+    assert [event['event'] for event in events] == ['open', 'request', 'response', 'close']
+    assert events[1]['rpc'] == 'OpenSession'
+    assert events[1]['size'] == len(_message('OpenSession')) + 7
+    assert events[2]['size'] == len(_message('OpenSession')) + 8
+    assert events[2]['elapsed'] >= 0
+
+    assert len(load_capture(path)) == 1
+    summary = summarize_capture(path)
+    assert summary['OpenSession']['count'] == 1
+    assert summary['OpenSession']['response_bytes'] == len(_message('OpenSession')) + 8
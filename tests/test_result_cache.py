@@ -0,0 +1,167 @@
+import datetime
+import decimal
+import os
+
+import pytest
+
+from airflow_indexima.cache import ResultCache, get_referenced_tables, is_cacheable_query, normalize_sql
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT  *\n FROM Client WHERE name = 'A  B';") == (
+        "select * from client where name = 'A  B'"
+    )
+
+
+def test_get_referenced_tables():
+    assert get_referenced_tables('select * from a join db.b on a.id = b.id') == ['a', 'db.b']
+    assert get_referenced_tables('select * from (select * from `c`) t') == ['c']
+    assert get_referenced_tables('select * from a, db.b x, c as y where a.id = x.id') == ['a', 'c', 'db.b']
+    assert get_referenced_tables("select * from a where name = 'from b'") == ['a']
+
+
+def test_is_cacheable_query():
+    assert is_cacheable_query(' Select 1')
+    assert not is_cacheable_query('COMMIT client')
+    assert not is_cacheable_query("LOAD DATA INPATH 'a' INTO TABLE b")
+
+
+def test_result_cache_put_and_get(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    key = cache.get_key('select id, name from client')
+    assert cache.get(key) is None
+
+    description = [('id', 'INT_TYPE', None, None, None, None, True), ('name', 'STRING_TYPE') + (None,) * 5]
+    cache.put(key, description=description, rows=[(1, 'a'), (2, None)])
+
+    cursor = cache.get(cache.get_key('SELECT id, name FROM client;'))
+    assert cursor.description == description
+    assert cursor.fetchone() == (1, 'a')
+    assert cursor.fetchall() == [(2, None)]
+    assert cursor.fetchone() is None
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['hit_rate'] == 0.5
+
+
+def test_result_cache_is_invalidated_on_commit(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    key = cache.get_key('select * from client')
+    cache.put(key, description=None, rows=[(1,)])
+
+    cache.bump_epoch_of_statement('COMMIT Client')
+
+    assert cache.get_key('select * from client') != key
+    cache.bump_epoch_of_statement('ROLLBACK other')
+    cache.bump_epoch_of_statement('select * from client')
+    assert cache.get_epochs(['client', 'other']) == {'client': 1, 'other': 1}
+
+
+def test_result_cache_is_invalidated_on_rename_drop_and_truncate(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    cache.bump_epoch_of_statement('ALTER TABLE client RENAME TO client__swap;')
+    assert cache.get_epochs(['client', 'client__swap']) == {'client': 1, 'client__swap': 1}
+    cache.bump_epoch_of_statement('drop table if exists client')
+    cache.bump_epoch_of_statement('TRUNCATE TABLE db.client')
+    cache.bump_epoch_of_statement('create or replace view client_view as select * from client')
+    assert cache.get_epochs(['client', 'client_view']) == {'client': 3, 'client_view': 1}
+
+
+def test_result_cache_is_invalidated_on_commit_of_a_comma_joined_table(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    sql = 'select * from a, b where a.id = b.id'
+    key = cache.get_key(sql)
+    cache.put(key, description=None, rows=[(1,)])
+    assert cache.get(cache.get_key(sql)) is not None
+
+    cache.bump_epoch_of_statement('COMMIT b')
+
+    assert cache.get_key(sql) != key
+    assert cache.get(cache.get_key(sql)) is None
+
+
+def test_result_cache_is_not_used_when_tables_are_not_identified(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    assert cache.is_cacheable('select * from a, b')
+    assert not cache.is_cacheable('select * from a, (select * from b) t')
+    assert not cache.is_cacheable('select * from a, explode_table(b)')
+
+
+def test_result_cache_eviction(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir), max_entries=2)
+    for i in range(3):
+        cache.put(cache.get_key(f'select {i}'), description=None, rows=[(i,)])
+    assert len(tmpdir.listdir(lambda p: p.basename.endswith('.result'))) == 2
+    assert cache.stats['evictions'] == 1
+
+
+def test_result_cache_key_scope(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    sql = 'select * from client'
+    assert cache.get_key(sql, conn_id='a') != cache.get_key(sql, conn_id='b')
+
+    # a commit on a db qualified table invalidate queries on its short name
+    key = cache.get_key('select * from client')
+    cache.bump_epoch_of_statement('COMMIT db.client')
+    assert cache.get_key('select * from client') != key
+
+    assert cache.is_cacheable('select * from client')
+    assert not cache.is_cacheable('select current_timestamp()')
+    assert not cache.is_cacheable('COMMIT client')
+
+
+def test_result_cache_ttl(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir), ttl_seconds=0)
+    key = cache.get_key('select * from client')
+    cache.put(key, description=None, rows=[(1,)])
+    assert cache.get(key) is None
+    assert ResultCache(cache_dir=str(tmpdir), ttl_seconds=None).get(key).fetchall() == [(1,)]
+
+
+def test_result_cache_unreadable_entry(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir), ttl_seconds=None)
+    key = cache.get_key('select * from client')
+    path = tmpdir.join(f'{key}.result')
+    cache.put(key, description=None, rows=[(1,)])
+    data = path.read_binary()
+    header = b'{"description": null, "at": 0}'
+    # empty, truncated in a column, header without columns (written by another version)
+    for content in (b'', data[:-3], len(header).to_bytes(8, 'big') + header):
+        path.write_binary(content)
+        assert cache.get(key) is None
+        assert not path.exists()
+    assert cache.stats['misses'] == 3
+
+
+def test_result_cache_value_types(tmpdir):
+    cache = ResultCache(cache_dir=str(tmpdir))
+    key = cache.get_key('select * from client')
+    row = (
+        1,
+        1.5,
+        True,
+        'a',
+        None,
+        b'\x00\xff',
+        decimal.Decimal('1.10'),
+        datetime.date(2020, 1, 2),
+        datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+    )
+    cache.put(key, description=None, rows=[row])
+    assert cache.get(key).fetchall() == [row]
+
+    # a result with a value of another type is not stored
+    key = cache.get_key('select * from other')
+    cache.put(key, description=None, rows=[(object(),)])
+    assert cache.get(key) is None
+
+
+def test_result_cache_directory_permissions(tmpdir):
+    cache_dir = tmpdir.join('cache')
+    ResultCache(cache_dir=str(cache_dir))
+    assert cache_dir.stat().mode & 0o777 == 0o700
+
+    shared_dir = tmpdir.mkdir('shared')
+    os.chmod(str(shared_dir), 0o777)
+    with pytest.raises(PermissionError):
+        ResultCache(cache_dir=str(shared_dir))
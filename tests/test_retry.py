@@ -0,0 +1,145 @@
+import pytest
+from pyhive import hive
+from TCLIService import ttypes
+from thrift.transport.TTransport import TTransportException
+
+from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.retry import (
+    RetryPolicy,
+    StatementInterruptedError,
+    is_idempotent_statement,
+    is_session_statement,
+    is_transient_error,
+)
+
+
+def test_is_transient_error():
+    assert is_transient_error(TTransportException(message='TSocket read 0 bytes'))
+    assert is_transient_error(ConnectionResetError())
+    assert is_transient_error(hive.OperationalError('Invalid SessionHandle: SessionHandle [1234]'))
+    assert not is_transient_error(hive.OperationalError('Table not found'))
+    assert not is_transient_error(ValueError())
+
+
+def test_is_idempotent_statement():
+    assert is_idempotent_statement(' SELECT * from client')
+    assert is_idempotent_statement('PAUSE 1000')
+    assert not is_idempotent_statement("LOAD DATA INPATH 's3://bucket/client' INTO TABLE client;")
+    assert not is_idempotent_statement('truncate table client;')
+    # outcome of an interrupted commit is unknown
+    assert not is_idempotent_statement('commit client;')
+    assert not is_idempotent_statement("insert into client values ('select')")
+    assert is_session_statement('USE sales')
+    assert is_session_statement(" set hive.exec.parallel='true'")
+    assert not is_session_statement('select * from settings')
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(base_delay_seconds=1.0, max_delay_seconds=3.0)
+    for attempt in range(1, 10):
+        assert 0 <= policy.get_delay(attempt) <= min(3.0, 2 ** (attempt - 1))
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+class _FlakyHook(IndeximaHook):
+    def __init__(self, failures, **kwargs):
+        super(_FlakyHook, self).__init__(**kwargs)
+        self.failures = failures
+        self.connects = 0
+        self.statements = []
+
+    def get_conn(self, read_only=False):
+        self.connects += 1
+        self._cursor = object()
+
+    def close(self):
+        self._cursor = None
+
+    def _execute(self, sql):
+        self.statements.append(sql)
+        if len(self.statements) <= self.failures:
+            raise TTransportException(message='TSocket read 0 bytes')
+
+
+def test_hook_replay_idempotent_statement(indexima_connection):
+    policy = RetryPolicy(max_attempts=3, base_delay_seconds=0)
+    hook = _FlakyHook(failures=2, indexima_conn_id=indexima_connection.id, retry_policy=policy)
+    hook.run('select 1')
+    assert hook.statements == ['select 1'] * 3
+    assert hook.connects == 3
+
+    hook = _FlakyHook(failures=3, indexima_conn_id=indexima_connection.id, retry_policy=policy)
+    with pytest.raises(TTransportException):
+        hook.run('select 1')
+
+    hook = _FlakyHook(failures=1, indexima_conn_id=indexima_connection.id, retry_policy=policy)
+    with pytest.raises(StatementInterruptedError):
+        hook.run('truncate table client')
+    assert hook.statements == ['truncate table client']
+
+    hook = _FlakyHook(failures=1, indexima_conn_id=indexima_connection.id)
+    with pytest.raises(TTransportException):
+        hook.run('select 1')
+
+
+def test_hook_replay_session_statements(indexima_connection):
+    policy = RetryPolicy(max_attempts=3, base_delay_seconds=0)
+    hook = _FlakyHook(failures=0, indexima_conn_id=indexima_connection.id, retry_policy=policy)
+    hook.run('use sales')
+    hook.run("set hive.exec.parallel='true'")
+    hook.run('select 1')
+    hook.failures = len(hook.statements) + 1
+    hook.run('select 2')
+    assert hook.statements[3:] == ['select 2', 'use sales', "set hive.exec.parallel='true'", 'select 2']
+    assert hook.connects == 2
+
+    # session is restored by next statement after an interrupted statement
+    hook.failures = len(hook.statements) + 1
+    with pytest.raises(StatementInterruptedError):
+        hook.run('truncate table client')
+    hook.run('select 3')
+    assert hook.statements[-3:] == ['use sales', "set hive.exec.parallel='true'", 'select 3']
+
+    # an explicit close ends the session
+    IndeximaHook.close(hook)
+    hook.run('select 4')
+    assert hook.statements[-2:] == ['select 3', 'select 4']
+
+
+class _BrokenPollCursor:
+    def __init__(self, statements, broken):
+        self.statements = statements
+        self.broken = broken
+        self._operationHandle = object()
+
+    def execute(self, sql, async_=False):
+        self.statements.append(sql)
+
+    def poll(self):
+        if self.statements[-1] in self.broken:
+            self.broken.remove(self.statements[-1])
+            raise TTransportException(message='TSocket read 0 bytes')
+        return ttypes.TGetOperationStatusResp(operationState=ttypes.TOperationState.FINISHED_STATE)
+
+
+class _BrokenPollHook(IndeximaHook):
+    def __init__(self, broken, **kwargs):
+        super(_BrokenPollHook, self).__init__(**kwargs)
+        self.broken = broken
+        self.sessions = []
+
+    def get_conn(self, read_only=False):
+        self.sessions.append([])
+        self._cursor = _BrokenPollCursor(self.sessions[-1], self.broken)
+
+    def _create_connection(self, node=None, dedicated=False):
+        raise AssertionError('an operation lost with its connection is not cancelled')
+
+
+def test_hook_replay_session_statements_after_poll_error(indexima_connection):
+    policy = RetryPolicy(max_attempts=3, base_delay_seconds=0)
+    hook = _BrokenPollHook(broken=['select 1'], indexima_conn_id=indexima_connection.id, retry_policy=policy)
+    hook.run('use sales')
+    hook.run('select 1')
+    assert hook.sessions == [['use sales', 'select 1'], ['use sales', 'select 1']]
@@ -0,0 +1,36 @@
+from airflow_indexima.routing import HiveNode, NodeSelector, parse_hive_nodes
+
+
+def test_parse_hive_nodes():
+    assert parse_hive_nodes(['node-1:10001', ' node-2 ']) == [
+        HiveNode(host='node-1', port=10001),
+        HiveNode(host='node-2', port=10000),
+    ]
+
+
+def test_node_selector_prefer_fast_node():
+    selector = NodeSelector()
+    nodes = parse_hive_nodes(['slow', 'fast'])
+    selector.record_success(nodes[0], latency=2.0)
+    selector.record_success(nodes[1], latency=0.1)
+    assert selector.order(nodes) == [nodes[1], nodes[0]]
+
+
+def test_node_selector_penalize_failing_node():
+    selector = NodeSelector()
+    nodes = parse_hive_nodes(['failing', 'other'])
+    selector.record_failure(nodes[0])
+    assert selector.order(nodes) == [nodes[1], nodes[0]]
+
+
+def test_node_selector_read_only_prefer_least_loaded_node():
+    selector = NodeSelector()
+    nodes = parse_hive_nodes(['busy', 'idle'])
+    selector.record_success(nodes[0], latency=0.1)
+    selector.record_success(nodes[0], latency=0.1)
+    selector.record_success(nodes[1], latency=0.5)
+    assert selector.order(nodes) == [nodes[0], nodes[1]]
+    assert selector.order(nodes, read_only=True) == [nodes[1], nodes[0]]
+    selector.release(nodes[0])
+    selector.release(nodes[0])
+    assert selector.order(nodes, read_only=True) == [nodes[0], nodes[1]]
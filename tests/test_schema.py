@@ -0,0 +1,193 @@
+import io
+import logging
+import struct
+import zlib
+
+from thrift.protocol.TCompactProtocol import TCompactProtocol
+from thrift.Thrift import TType
+from thrift.transport.TTransport import TMemoryBuffer
+
+from airflow_indexima.catalog import TableCatalog, get_ddl_tables, parse_describe_rows
+from airflow_indexima.schema import (
+    ColumnSchema,
+    compare_schemas,
+    is_local_uri,
+    read_orc_schema,
+    read_parquet_schema,
+    read_source_schema,
+)
+
+
+def _parquet_file(elements):
+    """Build a parquet file tail with a schema (list of (name, physical type, converted type, children))."""
+    buffer = TMemoryBuffer()
+    protocol = TCompactProtocol(buffer)
+    protocol.writeStructBegin('FileMetaData')
+    protocol.writeFieldBegin('version', TType.I32, 1)
+    protocol.writeI32(1)
+    protocol.writeFieldEnd()
+    protocol.writeFieldBegin('schema', TType.LIST, 2)
+    protocol.writeListBegin(TType.STRUCT, len(elements))
+    for name, physical_type, converted_type, children in elements:
+        protocol.writeStructBegin('SchemaElement')
+        for field_id, ttype, value in (
+            (1, TType.I32, physical_type),
+            (4, TType.STRING, name),
+            (5, TType.I32, children),
+            (6, TType.I32, converted_type),
+        ):
+            if value is None:
+                continue
+            protocol.writeFieldBegin('', ttype, field_id)
+            if ttype == TType.STRING:
+                protocol.writeString(value)
+            else:
+                protocol.writeI32(value)
+            protocol.writeFieldEnd()
+        protocol.writeFieldStop()
+        protocol.writeStructEnd()
+    protocol.writeListEnd()
+    protocol.writeFieldEnd()
+    protocol.writeFieldStop()
+    protocol.writeStructEnd()
+    footer = buffer.getvalue()
+    return io.BytesIO(b'PAR1' + footer + struct.pack('<i', len(footer)) + b'PAR1')
+
+
+def _varint(value):
+    result = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            result.append(byte | 0x80)
+        else:
+            result.append(byte)
+            return bytes(result)
+
+
+def _message(*fields):
+    result = b''
+    for number, value in fields:
+        if isinstance(value, int):
+            result += _varint(number << 3) + _varint(value)
+        else:
+            result += _varint(number << 3 | 2) + _varint(len(value)) + value
+    return result
+
+
+def _orc_file(columns, compression=0):
+    subtypes = b''.join(_varint(index + 1) for index in range(len(columns)))
+    root = _message((1, 12), (2, subtypes)) + b''.join(_message((3, name.encode())) for name, _ in columns)
+    types = [root] + [_message((1, kind)) for _, kind in columns]
+    footer = _message(*((4, message) for message in types))
+    if compression == 1:
+        compressor = zlib.compressobj(wbits=-15)
+        chunk = compressor.compress(footer) + compressor.flush()
+        footer = struct.pack('<I', len(chunk) << 1)[:3] + chunk
+    postscript = _message((1, len(footer)), (2, compression), (8000, b'ORC'))
+    return io.BytesIO(b'ORC' + footer + postscript + bytes([len(postscript)]))
+
+
+def test_read_parquet_schema():
+    source = _parquet_file(
+        [
+            ('schema', None, None, 3),
+            ('id', 2, None, None),
+            ('name', 6, 0, None),
+            # nested children are skipped
+            ('tags', None, 3, 1),
+            ('list', None, None, 1),
+            ('element', 6, 0, None),
+        ]
+    )
+    assert read_parquet_schema(source) == [
+        ColumnSchema('id', 'bigint'),
+        ColumnSchema('name', 'string'),
+        ColumnSchema('tags', 'list'),
+    ]
+
+
+def test_read_orc_schema():
+    columns = [('id', 4), ('price', 14), ('day', 15)]
+    expected = [ColumnSchema('id', 'bigint'), ColumnSchema('price', 'decimal'), ColumnSchema('day', 'date')]
+    assert read_orc_schema(_orc_file(columns)) == expected
+    assert read_orc_schema(_orc_file(columns, compression=1)) == expected
+
+
+def test_read_source_schema_csv(tmp_path):
+    (tmp_path / '_SUCCESS').write_bytes(b'')
+    (tmp_path / 'part-0.csv').write_bytes(b'1\tjohn\t12.5\n2\tjane\t3.0\n')
+    assert len(read_source_schema(f'file://{tmp_path}', "'\\t'")) == 3
+    assert read_source_schema(f'hdfs://namenode{tmp_path}', "'\\t'") is None
+    assert read_source_schema(str(tmp_path), 'JSON') is None
+    assert is_local_uri(str(tmp_path)) and is_local_uri(f'file://{tmp_path}')
+    assert not is_local_uri('s3://bucket/client')
+
+
+def test_load_data_operator_schema_check_skipped():
+    from airflow_indexima.operators.indexima import IndeximaLoadDataOperator
+
+    class _WarningHandler(logging.Handler):
+        def __init__(self):
+            super(_WarningHandler, self).__init__(level=logging.WARNING)
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    op = IndeximaLoadDataOperator(
+        task_id='load',
+        indexima_conn_id='my-conn',
+        target_table='client',
+        load_path_uri='s3://bucket/client',
+        format_query='PARQUET',
+        check_source_schema=True,
+    )
+    handler = _WarningHandler()
+    op.log.addHandler(handler)
+    try:
+        # hook is not used: source schema is not read
+        op.validate_source_schema(hook=None)
+    finally:
+        op.log.removeHandler(handler)
+    assert handler.messages == [
+        'source schema check skipped, s3://bucket/client is not a local path (set a source_opener to read it)'
+    ]
+
+
+def test_compare_schemas():
+    target = [
+        ColumnSchema('id', 'bigint'),
+        ColumnSchema('price', 'decimal(10,2)'),
+        ColumnSchema('day', 'date'),
+    ]
+    assert compare_schemas([ColumnSchema('ID', 'int'), ColumnSchema('price', 'double')], target) == []
+    problems = compare_schemas([ColumnSchema('id', 'string'), ColumnSchema('extra', 'int')], target)
+    assert len(problems) == 2
+    assert 'id (string)' in problems[0]
+    assert 'extra' in problems[1]
+    assert compare_schemas([ColumnSchema('a', 'string')] * 2, target, by_name=False)
+    assert not compare_schemas([ColumnSchema('a', 'string')] * 3, target, by_name=False)
+
+
+def test_table_catalog(tmp_path):
+    rows = [
+        ('id', 'bigint', ''),
+        ('name', 'string', ''),
+        ('', None, None),
+        ('# Partition Information', '', ''),
+    ]
+    columns = parse_describe_rows(rows)
+    assert columns == [ColumnSchema('id', 'bigint'), ColumnSchema('name', 'string')]
+    assert get_ddl_tables('ALTER TABLE db.client RENAME TO db.customer') == ['db.client', 'db.customer']
+    assert get_ddl_tables('select * from client') == []
+
+    catalog = TableCatalog(cache_dir=str(tmp_path))
+    catalog.put('conn', 'Client', columns)
+    assert TableCatalog(cache_dir=str(tmp_path)).get('conn', 'client') == columns
+    assert TableCatalog(cache_dir=str(tmp_path), ttl_seconds=-1).get('conn', 'client') is None
+    catalog.invalidate_statement('conn', 'select * from client')
+    assert catalog.get('conn', 'client') == columns
+    catalog.invalidate_statement('conn', 'DROP TABLE IF EXISTS client')
+    assert catalog.get('conn', 'client') is None
@@ -0,0 +1,119 @@
+import datetime
+import io
+import os
+
+import pytest
+
+from airflow_indexima.hooks.indexima import IndeximaHook
+from airflow_indexima.parquet import write_parquet
+from airflow_indexima.schema import ColumnSchema, read_parquet_schema
+from airflow_indexima.staging import LocalStagingBackend, get_frame_schema, iter_frame_rows, stage_rows
+
+
+_COLUMNS = [
+    ColumnSchema('id', 'bigint'),
+    ColumnSchema('name', 'string'),
+    ColumnSchema('day', 'date'),
+    ColumnSchema('amount', 'decimal(10,2)'),
+]
+
+
+def test_write_parquet():
+    target = io.BytesIO()
+    rows = [(1, 'john', datetime.date(2020, 1, 1), '12.50'), (2, None, None, None)]
+    size = write_parquet(target, _COLUMNS, rows)
+    assert size == len(target.getvalue())
+    assert target.getvalue()[:4] == target.getvalue()[-4:] == b'PAR1'
+    assert read_parquet_schema(target) == [
+        ColumnSchema('id', 'bigint'),
+        ColumnSchema('name', 'string'),
+        ColumnSchema('day', 'date'),
+        ColumnSchema('amount', 'decimal'),
+    ]
+
+    with pytest.raises(ValueError):
+        write_parquet(io.BytesIO(), [ColumnSchema('id', 'bigint')], [('not a number',)])
+    with pytest.raises(ValueError):
+        write_parquet(io.BytesIO(), [ColumnSchema('tags', 'array<string>')], [])
+
+
+def test_stage_rows(tmp_path):
+    backend = LocalStagingBackend(base_dir=str(tmp_path), base_uri='hdfs://namenode/staging/')
+    location = backend.create_location(prefix='db.client')
+    rows = ((index, f'name-{index}', None, None) for index in range(25))
+    assert stage_rows(backend, location, _COLUMNS, rows, chunk_rows=10) == (25, 3)
+    assert sorted(os.listdir(location)) == ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet']
+    assert backend.get_uri(location) == f'hdfs://namenode/staging/{os.path.basename(location)}'
+    backend.delete_location(location)
+    assert not os.path.exists(location)
+
+
+def test_local_staging_permissions(tmp_path):
+    umask = os.umask(0o077)
+    try:
+        backend = LocalStagingBackend(base_dir=str(tmp_path))
+        location = backend.create_location(prefix='client')
+        with backend.open_chunk(location, 'part-00000.parquet') as target:
+            target.write(b'PAR1')
+    finally:
+        os.umask(umask)
+    # readable by Indexima servers running as another user
+    assert os.stat(location).st_mode & 0o777 == 0o755
+    assert os.stat(os.path.join(location, 'part-00000.parquet')).st_mode & 0o777 == 0o644
+
+    location = LocalStagingBackend(base_dir=str(tmp_path), mode=0o750).create_location(prefix='client')
+    assert os.stat(location).st_mode & 0o777 == 0o750
+
+
+class _Cursor:
+    def fetchone(self):
+        return None
+
+
+class _RecordingHook(IndeximaHook):
+    def __init__(self, **kwargs):
+        super(_RecordingHook, self).__init__(**kwargs)
+        self.statements = []
+        self.staged = []
+
+    def run(self, sql, progress_monitor=None):
+        if sql.startswith('LOAD'):
+            self.staged = os.listdir(sql.split("'")[1])
+        self.statements.append(sql)
+        return _Cursor()
+
+
+def test_hook_load_iterable(indexima_connection, tmp_path):
+    hook = _RecordingHook(indexima_conn_id=indexima_connection.id)
+    with pytest.raises(ValueError):
+        hook.load_iterable([], schema=_COLUMNS, table='client')
+
+    hook = _RecordingHook(
+        indexima_conn_id=indexima_connection.id, staging_backend=LocalStagingBackend(base_dir=str(tmp_path))
+    )
+    rows = ((index, 'name', None, None) for index in range(5))
+    assert hook.load_iterable(rows, schema=_COLUMNS, table='client', chunk_rows=2) == 5
+    assert len(hook.staged) == 3
+    assert hook.statements[0].endswith("INTO TABLE client FORMAT PARQUET;")
+    assert hook.statements[1] == 'COMMIT client'
+    # staging location is deleted
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_frame_schema():
+    pandas = pytest.importorskip('pandas')
+    frame = pandas.DataFrame(
+        {
+            'id': [1, 2],
+            'price': [1.5, float('nan')],
+            'name': ['john', None],
+            'at': pandas.to_datetime(['2020-01-01', None]),
+        }
+    )
+    assert get_frame_schema(frame) == [
+        ColumnSchema('id', 'bigint'),
+        ColumnSchema('price', 'double'),
+        ColumnSchema('name', 'string'),
+        ColumnSchema('at', 'timestamp'),
+    ]
+    assert list(iter_frame_rows(frame))[1] == (2, None, None, None)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from airflow_indexima.schema import ColumnSchema
+from airflow_indexima.warmup import get_default_warm_up_queries, run_warm_up_queries
+
+
+def test_default_warm_up_queries():
+    columns = [
+        ColumnSchema('id', 'bigint'),
+        ColumnSchema('name', 'varchar(20)'),
+        ColumnSchema('price', 'decimal(10,2)'),
+        ColumnSchema('tags', 'array<string>'),
+        ColumnSchema('day', 'date'),
+    ]
+    assert get_default_warm_up_queries('client', columns, max_columns=4) == [
+        'SELECT COUNT(*) FROM client',
+        'SELECT id, COUNT(*) FROM client GROUP BY id LIMIT 100',
+        'SELECT name, COUNT(*) FROM client GROUP BY name LIMIT 100',
+        'SELECT SUM(price) FROM client',
+    ]
+
+
+class _Hook:
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    created = 0
+
+    def __init__(self):
+        with _Hook.lock:
+            _Hook.created += 1
+        self.closed = False
+
+    def run(self, sql):
+        with _Hook.lock:
+            _Hook.active += 1
+            _Hook.max_active = max(_Hook.max_active, _Hook.active)
+        time.sleep(0.02)
+        with _Hook.lock:
+            _Hook.active -= 1
+        if 'missing' in sql:
+            raise RuntimeError('Table not found')
+        return self
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+def test_run_warm_up_queries():
+    queries = [f'select {index}' for index in range(8)] + ['select * from missing']
+    results = run_warm_up_queries(_Hook, queries, concurrency=3)
+    assert [sql for sql, _ in results] == queries
+    # a failed query is reported, not raised
+    assert results[-1][1] is None
+    assert all(latency > 0 for _, latency in results[:-1])
+    assert _Hook.max_active <= 3
+    assert _Hook.created <= 3